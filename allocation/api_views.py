@@ -13,9 +13,9 @@ from django.db import transaction
 from projects.models import Task
 from resources.models import Resource
 from .models import Assignment
+from .solver import assignment_solver
 from analytics.ai_services import AIResourceAllocationService
 from analytics.working_enhanced_ai import WorkingEnhancedAIService
-from analytics.services import UtilizationTrackingService
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +25,10 @@ logger = logging.getLogger(__name__)
 def ai_auto_assign_tasks(request):
     """
     Auto-assign multiple unassigned tasks using AI recommendations
+
+    With "mode": "solver" the tasks are assigned together by the deterministic
+    solver (allocation.solver) instead of one model call per task; "explain":
+    true then asks the model, in a single call, to word the reasons.
     """
     try:
         data = json.loads(request.body)
@@ -33,56 +37,65 @@ def ai_auto_assign_tasks(request):
         if not task_ids:
             return JsonResponse({'success': False, 'error': 'No tasks specified'})
         
+        if data.get('mode') == 'solver':
+            return _solver_auto_assign(task_ids, explain=bool(data.get('explain')))
+        
         ai_service = AIResourceAllocationService()
         assignments_made = []
         errors = []
         
+        unassigned = []
+        for task_id in task_ids:
+            try:
+                task = Task.objects.get(id=task_id)
+            except Task.DoesNotExist:
+                errors.append(f"Task {task_id} not found")
+                continue
+            # Skip if already assigned
+            if not Assignment.objects.filter(task=task).exists():
+                unassigned.append(task)
+        
+        # Get AI suggestions for all tasks concurrently, outside any transaction
+        suggestions_by_task = ai_service.suggest_allocations([task.id for task in unassigned])
+        
         with transaction.atomic():
-            for task_id in task_ids:
+            for task in unassigned:
                 try:
-                    task = Task.objects.get(id=task_id)
-                    
-                    # Skip if already assigned
-                    if Assignment.objects.filter(task=task).exists():
-                        continue
-                    
-                    # Get AI suggestions
-                    suggestions = ai_service.suggest_optimal_resource_allocation(
-                        task_id=task_id, 
-                        force_refresh=False
-                    )
-                    
-                    if suggestions and 'suggestions' in suggestions and suggestions['suggestions']:
-                        # Use the best suggestion (first one)
-                        best_suggestion = suggestions['suggestions'][0]
-                        resource_id = best_suggestion['resource']['id']
+                    # Savepoint per task: a failed task must not break the others
+                    with transaction.atomic():
+                        suggestions = suggestions_by_task.get(task.id)
                         
-                        resource = Resource.objects.get(id=resource_id)                        # Create assignment
-                        assignment = Assignment.objects.create(
-                            task=task,
-                            resource=resource,
-                            allocated_hours=task.estimated_hours
-                        )
+                        if suggestions and 'suggestions' in suggestions and suggestions['suggestions']:
+                            # Use the best suggestion (first one)
+                            best_suggestion = suggestions['suggestions'][0]
+                            resource_id = best_suggestion['resource']['id']
+                            
+                            resource = Resource.objects.get(id=resource_id)
+                            
+                            # Another request may have assigned it while the model was answering
+                            if Assignment.objects.filter(task=task).exists():
+                                continue
+                            
+                            # Create assignment
+                            assignment = Assignment.objects.create(
+                                task=task,
+                                resource=resource,
+                                allocated_hours=task.estimated_hours
+                            )
+                            
+                            assignments_made.append({
+                                'task_id': task.id,
+                                'task_name': task.name,
+                                'resource_id': resource.id,
+                                'resource_name': resource.name,
+                                'match_score': best_suggestion.get('match_score', 0),
+                                'reasoning': best_suggestion.get('reasoning', 'AI recommendation')
+                            })
                         
-                        # Update utilization tracking
-                        utilization_service = UtilizationTrackingService()
-                        utilization_service.record_daily_utilization()
-                        
-                        assignments_made.append({
-                            'task_id': task.id,
-                            'task_name': task.name,
-                            'resource_id': resource.id,
-                            'resource_name': resource.name,
-                            'match_score': best_suggestion.get('match_score', 0),
-                            'reasoning': best_suggestion.get('reasoning', 'AI recommendation')
-                        })
-                        
-                except Task.DoesNotExist:
-                    errors.append(f"Task {task_id} not found")
                 except Resource.DoesNotExist:
-                    errors.append(f"Resource not found for task {task_id}")
+                    errors.append(f"Resource not found for task {task.id}")
                 except Exception as e:
-                    errors.append(f"Failed to assign task {task_id}: {str(e)}")
+                    errors.append(f"Failed to assign task {task.id}: {str(e)}")
         
         return JsonResponse({
             'success': True,
@@ -97,6 +110,56 @@ def ai_auto_assign_tasks(request):
         logger.error(f"Error in AI auto-assign: {e}")
         return JsonResponse({'success': False, 'error': 'Internal server error'})
 
+def _solver_auto_assign(task_ids, explain=False):
+    """Assign the unassigned tasks among task_ids in one solver run"""
+    errors = []
+    ids = []
+    for task_id in task_ids:
+        try:
+            ids.append(int(task_id))
+        except (TypeError, ValueError):
+            errors.append(f"Task {task_id} not found")
+    tasks = Task.objects.in_bulk(ids)
+    for task_id in ids:
+        if task_id not in tasks:
+            errors.append(f"Task {task_id} not found")
+    assigned = set(Assignment.objects.filter(task_id__in=tasks).values_list('task_id', flat=True))
+    unassigned = [task for task_id, task in tasks.items() if task_id not in assigned]
+    
+    plan = assignment_solver.solve(unassigned)
+    explanations = AIResourceAllocationService().explain_assignments(plan['assignments']) if explain else {}
+    
+    assignments_made = []
+    with transaction.atomic():
+        for item in plan['assignments']:
+            task, resource = item['task'], item['resource']
+            # Another request may have assigned it while the plan was made
+            if Assignment.objects.filter(task=task).exists():
+                continue
+            Assignment.objects.create(task=task, resource=resource, allocated_hours=task.estimated_hours)
+            assignments_made.append({
+                'task_id': task.id,
+                'task_name': task.name,
+                'resource_id': resource.id,
+                'resource_name': resource.name,
+                'match_score': item['score'],
+                'skill_match': item['skill_match'],
+                'projected_utilization': item['projected_utilization'],
+                'reasoning': explanations.get(task.id, item['reasoning'])
+            })
+    
+    return JsonResponse({
+        'success': True,
+        'mode': 'solver',
+        'assignments_made': assignments_made,
+        'total_assigned': len(assignments_made),
+        'unassigned': [
+            {'task_id': item['task'].id, 'task_name': item['task'].name, 'reason': item['reason']}
+            for item in plan['unassigned']
+        ],
+        'errors': errors
+    })
+
 @login_required
 @require_http_methods(["POST"])
 @csrf_exempt
@@ -136,10 +199,6 @@ def assign_task(request):
             allocated_hours=task.estimated_hours
         )
         
-        # Update utilization tracking
-        utilization_service = UtilizationTrackingService()
-        utilization_service.record_daily_utilization()
-          
         # Get updated utilization
         new_utilization = resource.current_utilization()
         
@@ -273,10 +332,6 @@ def unassign_task(request):
           # Delete the assignment
         assignment.delete()
         
-        # Update utilization tracking
-        utilization_service = UtilizationTrackingService()
-        utilization_service.record_daily_utilization()
-        
         # Get updated utilization
         resource = Resource.objects.get(id=resource_id)
         new_utilization = resource.current_utilization()
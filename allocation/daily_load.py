@@ -0,0 +1,241 @@
+"""
+Materialized per-resource daily load
+
+Each assignment's allocated hours are spread evenly over the business days of
+its task, and leave from ResourceAvailability is recorded per business day
+(capped at the resource's daily capacity). ResourceDailyLoad stores the
+per-day totals so utilization over any range, including the leave-adjusted
+capacity, is a single SUM over an indexed table.
+"""
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.business_calendar import business_calendar
+from resources.models import Resource, ResourceAvailability
+from .models import Assignment, ResourceDailyLoad
+
+logger = logging.getLogger(__name__)
+
+# Differences smaller than this are treated as rounding noise
+HOURS_TOLERANCE = 0.001
+
+ASSIGNMENT_FIELDS = ('resource_id', 'allocated_hours', 'task__start_date', 'task__end_date', 'resource__location')
+LEAVE_FIELDS = ('resource_id', 'hours_per_day', 'start_date', 'end_date', 'resource__location', 'resource__capacity')
+
+# Availability entries of these types do not reduce capacity
+AVAILABLE_TYPES = ('available',)
+
+
+def distribute_hours(rows: Iterable[Tuple], start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> Dict[Tuple[int, date], float]:
+    """
+    Spread assignment hours over the business days of each task
+
+    Args:
+        rows: Tuples of (resource_id, allocated_hours, task_start, task_end, location)
+        start_date: Only return days on or after this date
+        end_date: Only return days on or before this date
+
+    Returns:
+        Dictionary mapping (resource_id, date) to allocated hours
+    """
+    loads = defaultdict(float)
+    lower = np.datetime64(start_date, 'D') if start_date else None
+    upper = np.datetime64(end_date, 'D') if end_date else None
+
+    for resource_id, hours, task_start, task_end, location in rows:
+        if not hours or task_end < task_start:
+            continue
+        days = np.arange(np.datetime64(task_start, 'D'), np.datetime64(task_end, 'D') + 1)
+        days = days[np.is_busday(days, busdaycal=business_calendar.calendar_for(location))]
+        if not len(days):
+            continue
+        per_day = float(hours) / len(days)
+        if lower is not None:
+            days = days[days >= lower]
+        if upper is not None:
+            days = days[days <= upper]
+        for day in days.tolist():
+            loads[(resource_id, day)] += per_day
+
+    return loads
+
+
+def distribute_leave(rows: Iterable[Tuple], start_date: Optional[date] = None,
+                     end_date: Optional[date] = None) -> Dict[Tuple[int, date], float]:
+    """
+    Spread leave over business days, capped at each resource's daily capacity
+
+    Args:
+        rows: Tuples of (resource_id, hours_per_day, start, end, location, weekly_capacity)
+        start_date: Only return days on or after this date
+        end_date: Only return days on or before this date
+
+    Returns:
+        Dictionary mapping (resource_id, date) to hours of leave
+    """
+    leave = defaultdict(float)
+    daily_capacity = {}
+
+    for resource_id, hours_per_day, leave_start, leave_end, location, capacity in rows:
+        if start_date:
+            leave_start = max(leave_start, start_date)
+        if end_date:
+            leave_end = min(leave_end, end_date)
+        if not hours_per_day or leave_end < leave_start:
+            continue
+        # Assuming 5-day work week
+        daily_capacity[resource_id] = capacity / 5
+        days = np.arange(np.datetime64(leave_start, 'D'), np.datetime64(leave_end, 'D') + 1)
+        days = days[np.is_busday(days, busdaycal=business_calendar.calendar_for(location))]
+        for day in days.tolist():
+            leave[(resource_id, day)] += float(hours_per_day)
+
+    # Overlapping entries cannot take away more than a full day
+    return {key: min(hours, daily_capacity[key[0]]) for key, hours in leave.items()}
+
+
+class DailyLoadService:
+    """Keep ResourceDailyLoad in sync with assignments"""
+
+    def expected_loads(self, resource_ids: Optional[List[int]] = None, start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> Dict[Tuple[int, date], Tuple[float, float]]:
+        """Compute (allocated_hours, leave_hours) per resource and day from the source tables"""
+        assignments = Assignment.objects.all()
+        availability = ResourceAvailability.objects.exclude(availability_type__in=AVAILABLE_TYPES)
+        if resource_ids is not None:
+            assignments = assignments.filter(resource_id__in=resource_ids)
+            availability = availability.filter(resource_id__in=resource_ids)
+        if start_date:
+            assignments = assignments.filter(task__end_date__gte=start_date)
+            availability = availability.filter(end_date__gte=start_date)
+        if end_date:
+            assignments = assignments.filter(task__start_date__lte=end_date)
+            availability = availability.filter(start_date__lte=end_date)
+
+        allocated = distribute_hours(assignments.values_list(*ASSIGNMENT_FIELDS).iterator(), start_date, end_date)
+        leave = distribute_leave(availability.values_list(*LEAVE_FIELDS).iterator(), start_date, end_date)
+        return {key: (allocated.get(key, 0.0), leave.get(key, 0.0)) for key in set(allocated) | set(leave)}
+
+    def refresh(self, resource_id: int, start_date: date, end_date: date) -> int:
+        """
+        Recompute one resource's rows for a date range
+
+        Only rows whose hours actually changed are written.
+
+        Returns:
+            Number of rows created, updated or deleted
+        """
+        if start_date is None or end_date is None or end_date < start_date:
+            return 0
+
+        expected = self.expected_loads([resource_id], start_date, end_date)
+        with transaction.atomic():
+            existing = {
+                row.date: row for row in ResourceDailyLoad.objects.select_for_update().filter(
+                    resource_id=resource_id, date__range=(start_date, end_date)
+                )
+            }
+            to_create, to_update = [], []
+            for (_, day), (hours, leave) in expected.items():
+                row = existing.pop(day, None)
+                if row is None:
+                    to_create.append(ResourceDailyLoad(
+                        resource_id=resource_id, date=day, allocated_hours=hours, leave_hours=leave
+                    ))
+                elif (abs(row.allocated_hours - hours) > HOURS_TOLERANCE
+                      or abs(row.leave_hours - leave) > HOURS_TOLERANCE):
+                    row.allocated_hours = hours
+                    row.leave_hours = leave
+                    # bulk_update does not apply auto_now
+                    row.updated_at = timezone.now()
+                    to_update.append(row)
+
+            if existing:
+                ResourceDailyLoad.objects.filter(pk__in=[row.pk for row in existing.values()]).delete()
+            if to_update:
+                ResourceDailyLoad.objects.bulk_update(to_update, ['allocated_hours', 'leave_hours', 'updated_at'])
+            if to_create:
+                ResourceDailyLoad.objects.bulk_create(to_create)
+
+        return len(to_create) + len(to_update) + len(existing)
+
+    def refresh_resource(self, resource_id: int) -> int:
+        """Recompute every row for one resource (e.g. after its location or capacity changed)"""
+        return self.rebuild([resource_id])
+
+    def rebuild(self, resource_ids: Optional[List[int]] = None, batch_size: int = 1000) -> int:
+        """
+        Rebuild the table from scratch
+
+        Args:
+            resource_ids: Limit the rebuild to these resources (default: all)
+            batch_size: Rows per INSERT
+
+        Returns:
+            Number of rows written
+        """
+        expected = self.expected_loads(resource_ids)
+        rows = [
+            ResourceDailyLoad(resource_id=resource_id, date=day, allocated_hours=hours, leave_hours=leave)
+            for (resource_id, day), (hours, leave) in expected.items()
+        ]
+        with transaction.atomic():
+            existing = ResourceDailyLoad.objects.all()
+            if resource_ids is not None:
+                existing = existing.filter(resource_id__in=resource_ids)
+            existing.delete()
+            ResourceDailyLoad.objects.bulk_create(rows, batch_size=batch_size)
+
+        from .utilization import utilization_engine
+        utilization_engine.cache.bump(
+            resource_ids if resource_ids is not None else Resource.objects.values_list('id', flat=True)
+        )
+
+        logger.info(f"Rebuilt daily load: {len(rows)} rows")
+        return len(rows)
+
+    def check(self, resource_ids: Optional[List[int]] = None) -> List[Dict]:
+        """
+        Compare stored rows with loads recomputed from assignments
+
+        Returns:
+            List of mismatches with resource_id, date, stored and expected hours
+            and leave hours
+        """
+        expected = self.expected_loads(resource_ids)
+        stored_rows = ResourceDailyLoad.objects.all()
+        if resource_ids is not None:
+            stored_rows = stored_rows.filter(resource_id__in=resource_ids)
+        stored = {
+            (resource_id, day): (hours, leave)
+            for resource_id, day, hours, leave in stored_rows.values_list(
+                'resource_id', 'date', 'allocated_hours', 'leave_hours'
+            ).iterator()
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            expected_hours, expected_leave = expected.get(key, (0.0, 0.0))
+            stored_hours, stored_leave = stored.get(key, (0.0, 0.0))
+            if (abs(expected_hours - stored_hours) > HOURS_TOLERANCE
+                    or abs(expected_leave - stored_leave) > HOURS_TOLERANCE):
+                mismatches.append({
+                    'resource_id': key[0],
+                    'date': key[1],
+                    'stored_hours': round(stored_hours, 3),
+                    'expected_hours': round(expected_hours, 3),
+                    'stored_leave_hours': round(stored_leave, 3),
+                    'expected_leave_hours': round(expected_leave, 3),
+                })
+        return mismatches
+
+
+# Global instance
+daily_load_service = DailyLoadService()
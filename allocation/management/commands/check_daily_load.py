@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from allocation.daily_load import daily_load_service
+
+
+class Command(BaseCommand):
+    help = 'Check the materialized daily load table against assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            type=int,
+            action='append',
+            dest='resource_ids',
+            help='Resource ID to check (can be repeated; default: all resources)'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the rows of resources with mismatches'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Maximum number of mismatches to print (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = daily_load_service.check(options['resource_ids'])
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Daily load table is consistent'))
+            return
+
+        for mismatch in mismatches[:options['limit']]:
+            self.stdout.write(
+                f"Resource {mismatch['resource_id']} on {mismatch['date']}: "
+                f"stored {mismatch['stored_hours']}h, expected {mismatch['expected_hours']}h"
+            )
+
+        resource_ids = sorted({mismatch['resource_id'] for mismatch in mismatches})
+        if options['fix']:
+            daily_load_service.rebuild(resource_ids)
+            self.stdout.write(
+                self.style.SUCCESS(f'Rebuilt daily load for {len(resource_ids)} resource(s)')
+            )
+        else:
+            raise CommandError(
+                f'{len(mismatches)} mismatched row(s) across {len(resource_ids)} resource(s); '
+                f'run with --fix or rebuild_daily_load'
+            )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from allocation.daily_load import daily_load_service
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized per-resource daily load table from assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            type=int,
+            action='append',
+            dest='resource_ids',
+            help='Resource ID to rebuild (can be repeated; default: all resources)'
+        )
+
+    def handle(self, *args, **options):
+        rows = daily_load_service.rebuild(options['resource_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt daily load table ({rows} rows)')
+        )
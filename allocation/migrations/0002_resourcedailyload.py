@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-17 23:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_add_remote_worker_fields'),
+        ('allocation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('allocated_hours', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_loads', to='resources.resource')),
+            ],
+            options={
+                'ordering': ['resource', 'date'],
+                'indexes': [models.Index(fields=['date', 'resource'], name='allocation__date_534676_idx')],
+                'unique_together': {('resource', 'date')},
+            },
+        ),
+    ]
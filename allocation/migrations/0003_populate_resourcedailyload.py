@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def populate_daily_load(apps, schema_editor):
+    from allocation.daily_load import distribute_hours
+
+    Assignment = apps.get_model('allocation', 'Assignment')
+    ResourceDailyLoad = apps.get_model('allocation', 'ResourceDailyLoad')
+
+    rows = Assignment.objects.values_list(
+        'resource_id', 'allocated_hours', 'task__start_date', 'task__end_date', 'resource__location'
+    ).iterator()
+    ResourceDailyLoad.objects.bulk_create(
+        [
+            ResourceDailyLoad(resource_id=resource_id, date=day, allocated_hours=hours)
+            for (resource_id, day), hours in distribute_hours(rows).items()
+        ],
+        batch_size=1000,
+    )
+
+
+def clear_daily_load(apps, schema_editor):
+    apps.get_model('allocation', 'ResourceDailyLoad').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0002_resourcedailyload'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_daily_load, clear_daily_load),
+    ]
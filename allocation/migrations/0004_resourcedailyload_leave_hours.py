@@ -0,0 +1,52 @@
+# Generated by Django 4.2.6 on 2026-10-18 00:03
+
+from django.db import migrations, models
+
+
+def populate_leave_hours(apps, schema_editor):
+    from allocation.daily_load import AVAILABLE_TYPES, LEAVE_FIELDS, distribute_leave
+
+    ResourceAvailability = apps.get_model('resources', 'ResourceAvailability')
+    ResourceDailyLoad = apps.get_model('allocation', 'ResourceDailyLoad')
+
+    rows = ResourceAvailability.objects.exclude(
+        availability_type__in=AVAILABLE_TYPES
+    ).values_list(*LEAVE_FIELDS).iterator()
+    leave = distribute_leave(rows)
+
+    existing = {
+        (row.resource_id, row.date): row
+        for row in ResourceDailyLoad.objects.filter(resource_id__in={key[0] for key in leave})
+    }
+    to_update, to_create = [], []
+    for (resource_id, day), hours in leave.items():
+        row = existing.get((resource_id, day))
+        if row is None:
+            to_create.append(ResourceDailyLoad(resource_id=resource_id, date=day, leave_hours=hours))
+        else:
+            row.leave_hours = hours
+            to_update.append(row)
+    ResourceDailyLoad.objects.bulk_update(to_update, ['leave_hours'], batch_size=1000)
+    ResourceDailyLoad.objects.bulk_create(to_create, batch_size=1000)
+
+
+def clear_leave_hours(apps, schema_editor):
+    ResourceDailyLoad = apps.get_model('allocation', 'ResourceDailyLoad')
+    ResourceDailyLoad.objects.filter(allocated_hours=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('allocation', '0003_populate_resourcedailyload'),
+        ('resources', '0005_add_remote_worker_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcedailyload',
+            name='leave_hours',
+            field=models.FloatField(default=0, help_text='Capacity lost to leave, capped at the daily capacity'),
+        ),
+        migrations.RunPython(populate_leave_hours, clear_leave_hours),
+    ]
@@ -14,4 +14,27 @@ class Assignment(models.Model):
         return f"{self.resource.name} assigned to {self.task.name}"
     
     class Meta:
-        unique_together = ['resource', 'task']
\ No newline at end of file
+        unique_together = ['resource', 'task']
+
+class ResourceDailyLoad(models.Model):
+    """Allocated and leave hours per resource per business day, derived from
+    assignments and ResourceAvailability.
+
+    Rows are maintained by the signal handlers in allocation.signals; use the
+    rebuild_daily_load / check_daily_load management commands after bulk edits.
+    """
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='daily_loads')
+    date = models.DateField()
+    allocated_hours = models.FloatField(default=0)
+    leave_hours = models.FloatField(default=0, help_text="Capacity lost to leave, capped at the daily capacity")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.resource.name} - {self.date} ({self.allocated_hours:.1f}h)"
+    
+    class Meta:
+        unique_together = ['resource', 'date']
+        indexes = [
+            models.Index(fields=['date', 'resource']),
+        ]
+        ordering = ['resource', 'date']
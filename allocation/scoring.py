@@ -0,0 +1,188 @@
+"""
+Task × resource scoring matrix
+
+Scores every candidate pair of a set of tasks and resources at once: skill
+match, adjacent-skill match, current and projected utilization, and cost, as
+NumPy arrays with one row per task and one column per resource. Skills are
+read in one query per side and utilization once per distinct task period, so
+allocation passes become masks and sorts over the arrays instead of issuing
+queries for every task, resource and pass.
+"""
+from collections import defaultdict
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from core.business_calendar import business_calendar
+from projects.models import Task
+from resources.models import Resource, ResourceSkill, Skill
+from .utilization import utilization_engine
+
+# Skill match used when a task lists no required skills
+DEFAULT_SKILL_MATCH = 0.5
+# Share of a direct match credited for a related skill
+ADJACENT_SKILL_CREDIT = 0.5
+# Hours of capacity per work day assumed for projected utilization
+HOURS_PER_WORKDAY = 8
+
+# Related skills by required skill name
+SKILL_ADJACENCIES = {
+    'JavaScript': ['TypeScript', 'React', 'Node.js'],
+    'Python': ['Django', 'Flask', 'Data Analysis'],
+    'AWS': ['Docker', 'DevOps', 'Kubernetes'],
+    'UI/UX Design': ['Graphic Design', 'Frontend Development'],
+}
+
+
+class ScoringMatrix:
+    """
+    Scores for every task (row) and resource (column) pair
+
+    Attributes:
+        skill_match: Share of the task's required skills the resource has
+            (DEFAULT_SKILL_MATCH for tasks without required skills)
+        adjacent_match: Like skill_match, crediting related skills
+            (SKILL_ADJACENCIES) at ADJACENT_SKILL_CREDIT; 0 without required skills
+        proficiency: Mean proficiency (1-10) over the required skills the resource has
+        current_utilization: Current-week utilization per resource
+        period_utilization: Utilization over each task's period
+        projected_utilization: period_utilization plus the task's hours
+        cost: Estimated hours × the resource's hourly cost
+    """
+
+    def __init__(self, tasks: Iterable[Task], resources: Iterable, with_utilization: bool = True):
+        """
+        Args:
+            tasks: Tasks to score (rows)
+            resources: Resources to score them against (columns)
+            with_utilization: Set to False to skip the utilization scores
+                (one query per distinct task period) when they are not needed
+        """
+        self.tasks = list(tasks)
+        self.resources = list(resources)
+        self._task_index = {task.id: row for row, task in enumerate(self.tasks)}
+        self._resource_index = {resource.id: column for column, resource in enumerate(self.resources)}
+
+        self.estimated_hours = np.array([task.estimated_hours or 0 for task in self.tasks], dtype=float)
+        self.priority = np.array([task.priority for task in self.tasks], dtype=float)
+        self.capacity = np.array([resource.capacity for resource in self.resources], dtype=float)
+        self.cost_per_hour = np.array([float(resource.cost_per_hour) for resource in self.resources])
+        self.cost = np.outer(self.estimated_hours, self.cost_per_hour)
+
+        self._load_skills()
+        if with_utilization:
+            self._load_utilization()
+
+    @property
+    def shape(self):
+        return len(self.tasks), len(self.resources)
+
+    def row(self, task) -> int:
+        return self._task_index[task.id]
+
+    def column(self, resource) -> int:
+        return self._resource_index[resource.id]
+
+    def _load_skills(self):
+        """Build required (task × skill) and held (resource × skill) matrices from two queries"""
+        required_rows = Task.skills_required.through.objects.filter(
+            task_id__in=self._task_index
+        ).values_list('task_id', 'skill_id')
+        held_rows = ResourceSkill.objects.filter(
+            resource_id__in=self._resource_index
+        ).values_list('resource_id', 'skill_id', 'proficiency')
+        required_rows, held_rows = list(required_rows), list(held_rows)
+
+        skill_ids = sorted({skill_id for _, skill_id in required_rows} | {skill_id for _, skill_id, _ in held_rows})
+        skill_index = {skill_id: index for index, skill_id in enumerate(skill_ids)}
+        self.skills = Skill.objects.in_bulk(skill_ids)
+        self._skill_ids = np.array(skill_ids, dtype=np.int64)
+
+        tasks, resources = self.shape
+        self.required = np.zeros((tasks, len(skill_ids)), dtype=bool)
+        for task_id, skill_id in required_rows:
+            self.required[self._task_index[task_id], skill_index[skill_id]] = True
+        self.held = np.zeros((resources, len(skill_ids)), dtype=bool)
+        levels = np.zeros((resources, len(skill_ids)))
+        for resource_id, skill_id, proficiency in held_rows:
+            column = self._resource_index[resource_id]
+            self.held[column, skill_index[skill_id]] = True
+            levels[column, skill_index[skill_id]] = proficiency
+
+        required = self.required.astype(float)
+        held = self.held.astype(float)
+        required_count = required.sum(axis=1, keepdims=True)
+        has_requirements = required_count > 0
+        per_task = np.where(has_requirements, required_count, 1)
+
+        direct = required @ held.T
+        self.skill_match = np.where(has_requirements, direct / per_task, DEFAULT_SKILL_MATCH)
+        self.proficiency = np.divide(required @ levels.T, direct, out=np.zeros_like(direct), where=direct > 0)
+
+        # related[s, t]: skill t is related to required skill s
+        related = np.zeros((len(skill_ids), len(skill_ids)))
+        names = {skill_id: skill.name for skill_id, skill in self.skills.items()}
+        by_name = defaultdict(list)
+        for skill_id, name in names.items():
+            by_name[name].append(skill_index[skill_id])
+        for skill_id in skill_ids:
+            for name in SKILL_ADJACENCIES.get(names.get(skill_id), []):
+                related[skill_index[skill_id], by_name.get(name, [])] = 1
+        # Required skills the resource lacks but holds a related skill for
+        related_only = (~self.held) & ((held @ related.T) > 0)
+        adjacent = required @ related_only.astype(float).T
+        self.adjacent_match = np.where(
+            has_requirements, (direct + ADJACENT_SKILL_CREDIT * adjacent) / per_task, 0.0
+        )
+
+    def _load_utilization(self):
+        """Current and per-task-period utilization, one engine call per distinct period"""
+        current = utilization_engine.compute(self.resources)
+        self.current_utilization = np.array([current[resource.id] for resource in self.resources], dtype=float)
+
+        tasks, resources = self.shape
+        self.period_utilization = np.zeros((tasks, resources))
+        workdays = np.zeros((tasks, resources))
+        rows_by_period = defaultdict(list)
+        for row, task in enumerate(self.tasks):
+            rows_by_period[(task.start_date, task.end_date)].append(row)
+        locations = sorted({resource.location for resource in self.resources}, key=str)
+        location_columns = {
+            location: [column for column, resource in enumerate(self.resources) if resource.location == location]
+            for location in locations
+        }
+
+        for (start_date, end_date), rows in rows_by_period.items():
+            period = utilization_engine.compute(self.resources, start_date, end_date)
+            self.period_utilization[rows] = [period[resource.id] for resource in self.resources]
+            for location, columns in location_columns.items():
+                workdays[np.ix_(rows, columns)] = business_calendar.count(start_date, end_date, location)
+
+        hours_available = HOURS_PER_WORKDAY * workdays
+        additional = np.divide(self.estimated_hours[:, None] * 100, hours_available,
+                               out=np.zeros_like(hours_available), where=hours_available > 0)
+        self.projected_utilization = np.round(self.period_utilization + additional, 1)
+
+    def skill_gap(self, task, resource) -> List[Skill]:
+        """Required skills of the task the resource does not have"""
+        missing = self.required[self.row(task)] & ~self.held[self.column(resource)]
+        return [self.skills[skill_id] for skill_id in self._skill_ids[missing].tolist()]
+
+    def rank(self, mask: np.ndarray, *keys: np.ndarray, limit: Optional[int] = None) -> List[int]:
+        """
+        Column indices selected by a mask, in descending order of the keys
+
+        The first key sorts first; ties keep resource order.
+        """
+        columns = np.flatnonzero(mask)
+        if len(columns) and keys:
+            order = np.lexsort([-key[columns] for key in reversed(keys)])
+            columns = columns[order]
+        return columns[:limit].tolist()
+
+
+def build_scoring_matrix(tasks: Iterable[Task], resources: Optional[Sequence] = None) -> ScoringMatrix:
+    """Score tasks against the given resources (every resource if not given)"""
+    if resources is None:
+        resources = Resource.objects.all()
+    return ScoringMatrix(tasks, resources)
@@ -0,0 +1,165 @@
+"""
+Signal handlers that keep ResourceDailyLoad and the utilization cache in sync
+with assignments, tasks, resources and availability (leave)
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from projects.models import Task
+from resources.models import Resource, ResourceAvailability
+from .daily_load import daily_load_service
+from .models import Assignment
+from .utilization import utilization_engine
+
+
+def _union(*spans):
+    """Smallest date range covering all non-empty spans"""
+    spans = [span for span in spans if span and span[0] and span[1]]
+    if not spans:
+        return None
+    return min(span[0] for span in spans), max(span[1] for span in spans)
+
+
+@receiver(pre_save, sender=Assignment)
+def remember_assignment_state(sender, instance, raw=False, **kwargs):
+    """Record the resource and task span an assignment had before saving"""
+    instance._daily_load_previous = None
+    if raw or not instance.pk:
+        return
+    instance._daily_load_previous = Assignment.objects.filter(pk=instance.pk).values_list(
+        'resource_id', 'allocated_hours', 'task__start_date', 'task__end_date'
+    ).first()
+
+
+@receiver(post_save, sender=Assignment)
+def update_daily_load_for_assignment(sender, instance, created, raw=False, **kwargs):
+    """Rewrite the daily load rows covered by the old and new assignment spans"""
+    previous = getattr(instance, '_daily_load_previous', None)
+    if not raw:
+        task = instance.task
+        span = (task.start_date, task.end_date)
+        if previous is None:
+            daily_load_service.refresh(instance.resource_id, *span)
+        else:
+            old_resource_id, old_hours, old_start, old_end = previous
+            if old_resource_id != instance.resource_id:
+                daily_load_service.refresh(old_resource_id, old_start, old_end)
+                daily_load_service.refresh(instance.resource_id, *span)
+            elif old_hours != instance.allocated_hours or (old_start, old_end) != span:
+                daily_load_service.refresh(instance.resource_id, *_union(span, (old_start, old_end)))
+
+    # Bump after the daily load is written so a reader never caches old rows under the new version
+    utilization_engine.cache.bump([instance.resource_id, previous[0] if previous else None])
+
+
+@receiver(pre_delete, sender=Assignment)
+def remember_deleted_assignment_span(sender, instance, **kwargs):
+    """Capture the task span while the task is still available"""
+    instance._daily_load_span = Task.objects.filter(pk=instance.task_id).values_list(
+        'start_date', 'end_date'
+    ).first()
+
+
+@receiver(post_delete, sender=Assignment)
+def update_daily_load_for_deleted_assignment(sender, instance, **kwargs):
+    """Remove the hours of a deleted assignment"""
+    span = getattr(instance, '_daily_load_span', None)
+    if span:
+        daily_load_service.refresh(instance.resource_id, *span)
+    utilization_engine.cache.bump([instance.resource_id])
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_dates(sender, instance, raw=False, **kwargs):
+    """Record the task dates and estimate before saving"""
+    instance._daily_load_previous = None
+    if raw or not instance.pk:
+        return
+    instance._daily_load_previous = Task.objects.filter(pk=instance.pk).values_list(
+        'start_date', 'end_date', 'estimated_hours'
+    ).first()
+
+
+@receiver(post_save, sender=Task)
+def update_daily_load_for_task(sender, instance, created, raw=False, **kwargs):
+    """Re-spread assigned hours when a task moves or changes length, and
+    invalidate cached utilization of its assignees when dates or estimate change"""
+    previous = getattr(instance, '_daily_load_previous', None)
+    if raw or created or previous is None:
+        return
+    old_start, old_end, old_estimate = previous
+    span = (instance.start_date, instance.end_date)
+    dates_changed = (old_start, old_end) != span
+    if not dates_changed and old_estimate == instance.estimated_hours:
+        return
+
+    resource_ids = list(Assignment.objects.filter(task=instance).values_list('resource_id', flat=True))
+    if dates_changed:
+        affected = _union((old_start, old_end), span)
+        for resource_id in resource_ids:
+            daily_load_service.refresh(resource_id, *affected)
+    utilization_engine.cache.bump(resource_ids)
+
+
+@receiver(pre_save, sender=Resource)
+def remember_resource_location(sender, instance, raw=False, **kwargs):
+    """Record the capacity and location (holidays depend on it) before saving"""
+    instance._daily_load_previous = None
+    if raw or not instance.pk:
+        return
+    instance._daily_load_previous = Resource.objects.filter(pk=instance.pk).values_list(
+        'capacity', 'location'
+    ).first()
+
+
+@receiver(post_save, sender=Resource)
+def update_daily_load_for_resource(sender, instance, created, raw=False, **kwargs):
+    """Rebuild a resource's rows and invalidate its cached utilization when
+    capacity or location changed"""
+    previous = getattr(instance, '_daily_load_previous', None)
+    if previous is not None and not raw and previous != (instance.capacity, instance.location):
+        # Leave is capped at the daily capacity and holidays depend on the location
+        daily_load_service.refresh_resource(instance.id)
+    if previous is None or previous != (instance.capacity, instance.location):
+        # New resources may reuse the id of a deleted one, so they get a fresh version too
+        utilization_engine.cache.bump([instance.id])
+
+
+@receiver(post_delete, sender=Resource)
+def invalidate_deleted_resource(sender, instance, **kwargs):
+    """Drop cached utilization of a deleted resource"""
+    utilization_engine.cache.bump([instance.id])
+
+
+@receiver(pre_save, sender=ResourceAvailability)
+def remember_availability_span(sender, instance, raw=False, **kwargs):
+    """Record the resource and dates of an availability entry before saving"""
+    instance._daily_load_previous = None
+    if raw or not instance.pk:
+        return
+    instance._daily_load_previous = ResourceAvailability.objects.filter(pk=instance.pk).values_list(
+        'resource_id', 'start_date', 'end_date'
+    ).first()
+
+
+@receiver(post_save, sender=ResourceAvailability)
+def update_daily_load_for_availability(sender, instance, created, raw=False, **kwargs):
+    """Rewrite leave hours covered by the old and new availability spans"""
+    previous = getattr(instance, '_daily_load_previous', None)
+    if not raw:
+        span = (instance.start_date, instance.end_date)
+        if previous is None:
+            daily_load_service.refresh(instance.resource_id, *span)
+        elif previous[0] != instance.resource_id:
+            daily_load_service.refresh(previous[0], previous[1], previous[2])
+            daily_load_service.refresh(instance.resource_id, *span)
+        else:
+            daily_load_service.refresh(instance.resource_id, *_union(span, previous[1:]))
+    utilization_engine.cache.bump([instance.resource_id, previous[0] if previous else None])
+
+
+@receiver(post_delete, sender=ResourceAvailability)
+def update_daily_load_for_deleted_availability(sender, instance, **kwargs):
+    """Give back the capacity of a deleted availability entry"""
+    daily_load_service.refresh(instance.resource_id, instance.start_date, instance.end_date)
+    utilization_engine.cache.bump([instance.resource_id])
@@ -0,0 +1,234 @@
+"""
+Deterministic bulk assignment solver
+
+Assigns many tasks at once without asking the model, as a series of optimal
+bipartite matchings: each round gives every resource at most one task, picking
+the matching with the highest total score (scipy's linear_sum_assignment), then
+books the matched tasks' hours against the resources' remaining capacity before
+the next round. Later rounds therefore see the hours booked by earlier ones:
+a task is only given to a resource if its hours fit in its own period and in
+the period of every task already booked on that resource, so no resource is
+booked beyond its free hours in any booked task's period.
+
+Scores combine skill match, task priority, hourly cost and the share of the
+resource's capacity left after the task (allocation.scoring.ScoringMatrix).
+Because tasks need different numbers of hours, filling capacity exactly is a
+generalized assignment problem; matching in rounds keeps every round optimal
+and the whole run fast (hundreds of tasks in well under a second).
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from scipy.optimize import linear_sum_assignment
+
+from core.business_calendar import business_calendar
+from projects.models import Task
+from resources.models import Resource
+from .scoring import ScoringMatrix
+from .timeline import build_timelines
+
+logger = logging.getLogger(__name__)
+
+# Weights of the parts of a pair's score (they sum to 1)
+SKILL_WEIGHT = 0.5
+PRIORITY_WEIGHT = 0.25
+CAPACITY_WEIGHT = 0.15
+COST_WEIGHT = 0.1
+MAX_PRIORITY = 5
+DEFAULT_MIN_SKILL_MATCH = 0.5
+# Differences smaller than this are treated as rounding noise
+HOURS_TOLERANCE = 0.001
+# Score of pairs that must not be matched
+INFEASIBLE = -1.0
+
+
+class AssignmentSolver:
+    """Assign tasks to resources by score, within each resource's free hours"""
+
+    def __init__(self, min_skill_match: Optional[float] = None):
+        """
+        Args:
+            min_skill_match: Lowest skill match a resource may be assigned at
+                (AUTO_ASSIGN_MIN_SKILL_MATCH if not given)
+        """
+        self._min_skill_match = min_skill_match
+
+    @property
+    def min_skill_match(self) -> float:
+        if self._min_skill_match is not None:
+            return self._min_skill_match
+        return getattr(settings, 'AUTO_ASSIGN_MIN_SKILL_MATCH', DEFAULT_MIN_SKILL_MATCH)
+
+    def solve(self, tasks: Iterable[Task], resources: Optional[Sequence[Resource]] = None) -> Dict[str, List[Dict]]:
+        """
+        Plan assignments for tasks; nothing is saved
+
+        Args:
+            tasks: Tasks to assign
+            resources: Candidate resources (every resource if not given)
+
+        Returns:
+            {"assignments": [...], "unassigned": [...]}. Assignments hold the
+            task, resource, score, skill_match, projected_utilization (over the
+            task's period, counting the hours planned before it), cost and
+            reasoning; unassigned entries hold the task and a reason.
+        """
+        tasks = sorted(tasks, key=lambda task: task.id)
+        resources = list(Resource.objects.all() if resources is None else resources)
+        if not tasks:
+            return {'assignments': [], 'unassigned': []}
+        if not resources:
+            return {'assignments': [], 'unassigned': [
+                {'task': task, 'reason': 'No resources to assign to'} for task in tasks
+            ]}
+
+        scores = ScoringMatrix(tasks, resources, with_utilization=False)
+        capacity = _CapacityState(tasks, resources)
+        skilled = scores.skill_match >= self.min_skill_match
+        fixed_score = self._fixed_score(scores)
+
+        plan = []
+        remaining = np.arange(len(tasks))
+        while len(remaining):
+            fits = capacity.fits(remaining, scores.estimated_hours[remaining]) & skilled[remaining]
+            if not fits.any():
+                break
+            weights = np.where(
+                fits,
+                fixed_score[remaining] + CAPACITY_WEIGHT * capacity.headroom(remaining, scores.estimated_hours[remaining]),
+                INFEASIBLE
+            )
+            # A zero-score "leave unassigned" column per task makes this a
+            # maximum-weight matching instead of one that must match every task
+            padded = np.hstack([weights, np.full((len(remaining), len(remaining)), 0.0)])
+            rows, columns = linear_sum_assignment(padded, maximize=True)
+            matched = columns < len(resources)
+            rows, columns = rows[matched], columns[matched]
+            matched = fits[rows, columns]
+            rows, columns = rows[matched], columns[matched]
+            if not len(rows):
+                break
+
+            for row, column in zip(rows.tolist(), columns.tolist()):
+                task_row = int(remaining[row])
+                plan.append(self._describe(scores, capacity, task_row, column, float(weights[row, column])))
+                capacity.book(task_row, column, scores.estimated_hours[task_row])
+            remaining = np.delete(remaining, rows)
+
+        unassigned = [
+            {
+                'task': tasks[row],
+                'reason': ('Not enough free capacity in the task period' if skilled[row].any()
+                           else 'No resource has enough of the required skills'),
+            }
+            for row in remaining.tolist()
+        ]
+        logger.info(f"Solver assigned {len(plan)} of {len(tasks)} tasks to {len(resources)} resources")
+        return {'assignments': sorted(plan, key=lambda item: item['task'].id), 'unassigned': unassigned}
+
+    def _fixed_score(self, scores: ScoringMatrix) -> np.ndarray:
+        """Parts of every pair's score that do not change as hours are booked"""
+        highest_rate = scores.cost_per_hour.max()
+        cheapness = 1 - scores.cost_per_hour / highest_rate if highest_rate > 0 else np.ones(scores.shape[1])
+        priority = np.clip(scores.priority, 0, MAX_PRIORITY) / MAX_PRIORITY
+        return SKILL_WEIGHT * scores.skill_match + PRIORITY_WEIGHT * priority[:, None] + COST_WEIGHT * cheapness
+
+    def _describe(self, scores: ScoringMatrix, capacity: '_CapacityState', row: int, column: int,
+                  score: float) -> Dict[str, Any]:
+        task, resource = scores.tasks[row], scores.resources[column]
+        skill_match = float(scores.skill_match[row, column])
+        projected = capacity.projected_utilization(row, column, scores.estimated_hours[row])
+        gap = scores.skill_gap(task, resource)
+        reasoning = f"Skill match {skill_match:.0%}, {projected:g}% utilized over the task period"
+        if gap:
+            reasoning += f"; missing {', '.join(skill.name for skill in gap)}"
+        return {
+            'task': task,
+            'resource': resource,
+            'score': round(score, 3),
+            'skill_match': round(skill_match, 3),
+            'projected_utilization': projected,
+            'cost': float(scores.cost[row, column]),
+            'reasoning': reasoning,
+        }
+
+
+class _CapacityState:
+    """Free hours of each resource in each task's period, less the hours planned so far"""
+
+    def __init__(self, tasks: List[Task], resources: List[Resource]):
+        start_date = min(task.start_date for task in tasks)
+        end_date = max(task.end_date for task in tasks)
+        timelines = build_timelines(resources, start_date, end_date)
+
+        shape = (len(tasks), len(resources))
+        self.free = np.zeros(shape)
+        self.load = np.zeros(shape)
+        self.available = np.zeros(shape)
+        for column, resource in enumerate(resources):
+            timeline = timelines[resource.id]
+            for row, task in enumerate(tasks):
+                self.free[row, column] = timeline.free_hours(task.start_date, task.end_date)
+                self.load[row, column] = timeline.load(task.start_date, task.end_date)
+                self.available[row, column] = timeline.available_hours(task.start_date, task.end_date)
+        self.planned = np.zeros(shape)
+        self.booked = np.zeros(shape, dtype=bool)
+
+        # Hours are spread evenly over a task's business days (as in the daily
+        # load), so booking task i books share[i, j] of its hours in task j's period
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        first = np.array([(task.start_date - start_date).days for task in tasks])
+        last = np.array([(task.end_date - start_date).days + 1 for task in tasks])
+        self._share = {}
+        self._location = [resource.location for resource in resources]
+        for location in set(self._location):
+            workday_prefix = np.concatenate(([0], np.cumsum(
+                np.is_busday(days, busdaycal=business_calendar.calendar_for(location))
+            )))
+            overlap_first = np.maximum(first[:, None], first[None, :])
+            overlap_last = np.maximum(np.minimum(last[:, None], last[None, :]), overlap_first)
+            overlap = (workday_prefix[overlap_last] - workday_prefix[overlap_first]).astype(float)
+            own = np.diag(overlap).copy()
+            self._share[location] = np.divide(overlap, own[:, None], out=np.zeros_like(overlap),
+                                              where=own[:, None] > 0)
+
+    def fits(self, rows: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """
+        Pairs (rows × every resource) with room for the tasks' hours
+
+        The hours must fit in the task's own period and, spread over its
+        business days, must not push the period of any task already booked on
+        the resource past its free hours.
+        """
+        slack = self.free - self.planned
+        room = slack[rows] - hours[:, None] >= -HOURS_TOLERANCE
+        for column in np.flatnonzero(self.booked.any(axis=0)):
+            booked = np.flatnonzero(self.booked[:, column])
+            share = self._share[self._location[column]][np.ix_(rows, booked)]
+            after = slack[booked, column][None, :] - hours[:, None] * share
+            room[:, column] &= (after >= -HOURS_TOLERANCE).all(axis=1)
+        # A task with hours needs at least one working day in its period
+        return room & ((self.available[rows] > 0) | (hours[:, None] <= 0))
+
+    def headroom(self, rows: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """Share of each resource's available hours still free after taking the task"""
+        left = self.free[rows] - self.planned[rows] - hours[:, None]
+        return np.clip(np.divide(left, self.available[rows], out=np.zeros_like(left),
+                                 where=self.available[rows] > 0), 0, 1)
+
+    def projected_utilization(self, row: int, column: int, hours: float) -> float:
+        available = self.available[row, column]
+        if available <= 0:
+            return 0
+        return round(float((self.load[row, column] + self.planned[row, column] + hours) / available * 100), 1)
+
+    def book(self, row: int, column: int, hours: float):
+        """Plan a task's hours on a resource"""
+        self.planned[:, column] += hours * self._share[self._location[column]][row]
+        self.booked[row, column] = True
+
+
+# Global instance
+assignment_solver = AssignmentSolver()
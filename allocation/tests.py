@@ -1,12 +1,32 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.db import IntegrityError
+from django.db import DatabaseError, IntegrityError
+from django.utils import timezone
 from datetime import date, timedelta
+from io import StringIO
 from decimal import Decimal
+from unittest.mock import patch
+import json
+import threading
 
-from .models import Assignment
-from resources.models import Resource, Skill
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+
+from analytics import ai_services
+from analytics.ai_services import gemini_service
+from utils.gemini_ai import GeminiAIService
+from utils.llm_backends import LocalBackend
+from utils.single_flight import single_flight
+
+from .daily_load import daily_load_service
+from .models import Assignment, ResourceDailyLoad
+from .scoring import build_scoring_matrix
+from .solver import AssignmentSolver
+from .timeline import build_timelines
+from resources.models import Resource, ResourceAvailability, ResourceSkill, Skill
+from resources.tests.test_utilization import SHARED_CACHES
 from projects.models import Project, Task
 
 
@@ -602,3 +622,578 @@ class AssignmentIntegrationTest(TestCase):
         self.assertGreater(assignment.updated_at, original_updated_at)
         self.assertEqual(assignment.allocated_hours, 50)
         self.assertEqual(assignment.notes, "Increased scope")
+
+
+class ResourceDailyLoadTest(TestCase):
+    """Test cases for the materialized daily load table"""
+    
+    def setUp(self):
+        self.resource = Resource.objects.create(name="Load Tester", role="Developer", capacity=40)
+        self.other = Resource.objects.create(name="Other Tester", role="Developer", capacity=40)
+        self.project = Project.objects.create(
+            name="Load Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        # Monday 2024-01-01 to Friday 2024-01-12: 10 business days
+        self.task = Task.objects.create(
+            project=self.project,
+            name="Load Task",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 1, 12),
+            estimated_hours=40
+        )
+    
+    def total_hours(self, resource):
+        return ResourceDailyLoad.objects.filter(resource=resource).aggregate(
+            total=Sum('allocated_hours'))['total'] or 0
+    
+    def test_assignment_create_spreads_hours(self):
+        """Test that hours are spread over business days only"""
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        
+        loads = ResourceDailyLoad.objects.filter(resource=self.resource)
+        self.assertEqual(loads.count(), 10)
+        self.assertTrue(all(load.date.weekday() < 5 for load in loads))
+        self.assertAlmostEqual(loads.first().allocated_hours, 4.0)
+    
+    def test_assignment_update_and_delete(self):
+        """Test that hour changes, reassignment and deletion rewrite rows"""
+        assignment = Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        
+        assignment.allocated_hours = 20
+        assignment.save()
+        self.assertAlmostEqual(self.total_hours(self.resource), 20)
+        
+        assignment.resource = self.other
+        assignment.save()
+        self.assertEqual(self.total_hours(self.resource), 0)
+        self.assertAlmostEqual(self.total_hours(self.other), 20)
+        
+        assignment.delete()
+        self.assertFalse(ResourceDailyLoad.objects.exists())
+    
+    def test_updated_rows_get_a_new_timestamp(self):
+        """Test that rewritten rows record when they changed"""
+        assignment = Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        long_ago = timezone.now() - timedelta(days=30)
+        ResourceDailyLoad.objects.update(updated_at=long_ago)
+        
+        assignment.allocated_hours = 20
+        assignment.save()
+        
+        updated = ResourceDailyLoad.objects.filter(resource=self.resource).values_list('updated_at', flat=True)
+        self.assertEqual(len(updated), 10)
+        self.assertTrue(all(stamp > long_ago for stamp in updated))
+    
+    def test_task_date_change_moves_rows(self):
+        """Test that moving a task re-spreads the assigned hours"""
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        
+        self.task.start_date = date(2024, 2, 5)
+        self.task.end_date = date(2024, 2, 9)
+        self.task.save()
+        
+        dates = list(ResourceDailyLoad.objects.filter(resource=self.resource).values_list('date', flat=True))
+        self.assertEqual(dates, [date(2024, 2, 5) + timedelta(days=i) for i in range(5)])
+        self.assertAlmostEqual(self.total_hours(self.resource), 40)
+    
+    def test_task_delete_removes_rows(self):
+        """Test that deleting a task removes its assigned hours"""
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        self.task.delete()
+        self.assertFalse(ResourceDailyLoad.objects.exists())
+    
+    def test_check_and_rebuild(self):
+        """Test the consistency checker and rebuild"""
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        self.assertEqual(daily_load_service.check(), [])
+        
+        # Bulk updates bypass the signal handlers
+        Assignment.objects.filter(resource=self.resource).update(allocated_hours=80)
+        mismatches = daily_load_service.check()
+        self.assertEqual(len(mismatches), 10)
+        self.assertEqual(mismatches[0]['expected_hours'], 8.0)
+        
+        call_command('rebuild_daily_load', stdout=StringIO())
+        self.assertEqual(daily_load_service.check(), [])
+        self.assertAlmostEqual(self.total_hours(self.resource), 80)
+
+
+class CapacityTimelineTest(TestCase):
+    """Test cases for the prefix-sum capacity timeline"""
+    
+    def setUp(self):
+        self.resource = Resource.objects.create(name="Timeline Tester", role="Developer", capacity=40)
+        self.project = Project.objects.create(
+            name="Timeline Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        # Fully books the first two weeks of January 2024
+        self.task = Task.objects.create(
+            project=self.project,
+            name="Busy Task",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 1, 12),
+            estimated_hours=80
+        )
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=80)
+        self.timeline = build_timelines([self.resource], date(2024, 1, 1), date(2024, 2, 29))[self.resource.id]
+    
+    def test_range_queries(self):
+        """Test load, availability and utilization over ranges"""
+        self.assertAlmostEqual(self.timeline.load(date(2024, 1, 1), date(2024, 1, 7)), 40)
+        self.assertAlmostEqual(self.timeline.available_hours(date(2024, 1, 1), date(2024, 1, 14)), 80)
+        self.assertEqual(self.timeline.workdays(date(2024, 1, 6), date(2024, 1, 7)), 0)
+        self.assertEqual(self.timeline.utilization(date(2024, 1, 8), date(2024, 1, 21)), 50)
+    
+    def test_matches_engine(self):
+        """Test that period utilization agrees with the engine"""
+        for start, end in [(date(2024, 1, 3), date(2024, 1, 17)), (date(2024, 1, 10), date(2024, 2, 2))]:
+            self.assertEqual(self.timeline.utilization(start, end), self.resource.current_utilization(start, end))
+    
+    def test_first_window(self):
+        """Test finding the first window with enough free hours"""
+        self.assertEqual(
+            self.timeline.first_window(5, 40),
+            (date(2024, 1, 15), date(2024, 1, 19))
+        )
+        self.assertEqual(
+            self.timeline.first_window(3, 24, earliest=date(2024, 1, 17)),
+            (date(2024, 1, 17), date(2024, 1, 19))
+        )
+        self.assertIsNone(self.timeline.first_window(5, 41))
+        self.assertIsNone(self.timeline.first_window(60, 1))
+
+
+class ScoringMatrixTest(TestCase):
+    """Test cases for the task × resource scoring matrix"""
+    
+    def setUp(self):
+        self.python = Skill.objects.create(name="Python")
+        self.aws = Skill.objects.create(name="AWS")
+        self.django = Skill.objects.create(name="Django")
+        self.expert = Resource.objects.create(name="Expert", role="Developer", capacity=40, cost_per_hour=100)
+        self.adjacent = Resource.objects.create(name="Adjacent", role="Developer", capacity=40, cost_per_hour=50)
+        self.novice = Resource.objects.create(name="Novice", role="Developer", capacity=40, cost_per_hour=30)
+        ResourceSkill.objects.create(resource=self.expert, skill=self.python, proficiency=9)
+        ResourceSkill.objects.create(resource=self.expert, skill=self.aws, proficiency=7)
+        ResourceSkill.objects.create(resource=self.adjacent, skill=self.python, proficiency=5)
+        ResourceSkill.objects.create(resource=self.adjacent, skill=self.django, proficiency=8)
+        self.resources = [self.expert, self.adjacent, self.novice]
+        
+        project = Project.objects.create(
+            name="Scoring Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        # Monday to Friday: 40 working hours
+        self.task = Task.objects.create(
+            project=project, name="Skilled Task",
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 12),
+            estimated_hours=10
+        )
+        self.task.skills_required.set([self.python, self.aws])
+        self.open_task = Task.objects.create(
+            project=project, name="Open Task",
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 12),
+            estimated_hours=20
+        )
+        busy_task = Task.objects.create(
+            project=project, name="Busy Task",
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 12),
+            estimated_hours=20
+        )
+        Assignment.objects.create(resource=self.expert, task=busy_task, allocated_hours=20)
+    
+    def test_scores(self):
+        """Test skill, utilization and cost scores for every pair"""
+        scores = build_scoring_matrix([self.task, self.open_task], self.resources)
+        
+        self.assertEqual(scores.shape, (2, 3))
+        self.assertEqual(scores.skill_match[0].tolist(), [1.0, 0.5, 0.0])
+        self.assertEqual(scores.skill_match[1].tolist(), [0.5, 0.5, 0.5])
+        # Django is related to Python, not AWS, so it earns no credit for the missing AWS
+        self.assertEqual(scores.adjacent_match[0].tolist(), [1.0, 0.5, 0.0])
+        self.assertEqual(scores.proficiency[0].tolist(), [8.0, 5.0, 0.0])
+        self.assertEqual(scores.period_utilization[0].tolist(), [50.0, 0.0, 0.0])
+        self.assertEqual(scores.projected_utilization[0].tolist(), [75.0, 25.0, 25.0])
+        self.assertEqual(scores.cost[1].tolist(), [2000.0, 1000.0, 600.0])
+        self.assertEqual(scores.skill_gap(self.task, self.adjacent), [self.aws])
+        self.assertEqual(scores.skill_gap(self.task, self.expert), [])
+    
+    def test_adjacent_skills(self):
+        """Test that a related skill earns partial credit for a missing one"""
+        self.task.skills_required.set([self.python])
+        ResourceSkill.objects.create(resource=self.novice, skill=self.django, proficiency=6)
+        scores = build_scoring_matrix([self.task], self.resources)
+        
+        self.assertEqual(scores.skill_match[0].tolist(), [1.0, 1.0, 0.0])
+        self.assertEqual(scores.adjacent_match[0].tolist(), [1.0, 1.0, 0.5])
+    
+    def test_rank(self):
+        """Test masked ranking by several keys"""
+        scores = build_scoring_matrix([self.task, self.open_task], self.resources)
+        row = scores.row(self.open_task)
+        
+        # Equal skill match: ties keep resource order, then fall to the next key
+        self.assertEqual(scores.rank(scores.skill_match[row] > 0, scores.skill_match[row]), [0, 1, 2])
+        self.assertEqual(
+            scores.rank(scores.skill_match[row] > 0, scores.skill_match[row], -scores.cost[row]),
+            [2, 1, 0]
+        )
+        self.assertEqual(scores.rank(scores.skill_match[0] > 0, scores.skill_match[0], limit=1), [0])
+        self.assertEqual(scores.rank(scores.skill_match[0] > 1, scores.skill_match[0]), [])
+    
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_query_count_does_not_grow_with_pairs(self):
+        """Test that scoring more tasks and resources issues no more queries (utilization cached)"""
+        cache.clear()
+        # Skills and skill names: three queries however many pairs are scored
+        build_scoring_matrix([self.task, self.open_task], self.resources)
+        with self.assertNumQueries(3):
+            build_scoring_matrix([self.task], self.resources[:1])
+        with self.assertNumQueries(3):
+            build_scoring_matrix([self.task, self.open_task], self.resources)
+
+
+class AssignmentSolverTest(TestCase):
+    """Test cases for the deterministic bulk assignment solver"""
+    
+    def setUp(self):
+        self.python = Skill.objects.create(name="Python")
+        self.senior = Resource.objects.create(name="Senior", role="Developer", capacity=40, cost_per_hour=120)
+        self.junior = Resource.objects.create(name="Junior", role="Developer", capacity=40, cost_per_hour=40)
+        ResourceSkill.objects.create(resource=self.senior, skill=self.python, proficiency=9)
+        self.project = Project.objects.create(
+            name="Solver Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        self.solver = AssignmentSolver(min_skill_match=0.5)
+    
+    def create_task(self, name, hours, priority=3, week=0, skills=()):
+        start = date(2024, 1, 8) + timedelta(weeks=week)
+        task = Task.objects.create(
+            project=self.project, name=name, priority=priority,
+            start_date=start, end_date=start + timedelta(days=4),
+            estimated_hours=hours
+        )
+        task.skills_required.set(skills)
+        return task
+    
+    def test_skills_then_cost(self):
+        """Test that skilled tasks go to the skilled resource and open ones to the cheaper"""
+        skilled = self.create_task("Skilled", 10, skills=[self.python])
+        open_task = self.create_task("Open", 10)
+        plan = self.solver.solve([skilled, open_task], [self.senior, self.junior])
+        
+        chosen = {item['task']: item['resource'] for item in plan['assignments']}
+        self.assertEqual(chosen, {skilled: self.senior, open_task: self.junior})
+        self.assertEqual(plan['unassigned'], [])
+    
+    def test_capacity_is_respected_by_priority(self):
+        """Test that a full week goes to the higher priority task while a later week has its own capacity"""
+        tasks = [
+            self.create_task("Low", 30, priority=1),
+            self.create_task("High", 30, priority=5),
+            self.create_task("Later", 30, priority=1, week=1),
+        ]
+        plan = self.solver.solve(tasks, [self.junior])
+        
+        self.assertEqual([item['task'] for item in plan['assignments']], [tasks[1], tasks[2]])
+        self.assertEqual(plan['assignments'][0]['projected_utilization'], 75.0)
+        self.assertEqual(plan['unassigned'], [
+            {'task': tasks[0], 'reason': 'Not enough free capacity in the task period'}
+        ])
+    
+    def test_existing_load_and_planned_hours_count(self):
+        """Test that hours already booked and hours planned in the same run both use up capacity"""
+        booked = self.create_task("Booked", 20)
+        Assignment.objects.create(resource=self.junior, task=booked, allocated_hours=20)
+        tasks = [self.create_task(f"Task {i}", 8) for i in range(4)]
+        plan = self.solver.solve(tasks, [self.junior])
+        
+        self.assertEqual(len(plan['assignments']), 2)
+        self.assertEqual(max(item['projected_utilization'] for item in plan['assignments']), 90.0)
+        self.assertEqual(len(plan['unassigned']), 2)
+    
+    def test_long_task_cannot_overfill_a_booked_short_one(self):
+        """Test that a task spanning a booked task's period also fits within that period"""
+        short = self.create_task("Short", 20, priority=5)
+        long_task = Task.objects.create(
+            project=self.project, name="Long", priority=1,
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 19),
+            estimated_hours=60
+        )
+        plan = self.solver.solve([short, long_task], [self.junior])
+        
+        # The long task fits its own 80 free hours, but half of it (30 h) would
+        # land in the short task's week, already holding 20 of 40 free hours
+        self.assertEqual([item['task'] for item in plan['assignments']], [short])
+        self.assertEqual(plan['unassigned'], [
+            {'task': long_task, 'reason': 'Not enough free capacity in the task period'}
+        ])
+        
+        long_task.estimated_hours = 40
+        long_task.save()
+        plan = self.solver.solve([short, long_task], [self.junior])
+        self.assertEqual([item['task'] for item in plan['assignments']], [short, long_task])
+    
+    def test_unmatched_skills(self):
+        """Test that a task nobody is skilled enough for is left unassigned"""
+        go = Skill.objects.create(name="Go")
+        task = self.create_task("Go Task", 10, skills=[go])
+        plan = self.solver.solve([task], [self.senior, self.junior])
+        
+        self.assertEqual(plan['assignments'], [])
+        self.assertEqual(plan['unassigned'][0]['reason'], 'No resource has enough of the required skills')
+
+
+class LeaveAwareCapacityTest(TestCase):
+    """Test cases for leave reducing capacity"""
+    
+    def setUp(self):
+        self.resource = Resource.objects.create(name="Leave Tester", role="Developer", capacity=40)
+        self.project = Project.objects.create(
+            name="Leave Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        self.task = Task.objects.create(
+            project=self.project,
+            name="Leave Task",
+            start_date=date(2024, 1, 8),
+            end_date=date(2024, 1, 12),
+            estimated_hours=20
+        )
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=20)
+        self.week = (date(2024, 1, 8), date(2024, 1, 14))
+    
+    def test_leave_reduces_capacity(self):
+        """Test that vacation shrinks available hours and raises utilization"""
+        self.assertEqual(self.resource.current_utilization(*self.week), 50)
+        
+        leave = ResourceAvailability.objects.create(
+            resource=self.resource,
+            availability_type='vacation',
+            start_date=date(2024, 1, 11),
+            end_date=date(2024, 1, 14),
+            hours_per_day=8
+        )
+        # Thursday and Friday off: 20h of 24h available
+        self.assertEqual(self.resource.current_utilization(*self.week), 83.3)
+        
+        leave.start_date = date(2024, 1, 12)
+        leave.save()
+        self.assertEqual(self.resource.current_utilization(*self.week), 62.5)
+        
+        leave.delete()
+        self.assertEqual(self.resource.current_utilization(*self.week), 50)
+    
+    def test_available_entries_and_capacity_cap(self):
+        """Test that 'available' entries are ignored and leave is capped per day"""
+        ResourceAvailability.objects.create(
+            resource=self.resource, availability_type='available',
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 12)
+        )
+        ResourceAvailability.objects.create(
+            resource=self.resource, availability_type='training',
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 8), hours_per_day=6
+        )
+        ResourceAvailability.objects.create(
+            resource=self.resource, availability_type='meeting',
+            start_date=date(2024, 1, 8), end_date=date(2024, 1, 8), hours_per_day=6
+        )
+        
+        load = ResourceDailyLoad.objects.get(resource=self.resource, date=date(2024, 1, 8))
+        self.assertEqual(load.leave_hours, 8)
+        self.assertEqual(daily_load_service.check(), [])
+        
+        timeline = build_timelines([self.resource], *self.week)[self.resource.id]
+        self.assertAlmostEqual(timeline.available_hours(*self.week), 32)
+        self.assertEqual(timeline.utilization(*self.week), self.resource.current_utilization(*self.week))
+        
+        # Halving capacity re-caps the stored leave
+        self.resource.capacity = 20
+        self.resource.save()
+        load = ResourceDailyLoad.objects.get(resource=self.resource, date=date(2024, 1, 8))
+        self.assertEqual(load.leave_hours, 4)
+
+
+class AIAutoAssignTest(TestCase):
+    """Test cases for bulk AI auto-assignment"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(self.user)
+        self.resources = [
+            Resource.objects.create(name=f"Developer {i}", role="Developer", capacity=40)
+            for i in range(2)
+        ]
+        project = Project.objects.create(
+            name="Test Project",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30)
+        )
+        self.tasks = [
+            Task.objects.create(
+                project=project, name=f"Task {i}",
+                start_date=date.today(), end_date=date.today() + timedelta(days=10),
+                estimated_hours=8
+            )
+            for i in range(2)
+        ]
+    
+    def test_model_calls_are_batched(self):
+        """Test that every task's prompt goes out in one batch and all tasks get assigned"""
+        responses = [
+            {"recommendations": [{"resource_id": resource.id, "match_score": 0.9}]}
+            for resource in self.resources
+        ]
+        with patch.object(gemini_service, 'is_available', return_value=True), \
+                patch.object(gemini_service, 'batch_generate', return_value=responses) as batch:
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks] + [999999]}),
+                content_type='application/json'
+            )
+        
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['total_assigned'], 2)
+        self.assertEqual(data['errors'], ["Task 999999 not found"])
+        batch.assert_called_once()
+        self.assertEqual(len(batch.call_args.args[0]), 2)
+        for task, resource in zip(self.tasks, self.resources):
+            self.assertEqual(Assignment.objects.get(task=task).resource, resource)
+    
+    def test_failed_call_leaves_task_unassigned(self):
+        """Test that a task whose model call failed is skipped"""
+        responses = [{"recommendations": [{"resource_id": self.resources[0].id}]}, None]
+        with patch.object(gemini_service, 'is_available', return_value=True), \
+                patch.object(gemini_service, 'batch_generate', return_value=responses):
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks]}),
+                content_type='application/json'
+            )
+        
+        self.assertEqual(response.json()['total_assigned'], 1)
+        self.assertFalse(Assignment.objects.filter(task=self.tasks[1]).exists())
+    
+    def test_database_error_on_one_task_keeps_the_others(self):
+        """Test that each task is assigned in its own savepoint"""
+        responses = [
+            {"recommendations": [{"resource_id": resource.id, "match_score": 0.9}]}
+            for resource in self.resources
+        ]
+        refresh = daily_load_service.refresh
+        calls = []
+        
+        def fail_first(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise DatabaseError("disk I/O error")
+            return refresh(*args, **kwargs)
+        
+        with patch.object(gemini_service, 'is_available', return_value=True), \
+                patch.object(gemini_service, 'batch_generate', return_value=responses), \
+                patch.object(daily_load_service, 'refresh', side_effect=fail_first):
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks]}),
+                content_type='application/json'
+            )
+        
+        data = response.json()
+        self.assertEqual([item['task_id'] for item in data['assignments_made']], [self.tasks[1].id])
+        self.assertEqual(len(data['errors']), 1)
+        self.assertFalse(Assignment.objects.filter(task=self.tasks[0]).exists())
+        self.assertEqual(Assignment.objects.get(task=self.tasks[1]).resource, self.resources[1])
+    
+    @override_settings(LLM_CACHE_ENABLED=False, LLM_TELEMETRY_ENABLED=False)
+    def test_end_to_end_with_local_backend(self):
+        """Test the whole auto-assign path against the offline LLM stand-in"""
+        service = GeminiAIService(backend=LocalBackend(latency_ms=0))
+        with patch.object(ai_services, 'gemini_service', service):
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks]}),
+                content_type='application/json'
+            )
+        
+        self.assertEqual(response.json()['total_assigned'], 2)
+        resource_ids = {resource.id for resource in self.resources}
+        for task in self.tasks:
+            self.assertIn(Assignment.objects.get(task=task).resource_id, resource_ids)
+    
+    def test_solver_mode_makes_no_model_calls(self):
+        """Test that solver mode assigns every task without asking the model"""
+        with patch.object(gemini_service, 'batch_generate') as batch, \
+                patch.object(gemini_service, 'generate_json_response') as generate:
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks], 'mode': 'solver'}),
+                content_type='application/json'
+            )
+        
+        data = response.json()
+        self.assertEqual(data['mode'], 'solver')
+        self.assertEqual(data['total_assigned'], 2)
+        self.assertEqual(data['unassigned'], [])
+        batch.assert_not_called()
+        generate.assert_not_called()
+        # 8 hours each: one per developer keeps the load even
+        self.assertEqual(
+            {Assignment.objects.get(task=task).resource for task in self.tasks}, set(self.resources)
+        )
+    
+    def test_solver_mode_accepts_string_ids(self):
+        """Test that task IDs sent as strings are found"""
+        response = self.client.post(
+            reverse('ai_auto_assign_tasks'),
+            data=json.dumps({'task_ids': [str(task.id) for task in self.tasks] + ['999999', 'x'], 'mode': 'solver'}),
+            content_type='application/json'
+        )
+        
+        data = response.json()
+        self.assertEqual(data['total_assigned'], 2)
+        self.assertEqual(data['errors'], ["Task x not found", "Task 999999 not found"])
+    
+    def test_solver_mode_explanations_take_one_call(self):
+        """Test that solver explanations come from a single model call"""
+        explanations = {"explanations": [
+            {"task_id": task.id, "reasoning": f"Explained {task.name}"} for task in self.tasks
+        ]}
+        with patch.object(gemini_service, 'is_available', return_value=True), \
+                patch.object(gemini_service, 'generate_json_response', return_value=explanations) as generate:
+            response = self.client.post(
+                reverse('ai_auto_assign_tasks'),
+                data=json.dumps({'task_ids': [task.id for task in self.tasks], 'mode': 'solver', 'explain': True}),
+                content_type='application/json'
+            )
+        
+        generate.assert_called_once()
+        reasons = {item['task_id']: item['reasoning'] for item in response.json()['assignments_made']}
+        self.assertEqual(reasons, {task.id: f"Explained {task.name}" for task in self.tasks})
+    
+    def test_task_in_flight_elsewhere_is_not_regenerated(self):
+        """Test that suggestions another caller is generating are waited for"""
+        key = ai_services.ALLOCATION_FLIGHT_KEY.format(self.tasks[0].id)
+        token = single_flight.acquire(key)
+        other_result = {"task": {"id": self.tasks[0].id}, "suggestions": []}
+        threading.Timer(0.1, single_flight.complete, args=(key, token, other_result)).start()
+        
+        responses = [{"recommendations": [{"resource_id": self.resources[1].id, "match_score": 0.9}]}]
+        with patch.object(gemini_service, 'is_available', return_value=True), \
+                patch.object(gemini_service, 'batch_generate', return_value=responses) as batch:
+            results = ai_services.AIResourceAllocationService().suggest_allocations(
+                [task.id for task in self.tasks]
+            )
+        
+        batch.assert_called_once()
+        self.assertEqual(len(batch.call_args.args[0]), 1)
+        self.assertEqual(results[self.tasks[0].id], other_result)
+        self.assertEqual(results[self.tasks[1].id]['suggestions'][0]['resource']['id'], self.resources[1].id)
@@ -0,0 +1,149 @@
+"""
+Per-resource capacity timeline
+
+Holds a resource's daily allocated and available (leave-adjusted) hours over a
+date horizon as cumulative arrays, so range totals are answered with two array
+lookups instead of re-reading assignments for every candidate period.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from core.business_calendar import business_calendar
+from .models import ResourceDailyLoad
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Cumulative sum with a leading zero, so range (i, j) is prefix[j] - prefix[i]"""
+    return np.concatenate(([0], np.cumsum(values)))
+
+
+class CapacityTimeline:
+    """Daily allocated vs. available hours for one resource"""
+
+    def __init__(self, resource, start_date: date, end_date: date, daily_hours: Optional[Dict[date, float]] = None,
+                 daily_leave: Optional[Dict[date, float]] = None):
+        """
+        Args:
+            resource: Resource the timeline belongs to
+            start_date: First day of the horizon
+            end_date: Last day of the horizon (inclusive)
+            daily_hours: Allocated hours by date (as stored in ResourceDailyLoad)
+            daily_leave: Hours of leave by date (as stored in ResourceDailyLoad)
+        """
+        self.resource = resource
+        self.start_date = start_date
+        self.end_date = end_date
+
+        self.days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        workdays = np.is_busday(self.days, busdaycal=business_calendar.calendar_for(resource.location))
+        # Assuming 5-day work week
+        self.available = np.where(workdays, resource.capacity / 5, 0.0)
+        self.allocated = np.zeros(len(self.days))
+        for day, hours in (daily_hours or {}).items():
+            index = (day - start_date).days
+            if 0 <= index < len(self.days):
+                self.allocated[index] = hours
+        for day, hours in (daily_leave or {}).items():
+            index = (day - start_date).days
+            if 0 <= index < len(self.days):
+                self.available[index] = max(self.available[index] - hours, 0.0)
+
+        self._workday_prefix = _prefix(workdays.astype(np.int64))
+        self._available_prefix = _prefix(self.available)
+        self._allocated_prefix = _prefix(self.allocated)
+        self._free_prefix = _prefix(np.maximum(self.available - self.allocated, 0.0))
+
+    def _bounds(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        """Convert an inclusive date range to a clipped half-open index range"""
+        size = len(self.days)
+        first = min(max((start_date - self.start_date).days, 0), size)
+        last = min(max((end_date - self.start_date).days + 1, 0), size)
+        return first, max(first, last)
+
+    def load(self, start_date: date, end_date: date) -> float:
+        """Allocated hours between two dates (inclusive)"""
+        first, last = self._bounds(start_date, end_date)
+        return float(self._allocated_prefix[last] - self._allocated_prefix[first])
+
+    def available_hours(self, start_date: date, end_date: date) -> float:
+        """Available hours between two dates (inclusive)"""
+        first, last = self._bounds(start_date, end_date)
+        return float(self._available_prefix[last] - self._available_prefix[first])
+
+    def free_hours(self, start_date: date, end_date: date) -> float:
+        """Unallocated hours between two dates; over-allocated days count as zero"""
+        first, last = self._bounds(start_date, end_date)
+        return float(self._free_prefix[last] - self._free_prefix[first])
+
+    def workdays(self, start_date: date, end_date: date) -> int:
+        """Business days between two dates (inclusive)"""
+        first, last = self._bounds(start_date, end_date)
+        return int(self._workday_prefix[last] - self._workday_prefix[first])
+
+    def utilization(self, start_date: date, end_date: date) -> float:
+        """Utilization percentage for a period, matching UtilizationEngine.compute"""
+        available = self.available_hours(start_date, end_date)
+        if available <= 0:
+            return 0
+        return round(self.load(start_date, end_date) / available * 100, 1)
+
+    def first_window(self, workdays: int, free_hours: float,
+                     earliest: Optional[date] = None) -> Optional[Tuple[date, date]]:
+        """
+        Find the first run of consecutive workdays with enough free hours
+
+        The end of the window for every candidate start is found by binary search
+        on the cumulative workday count; the free-hours check is one vectorized
+        comparison over all candidates.
+
+        Args:
+            workdays: Number of workdays the window must span
+            free_hours: Minimum unallocated hours inside the window
+            earliest: Do not start before this date (default: start of the horizon)
+
+        Returns:
+            (start_date, end_date) of the window, or None if none fits in the horizon
+        """
+        if workdays <= 0:
+            return None
+        first = self._bounds(earliest or self.start_date, self.end_date)[0]
+        is_workday = np.diff(self._workday_prefix) > 0
+        starts = np.nonzero(is_workday[first:])[0] + first
+        if not len(starts):
+            return None
+
+        ends = np.searchsorted(self._workday_prefix, self._workday_prefix[starts] + workdays)
+        fits_horizon = ends < len(self._workday_prefix)
+        starts, ends = starts[fits_horizon], ends[fits_horizon]
+
+        enough = np.nonzero(self._free_prefix[ends] - self._free_prefix[starts] >= free_hours)[0]
+        if not len(enough):
+            return None
+        match = enough[0]
+        return (self.start_date + timedelta(days=int(starts[match])),
+                self.start_date + timedelta(days=int(ends[match]) - 1))
+
+
+def build_timelines(resources: Iterable, start_date: date, end_date: date) -> Dict[int, CapacityTimeline]:
+    """Build timelines for many resources from a single daily load query"""
+    resources = list(resources)
+    daily_hours = defaultdict(dict)
+    daily_leave = defaultdict(dict)
+    rows = ResourceDailyLoad.objects.filter(
+        resource_id__in=[r.id for r in resources],
+        date__range=(start_date, end_date)
+    ).values_list('resource_id', 'date', 'allocated_hours', 'leave_hours')
+    for resource_id, day, hours, leave in rows:
+        daily_hours[resource_id][day] = hours
+        if leave:
+            daily_leave[resource_id][day] = leave
+
+    return {
+        resource.id: CapacityTimeline(
+            resource, start_date, end_date, daily_hours.get(resource.id), daily_leave.get(resource.id)
+        )
+        for resource in resources
+    }
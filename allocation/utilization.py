@@ -0,0 +1,300 @@
+"""
+Batch utilization engine for ResourcePro
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
+
+from core import events
+from core.business_calendar import business_calendar
+from core.utils import cache_is_shared
+from .models import ResourceDailyLoad
+
+
+def _as_date(value) -> Optional[date]:
+    """Accept date objects or ISO strings (as passed through query params)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+class UtilizationCache:
+    """
+    Versioned cache of utilization values keyed by (resource_id, start, end)
+
+    Every resource has a data version that is replaced whenever anything that
+    feeds its utilization changes (see allocation.signals). Cached values are
+    stored under keys that include the version, so a bump makes all of the
+    resource's old entries unreachable instead of deleting them. Versions are
+    bumped again on transaction commit so a value read from the pre-commit
+    state cannot be cached under the new version.
+
+    Uses the default cache backend. Versions are bumped by whichever process
+    changes the data (web workers, background jobs, management commands), so
+    values are only cached when that backend is shared by every process; with
+    the per-process local-memory backend they are always computed.
+    """
+    PREFIX = 'utilization'
+    TIMEOUT = 60 * 60 * 24
+
+    @property
+    def enabled(self) -> bool:
+        """Whether values may be served from the cache"""
+        return cache_is_shared()
+
+    def _version_key(self, resource_id: int) -> str:
+        return f'{self.PREFIX}:version:{resource_id}'
+
+    def _value_key(self, resource_id: int, version: str, start_date: date, end_date: date) -> str:
+        return f'{self.PREFIX}:value:{resource_id}:{start_date.isoformat()}:{end_date.isoformat()}:{version}'
+
+    def versions(self, resource_ids: List[int]) -> Dict[int, str]:
+        """Get the current data version of each resource, creating missing ones"""
+        keys = {self._version_key(resource_id): resource_id for resource_id in resource_ids}
+        found = cache.get_many(keys.keys())
+        versions = {keys[key]: version for key, version in found.items()}
+        for key, resource_id in keys.items():
+            if resource_id not in versions:
+                # add() keeps a version another process created in the meantime
+                cache.add(key, uuid.uuid4().hex, None)
+                versions[resource_id] = cache.get(key)
+        return versions
+
+    def bump(self, resource_ids: Iterable[int]):
+        """Invalidate all cached values for the given resources"""
+        resource_ids = [resource_id for resource_id in set(resource_ids) if resource_id is not None]
+        if not resource_ids:
+            return
+
+        def _bump():
+            cache.set_many({self._version_key(resource_id): uuid.uuid4().hex for resource_id in resource_ids}, None)
+
+        _bump()
+        transaction.on_commit(_bump)
+        events.publish('utilization', {'resource_ids': sorted(resource_ids)})
+
+    def get_many(self, resource_ids: List[int], start_date: date, end_date: date) -> Tuple[Dict[int, float], Dict[int, str]]:
+        """
+        Look up cached values for a period
+
+        Returns:
+            Tuple of (cached values by resource id, cache keys of the misses by resource id)
+        """
+        versions = self.versions(resource_ids)
+        keys = {
+            self._value_key(resource_id, versions[resource_id], start_date, end_date): resource_id
+            for resource_id in resource_ids
+        }
+        found = cache.get_many(keys.keys())
+        hits = {keys[key]: value for key, value in found.items()}
+        misses = {resource_id: key for key, resource_id in keys.items() if resource_id not in hits}
+        self._count('hits', len(hits))
+        self._count('misses', len(misses))
+        return hits, misses
+
+    def set_many(self, values: Dict[str, float]):
+        """Store computed values under the keys returned by get_many"""
+        if values:
+            cache.set_many(values, self.TIMEOUT)
+
+    def _count(self, name: str, amount: int):
+        if not amount:
+            return
+        key = f'{self.PREFIX}:stats:{name}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters since the last reset"""
+        counters = cache.get_many([f'{self.PREFIX}:stats:hits', f'{self.PREFIX}:stats:misses'])
+        hits = counters.get(f'{self.PREFIX}:stats:hits', 0)
+        misses = counters.get(f'{self.PREFIX}:stats:misses', 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 1) if total else 0.0,
+        }
+
+    def reset_stats(self):
+        cache.delete_many([f'{self.PREFIX}:stats:hits', f'{self.PREFIX}:stats:misses'])
+
+
+class UtilizationEngine:
+    """Compute utilization for many resources from a single daily load query"""
+
+    def __init__(self):
+        self.cache = UtilizationCache()
+
+    def resolve_period(self, start_date=None, end_date=None) -> Tuple[date, date]:
+        """
+        Fill in the default period used by Resource.current_utilization
+
+        Defaults to the current week (Monday-Sunday) when no dates are given.
+        """
+        start_date = _as_date(start_date)
+        end_date = _as_date(end_date)
+
+        if start_date is None:
+            today = timezone.now().date()
+            start_date = today - timedelta(days=today.weekday())
+
+        if end_date is None:
+            end_date = start_date + timedelta(days=6)
+
+        return start_date, end_date
+
+    def period_hours(self, resources, start_date: date, end_date: date) -> Tuple[Dict[int, float], Dict[int, float]]:
+        """
+        Allocated hours and hours lost to leave per resource for the period
+
+        Reads the materialized ResourceDailyLoad table, where each assignment's
+        hours are already spread over the business days of its task and leave
+        is already capped at the daily capacity.
+
+        Returns:
+            Tuple of (allocated hours, leave hours), each keyed by resource id
+        """
+        if isinstance(resources, QuerySet):
+            resource_filter = {'resource__in': resources.values('pk')}
+        else:
+            resource_filter = {'resource_id__in': [r.id for r in resources]}
+
+        rows = ResourceDailyLoad.objects.filter(
+            date__range=(start_date, end_date),
+            **resource_filter
+        ).order_by().values('resource_id').annotate(
+            allocated=Sum('allocated_hours'), leave=Sum('leave_hours')
+        ).values_list('resource_id', 'allocated', 'leave')
+
+        allocated, leave = defaultdict(float), defaultdict(float)
+        for resource_id, allocated_total, leave_total in rows:
+            allocated[resource_id] = allocated_total
+            leave[resource_id] = leave_total
+        return allocated, leave
+
+    def compute(self, resources: Iterable, start_date=None, end_date=None, use_cache: bool = True) -> Dict[int, float]:
+        """
+        Calculate utilization percentages for a set of resources
+
+        Args:
+            resources: Queryset or iterable of Resource objects
+            start_date: Period start (defaults to Monday of the current week)
+            end_date: Period end (defaults to six days after start_date)
+            use_cache: Serve values from the versioned utilization cache
+                (ignored unless the cache is shared, see UtilizationCache)
+
+        Returns:
+            Dictionary mapping resource id to utilization percentage (0-100+)
+        """
+        resources = list(resources)
+        if not resources:
+            return {}
+
+        start_date, end_date = self.resolve_period(start_date, end_date)
+        if not use_cache or not self.cache.enabled:
+            return self._compute(resources, start_date, end_date)
+
+        hits, misses = self.cache.get_many([r.id for r in resources], start_date, end_date)
+        if misses:
+            computed = self._compute([r for r in resources if r.id in misses], start_date, end_date)
+            self.cache.set_many({misses[resource_id]: value for resource_id, value in computed.items()})
+            hits.update(computed)
+        return hits
+
+    def _compute(self, resources: List, start_date: date, end_date: date) -> Dict[int, float]:
+        """Calculate utilization from the daily load table, bypassing the cache"""
+        allocated, leave = self.period_hours(resources, start_date, end_date)
+
+        work_days = {}
+        utilization = {}
+        for resource in resources:
+            if resource.location not in work_days:
+                work_days[resource.location] = business_calendar.count(start_date, end_date, resource.location)
+            # Assuming 5-day work week, minus approved leave
+            available_hours = (resource.capacity / 5) * work_days[resource.location] - leave[resource.id]
+            if available_hours > 0:
+                utilization[resource.id] = round((allocated[resource.id] / available_hours) * 100, 1)
+            else:
+                utilization[resource.id] = 0
+
+        return utilization
+
+    def annotate(self, resources: Iterable, start_date=None, end_date=None, attr: str = 'utilization'):
+        """Set the utilization attribute on each resource and return them as a list"""
+        resources = list(resources)
+        utilization = self.compute(resources, start_date, end_date)
+        for resource in resources:
+            setattr(resource, attr, utilization.get(resource.id, 0))
+        return resources
+
+    def heatmap(self, resources: Iterable, start_date: date, weeks: int) -> Dict:
+        """
+        Weekly utilization matrix (resources x weeks) in one vectorized pass
+
+        Reads every daily load row in the horizon once and buckets it into
+        weeks with NumPy date arithmetic.
+
+        Args:
+            resources: Resource objects, one matrix row each
+            start_date: First day of the first week
+            weeks: Number of 7-day columns
+
+        Returns:
+            Dictionary with 'week_starts' (datetime64 array) and 'allocated',
+            'available' and 'utilization' float matrices of shape (resources, weeks)
+        """
+        resources = list(resources)
+        origin = np.datetime64(start_date, 'D')
+        week_starts = origin + np.arange(weeks) * 7
+        end_date = start_date + timedelta(days=weeks * 7 - 1)
+        row_of = {resource.id: index for index, resource in enumerate(resources)}
+
+        rows = list(ResourceDailyLoad.objects.filter(
+            resource_id__in=list(row_of),
+            date__range=(start_date, end_date)
+        ).values_list('resource_id', 'date', 'allocated_hours', 'leave_hours'))
+
+        allocated = np.zeros((len(resources), weeks))
+        leave = np.zeros((len(resources), weeks))
+        if rows:
+            resource_ids, days, hours, leave_hours = zip(*rows)
+            row_index = np.array([row_of[resource_id] for resource_id in resource_ids])
+            week_index = (np.array(days, dtype='datetime64[D]') - origin).astype(np.int64) // 7
+            np.add.at(allocated, (row_index, week_index), hours)
+            np.add.at(leave, (row_index, week_index), leave_hours)
+
+        # Business days per week, per distinct location
+        workdays = {}
+        for location in {resource.location for resource in resources}:
+            workdays[location] = business_calendar.count_many(week_starts, week_starts + 6, location)
+        daily_capacity = np.array([resource.capacity / 5 for resource in resources], dtype=float)
+        available = np.array([workdays[resource.location] for resource in resources], dtype=float).reshape(
+            len(resources), weeks
+        ) * daily_capacity[:, None] - leave
+
+        utilization = np.divide(allocated * 100, available, out=np.zeros_like(allocated), where=available > 0)
+        return {
+            'week_starts': week_starts,
+            'allocated': allocated,
+            'available': available,
+            'utilization': np.round(utilization, 1),
+        }
+
+
+# Global instance
+utilization_engine = UtilizationEngine()
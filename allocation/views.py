@@ -4,6 +4,7 @@ from django.db.models import Q
 from resources.models import Resource
 from projects.models import Project, Task
 from .models import Assignment
+from .utilization import utilization_engine
 
 @login_required
 def allocation_board(request):
@@ -13,9 +14,10 @@ def allocation_board(request):
     # Get all resources
     resources = Resource.objects.all()
     
-    # Calculate current utilization for all resources
+    # Calculate current utilization for all resources in one pass
+    utilization = utilization_engine.compute(resources)
     for resource in resources:
-        resource.utilization = resource.current_utilization()
+        resource.utilization = utilization[resource.id]
         # Add a capped utilization value for the progress bar
         resource.capped_utilization = min(resource.utilization, 100)
     
@@ -8,20 +8,31 @@ from typing import Dict, List, Optional, Any
 from decimal import Decimal
 
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Avg, Sum, Q
 
 from resources.models import Resource, Skill
 from projects.models import Task, Project
 from allocation.models import Assignment
+from allocation.utilization import utilization_engine
+from core.business_calendar import business_calendar
 from analytics.models import (
     SkillDemandAnalysis, AISkillRecommendation, 
     AIResourceAllocationSuggestion, ResourceDemandForecast,
     AIForecastAdjustment
 )
 from utils.gemini_ai import gemini_service
+from utils.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+# Seconds an identical prompt is answered from the LLM response cache
+SKILL_RECOMMENDATION_CACHE_TTL = 24 * 3600
+ALLOCATION_CACHE_TTL = 4 * 3600
+
+ALLOCATION_FLIGHT_KEY = 'allocation:task:{}'
+FORECAST_CACHE_TTL = 24 * 3600
+
 class AISkillRecommendationService:
     """AI-powered skill recommendation engine"""
     
@@ -58,7 +69,11 @@ class AISkillRecommendationService:
         
         try:
             # Get AI recommendations
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+            ai_response = gemini_service.generate_json_response(
+                prompt, temperature=0.3,
+                cache_ttl=SKILL_RECOMMENDATION_CACHE_TTL, use_cache=not force_refresh,
+                feature='skill_recommendations'
+            )
             
             if not ai_response:
                 logger.warning("AI service returned no response")
@@ -297,30 +312,137 @@ class AIResourceAllocationService:
         Returns:
             Dictionary containing allocation suggestions or None if failed
         """
+        return self.suggest_allocations([task_id], force_refresh=force_refresh).get(task_id)
+    
+    def suggest_allocations(self, task_ids: List[int], force_refresh: bool = False) -> Dict[int, Dict]:
+        """
+        Generate allocation suggestions for several tasks at once
+        
+        Task and resource data are read first, the model calls for tasks without
+        recent suggestions are made concurrently (gemini_service.batch_generate),
+        and the suggestions are stored in one short transaction at the end, so
+        no transaction is held open while waiting for the model. A task another
+        caller is already generating suggestions for is not sent to the model
+        again; that caller's suggestions are waited for (utils.single_flight).
+        
+        Args:
+            task_ids: IDs of the tasks to get suggestions for
+            force_refresh: If True, regenerate even if recent suggestions exist
+            
+        Returns:
+            Suggestions (or an "error" entry) by task ID
+        """
+        results = {}
+        pending = []
+        for task_id in dict.fromkeys(task_ids):
+            result, request = self._prepare_allocation_request(task_id, force_refresh)
+            if request is None:
+                results[task_id] = result
+            else:
+                pending.append((task_id,) + request)
+        
+        if not pending:
+            return results
+        
+        # Tasks another caller is already generating suggestions for are waited
+        # for instead of being sent to the model a second time
+        leading, following = [], []
+        for request in pending:
+            token = single_flight.acquire(ALLOCATION_FLIGHT_KEY.format(request[0]))
+            if token:
+                leading.append((token, request))
+            else:
+                following.append(request)
+        
+        try:
+            results.update(self._lead_allocations([request for _, request in leading], force_refresh))
+        finally:
+            for token, request in leading:
+                key = ALLOCATION_FLIGHT_KEY.format(request[0])
+                if request[0] in results:
+                    single_flight.complete(key, token, results[request[0]])
+                else:
+                    single_flight.release(key, token)
+        
+        for request in following:
+            results[request[0]] = single_flight.do(
+                ALLOCATION_FLIGHT_KEY.format(request[0]),
+                lambda request=request: self._lead_allocations([request], force_refresh)[request[0]]
+            )
+        
+        return results
+    
+    def _lead_allocations(self, pending: List[tuple], force_refresh: bool) -> Dict[int, Dict]:
+        """Generate suggestions for requests whose single-flight lock this caller holds"""
+        results = {}
+        generate = []
+        for request in pending:
+            # Another caller may have stored suggestions since this one checked
+            recent_suggestion = None if force_refresh else self._get_recent_suggestion(request[1])
+            if recent_suggestion:
+                results[request[0]] = self._format_existing_suggestion(recent_suggestion)
+            else:
+                generate.append(request)
+        results.update(self._generate_allocations(generate, force_refresh))
+        return results
+    
+    def _generate_allocations(self, pending: List[tuple], force_refresh: bool) -> Dict[int, Dict]:
+        """Call the model for prepared (task_id, task, available_resources, prompt) requests and store the suggestions"""
+        results = {}
+        if not pending:
+            return results
+        
+        ai_responses = gemini_service.batch_generate(
+            [prompt for _, _, _, prompt in pending], temperature=0.2,
+            cache_ttl=ALLOCATION_CACHE_TTL, use_cache=not force_refresh,
+            feature='resource_allocation'
+        )
+        
+        with transaction.atomic():
+            for (task_id, task, available_resources, _), ai_response in zip(pending, ai_responses):
+                if not ai_response:
+                    results[task_id] = {"error": "Failed to generate AI recommendations"}
+                    continue
+                try:
+                    # Process and store the best suggestions
+                    with transaction.atomic():
+                        results[task_id] = self._process_and_store_allocation_suggestions(
+                            task, ai_response, available_resources
+                        )
+                except Exception as e:
+                    logger.error(f"Error generating allocation suggestions: {e}")
+                    results[task_id] = {"error": "Failed to generate suggestions"}
+        
+        return results
+    
+    def _prepare_allocation_request(self, task_id: int, force_refresh: bool):
+        """
+        Read what the allocation prompt for a task needs
+        
+        Returns:
+            (result, None) when the task needs no model call - recent suggestions
+            or an error - otherwise (None, (task, available_resources, prompt))
+        """
         try:
-            task = Task.objects.get(id=task_id)
+            task = Task.objects.select_related('project').get(id=task_id)
         except Task.DoesNotExist:
-            return {"error": "Task not found"}
+            return {"error": "Task not found"}, None
         
         # Check if we have recent suggestions (within last 4 hours)
         if not force_refresh:
-            recent_suggestion = AIResourceAllocationSuggestion.objects.filter(
-                task=task,
-                created_at__gte=timezone.now() - timedelta(hours=4)
-            ).first()
-            
+            recent_suggestion = self._get_recent_suggestion(task)
             if recent_suggestion:
-                return self._format_existing_suggestion(recent_suggestion)
+                return self._format_existing_suggestion(recent_suggestion), None
         
         if not gemini_service.is_available():
             logger.warning("Gemini AI not available for resource allocation")
-            return {"error": "AI service not available"}
+            return {"error": "AI service not available"}, None
         
         # Get available resources (not over-allocated)
         available_resources = self._get_available_resources(task)
         
         if not available_resources:
-            return {"error": "No available resources found"}
+            return {"error": "No available resources found"}, None
         
         # Create task data for AI analysis
         task_data = self._prepare_task_data(task)
@@ -328,31 +450,28 @@ class AIResourceAllocationService:
         
         # Create prompt for Gemini
         prompt = self._create_allocation_prompt(task_data, resources_data)
-        
-        try:
-            # Get AI recommendations
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.2)
-            
-            if not ai_response:
-                return {"error": "Failed to generate AI recommendations"}
-            
-            # Process and store the best suggestions
-            suggestions = self._process_and_store_allocation_suggestions(task, ai_response, available_resources)
-            
-            return suggestions
-        except Exception as e:
-            logger.error(f"Error generating allocation suggestions: {e}")
-            return {"error": "Failed to generate suggestions"}
+        return None, (task, available_resources, prompt)
+    
+    def _get_recent_suggestion(self, task: Task) -> Optional[AIResourceAllocationSuggestion]:
+        return AIResourceAllocationSuggestion.objects.filter(
+            task=task,
+            created_at__gte=timezone.now() - timedelta(hours=4)
+        ).first()
     
     def _get_available_resources(self, task: Task) -> List[Resource]:
         """Get resources that are available for allocation"""
         available_resources = []
+        resources = Resource.objects.all()
+        current_map = utilization_engine.compute(resources)
+        period_map = utilization_engine.compute(resources, task.start_date, task.end_date)
         
-        for resource in Resource.objects.all():
+        for resource in resources:
             # Check current overall utilization
-            current_utilization = resource.current_utilization()
+            current_utilization = current_map[resource.id]
               # Calculate what utilization would be if this task is assigned
-            projected_utilization = self._calculate_projected_utilization(resource, task)
+            projected_utilization = self._calculate_projected_utilization(
+                resource, task, period_utilization=period_map[resource.id]
+            )
             
             # Consider resource available if:
             # 1. Current utilization is less than 90% (reasonable safety buffer)
@@ -365,15 +484,16 @@ class AIResourceAllocationService:
         
         return available_resources
     
-    def _calculate_projected_utilization(self, resource: Resource, task: Task) -> float:
+    def _calculate_projected_utilization(self, resource: Resource, task: Task,
+                                         period_utilization: Optional[float] = None) -> float:
         """Calculate what the resource utilization would be if this task is assigned"""
         # Get current utilization during the task period
-        current_util = resource.current_utilization(task.start_date, task.end_date)
+        if period_utilization is None:
+            period_utilization = resource.current_utilization(task.start_date, task.end_date)
+        current_util = period_utilization
         
         # Calculate additional utilization from this task
-        task_duration_days = (task.end_date - task.start_date).days + 1
-        work_days = sum(1 for i in range(task_duration_days) 
-                       if (task.start_date + timezone.timedelta(days=i)).weekday() < 5)
+        work_days = business_calendar.count(task.start_date, task.end_date, resource.location)
         
         if work_days > 0:
             available_hours_in_period = (resource.capacity / 5) * work_days
@@ -408,6 +528,7 @@ class AIResourceAllocationService:
     def _prepare_resources_data(self, resources: List[Resource], task: Task) -> List[Dict[str, Any]]:
         """Prepare resources data for AI analysis"""
         resources_data = []
+        period_map = utilization_engine.compute(resources, task.start_date, task.end_date)
         
         for resource in resources:
             # Get resource skills with proficiency if available
@@ -425,9 +546,7 @@ class AIResourceAllocationService:
                 resource_skills.append(skill_info)
             
             # Calculate current utilization for the task period
-            current_utilization = resource.current_utilization(
-                task.start_date, task.end_date
-            )
+            current_utilization = period_map[resource.id]
             
             resources_data.append({
                 "id": resource.id,
@@ -573,6 +692,68 @@ Sort recommendations by match_score (highest first). Only include resources with
             "generated_at": suggestion.created_at.isoformat()
         }
 
+    def explain_assignments(self, assignments: List[Dict]) -> Dict[int, str]:
+        """
+        Explain a plan made by allocation.solver in one model call
+
+        The plan is already decided; the model only words the reasons for it.
+
+        Args:
+            assignments: Planned assignments (AssignmentSolver.solve)
+
+        Returns:
+            Explanation by task ID; empty if the model is unavailable or failed
+        """
+        if not assignments or not gemini_service.is_available():
+            return {}
+
+        plan = [
+            {
+                "task_id": item['task'].id,
+                "task": item['task'].name,
+                "priority": item['task'].priority,
+                "estimated_hours": item['task'].estimated_hours,
+                "resource": item['resource'].name,
+                "role": item['resource'].role,
+                "skill_match": item['skill_match'],
+                "projected_utilization": item['projected_utilization'],
+                "cost": item['cost'],
+            }
+            for item in assignments
+        ]
+        prompt = f"""
+You are an expert project manager reviewing task assignments made by an optimizer that balances
+skill match, task priority, cost and remaining capacity across the whole team.
+
+Assignments:
+{json.dumps(plan, indent=2)}
+
+For each assignment, explain in one sentence why the resource suits the task. Do not suggest changes.
+
+Respond with valid JSON in this exact format:
+{{
+    "explanations": [
+        {{
+            "task_id": integer,
+            "reasoning": "string"
+        }}
+    ]
+}}
+"""
+        ai_response = gemini_service.generate_json_response(
+            prompt, temperature=0.2, cache_ttl=ALLOCATION_CACHE_TTL, feature='assignment_explanations'
+        )
+        if not ai_response:
+            return {}
+
+        explanations = {}
+        for entry in ai_response.get("explanations", []):
+            try:
+                explanations[int(entry["task_id"])] = str(entry["reasoning"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return explanations
+
 class AIForecastEnhancementService:
     """AI-enhanced resource demand forecasting"""
     
@@ -607,7 +788,8 @@ class AIForecastEnhancementService:
         
         try:
             # Get AI enhancements
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3, cache_ttl=FORECAST_CACHE_TTL,
+                                                                feature='forecast_enhancement')
             
             if not ai_response:
                 return {"error": "Failed to generate AI enhancements"}
@@ -639,7 +821,8 @@ class AIForecastEnhancementService:
         prompt = self._create_strategic_recommendations_prompt(forecast_summary)
         
         try:
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.4)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.4, cache_ttl=FORECAST_CACHE_TTL,
+                                                                feature='strategic_recommendations')
             
             if not ai_response:
                 return {"error": "Failed to generate strategic recommendations"}
@@ -687,8 +870,10 @@ class AIForecastEnhancementService:
         overutilized_resources = []
         underutilized_resources = []
         
-        for resource in Resource.objects.all():
-            utilization = resource.current_utilization()
+        resources = Resource.objects.all()
+        current_utilization = utilization_engine.compute(resources)
+        for resource in resources:
+            utilization = current_utilization[resource.id]
             if utilization > 95:
                 overutilized_resources.append(resource.role)
             elif utilization < 60:
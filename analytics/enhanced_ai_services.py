@@ -3,21 +3,32 @@
 Enhanced AI Resource Allocation Service
 Implements dynamic time-based analysis, priority-driven assignments, 
 and future-aware scheduling as recommended.
+
+Every task × resource pair is scored once (allocation.scoring.ScoringMatrix);
+the passes are filters and sorts over those scores.
 """
 
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
 from django.utils import timezone
 from django.db.models import Q
 from allocation.models import Assignment
+from allocation.scoring import ScoringMatrix, build_scoring_matrix
+from allocation.timeline import build_timelines
+from core.business_calendar import business_calendar
 from projects.models import Task
-from resources.models import Resource, Skill
+from resources.models import Resource
 from analytics.models import AIResourceAllocationSuggestion
 
 logger = logging.getLogger(__name__)
 
+# Lowest Task.priority (1-5) considered high priority for informed over-allocation
+HIGH_PRIORITY = 4
+
 class EnhancedAIResourceAllocationService:
     """Enhanced AI service with dynamic scheduling and priority-driven assignments"""
     
@@ -43,10 +54,11 @@ class EnhancedAIResourceAllocationService:
         
         # Sort tasks by priority (critical first)
         prioritized_tasks = self._sort_tasks_by_priority(unassigned_tasks)
+        scores = build_scoring_matrix(prioritized_tasks)
         
         suggestions = {}
         for task in prioritized_tasks:
-            task_suggestions = self._analyze_task_with_enhanced_logic(task)
+            task_suggestions = self._analyze_task_with_enhanced_logic(task, scores)
             if task_suggestions:
                 suggestions[str(task.id)] = task_suggestions
         
@@ -65,7 +77,7 @@ class EnhancedAIResourceAllocationService:
         
         return sorted(tasks, key=get_priority_weight, reverse=True)
     
-    def _analyze_task_with_enhanced_logic(self, task: Task) -> Optional[Dict]:
+    def _analyze_task_with_enhanced_logic(self, task: Task, scores: Optional[ScoringMatrix] = None) -> Optional[Dict]:
         """
         Implement the 6-pass decision-making process:
         1. Ideal Assignment Pass
@@ -73,10 +85,14 @@ class EnhancedAIResourceAllocationService:
         3. Flexible & Collaborative Pass
         4. Good Fit Pass
         5. Informed Over-allocation Pass
+        
+        scores must cover the task and every resource; built if not given.
         """
+        if scores is None:
+            scores = build_scoring_matrix([task])
         
         # Pass 1: Ideal Assignment (under 90% utilization)
-        ideal_suggestions = self._ideal_assignment_pass(task)
+        ideal_suggestions = self._ideal_assignment_pass(task, scores)
         if ideal_suggestions:
             return {
                 'type': 'ideal',
@@ -85,7 +101,7 @@ class EnhancedAIResourceAllocationService:
             }
         
         # Pass 2: Future-Aware Scheduling
-        future_suggestions = self._future_aware_pass(task)
+        future_suggestions = self._future_aware_pass(task, scores)
         if future_suggestions:
             return {
                 'type': 'future_scheduled',
@@ -94,7 +110,7 @@ class EnhancedAIResourceAllocationService:
             }
         
         # Pass 3: Flexible & Collaborative Assignment
-        flexible_suggestions = self._flexible_collaborative_pass(task)
+        flexible_suggestions = self._flexible_collaborative_pass(task, scores)
         if flexible_suggestions:
             return {
                 'type': 'collaborative',
@@ -103,7 +119,7 @@ class EnhancedAIResourceAllocationService:
             }
         
         # Pass 4: Good Fit (adjacent skills)
-        adjacent_suggestions = self._good_fit_pass(task)
+        adjacent_suggestions = self._good_fit_pass(task, scores)
         if adjacent_suggestions:
             return {
                 'type': 'good_fit',
@@ -112,7 +128,7 @@ class EnhancedAIResourceAllocationService:
             }
         
         # Pass 5: Informed Over-allocation
-        overallocation_suggestions = self._informed_overallocation_pass(task)
+        overallocation_suggestions = self._informed_overallocation_pass(task, scores)
         if overallocation_suggestions:
             return {
                 'type': 'overallocation',
@@ -122,49 +138,44 @@ class EnhancedAIResourceAllocationService:
         
         return None
     
-    def _ideal_assignment_pass(self, task: Task) -> List[Dict]:
+    def _ideal_assignment_pass(self, task: Task, scores: ScoringMatrix) -> List[Dict]:
         """Pass 1: Find assignees with perfect skill match and under 90% utilization"""
-        suggestions = []
-        
-        for resource in Resource.objects.all():
-            # Check skill match
-            skill_match = self._calculate_skill_match(resource, task)
-            if skill_match < 0.7:  # Require at least 70% skill match
-                continue
-            
-            # Check current utilization (should be under 90%)
-            current_util = resource.current_utilization()
-            projected_util = self._calculate_projected_utilization(resource, task)
-            
-            if current_util < 90 and projected_util < 100:
-                suggestions.append({
-                    'resource_id': resource.id,
-                    'resource_name': resource.name,
-                    'skill_match': skill_match,
-                    'current_utilization': current_util,
-                    'projected_utilization': projected_util,
-                    'start_date': task.start_date.isoformat(),
-                    'confidence': 'high'
-                })
-        
-        return sorted(suggestions, key=lambda x: x['skill_match'], reverse=True)[:3]
+        row = scores.row(task)
+        skill_match = scores.skill_match[row]
+        projected = scores.projected_utilization[row]
+        
+        # At least 70% skill match, under 90% now and under 100% with the task
+        candidates = (skill_match >= 0.7) & (scores.current_utilization < 90) & (projected < 100)
+        return [
+            {
+                'resource_id': scores.resources[column].id,
+                'resource_name': scores.resources[column].name,
+                'skill_match': float(skill_match[column]),
+                'current_utilization': float(scores.current_utilization[column]),
+                'projected_utilization': float(projected[column]),
+                'start_date': task.start_date.isoformat(),
+                'confidence': 'high'
+            }
+            for column in scores.rank(candidates, skill_match, limit=3)
+        ]
     
-    def _future_aware_pass(self, task: Task) -> List[Dict]:
+    def _future_aware_pass(self, task: Task, scores: ScoringMatrix) -> List[Dict]:
         """Pass 2: Find future dates when best-fit assignees have capacity"""
         suggestions = []
         
-        # Get resources with good skill matches (even if currently overloaded)
-        skilled_resources = []
-        for resource in Resource.objects.all():
-            skill_match = self._calculate_skill_match(resource, task)
-            if skill_match >= 0.7:
-                skilled_resources.append((resource, skill_match))
+        # Top 5 resources with good skill matches (even if currently overloaded)
+        skill_match = scores.skill_match[scores.row(task)]
+        top_matches = [
+            (scores.resources[column], float(skill_match[column]))
+            for column in scores.rank(skill_match >= 0.7, skill_match, limit=5)
+        ]
         
-        # Sort by skill match
-        skilled_resources.sort(key=lambda x: x[1], reverse=True)
+        # One capacity timeline per candidate covers every look-ahead window
+        horizon_start, horizon_end = self._future_horizon(task)
+        timelines = build_timelines([resource for resource, _ in top_matches], horizon_start, horizon_end)
         
-        for resource, skill_match in skilled_resources[:5]:  # Check top 5 matches
-            future_slots = self._find_future_capacity_slots(resource, task)
+        for resource, skill_match in top_matches:
+            future_slots = self._find_future_capacity_slots(resource, task, timelines[resource.id])
             if future_slots:
                 earliest_slot = future_slots[0]
                 suggestions.append({
@@ -180,7 +191,7 @@ class EnhancedAIResourceAllocationService:
         
         return sorted(suggestions, key=lambda x: (x['skill_match'], -x['delay_days']), reverse=True)[:3]
     
-    def _flexible_collaborative_pass(self, task: Task) -> List[Dict]:
+    def _flexible_collaborative_pass(self, task: Task, scores: ScoringMatrix) -> List[Dict]:
         """Pass 3: Analyze task splitting and collaborative assignments"""
         suggestions = []
         
@@ -191,92 +202,88 @@ class EnhancedAIResourceAllocationService:
                 suggestions.append(split_suggestion)
         
         # Option 2: Collaborative assignment
-        collaborative_suggestion = self._analyze_collaborative_assignment(task)
+        collaborative_suggestion = self._analyze_collaborative_assignment(task, scores)
         if collaborative_suggestion:
             suggestions.append(collaborative_suggestion)
         
         return suggestions
     
-    def _good_fit_pass(self, task: Task) -> List[Dict]:
+    def _good_fit_pass(self, task: Task, scores: ScoringMatrix) -> List[Dict]:
         """Pass 4: Find assignees with adjacent/related skills"""
-        suggestions = []
+        row = scores.row(task)
+        adjacent_match = scores.adjacent_match[row]
+        projected = scores.projected_utilization[row]
         
-        task_skills = set(task.skills_required.all())
-        
-        for resource in Resource.objects.all():
-            resource_skills = set(resource.skills.all())
-            
-            # Calculate adjacent skill match (related but not perfect)
-            adjacent_match = self._calculate_adjacent_skill_match(resource_skills, task_skills)
-            
-            if 0.4 <= adjacent_match < 0.7:  # Good enough but not perfect
-                current_util = resource.current_utilization()
-                projected_util = self._calculate_projected_utilization(resource, task)
-                
-                if projected_util < 95:  # Slightly more lenient for adjacent skills
-                    suggestions.append({
-                        'resource_id': resource.id,
-                        'resource_name': resource.name,
-                        'skill_match': adjacent_match,
-                        'skill_gap': list(task_skills - resource_skills),
-                        'current_utilization': current_util,
-                        'projected_utilization': projected_util,
-                        'mentoring_needed': True,
-                        'confidence': 'medium'
-                    })
-        
-        return sorted(suggestions, key=lambda x: x['skill_match'], reverse=True)[:3]
+        # Good enough but not perfect; slightly more lenient utilization for adjacent skills
+        candidates = (adjacent_match >= 0.4) & (adjacent_match < 0.7) & (projected < 95)
+        suggestions = []
+        for column in scores.rank(candidates, adjacent_match, limit=3):
+            resource = scores.resources[column]
+            suggestions.append({
+                'resource_id': resource.id,
+                'resource_name': resource.name,
+                'skill_match': float(adjacent_match[column]),
+                'skill_gap': scores.skill_gap(task, resource),
+                'current_utilization': float(scores.current_utilization[column]),
+                'projected_utilization': float(projected[column]),
+                'mentoring_needed': True,
+                'confidence': 'medium'
+            })
+        return suggestions
     
-    def _informed_overallocation_pass(self, task: Task) -> List[Dict]:
+    def _informed_overallocation_pass(self, task: Task, scores: ScoringMatrix) -> List[Dict]:
         """Pass 5: Calculate over-allocation scenarios with risk analysis"""
-        suggestions = []
-        
         # Only consider this for high/critical priority tasks
-        task_priority = getattr(task, 'priority', 'medium').lower()
-        if task_priority not in ['high', 'critical']:
-            return suggestions
-        
-        for resource in Resource.objects.all():
-            skill_match = self._calculate_skill_match(resource, task)
-            if skill_match < 0.6:  # Must have reasonable skill match
-                continue
-            
-            current_util = resource.current_utilization()
-            projected_util = self._calculate_projected_utilization(resource, task)
-            
-            if projected_util <= 120:  # Cap at 120% for safety
-                risk_analysis = self._calculate_overallocation_risk(resource, task, projected_util)
-                
-                suggestions.append({
-                    'resource_id': resource.id,
-                    'resource_name': resource.name,
-                    'skill_match': skill_match,
-                    'current_utilization': current_util,
-                    'projected_utilization': projected_util,
-                    'overallocation_percentage': projected_util - 100,
-                    'risk_analysis': risk_analysis,
-                    'mitigation_options': self._suggest_mitigation_options(resource, task),
-                    'confidence': 'low',
-                    'warning': 'This assignment exceeds normal capacity limits'
-                })
+        if task.priority < HIGH_PRIORITY:
+            return []
         
-        return sorted(suggestions, key=lambda x: (x['skill_match'], -x['projected_utilization']), reverse=True)[:2]
+        row = scores.row(task)
+        skill_match = scores.skill_match[row]
+        projected = scores.projected_utilization[row]
+        
+        # Reasonable skill match, capped at 120% for safety
+        candidates = (skill_match >= 0.6) & (projected <= 120)
+        suggestions = []
+        for column in scores.rank(candidates, skill_match, -projected, limit=2):
+            resource = scores.resources[column]
+            projected_util = float(projected[column])
+            suggestions.append({
+                'resource_id': resource.id,
+                'resource_name': resource.name,
+                'skill_match': float(skill_match[column]),
+                'current_utilization': float(scores.current_utilization[column]),
+                'projected_utilization': projected_util,
+                'overallocation_percentage': projected_util - 100,
+                'risk_analysis': self._calculate_overallocation_risk(resource, task, projected_util),
+                'mitigation_options': self._suggest_mitigation_options(resource, task, projected_util),
+                'confidence': 'low',
+                'warning': 'This assignment exceeds normal capacity limits'
+            })
+        return suggestions
+    
+    def _future_horizon(self, task: Task, weeks: int = 8) -> Tuple[date, date]:
+        """Date range covered by the future-aware look-ahead windows"""
+        current_date = max(timezone.now().date(), task.start_date)
+        return (current_date + timedelta(weeks=1),
+                current_date + timedelta(weeks=weeks) + (task.end_date - task.start_date))
     
-    def _find_future_capacity_slots(self, resource: Resource, task: Task) -> List[Dict]:
+    def _find_future_capacity_slots(self, resource: Resource, task: Task, timeline=None) -> List[Dict]:
         """Find future time slots where resource has capacity for the task"""
         slots = []
         
         # Look ahead up to 8 weeks
         current_date = max(timezone.now().date(), task.start_date)
+        if timeline is None:
+            timeline = build_timelines([resource], *self._future_horizon(task))[resource.id]
         
         for weeks_ahead in range(1, 9):
             potential_start = current_date + timedelta(weeks=weeks_ahead)
             potential_end = potential_start + (task.end_date - task.start_date)
             
             # Calculate utilization for this future period
-            future_util = resource.current_utilization(potential_start, potential_end)
             projected_util = self._calculate_projected_utilization_for_period(
-                resource, task, potential_start, potential_end
+                resource, task, potential_start, potential_end,
+                timeline.utilization(potential_start, potential_end)
             )
             
             if projected_util < 95:
@@ -314,21 +321,21 @@ class EnhancedAIResourceAllocationService:
             'reasoning': f'Split {task.estimated_hours}h task into manageable phases'
         }
     
-    def _analyze_collaborative_assignment(self, task: Task) -> Optional[Dict]:
+    def _analyze_collaborative_assignment(self, task: Task, scores: ScoringMatrix) -> Optional[Dict]:
         """Find multiple resources who can collaborate on the task"""
-        available_resources = []
-        
-        for resource in Resource.objects.all():
-            skill_match = self._calculate_skill_match(resource, task)
-            if skill_match >= 0.5:
-                current_util = resource.current_utilization()
-                if current_util < 85:  # More lenient for collaboration
-                    available_hours = max(0, (85 - current_util) / 100 * 40)  # Assume 40h/week capacity
-                    available_resources.append({
-                        'resource': resource,
-                        'skill_match': skill_match,
-                        'available_hours': available_hours
-                    })
+        skill_match = scores.skill_match[scores.row(task)]
+        current_util = scores.current_utilization
+        
+        # More lenient utilization for collaboration
+        available_resources = [
+            {
+                'resource': scores.resources[column],
+                'skill_match': float(skill_match[column]),
+                # Assume 40h/week capacity
+                'available_hours': max(0, (85 - float(current_util[column])) / 100 * 40)
+            }
+            for column in np.flatnonzero((skill_match >= 0.5) & (current_util < 85))
+        ]
         
         if len(available_resources) >= 2:
             # Sort by skill match and take top collaborators
@@ -354,54 +361,15 @@ class EnhancedAIResourceAllocationService:
         
         return None
     
-    def _calculate_skill_match(self, resource: Resource, task: Task) -> float:
-        """Calculate how well resource's skills match task requirements"""
-        task_skills = set(task.skills_required.all())
-        resource_skills = set(resource.skills.all())
-        
-        if not task_skills:
-            return 0.5  # Default match if no skills specified
-        
-        intersection = task_skills.intersection(resource_skills)
-        return len(intersection) / len(task_skills)
-    
-    def _calculate_adjacent_skill_match(self, resource_skills: set, task_skills: set) -> float:
-        """Calculate match including related/adjacent skills"""
-        # Define skill adjacencies (could be moved to database)
-        skill_adjacencies = {
-            'JavaScript': ['TypeScript', 'React', 'Node.js'],
-            'Python': ['Django', 'Flask', 'Data Analysis'],
-            'AWS': ['Docker', 'DevOps', 'Kubernetes'],
-            'UI/UX Design': ['Graphic Design', 'Frontend Development'],
-            # Add more as needed
-        }
-        
-        direct_matches = 0
-        adjacent_matches = 0
-        
-        for task_skill in task_skills:
-            task_skill_name = task_skill.name
-            
-            # Check direct match
-            if any(rs.name == task_skill_name for rs in resource_skills):
-                direct_matches += 1
-            else:
-                # Check adjacent skills
-                adjacent_skills = skill_adjacencies.get(task_skill_name, [])
-                if any(rs.name in adjacent_skills for rs in resource_skills):
-                    adjacent_matches += 0.5
-        
-        total_matches = direct_matches + adjacent_matches
-        return total_matches / len(task_skills) if task_skills else 0
-    
-    def _calculate_projected_utilization(self, resource: Resource, task: Task) -> float:
+    def _calculate_projected_utilization(self, resource: Resource, task: Task,
+                                         period_utilization: Optional[float] = None) -> float:
         """Calculate projected utilization if task is assigned"""
-        current_util = resource.current_utilization(task.start_date, task.end_date)
+        if period_utilization is None:
+            period_utilization = resource.current_utilization(task.start_date, task.end_date)
+        current_util = period_utilization
         
         # Calculate task duration in work days
-        task_duration_days = (task.end_date - task.start_date).days + 1
-        work_days = sum(1 for i in range(task_duration_days) 
-                       if (task.start_date + timedelta(days=i)).weekday() < 5)
+        work_days = business_calendar.count(task.start_date, task.end_date, resource.location)
         
         if work_days > 0:
             # Assume 8 hours per work day capacity
@@ -416,13 +384,14 @@ class EnhancedAIResourceAllocationService:
             
         return round(projected_util, 1)
     
-    def _calculate_projected_utilization_for_period(self, resource: Resource, task: Task, start_date, end_date) -> float:
+    def _calculate_projected_utilization_for_period(self, resource: Resource, task: Task, start_date, end_date,
+                                                    period_utilization: Optional[float] = None) -> float:
         """Calculate projected utilization for a specific period"""
-        current_util = resource.current_utilization(start_date, end_date)
+        if period_utilization is None:
+            period_utilization = resource.current_utilization(start_date, end_date)
+        current_util = period_utilization
         
-        task_duration_days = (end_date - start_date).days + 1
-        work_days = sum(1 for i in range(task_duration_days) 
-                       if (start_date + timedelta(days=i)).weekday() < 5)
+        work_days = business_calendar.count(start_date, end_date, resource.location)
         
         if work_days > 0:
             available_hours_in_period = 8 * work_days
@@ -467,13 +436,15 @@ class EnhancedAIResourceAllocationService:
             'overtime_hours_needed': max(0, overallocation / 100 * 40)  # Assuming 40h/week
         }
     
-    def _suggest_mitigation_options(self, resource: Resource, task: Task) -> List[Dict]:
+    def _suggest_mitigation_options(self, resource: Resource, task: Task,
+                                    projected_util: Optional[float] = None) -> List[Dict]:
         """Suggest ways to mitigate over-allocation"""
         options = []
         
         # Option 1: Overtime
-        overtime_hours = self._calculate_overallocation_risk(resource, task, 
-                                                           self._calculate_projected_utilization(resource, task))['overtime_hours_needed']
+        if projected_util is None:
+            projected_util = self._calculate_projected_utilization(resource, task)
+        overtime_hours = self._calculate_overallocation_risk(resource, task, projected_util)['overtime_hours_needed']
         options.append({
             'type': 'overtime',
             'description': f'Approve {overtime_hours:.1f} hours of overtime',
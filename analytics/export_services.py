@@ -10,9 +10,11 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 
-from .services import UtilizationTrackingService, CostTrackingService
+from .services import CostTrackingService
 from .models import ResourceDemandForecast, SkillDemandAnalysis
+from .rollups import utilization_rollups
 from resources.models import Resource
+from allocation.utilization import utilization_engine
 from projects.models import Project
 
 class ReportExportService:
@@ -45,16 +47,17 @@ class ReportExportService:
         story.append(Spacer(1, 20))
         
         # Get utilization data
-        utilization_service = UtilizationTrackingService()
         resources = Resource.objects.all()
+        current_utilization = utilization_engine.compute(resources)
+        today = timezone.now().date()
+        historical = utilization_rollups.resource_summary(today - timedelta(days=30), today)
         
         # Create table data
         table_data = [['Resource', 'Role', 'Current Utilization', 'Avg 30-day Utilization', 'Status']]
         
         for resource in resources:
-            current_util = resource.current_utilization()
-            trends = utilization_service.get_utilization_trends(resource, 30)
-            avg_util = trends.aggregate(avg=models.Avg('utilization_percentage'))['avg'] or 0
+            current_util = current_utilization[resource.id]
+            avg_util = historical.get(resource.id, {}).get('avg_utilization', 0)
             
             if current_util > 100:
                 status = "Over-allocated"
@@ -96,14 +99,15 @@ class ReportExportService:
     def export_utilization_excel(self):
         """Export utilization report as Excel"""
         # Get data
-        utilization_service = UtilizationTrackingService()
         resources = Resource.objects.all()
+        current_utilization = utilization_engine.compute(resources)
+        today = timezone.now().date()
+        historical = utilization_rollups.resource_summary(today - timedelta(days=30), today)
         
         data = []
         for resource in resources:
-            current_util = resource.current_utilization()
-            trends = utilization_service.get_utilization_trends(resource, 30)
-            avg_util = trends.aggregate(avg=models.Avg('utilization_percentage'))['avg'] or 0
+            current_util = current_utilization[resource.id]
+            avg_util = historical.get(resource.id, {}).get('avg_utilization', 0)
             
             data.append({
                 'Resource': resource.name,
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from analytics.rollups import utilization_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild weekly, monthly and department/role utilization rollups from daily history'
+
+    def handle(self, *args, **options):
+        rows = utilization_rollups.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt utilization rollups ({rows} rows)')
+        )
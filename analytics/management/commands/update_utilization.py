@@ -1,4 +1,7 @@
-from django.core.management.base import BaseCommand
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from analytics.services import UtilizationTrackingService
 from datetime import datetime, timedelta
 from django.utils import timezone
@@ -17,13 +20,43 @@ class Command(BaseCommand):
         parser.add_argument(
             '--today-only',
             action='store_true',
-            help='Update only today\'s utilization data'
+            help='Update only today\'s utilization data (run on a schedule to keep dashboards fresh)'
+        )
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='Backfill start date (YYYY-MM-DD); enables bulk backfill mode'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Backfill end date (YYYY-MM-DD, default: today)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes for backfill mode (default: CPU count)'
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Days per backfill chunk (default: 31)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per bulk upsert statement (default: 2000)'
         )
 
     def handle(self, *args, **options):
         utilization_service = UtilizationTrackingService()
         
-        if options['today_only']:
+        if options['start']:
+            self.backfill(utilization_service, options)
+        elif options['today_only']:
             # Update only today
             utilization_service.record_daily_utilization()
             self.stdout.write(
@@ -46,3 +79,46 @@ class Command(BaseCommand):
                     f'Successfully updated utilization data for the last {days} days'
                 )
             )
+
+    def backfill(self, utilization_service, options):
+        """Bulk backfill a date range with a process pool"""
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end_date = (datetime.strptime(options['end'], '%Y-%m-%d').date()
+                        if options['end'] else timezone.now().date())
+        except ValueError:
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+        if end_date < start_date:
+            raise CommandError('--end must not be before --start')
+        if options['chunk_days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--chunk-days and --batch-size must be positive')
+
+        started = time.monotonic()
+        written = 0
+
+        def report(chunk_start, chunk_end, rows, done, total):
+            nonlocal written
+            written += rows
+            elapsed = time.monotonic() - started
+            throughput = written / elapsed if elapsed > 0 else written
+            self.stdout.write(
+                f'[{done}/{total}] {chunk_start} to {chunk_end}: {rows} rows '
+                f'({elapsed:.1f}s elapsed, {throughput:,.0f} rows/s)'
+            )
+
+        total_rows = utilization_service.backfill_daily_utilization(
+            start_date, end_date,
+            workers=options['workers'],
+            chunk_days=options['chunk_days'],
+            batch_size=options['batch_size'],
+            progress=report
+        )
+
+        elapsed = time.monotonic() - started
+        throughput = total_rows / elapsed if elapsed > 0 else total_rows
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Backfilled {total_rows} rows from {start_date} to {end_date} '
+                f'in {elapsed:.1f}s ({throughput:,.0f} rows/s)'
+            )
+        )
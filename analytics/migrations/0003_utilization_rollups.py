@@ -0,0 +1,71 @@
+# Generated by Django 4.2.6 on 2026-10-18 00:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0005_add_remote_worker_fields'),
+        ('analytics', '0002_aiskillrecommendation_aiforecastadjustment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupWeeklyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('days', models.PositiveIntegerField(default=0, help_text='Number of daily rows summed')),
+                ('utilization_total', models.DecimalField(decimal_places=2, help_text='Sum of daily utilization percentages', max_digits=12)),
+                ('allocated_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('available_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.CharField(max_length=100)),
+                ('role', models.CharField(max_length=100)),
+                ('resource_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'abstract': False,
+                'unique_together': {('department', 'role', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('days', models.PositiveIntegerField(default=0, help_text='Number of daily rows summed')),
+                ('utilization_total', models.DecimalField(decimal_places=2, help_text='Sum of daily utilization percentages', max_digits=12)),
+                ('allocated_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('available_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_utilization', to='resources.resource')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'abstract': False,
+                'unique_together': {('resource', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('days', models.PositiveIntegerField(default=0, help_text='Number of daily rows summed')),
+                ('utilization_total', models.DecimalField(decimal_places=2, help_text='Sum of daily utilization percentages', max_digits=12)),
+                ('allocated_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('available_hours', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_utilization', to='resources.resource')),
+            ],
+            options={
+                'ordering': ['-period_start'],
+                'abstract': False,
+                'unique_together': {('resource', 'period_start')},
+            },
+        ),
+    ]
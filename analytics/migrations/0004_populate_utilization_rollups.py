@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def populate_rollups(apps, schema_editor):
+    from analytics.rollups import DAILY_FIELDS, build_rollups
+
+    HistoricalUtilization = apps.get_model('analytics', 'HistoricalUtilization')
+    WeeklyUtilization = apps.get_model('analytics', 'WeeklyUtilization')
+    MonthlyUtilization = apps.get_model('analytics', 'MonthlyUtilization')
+    GroupWeeklyUtilization = apps.get_model('analytics', 'GroupWeeklyUtilization')
+
+    weekly, monthly, groups = build_rollups(
+        HistoricalUtilization.objects.values_list(*DAILY_FIELDS).iterator(),
+        WeeklyUtilization, MonthlyUtilization, GroupWeeklyUtilization
+    )
+    WeeklyUtilization.objects.bulk_create(weekly, batch_size=1000)
+    MonthlyUtilization.objects.bulk_create(monthly, batch_size=1000)
+    GroupWeeklyUtilization.objects.bulk_create(groups, batch_size=1000)
+
+
+def clear_rollups(apps, schema_editor):
+    for model_name in ('WeeklyUtilization', 'MonthlyUtilization', 'GroupWeeklyUtilization'):
+        apps.get_model('analytics', model_name).objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_utilization_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rollups, clear_rollups),
+    ]
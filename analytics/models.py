@@ -36,6 +36,56 @@ class HistoricalUtilization(models.Model):
         ordering = ['-date']
         unique_together = ['resource', 'date']
 
+class UtilizationRollup(models.Model):
+    """Daily HistoricalUtilization rows summed over a period"""
+    period_start = models.DateField()
+    days = models.PositiveIntegerField(default=0, help_text='Number of daily rows summed')
+    utilization_total = models.DecimalField(max_digits=12, decimal_places=2, help_text='Sum of daily utilization percentages')
+    allocated_hours = models.DecimalField(max_digits=12, decimal_places=2)
+    available_hours = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def avg_utilization(self):
+        """Average daily utilization percentage over the period"""
+        return self.utilization_total / self.days if self.days else 0
+    
+    class Meta:
+        abstract = True
+        ordering = ['-period_start']
+
+class WeeklyUtilization(UtilizationRollup):
+    """Utilization per resource and ISO week (period_start is the Monday)"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='weekly_utilization')
+    
+    def __str__(self):
+        return f"{self.resource.name} - week of {self.period_start}"
+    
+    class Meta(UtilizationRollup.Meta):
+        unique_together = ['resource', 'period_start']
+
+class MonthlyUtilization(UtilizationRollup):
+    """Utilization per resource and calendar month (period_start is the 1st)"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='monthly_utilization')
+    
+    def __str__(self):
+        return f"{self.resource.name} - {self.period_start:%B %Y}"
+    
+    class Meta(UtilizationRollup.Meta):
+        unique_together = ['resource', 'period_start']
+
+class GroupWeeklyUtilization(UtilizationRollup):
+    """Utilization per department, role and ISO week"""
+    department = models.CharField(max_length=100)
+    role = models.CharField(max_length=100)
+    resource_count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.department} / {self.role} - week of {self.period_start}"
+    
+    class Meta(UtilizationRollup.Meta):
+        unique_together = ['department', 'role', 'period_start']
+
 class ProjectCostTracking(models.Model):
     """Track project costs over time"""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='cost_tracking')
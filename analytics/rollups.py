@@ -0,0 +1,292 @@
+"""
+Pre-aggregated utilization rollups
+
+Daily HistoricalUtilization rows are summed per resource and ISO week, per
+resource and month, and per department/role and week. Rollups store sums and
+a day count, so averages over any set of periods are exact (sum / days) and
+trend widgets read a handful of rows instead of every daily row. Ranges that
+do not start and end on period boundaries read the rollups of the periods
+inside them and the daily rows of the partial weeks at either end.
+
+Whenever daily rows are written, the weeks and months they fall in are
+recomputed from the daily table.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import GroupWeeklyUtilization, HistoricalUtilization, MonthlyUtilization, WeeklyUtilization
+
+logger = logging.getLogger(__name__)
+
+DAILY_FIELDS = ('resource_id', 'resource__department', 'resource__role', 'date',
+                'utilization_percentage', 'allocated_hours', 'available_hours')
+
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week containing a date"""
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day: date) -> date:
+    """First day of the month containing a date"""
+    return day.replace(day=1)
+
+
+def month_end(day: date) -> date:
+    """Last day of the month containing a date"""
+    return (month_start(day) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def split_weeks(start_date: date, end_date: date) -> Tuple[Optional[Tuple[date, date]], List[Tuple[date, date]]]:
+    """
+    Split a date range into the ISO weeks it fully covers and the days outside them
+
+    Returns:
+        (first and last Monday of the full weeks, or None if there are none;
+        (start, end) ranges of the remaining days)
+    """
+    if end_date < start_date:
+        return None, []
+    first = week_start(start_date + timedelta(days=6))
+    last = week_start(end_date + timedelta(days=1)) - timedelta(days=7)
+    if last < first:
+        return None, [(start_date, end_date)]
+
+    days_outside = []
+    if start_date < first:
+        days_outside.append((start_date, first - timedelta(days=1)))
+    if last + timedelta(days=6) < end_date:
+        days_outside.append((last + timedelta(days=7), end_date))
+    return (first, last), days_outside
+
+
+def _on_days(ranges: Sequence[Tuple[date, date]]) -> Q:
+    """Filter for daily rows falling in any of the ranges"""
+    condition = Q()
+    for start_date, end_date in ranges:
+        condition |= Q(date__range=(start_date, end_date))
+    return condition
+
+
+def build_rollups(rows: Iterable[Tuple], weekly_model, monthly_model, group_model,
+                  weeks: Optional[Tuple[date, date]] = None,
+                  months: Optional[Tuple[date, date]] = None) -> Tuple[List, List, List]:
+    """
+    Sum daily rows into unsaved rollup instances
+
+    Args:
+        rows: Tuples of DAILY_FIELDS
+        weekly_model, monthly_model, group_model: Rollup model classes
+        weeks: Only keep weeks whose Monday is in this inclusive range
+        months: Only keep months whose first day is in this inclusive range
+
+    Returns:
+        (weekly, monthly, group) lists of model instances
+    """
+    def totals():
+        return [0, Decimal('0'), Decimal('0'), Decimal('0')]
+
+    weekly = defaultdict(totals)
+    monthly = defaultdict(totals)
+    groups = defaultdict(totals)
+    group_members = defaultdict(set)
+
+    for resource_id, department, role, day, utilization, allocated, available in rows:
+        week = week_start(day)
+        group_key = (department, role, week)
+        group_members[group_key].add(resource_id)
+        for bucket in (weekly[(resource_id, week)], monthly[(resource_id, month_start(day))], groups[group_key]):
+            bucket[0] += 1
+            bucket[1] += utilization
+            bucket[2] += allocated
+            bucket[3] += available
+
+    def keep(period, bounds):
+        return bounds is None or bounds[0] <= period <= bounds[1]
+
+    def fields(bucket):
+        days, utilization, allocated, available = bucket
+        return {'days': days, 'utilization_total': utilization,
+                'allocated_hours': allocated, 'available_hours': available}
+
+    return (
+        [weekly_model(resource_id=resource_id, period_start=week, **fields(bucket))
+         for (resource_id, week), bucket in weekly.items() if keep(week, weeks)],
+        [monthly_model(resource_id=resource_id, period_start=month, **fields(bucket))
+         for (resource_id, month), bucket in monthly.items() if keep(month, months)],
+        [group_model(department=department, role=role, period_start=week,
+                     resource_count=len(group_members[(department, role, week)]), **fields(bucket))
+         for (department, role, week), bucket in groups.items() if keep(week, weeks)],
+    )
+
+
+class UtilizationRollupService:
+    """Maintain and query utilization rollups"""
+
+    def refresh(self, start_date: date, end_date: date) -> int:
+        """
+        Recompute every week and month touching a date range from the daily rows
+
+        Returns:
+            Number of rollup rows written
+        """
+        weeks = (week_start(start_date), week_start(end_date))
+        months = (month_start(start_date), month_start(end_date))
+        daily_rows = HistoricalUtilization.objects.filter(
+            date__range=(min(weeks[0], months[0]), max(weeks[1] + timedelta(days=6), month_end(end_date)))
+        ).values_list(*DAILY_FIELDS)
+
+        weekly, monthly, groups = build_rollups(
+            daily_rows.iterator(), WeeklyUtilization, MonthlyUtilization, GroupWeeklyUtilization,
+            weeks=weeks, months=months
+        )
+        with transaction.atomic():
+            WeeklyUtilization.objects.filter(period_start__range=weeks).delete()
+            MonthlyUtilization.objects.filter(period_start__range=months).delete()
+            GroupWeeklyUtilization.objects.filter(period_start__range=weeks).delete()
+            WeeklyUtilization.objects.bulk_create(weekly, batch_size=1000)
+            MonthlyUtilization.objects.bulk_create(monthly, batch_size=1000)
+            GroupWeeklyUtilization.objects.bulk_create(groups, batch_size=1000)
+
+        return len(weekly) + len(monthly) + len(groups)
+
+    def rebuild(self) -> int:
+        """Recompute all rollups from the daily table"""
+        with transaction.atomic():
+            WeeklyUtilization.objects.all().delete()
+            MonthlyUtilization.objects.all().delete()
+            GroupWeeklyUtilization.objects.all().delete()
+            dates = HistoricalUtilization.objects.order_by('date').values_list('date', flat=True)
+            first, last = dates.first(), dates.last()
+            written = self.refresh(first, last) if first else 0
+
+        logger.info(f"Rebuilt utilization rollups: {written} rows")
+        return written
+
+    def _periods(self, start_date: date, end_date: date):
+        """
+        Pick the rollup table and period_start range inside a date range
+
+        Month-aligned ranges read the monthly table; anything else reads the
+        ISO weeks it fully covers.
+
+        Returns:
+            (rollup model, period_start range or None, day ranges to read from
+            the daily table)
+        """
+        if start_date == month_start(start_date) and end_date == month_end(end_date):
+            return MonthlyUtilization, (start_date, month_start(end_date)), []
+        weeks, days_outside = split_weeks(start_date, end_date)
+        return WeeklyUtilization, weeks, days_outside
+
+    def resource_summary(self, start_date: date, end_date: date, resources=None) -> Dict[int, Dict]:
+        """
+        Per-resource totals for a date range, in at most two queries
+
+        Args:
+            start_date: First day of the range
+            end_date: Last day of the range
+            resources: Optional queryset or list of resources to limit to
+
+        Returns:
+            Dictionary mapping resource id to avg_utilization, allocated_hours,
+            available_hours and days; resources without history are absent
+        """
+        model, periods, days_outside = self._periods(start_date, end_date)
+        totals = defaultdict(lambda: [0, Decimal('0'), Decimal('0'), Decimal('0')])
+
+        def add(rows):
+            for resource_id, *sums in rows:
+                bucket = totals[resource_id]
+                for index, value in enumerate(sums):
+                    bucket[index] += value or 0
+
+        if periods:
+            rollups = model.objects.filter(period_start__range=periods)
+            if resources is not None:
+                rollups = rollups.filter(resource__in=resources)
+            add(rollups.values('resource_id').annotate(
+                total_days=Sum('days'),
+                total_utilization=Sum('utilization_total'),
+                total_allocated=Sum('allocated_hours'),
+                total_available=Sum('available_hours'),
+            ).values_list('resource_id', 'total_days', 'total_utilization', 'total_allocated', 'total_available'))
+        if days_outside:
+            daily = HistoricalUtilization.objects.filter(_on_days(days_outside))
+            if resources is not None:
+                daily = daily.filter(resource__in=resources)
+            add(daily.order_by().values('resource_id').annotate(
+                total_days=Count('id'),
+                total_utilization=Sum('utilization_percentage'),
+                total_allocated=Sum('allocated_hours'),
+                total_available=Sum('available_hours'),
+            ).values_list('resource_id', 'total_days', 'total_utilization', 'total_allocated', 'total_available'))
+
+        return {
+            resource_id: {
+                'avg_utilization': float(utilization / days) if days else 0.0,
+                'allocated_hours': allocated,
+                'available_hours': available,
+                'days': days,
+            }
+            for resource_id, (days, utilization, allocated, available) in totals.items()
+        }
+
+    def group_averages(self, periods: Sequence[Tuple[date, date]], department: Optional[str] = None,
+                       role: Optional[str] = None) -> List[float]:
+        """
+        Day-weighted average utilization for several date ranges, in at most two queries
+
+        Whole ISO weeks are read from the department/role rollups, the days
+        around them from the daily rows.
+
+        Args:
+            periods: (start_date, end_date) ranges
+            department: Limit to one department
+            role: Limit to one role
+
+        Returns:
+            Average utilization percentage per range (0 when there is no history)
+        """
+        rollups = GroupWeeklyUtilization.objects.all()
+        daily = HistoricalUtilization.objects.all()
+        if department:
+            rollups = rollups.filter(department=department)
+            daily = daily.filter(resource__department=department)
+        if role:
+            rollups = rollups.filter(role=role)
+            daily = daily.filter(resource__role=role)
+
+        rollup_aggregates, daily_aggregates = {}, {}
+        for index, (start_date, end_date) in enumerate(periods):
+            weeks, days_outside = split_weeks(start_date, end_date)
+            if weeks:
+                in_period = Q(period_start__range=weeks)
+                rollup_aggregates[f'utilization_{index}'] = Sum('utilization_total', filter=in_period)
+                rollup_aggregates[f'days_{index}'] = Sum('days', filter=in_period)
+            if days_outside:
+                in_period = _on_days(days_outside)
+                daily_aggregates[f'utilization_{index}'] = Sum('utilization_percentage', filter=in_period)
+                daily_aggregates[f'days_{index}'] = Count('id', filter=in_period)
+
+        totals = defaultdict(int)
+        for queryset, aggregates in ((rollups, rollup_aggregates), (daily, daily_aggregates)):
+            if aggregates:
+                for key, value in queryset.aggregate(**aggregates).items():
+                    totals[key] += value or 0
+
+        averages = []
+        for index in range(len(periods)):
+            days = totals[f'days_{index}']
+            averages.append(float(totals[f'utilization_{index}'] / days) if days else 0.0)
+        return averages
+
+
+# Global instance
+utilization_rollups = UtilizationRollupService()
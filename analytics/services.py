@@ -3,13 +3,17 @@ import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.db.models import Sum, Avg, Count
+from core.jobs import jobs
 from resources.models import Resource, TimeEntry
 from projects.models import Project, Task
 from allocation.models import Assignment
 from .models import ResourceDemandForecast, HistoricalUtilization, SkillDemandAnalysis
 from .ai_services import AIForecastEnhancementService
+from .rollups import utilization_rollups
 
 class PredictiveAnalyticsService:
     """Service for predictive analytics and forecasting"""
@@ -551,44 +555,220 @@ class PredictiveAnalyticsService:
         
         return role_forecasts
 
+# Cache key of the freshness marker for today's utilization snapshot
+SNAPSHOT_STATUS_KEY = 'analytics:daily_utilization:status'
+
+
+def compute_daily_utilization_rows(start_date, end_date):
+    """
+    Compute HistoricalUtilization values for every resource and day in a range
+
+    Reads resources, overlapping assignments and daily load rows once for the
+    whole range and fills (resource x day) arrays. Used both for the daily
+    snapshot and for bulk backfills. Module-level so it can run in a worker process.
+
+    Returns:
+        List of (resource_id, date, utilization_percentage, allocated_hours, available_hours)
+    """
+    from allocation.models import ResourceDailyLoad
+    from core.business_calendar import business_calendar
+
+    days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+    resources = list(Resource.objects.values_list('id', 'capacity', 'location'))
+    if not resources or not len(days):
+        return []
+    row_of = {resource_id: index for index, (resource_id, _, _) in enumerate(resources)}
+    shape = (len(resources), len(days))
+
+    # Assignment hours prorated over calendar days, accumulated with a difference array
+    prorated = np.zeros((shape[0], shape[1] + 1))
+    assignments = Assignment.objects.filter(
+        task__start_date__lte=end_date,
+        task__end_date__gte=start_date
+    ).values_list('resource_id', 'allocated_hours', 'task__start_date', 'task__end_date')
+    for resource_id, hours, task_start, task_end in assignments.iterator():
+        rate = hours / max(1, (task_end - task_start).days + 1)
+        first = max((task_start - start_date).days, 0)
+        last = min((task_end - start_date).days, shape[1] - 1)
+        prorated[row_of[resource_id], first] += rate
+        prorated[row_of[resource_id], last + 1] -= rate
+    prorated = np.cumsum(prorated, axis=1)[:, :shape[1]]
+
+    # Business-day load and leave, as used by Resource.current_utilization
+    load = np.zeros(shape)
+    leave = np.zeros(shape)
+    rows = list(ResourceDailyLoad.objects.filter(
+        date__range=(start_date, end_date)
+    ).values_list('resource_id', 'date', 'allocated_hours', 'leave_hours'))
+    if rows:
+        resource_ids, dates, hours, leave_hours = zip(*rows)
+        index = (np.array([row_of[resource_id] for resource_id in resource_ids]),
+                 (np.array(dates, dtype='datetime64[D]') - days[0]).astype(np.int64))
+        np.add.at(load, index, hours)
+        np.add.at(leave, index, leave_hours)
+
+    daily_capacity = np.array([capacity / 5 for _, capacity, _ in resources], dtype=float)
+    business_days = {
+        location: np.is_busday(days, busdaycal=business_calendar.calendar_for(location))
+        for location in {location for _, _, location in resources}
+    }
+    workday = np.array([business_days[location] for _, _, location in resources]).reshape(shape)
+    available_today = np.where(workday, daily_capacity[:, None], 0.0) - leave
+    utilization = np.round(
+        np.divide(load * 100, available_today, out=np.zeros(shape), where=available_today > 0), 1
+    )
+
+    dates = days.tolist()
+    return [
+        (resource_id, dates[day], float(utilization[row, day]), round(float(prorated[row, day]), 2),
+         float(daily_capacity[row]))
+        for row, (resource_id, _, _) in enumerate(resources)
+        for day in range(shape[1])
+    ]
+
+
 class UtilizationTrackingService:
     """Service for tracking and storing utilization metrics"""
     
+    def backfill_daily_utilization(self, start_date, end_date, workers=1, chunk_days=31,
+                                   batch_size=2000, progress=None):
+        """
+        Record daily utilization for a date range in bulk
+        
+        The range is split into chunks that are computed in a process pool, each
+        from one snapshot of assignments and daily load. Rows are upserted by the
+        calling process in large batches, which also keeps SQLite writes serialized.
+        
+        Args:
+            start_date: First day to record
+            end_date: Last day to record (inclusive)
+            workers: Number of worker processes (1 computes in-process)
+            chunk_days: Days per chunk
+            batch_size: Rows per INSERT ... ON CONFLICT statement
+            progress: Optional callable(chunk_start, chunk_end, rows, done, total)
+        
+        Returns:
+            Total number of rows written
+        """
+        chunks = []
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+        
+        total_rows = 0
+        
+        def _store(chunk, rows, done):
+            nonlocal total_rows
+            self._upsert_rows(rows, batch_size)
+            total_rows += len(rows)
+            if progress:
+                progress(chunk[0], chunk[1], len(rows), done, len(chunks))
+        
+        if workers <= 1 or len(chunks) == 1:
+            for done, chunk in enumerate(chunks, start=1):
+                _store(chunk, compute_daily_utilization_rows(*chunk), done)
+            return total_rows
+        
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        import django
+        # Spawned rather than forked, so each worker sets Django up and opens its
+        # own database connections instead of inheriting the parent's
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=django.setup) as pool:
+            futures = {pool.submit(compute_daily_utilization_rows, *chunk): chunk for chunk in chunks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                _store(futures[future], future.result(), done)
+        
+        return total_rows
+    
+    def _upsert_rows(self, rows, batch_size=2000):
+        """Insert or update HistoricalUtilization rows in batches and refresh
+        the rollups of the weeks and months they fall in"""
+        if not rows:
+            return
+        dates = [row[1] for row in rows]
+        HistoricalUtilization.objects.bulk_create(
+            [
+                HistoricalUtilization(
+                    resource_id=resource_id,
+                    date=date,
+                    utilization_percentage=utilization,
+                    allocated_hours=allocated_hours,
+                    available_hours=available_hours
+                )
+                for resource_id, date, utilization, allocated_hours, available_hours in rows
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['resource', 'date'],
+            update_fields=['utilization_percentage', 'allocated_hours', 'available_hours']
+        )
+        utilization_rollups.refresh(min(dates), max(dates))
+    
     def record_daily_utilization(self, date=None):
-        """Record utilization data for all resources for a given date"""
+        """
+        Record utilization data for all resources for a given date
+        
+        One set-based computation and one bulk upsert. Recording today's
+        snapshot also updates the freshness marker read by the dashboards.
+        
+        Returns:
+            Number of rows written
+        """
         if date is None:
             date = timezone.now().date()
         
-        resources = Resource.objects.all()
+        rows = compute_daily_utilization_rows(date, date)
+        self._upsert_rows(rows)
         
-        for resource in resources:
-            utilization = resource.current_utilization(date, date)
-            
-            # Calculate allocated and available hours for the day
-            assignments = Assignment.objects.filter(
-                resource=resource,
-                task__start_date__lte=date,
-                task__end_date__gte=date
-            )
-            
-            allocated_hours = sum(
-                assignment.allocated_hours / 
-                max(1, (assignment.task.end_date - assignment.task.start_date).days + 1)
-                for assignment in assignments
-            )
-            
-            # Assuming 8 hours per day capacity
-            available_hours = resource.capacity / 5  # Weekly capacity / 5 days
-            
-            HistoricalUtilization.objects.update_or_create(
-                resource=resource,
-                date=date,
-                defaults={
-                    'utilization_percentage': utilization,
-                    'allocated_hours': allocated_hours,
-                    'available_hours': available_hours
-                }
-            )
+        if date == timezone.now().date():
+            cache.set(SNAPSHOT_STATUS_KEY, {
+                'date': date,
+                'recorded_at': timezone.now(),
+                'rows': len(rows),
+            }, None)
+        return len(rows)
+    
+    def schedule_daily_utilization(self, date=None):
+        """
+        Record the daily snapshot in the background
+        
+        Repeated requests while a refresh is queued or running are merged.
+        """
+        jobs.enqueue(f'daily-utilization:{date or "today"}', self.record_daily_utilization, date)
+    
+    def get_snapshot_status(self):
+        """
+        Freshness of today's utilization snapshot
+        
+        Returns:
+            Dictionary with the snapshot date, recorded_at timestamp (None if
+            never recorded), row count and whether it is stale
+        """
+        status = cache.get(SNAPSHOT_STATUS_KEY) or {'date': None, 'recorded_at': None, 'rows': 0}
+        max_age = timedelta(seconds=getattr(settings, 'UTILIZATION_SNAPSHOT_MAX_AGE', 3600))
+        status['stale'] = (
+            status['date'] != timezone.now().date()
+            or status['recorded_at'] is None
+            or timezone.now() - status['recorded_at'] > max_age
+        )
+        return status
+    
+    def ensure_fresh_snapshot(self):
+        """
+        Return the snapshot status, scheduling a background refresh if stale
+        
+        For read views: they never write, but a stale snapshot is refreshed for
+        the next request when no scheduler has done it yet.
+        """
+        status = self.get_snapshot_status()
+        if status['stale']:
+            self.schedule_daily_utilization()
+        return status
     
     def get_utilization_trends(self, resource=None, days=30):
         """Get utilization trends for analysis"""
@@ -608,27 +788,31 @@ class CostTrackingService:
         """Update cost tracking for projects"""
         from .models import ProjectCostTracking
         
-        projects = Project.objects.all()
+        projects = Project.objects.with_metrics()
         if project_id:
             projects = projects.filter(id=project_id)
         
-        for project in projects:
-            estimated_cost = project.get_estimated_cost()
-            actual_cost = project.get_actual_cost()
-            budget_variance = project.get_budget_variance() or 0
-            
-            ProjectCostTracking.objects.update_or_create(
+        today = timezone.now().date()
+        rows = [
+            ProjectCostTracking(
                 project=project,
-                date=timezone.now().date(),
-                defaults={
-                    'estimated_cost': estimated_cost,
-                    'actual_cost': actual_cost,
-                    'budget_variance': budget_variance
-                }
+                date=today,
+                estimated_cost=project.estimated_cost,
+                actual_cost=project.actual_cost,
+                budget_variance=project.budget_variance or 0
             )
+            for project in projects
+        ]
+        ProjectCostTracking.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['project', 'date'],
+            update_fields=['estimated_cost', 'actual_cost', 'budget_variance']
+        )
     def get_cost_variance_report(self, start_date=None, end_date=None, project_status=None, client=None):
         """Generate cost variance report with optional filters"""
-        projects = Project.objects.all()
+        projects = Project.objects.with_metrics().select_related('manager')
         
         # Apply filters
         if project_status:
@@ -646,8 +830,8 @@ class CostTrackingService:
         
         report_data = []
         for project in projects:
-            estimated = project.get_estimated_cost()
-            actual = project.get_actual_cost()
+            estimated = project.estimated_cost
+            actual = project.actual_cost
             variance = estimated - actual if estimated and actual else 0
             variance_percentage = (variance / estimated * 100) if estimated > 0 else 0
             
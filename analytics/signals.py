@@ -0,0 +1,16 @@
+"""
+Signal handlers that refresh today's utilization snapshot when assignments change
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from allocation.models import Assignment
+
+
+@receiver(post_save, sender=Assignment)
+@receiver(post_delete, sender=Assignment)
+def refresh_utilization_snapshot(sender, raw=False, **kwargs):
+    """Re-record today's snapshot in the background once the change is committed"""
+    if not raw:
+        from .services import UtilizationTrackingService
+        UtilizationTrackingService().schedule_daily_utilization()
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from datetime import timedelta, datetime
 from decimal import Decimal
@@ -12,9 +13,11 @@ import logging
 from .services import PredictiveAnalyticsService, UtilizationTrackingService, CostTrackingService
 from .models import ResourceDemandForecast, HistoricalUtilization, SkillDemandAnalysis, AISkillRecommendation, AIResourceAllocationSuggestion, AIForecastAdjustment
 from .export_services import ReportExportService
+from .rollups import utilization_rollups
 from .ai_services import AISkillRecommendationService, AIResourceAllocationService, AIForecastEnhancementService
 from utils.gemini_ai import gemini_service
 from resources.models import Resource
+from allocation.utilization import utilization_engine
 from projects.models import Project, Task
 
 logger = logging.getLogger(__name__)
@@ -81,8 +84,8 @@ def analytics_dashboard(request):
       # Get utilization trends
     utilization_service = UtilizationTrackingService()
     
-    # Update today's utilization data before displaying trends
-    utilization_service.record_daily_utilization()
+    # Today's snapshot is recorded in the background; only read it here
+    utilization_snapshot = utilization_service.ensure_fresh_snapshot()
     
     utilization_trends = utilization_service.get_utilization_trends(days=30)
     
@@ -94,24 +97,14 @@ def analytics_dashboard(request):
     total_resources = Resource.objects.count()
     total_projects = Project.objects.count()
     
-    # Calculate utilization metrics
-    all_utilizations = HistoricalUtilization.objects.filter(
-        date__gte=timezone.now().date() - timedelta(days=30)
-    )
-    
-    avg_utilization = all_utilizations.aggregate(
-        avg=models.Avg('utilization_percentage')
-    )['avg'] or 0
-    
-    # Calculate utilization trend (compare last 30 days to previous 30 days)
-    previous_utilizations = HistoricalUtilization.objects.filter(
-        date__gte=timezone.now().date() - timedelta(days=60),
-        date__lt=timezone.now().date() - timedelta(days=30)
-    )
-    
-    previous_avg = previous_utilizations.aggregate(
-        avg=models.Avg('utilization_percentage')
-    )['avg'] or 0
+    # Calculate utilization metrics from the rollups: the last 30 days
+    # compared with the 30 days before them
+    today = timezone.now().date()
+    recent_start = today - timedelta(days=30)
+    avg_utilization, previous_avg = utilization_rollups.group_averages([
+        (recent_start, today),
+        (today - timedelta(days=60), recent_start - timedelta(days=1)),
+    ])
     
     utilization_trend = avg_utilization - previous_avg
       # Calculate budget metrics
@@ -127,15 +120,15 @@ def analytics_dashboard(request):
         per_page = 10
     
     utilization_data = []
-    for resource in Resource.objects.all():
+    resources = Resource.objects.all()
+    current_utilization = utilization_engine.compute(resources)
+    historical = utilization_rollups.resource_summary(recent_start, today)
+    for resource in resources:
         # Use real-time utilization instead of historical averages
-        current_util = resource.current_utilization()
+        current_util = current_utilization[resource.id]
         
         # Calculate historical trend (past 30 days average)
-        historical_avg = HistoricalUtilization.objects.filter(
-            resource=resource,
-            date__gte=timezone.now().date() - timedelta(days=30)
-        ).aggregate(avg=models.Avg('utilization_percentage'))['avg'] or 0
+        historical_avg = historical.get(resource.id, {}).get('avg_utilization', 0)
         
         # Calculate trend direction (current vs historical)
         if historical_avg > 0:
@@ -174,6 +167,7 @@ def analytics_dashboard(request):
         'utilization_data': utilization_page.object_list,  # Paginated data
         'utilization_page': utilization_page,  # Pagination object
         'utilization_trends': utilization_trends,
+        'utilization_snapshot': utilization_snapshot,
         'cost_report': cost_report[:10],  # Top 10 projects
         'total_resources': total_resources,
         'total_projects': total_projects,
@@ -502,10 +496,22 @@ def utilization_report(request):
     
     utilization_service = UtilizationTrackingService()
     
-    # Record today's utilization if not already done
-    utilization_service.record_daily_utilization()
+    # Today's snapshot is recorded in the background; only read it here
+    utilization_snapshot = utilization_service.ensure_fresh_snapshot()
+    
+    # Get utilization data for each resource from the rollups (one query for
+    # all resources, plus one for the days outside whole weeks)
+    summary = utilization_rollups.resource_summary(start_date, end_date, resources)
+    active_projects = dict(
+        Assignment.objects.filter(
+            resource__in=resources,
+            task__start_date__lte=end_date,
+            task__end_date__gte=start_date
+        ).values('resource_id').annotate(
+            projects=Count('task__project', distinct=True)
+        ).values_list('resource_id', 'projects')
+    )
     
-    # Get utilization data for each resource
     utilization_data = []
     total_hours = 0
     billable_hours = 0
@@ -513,28 +519,15 @@ def utilization_report(request):
     underutilized_count = 0
     
     for resource in resources:
-        # Get utilization trends for the period
-        trends = HistoricalUtilization.objects.filter(
-            resource=resource,
-            date__gte=start_date,
-            date__lte=end_date
-        )
+        resource_summary = summary.get(resource.id, {})
         
         # Calculate metrics
-        avg_utilization = trends.aggregate(avg=models.Avg('utilization_percentage'))['avg'] or 0
-        total_allocated = trends.aggregate(sum=models.Sum('allocated_hours'))['sum'] or 0
-        total_available = trends.aggregate(sum=models.Sum('available_hours'))['sum'] or 0        # Calculate actual hours (simplified - using allocated hours)
+        avg_utilization = resource_summary.get('avg_utilization', 0)
+        total_allocated = resource_summary.get('allocated_hours', 0)        # Calculate actual hours (simplified - using allocated hours)
         actual_hours = total_allocated if total_allocated else Decimal('0')
         # Calculate billable hours (assume 80% of actual hours are billable)
         resource_billable_hours = actual_hours * Decimal('0.8')
         
-        # Get active projects for this resource
-        active_projects = Assignment.objects.filter(
-            resource=resource,
-            task__start_date__lte=end_date,
-            task__end_date__gte=start_date
-        ).values('task__project').distinct().count()
-        
         # Determine status
         if avg_utilization > 90:
             overutilized_count += 1
@@ -546,26 +539,24 @@ def utilization_report(request):
             'utilization_rate': round(avg_utilization, 1),
             'actual_hours': round(actual_hours, 1),
             'billable_hours': round(resource_billable_hours, 1),
-            'active_projects': active_projects,
-            'trends': trends[:10]  # Last 10 entries for detail view
+            'active_projects': active_projects.get(resource.id, 0),
         })        
         total_hours += actual_hours
         billable_hours += resource_billable_hours
     
     # Calculate summary statistics
-    total_resources = resources.count()
+    total_resources = len(utilization_data)
     avg_utilization = sum(item['utilization_rate'] for item in utilization_data) / len(utilization_data) if utilization_data else 0
     billable_percentage = (billable_hours / total_hours * 100) if total_hours > 0 else 0
     
-    # Calculate utilization trend (compare with previous period)
+    # Calculate utilization trend (compare with previous period) from the
+    # department/role rollups, both periods together
     previous_start = start_date - timedelta(days=(end_date - start_date).days)
-    previous_utilizations = HistoricalUtilization.objects.filter(
-        resource__in=resources,
-        date__gte=previous_start,
-        date__lt=start_date
+    current_avg, previous_avg = utilization_rollups.group_averages(
+        [(start_date, end_date), (previous_start, start_date - timedelta(days=1))],
+        department=department, role=selected_role
     )
-    previous_avg = previous_utilizations.aggregate(avg=models.Avg('utilization_percentage'))['avg'] or 0
-    utilization_trend = avg_utilization - previous_avg
+    utilization_trend = current_avg - previous_avg
     
     # Get available departments and roles for filters
     departments = Resource.objects.values_list('department', flat=True).distinct().exclude(department__isnull=True)
@@ -587,6 +578,7 @@ def utilization_report(request):
         'billable_percentage': round(billable_percentage, 1),
         'overutilized_count': overutilized_count,
         'underutilized_count': underutilized_count,
+        'utilization_snapshot': utilization_snapshot,
     }
     
     return render(request, 'analytics/utilization_report.html', context)
@@ -667,13 +659,13 @@ def cost_tracking_report(request):
         elif item['budget_utilization'] > 90:
             budget_alerts.append(f"{item['project'].name} has used {item['budget_utilization']:.1f}% of budget")
       # Get unique clients for filter
-    clients = list(set([p.manager.username for p in Project.objects.filter(manager__isnull=False)]))
+    clients = list(Project.objects.filter(manager__isnull=False).values_list('manager__username', flat=True).distinct())
     
     # Prepare project cost data for the table
     project_costs = []
     for item in cost_report:
         project = item['project']
-        total_hours = sum(entry.hours for task in project.tasks.all() for entry in task.time_entries.all())
+        total_hours = project.actual_hours
         client_name = project.manager.username if project.manager else '-'
         
         project_costs.append({
@@ -689,8 +681,11 @@ def cost_tracking_report(request):
             'total_hours': total_hours,
         })    # Prepare resource cost data for the table
     resource_costs = []
-    for resource in Resource.objects.filter(cost_per_hour__isnull=False):
-        hours_logged = sum(entry.hours for entry in resource.time_entries.all())
+    resources_with_hours = Resource.objects.filter(cost_per_hour__isnull=False).annotate(
+        hours_logged=Coalesce(models.Sum('time_entries__hours'), Decimal('0'))
+    )
+    for resource in resources_with_hours:
+        hours_logged = resource.hours_logged
         # Use Decimal arithmetic to avoid type conflicts
         total_cost = hours_logged * resource.cost_per_hour if resource.cost_per_hour else Decimal('0')
         # For now, assume all hours are billable and use a simple profit margin calculation
@@ -937,6 +932,11 @@ def ai_strategic_recommendations(request):
                     forecast_service = AIForecastEnhancementService()
                     strategic_recommendations = forecast_service.generate_strategic_recommendations(enhanced_forecasts)
                 
+                if 'error' in strategic_recommendations and not gemini_service.is_available():
+                    # AI service down (or its circuit open): use the rule-based recommendations
+                    logger.warning(f"Strategic recommendations fell back to basic: {strategic_recommendations['error']}")
+                    strategic_recommendations = _generate_basic_strategic_recommendations()
+                
                 if 'error' in strategic_recommendations:
                     return JsonResponse({
                         'success': False,
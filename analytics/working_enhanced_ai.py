@@ -4,11 +4,14 @@ Working Enhanced AI Resource Allocation Service
 """
 
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any
 from django.utils import timezone
 
 from allocation.models import Assignment
+from allocation.timeline import build_timelines
+from allocation.utilization import utilization_engine
+from core.business_calendar import business_calendar
 from projects.models import Task
 from resources.models import Resource, Skill
 from analytics.models import AIResourceAllocationSuggestion
@@ -95,14 +98,15 @@ class WorkingEnhancedAIService:
     def _find_ideal_assignments(self, task: Task) -> List[Dict]:
         """Find resources with good skill match and under 95% utilization"""
         suggestions = []
+        resources, current_map, period_map = self._utilization_snapshot(task)
         
-        for resource in Resource.objects.all():
+        for resource in resources:
             skill_match = self._calculate_skill_match(resource, task)
             if skill_match < 0.6:  # Reduced from 0.7 to 0.6 for more flexibility
                 continue
                 
-            current_util = resource.current_utilization()
-            projected_util = self._calculate_projected_utilization(resource, task)
+            current_util = current_map[resource.id]
+            projected_util = self._calculate_projected_utilization(resource, task, period_map[resource.id])
             
             # More flexible thresholds
             if current_util < 95 and projected_util < 105:  # Allow slight over-allocation
@@ -129,10 +133,14 @@ class WorkingEnhancedAIService:
                 skilled_resources.append((resource, skill_match))
         
         skilled_resources.sort(key=lambda x: x[1], reverse=True)
+        top_matches = skilled_resources[:5]
+        
+        # One capacity timeline per candidate covers every look-ahead window
+        timelines = build_timelines([resource for resource, _ in top_matches], *self._future_horizon(task))
         
         # Check future availability for top 5 skilled resources
-        for resource, skill_match in skilled_resources[:5]:
-            future_slot = self._find_future_slot(resource, task)
+        for resource, skill_match in top_matches:
+            future_slot = self._find_future_slot(resource, task, timelines[resource.id])
             if future_slot:
                 suggestions.append({
                     'resource_id': resource.id,
@@ -151,8 +159,9 @@ class WorkingEnhancedAIService:
         suggestions = []
         
         task_skills = set(task.skills_required.all())
+        resources, _, period_map = self._utilization_snapshot(task)
         
-        for resource in Resource.objects.all():
+        for resource in resources:
             resource_skills = set(resource.skills.all())
             
             # Calculate skill overlap
@@ -162,7 +171,7 @@ class WorkingEnhancedAIService:
             overlap = len(task_skills.intersection(resource_skills)) / len(task_skills)
               # Look for partial matches (30-70% overlap) - more flexible
             if 0.3 <= overlap < 0.7:
-                projected_util = self._calculate_projected_utilization(resource, task)
+                projected_util = self._calculate_projected_utilization(resource, task, period_map[resource.id])
                 
                 if projected_util < 110:  # More lenient for good fit
                     skill_gaps = list(task_skills - resource_skills)
@@ -181,13 +190,14 @@ class WorkingEnhancedAIService:
     def _find_overallocation_assignments(self, task: Task) -> List[Dict]:
         """Find over-allocation scenarios with risk analysis"""
         suggestions = []
+        resources, _, period_map = self._utilization_snapshot(task)
         
-        for resource in Resource.objects.all():
+        for resource in resources:
             skill_match = self._calculate_skill_match(resource, task)
             if skill_match < 0.6:  # Must have reasonable skill match
                 continue
                 
-            projected_util = self._calculate_projected_utilization(resource, task)
+            projected_util = self._calculate_projected_utilization(resource, task, period_map[resource.id])
             
             # Only suggest up to 120% utilization
             if 100 < projected_util <= 120:
@@ -229,14 +239,22 @@ class WorkingEnhancedAIService:
         intersection = task_skills.intersection(resource_skills)
         return len(intersection) / len(task_skills)
     
-    def _calculate_projected_utilization(self, resource: Resource, task: Task) -> float:
+    def _utilization_snapshot(self, task: Task) -> Tuple[List[Resource], Dict[int, float], Dict[int, float]]:
+        """Load resources with current-week and task-period utilization in one pass each"""
+        resources = list(Resource.objects.all())
+        current_map = utilization_engine.compute(resources)
+        period_map = utilization_engine.compute(resources, task.start_date, task.end_date)
+        return resources, current_map, period_map
+    
+    def _calculate_projected_utilization(self, resource: Resource, task: Task,
+                                         period_utilization: Optional[float] = None) -> float:
         """Calculate projected utilization if task is assigned"""
-        current_util = resource.current_utilization(task.start_date, task.end_date)
+        if period_utilization is None:
+            period_utilization = resource.current_utilization(task.start_date, task.end_date)
+        current_util = period_utilization
         
         # Calculate work days in task period
-        task_duration_days = (task.end_date - task.start_date).days + 1
-        work_days = sum(1 for i in range(task_duration_days) 
-                       if (task.start_date + timedelta(days=i)).weekday() < 5)
+        work_days = business_calendar.count(task.start_date, task.end_date, resource.location)
         
         if work_days > 0:
             # Assume 8 hours per work day
@@ -251,10 +269,18 @@ class WorkingEnhancedAIService:
             
         return projected_util
     
-    def _find_future_slot(self, resource: Resource, task: Task) -> Optional[Dict]:
+    def _future_horizon(self, task: Task, weeks: int = 6) -> Tuple[date, date]:
+        """Date range covered by the future slot look-ahead windows"""
+        current_date = max(timezone.now().date(), task.start_date)
+        return (current_date + timedelta(weeks=1),
+                current_date + timedelta(weeks=weeks) + (task.end_date - task.start_date))
+    
+    def _find_future_slot(self, resource: Resource, task: Task, timeline=None) -> Optional[Dict]:
         """Find the earliest future slot where resource has capacity"""
         current_date = max(timezone.now().date(), task.start_date)
         task_duration = task.end_date - task.start_date
+        if timeline is None:
+            timeline = build_timelines([resource], *self._future_horizon(task))[resource.id]
         
         # Look ahead up to 6 weeks
         for weeks_ahead in range(1, 7):
@@ -262,7 +288,8 @@ class WorkingEnhancedAIService:
             potential_end = potential_start + task_duration
             
             projected_util = self._calculate_projected_utilization_for_period(
-                resource, task, potential_start, potential_end
+                resource, task, potential_start, potential_end,
+                timeline.utilization(potential_start, potential_end)
             )
             
             if projected_util < 95:
@@ -274,13 +301,14 @@ class WorkingEnhancedAIService:
         
         return None
     
-    def _calculate_projected_utilization_for_period(self, resource: Resource, task: Task, start_date, end_date) -> float:
+    def _calculate_projected_utilization_for_period(self, resource: Resource, task: Task, start_date, end_date,
+                                                    period_utilization: Optional[float] = None) -> float:
         """Calculate projected utilization for a specific period"""
-        current_util = resource.current_utilization(start_date, end_date)
+        if period_utilization is None:
+            period_utilization = resource.current_utilization(start_date, end_date)
+        current_util = period_utilization
         
-        task_duration_days = (end_date - start_date).days + 1
-        work_days = sum(1 for i in range(task_duration_days) 
-                       if (start_date + timedelta(days=i)).weekday() < 5)
+        work_days = business_calendar.count(start_date, end_date, resource.location)
         
         if work_days > 0:
             available_hours_in_period = 8 * work_days
@@ -415,11 +443,13 @@ class WorkingEnhancedAIService:
         """Analyze if task can be split among multiple resources"""
         task_skills = set(task.skills_required.all())
         suitable_resources = []
+        resources = Resource.objects.all()
+        current_map = utilization_engine.compute(resources)
         
-        for resource in Resource.objects.all():
+        for resource in resources:
             skill_match = self._calculate_skill_match(resource, task)
             if skill_match >= 0.3:  # At least some relevant skills
-                current_util = resource.current_utilization()
+                current_util = current_map[resource.id]
                 if current_util < 90:  # Has some capacity
                     # Calculate how many hours this resource could contribute
                     available_capacity = max(0, (85 - current_util) / 100 * 40)  # Rough weekly capacity
@@ -6,6 +6,7 @@ from django.db.models import Q
 from resources.models import Resource, Skill, TimeEntry
 from projects.models import Project, Task
 from allocation.models import Assignment
+from resources.skill_index import skill_index
 
 
 class ResourceFilter(django_filters.FilterSet):
@@ -16,9 +17,14 @@ class ResourceFilter(django_filters.FilterSet):
     department = django_filters.CharFilter(lookup_expr='icontains')
     skills = django_filters.ModelMultipleChoiceFilter(
         queryset=Skill.objects.all(),
-        field_name='skills__id',
-        to_field_name='id'
+        method='filter_by_any_skill'
+    )
+    all_skills = django_filters.ModelMultipleChoiceFilter(
+        queryset=Skill.objects.all(),
+        method='filter_by_all_skills'
     )
+    # Applies to the skills and all_skills filters
+    min_proficiency = django_filters.NumberFilter(method='filter_by_proficiency')
     min_capacity = django_filters.NumberFilter(field_name='capacity', lookup_expr='gte')
     max_capacity = django_filters.NumberFilter(field_name='capacity', lookup_expr='lte')
     min_cost = django_filters.NumberFilter(field_name='cost_per_hour', lookup_expr='gte')
@@ -26,6 +32,27 @@ class ResourceFilter(django_filters.FilterSet):
     timezone = django_filters.CharFilter(lookup_expr='icontains')
     location = django_filters.CharFilter(lookup_expr='icontains')
     
+    def _min_proficiency(self):
+        return int(self.form.cleaned_data.get('min_proficiency') or 1)
+    
+    def filter_by_any_skill(self, queryset, name, value):
+        """Filter resources having any of the skills (resources.skill_index)"""
+        if not value:
+            return queryset
+        skill_ids = [skill.id for skill in value]
+        return queryset.filter(id__in=skill_index.resources_with_any(skill_ids, self._min_proficiency()))
+    
+    def filter_by_all_skills(self, queryset, name, value):
+        """Filter resources having every one of the skills"""
+        if not value:
+            return queryset
+        skill_ids = [skill.id for skill in value]
+        return queryset.filter(id__in=skill_index.resources_with_all(skill_ids, self._min_proficiency()))
+    
+    def filter_by_proficiency(self, queryset, name, value):
+        """Read by the skill filters; does not filter on its own"""
+        return queryset
+    
     class Meta:
         model = Resource
         fields = ['name', 'role', 'department', 'skills', 'timezone', 'location']
@@ -3,9 +3,11 @@ API Serializers for ResourcePro
 """
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import models
 from resources.models import Resource, Skill, ResourceSkill, TimeEntry, ResourceAvailability
 from projects.models import Project, Task
 from allocation.models import Assignment
+from allocation.utilization import utilization_engine
 from accounts.models import UserProfile
 
 
@@ -72,6 +74,16 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at', 'resource_name', 'task_name', 'project_name']
 
 
+class ResourceListSerializer(serializers.ListSerializer):
+    """List serializer that computes utilization for all resources in one pass"""
+    
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        resources = list(iterable)
+        self.child.context['utilization_map'] = utilization_engine.compute(resources)
+        return super().to_representation(resources)
+
+
 class ResourceSerializer(serializers.ModelSerializer):
     """Serializer for Resource model"""
     skills = SkillSerializer(many=True, read_only=True)
@@ -86,9 +98,13 @@ class ResourceSerializer(serializers.ModelSerializer):
             'capacity', 'cost_per_hour', 'color', 'timezone', 'location',
             'current_utilization'
         ]
+        list_serializer_class = ResourceListSerializer
     
     def get_current_utilization(self, obj):
         """Get current utilization percentage"""
+        utilization_map = self.context.get('utilization_map')
+        if utilization_map is not None and obj.id in utilization_map:
+            return utilization_map[obj.id]
         try:
             return obj.current_utilization()
         except:
@@ -153,6 +169,8 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_tasks_count(self, obj):
         """Get total number of tasks in project"""
+        if hasattr(obj, 'task_count'):  # annotated by Project.objects.with_metrics()
+            return obj.task_count
         return obj.tasks.count()
     
     def get_completion_percentage(self, obj):
@@ -164,6 +182,8 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_total_estimated_hours(self, obj):
         """Get total estimated hours for all tasks"""
+        if hasattr(obj, 'total_estimated_hours'):
+            return obj.total_estimated_hours
         return sum(task.estimated_hours for task in obj.tasks.all())
 
 
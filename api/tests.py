@@ -1,14 +1,20 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.db import DatabaseError
 from django.urls import reverse
 from django.utils import timezone
 from datetime import date, timedelta
 import json
 from decimal import Decimal
+from unittest.mock import patch
 
 from resources.models import Resource, Skill, ResourceSkill
 from projects.models import Project, Task
+from allocation.daily_load import daily_load_service
 from allocation.models import Assignment
+from analytics.ai_services import AIResourceAllocationService
+from core.models import LLMCallRecord
+from utils.circuit_breaker import CircuitBreaker
 
 
 class APIAssignResourceTest(TestCase):
@@ -637,3 +643,218 @@ class APIIntegrationTest(TestCase):
         
         # Verify assignment was removed
         self.assertFalse(Assignment.objects.filter(id=assignment_id).exists())
+
+
+class APIUtilizationHeatmapTest(TestCase):
+    """Test cases for the utilization heatmap endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        self.client.login(username='planner', password='testpass123')
+        
+        self.dev = Resource.objects.create(name="Dev", role="Developer", department="Engineering", capacity=40)
+        self.designer = Resource.objects.create(name="Designer", role="Designer", department="Design", capacity=20)
+        self.project = Project.objects.create(
+            name="Heatmap Project",
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 31)
+        )
+        # Monday 2024-01-08 to Friday 2024-01-19
+        self.task = Task.objects.create(
+            project=self.project,
+            name="Two Week Task",
+            start_date=date(2024, 1, 8),
+            end_date=date(2024, 1, 19),
+            estimated_hours=40
+        )
+        self.assignment = Assignment.objects.create(resource=self.dev, task=self.task, allocated_hours=40)
+        self.url = '/api/v1/utilization/heatmap/'
+    
+    def test_heatmap_matrix(self):
+        """Test the columnar payload and weekly values"""
+        response = self.client.get(self.url, {'start': '2024-01-03', 'weeks': 3})
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['week_starts'], ['2024-01-01', '2024-01-08', '2024-01-15'])
+        self.assertEqual(data['resources']['name'], ['Designer', 'Dev'])
+        dev_row = data['utilization'][data['resources']['id'].index(self.dev.id)]
+        self.assertEqual(dev_row, [0.0, 50.0, 50.0])
+        
+        # Each cell matches the per-resource calculation
+        self.assertEqual(dev_row[1], self.dev.current_utilization(date(2024, 1, 8), date(2024, 1, 14)))
+    
+    def test_department_filter(self):
+        """Test filtering by department"""
+        response = self.client.get(self.url, {'start': '2024-01-01', 'weeks': 2, 'department': 'Design'})
+        self.assertEqual(response.json()['resources']['id'], [self.designer.id])
+    
+    def test_conditional_requests(self):
+        """Test ETag handling and invalidation"""
+        params = {'start': '2024-01-01', 'weeks': 4}
+        etag = self.client.get(self.url, params)['ETag']
+        
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        self.assignment.allocated_hours = 60
+        self.assignment.save()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_invalid_parameters(self):
+        """Test validation of weeks and start"""
+        self.assertEqual(self.client.get(self.url, {'weeks': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 'soon'}).status_code, 400)
+
+
+class APIBulkAssignTest(TestCase):
+    """Test cases for bulk AI assignment through the API"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        self.client.login(username='planner', password='testpass123')
+        
+        self.resources = [Resource.objects.create(name=f"Developer {i}", role="Developer") for i in range(2)]
+        project = Project.objects.create(
+            name="Bulk Project",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30)
+        )
+        self.tasks = [
+            Task.objects.create(
+                project=project, name=f"Task {i}",
+                start_date=date.today(), end_date=date.today() + timedelta(days=10),
+                estimated_hours=8
+            )
+            for i in range(2)
+        ]
+    
+    def test_database_error_on_one_task_keeps_the_others(self):
+        """Test that each task is assigned in its own savepoint"""
+        suggestions = {
+            task.id: {"suggestions": [{"resource": {"id": resource.id}, "match_score": 0.9}]}
+            for task, resource in zip(self.tasks, self.resources)
+        }
+        refresh = daily_load_service.refresh
+        calls = []
+        
+        def fail_first(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise DatabaseError("disk I/O error")
+            return refresh(*args, **kwargs)
+        
+        with patch.object(AIResourceAllocationService, 'suggest_allocations', return_value=suggestions), \
+                patch.object(daily_load_service, 'refresh', side_effect=fail_first):
+            response = self.client.post(
+                '/api/v1/assignments/bulk_assign/',
+                data=json.dumps({'task_ids': [task.id for task in self.tasks]}),
+                content_type='application/json'
+            )
+        
+        data = response.json()
+        self.assertEqual([item['task_id'] for item in data['assignments_made']], [self.tasks[1].id])
+        self.assertEqual(len(data['errors']), 1)
+        self.assertFalse(Assignment.objects.filter(task=self.tasks[0]).exists())
+        self.assertEqual(Assignment.objects.get(task=self.tasks[1]).resource, self.resources[1])
+
+
+class APIResourceSkillFilterTest(TestCase):
+    """Test cases for resource skill filtering through the skill index"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='planner', password='testpass123')
+        self.client.login(username='planner', password='testpass123')
+        
+        self.python = Skill.objects.create(name="Python")
+        self.aws = Skill.objects.create(name="AWS")
+        self.expert = Resource.objects.create(name="Expert", role="Developer")
+        self.junior = Resource.objects.create(name="Junior", role="Developer")
+        self.designer = Resource.objects.create(name="Designer", role="Designer")
+        ResourceSkill.objects.create(resource=self.expert, skill=self.python, proficiency=9)
+        ResourceSkill.objects.create(resource=self.expert, skill=self.aws, proficiency=7)
+        ResourceSkill.objects.create(resource=self.junior, skill=self.python, proficiency=3)
+    
+    def ids(self, response):
+        data = response.json()
+        return sorted(resource['id'] for resource in data.get('results', data))
+    
+    def test_list_filters(self):
+        """Test the any, all and proficiency skill filters"""
+        url = '/api/v1/resources/'
+        self.assertEqual(
+            self.ids(self.client.get(url, {'skills': [self.python.id, self.aws.id]})),
+            [self.expert.id, self.junior.id]
+        )
+        self.assertEqual(
+            self.ids(self.client.get(url, {'all_skills': [self.python.id, self.aws.id]})), [self.expert.id]
+        )
+        self.assertEqual(
+            self.ids(self.client.get(url, {'skills': [self.python.id], 'min_proficiency': 5})), [self.expert.id]
+        )
+    
+    def test_available(self):
+        """Test skill matching on available resources"""
+        url = '/api/v1/resources/available/'
+        skills = f"{self.python.id},{self.aws.id}"
+        self.assertEqual(self.ids(self.client.get(url, {'required_skills': skills})), [self.expert.id, self.junior.id])
+        self.assertEqual(
+            self.ids(self.client.get(url, {'required_skills': skills, 'skill_match': 'all'})), [self.expert.id]
+        )
+        self.assertEqual(
+            self.ids(self.client.get(url, {'required_skills': str(self.python.id), 'min_proficiency': 4})),
+            [self.expert.id]
+        )
+        self.assertEqual(self.client.get(url, {'min_proficiency': 'high'}).status_code, 400)
+
+
+class APIAIServiceStatusTest(TestCase):
+    """Test cases for the AI service status endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='ops', password='testpass123')
+        self.breaker = CircuitBreaker('llm')
+        self.breaker.reset()
+    
+    def tearDown(self):
+        self.breaker.reset()
+    
+    def test_requires_authentication(self):
+        """Test that anonymous requests are rejected"""
+        response = self.client.get('/api/v1/ai/status/')
+        self.assertIn(response.status_code, (401, 403))
+    
+    def test_reports_circuit_state(self):
+        """Test that an open circuit is reported"""
+        self.client.login(username='ops', password='testpass123')
+        for _ in range(self.breaker.failure_threshold):
+            self.breaker.record_failure('503 Service Unavailable')
+        
+        data = self.client.get('/api/v1/ai/status/').json()
+        self.assertFalse(data['available'])
+        self.assertEqual(data['circuit']['state'], 'open')
+        self.assertEqual(data['circuit']['last_error'], '503 Service Unavailable')
+        self.assertIsNotNone(data['circuit']['retry_at'])
+    
+    def test_reports_call_metrics(self):
+        """Test the per-feature telemetry report"""
+        self.client.login(username='ops', password='testpass123')
+        LLMCallRecord.objects.all().delete()
+        LLMCallRecord.objects.create(feature='daily_briefing', model_name='m', outcome='success',
+                                     latency_ms=1200, prompt_tokens=3000, attempts=1)
+        
+        data = self.client.get('/api/v1/ai/metrics/', {'hours': 1}).json()
+        self.assertEqual(data['features']['daily_briefing']['latency_ms']['p95'], 1200)
+        self.assertEqual(data['total']['calls'], 1)
+        
+        response = self.client.get('/api/v1/ai/metrics/', {'hours': 'day'})
+        self.assertEqual(response.status_code, 400)
+        for hours in ('nan', 'inf', '-1', '0', '1e12'):
+            response = self.client.get('/api/v1/ai/metrics/', {'hours': hours})
+            self.assertEqual(response.status_code, 400, hours)
@@ -6,7 +6,8 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, Sp
 from . import views
 from .viewsets import (
     CustomAuthToken, SkillViewSet, ResourceViewSet, ProjectViewSet,
-    TaskViewSet, AssignmentViewSet, TimeEntryViewSet, UserViewSet
+    TaskViewSet, AssignmentViewSet, TimeEntryViewSet, UserViewSet, UtilizationViewSet,
+    AIServiceViewSet
 )
 
 # Create router for ViewSets
@@ -18,6 +19,8 @@ router.register(r'tasks', TaskViewSet)
 router.register(r'assignments', AssignmentViewSet)
 router.register(r'time-entries', TimeEntryViewSet)
 router.register(r'users', UserViewSet)
+router.register(r'utilization', UtilizationViewSet, basename='utilization')
+router.register(r'ai', AIServiceViewSet, basename='ai')
 
 urlpatterns = [
     # API Documentation
@@ -3,10 +3,10 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
 import json
-from datetime import timedelta
 from resources.models import Resource
 from projects.models import Task
 from allocation.models import Assignment
+from core.business_calendar import business_calendar
 
 @login_required
 @require_POST
@@ -102,8 +102,7 @@ def check_conflicts(request):
     current_utilization = resource.current_utilization(task.start_date, task.end_date)
     
     # Calculate additional utilization from this task
-    work_days = sum(1 for i in range((task.end_date - task.start_date).days + 1) 
-                  if (task.start_date + timedelta(days=i)).weekday() < 5)
+    work_days = business_calendar.count(task.start_date, task.end_date, resource.location)
     
     daily_capacity = resource.capacity / 5  # Assuming 5-day work week
     available_hours = daily_capacity * work_days
@@ -1,23 +1,35 @@
 """
 API ViewSets for ResourcePro
 """
+import hashlib
+import json
+import math
+
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
+from datetime import datetime, timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from resources.models import Resource, Skill, ResourceSkill, TimeEntry, ResourceAvailability
+from resources.skill_index import skill_index
 from projects.models import Project, Task
 from allocation.models import Assignment
+from allocation.timeline import build_timelines
+from allocation.utilization import utilization_engine
 from accounts.models import UserProfile
 from analytics.ai_services import AIResourceAllocationService
 from analytics.working_enhanced_ai import WorkingEnhancedAIService
+from utils.gemini_ai import gemini_service
+from utils.llm_telemetry import llm_telemetry
 
 from .serializers import (
     UserSerializer, UserProfileSerializer, SkillSerializer, ResourceSerializer,
@@ -156,6 +168,49 @@ class ResourceViewSet(viewsets.ModelViewSet):
             'period_end': end_date
         })
     
+    @extend_schema(
+        tags=['Resources'],
+        summary="Find next capacity window",
+        description="Find the first run of consecutive workdays in which the resource has enough unallocated hours.",
+        parameters=[
+            OpenApiParameter('hours', OpenApiTypes.FLOAT, required=True, description='Free hours needed'),
+            OpenApiParameter('workdays', OpenApiTypes.INT, description='Length of the window in workdays (default: 5)'),
+            OpenApiParameter('start_date', OpenApiTypes.DATE, description='Earliest start date (default: today)'),
+            OpenApiParameter('weeks', OpenApiTypes.INT, description='How many weeks ahead to search (default: 12)'),
+        ]
+    )
+    @action(detail=True, methods=['get'], url_path='capacity-window')
+    def capacity_window(self, request, pk=None):
+        """Find the first window with enough free capacity"""
+        resource = self.get_object()
+        try:
+            hours = float(request.query_params['hours'])
+            workdays = int(request.query_params.get('workdays', 5))
+            weeks = int(request.query_params.get('weeks', 12))
+            start_date = request.query_params.get('start_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else timezone.now().date()
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'hours is required; workdays and weeks must be integers and start_date YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        end_date = start_date + timedelta(weeks=weeks)
+        timeline = build_timelines([resource], start_date, end_date)[resource.id]
+        window = timeline.first_window(workdays, hours)
+        
+        return Response({
+            'resource_id': resource.id,
+            'resource_name': resource.name,
+            'hours': hours,
+            'workdays': workdays,
+            'found': window is not None,
+            'window_start': window[0] if window else None,
+            'window_end': window[1] if window else None,
+            'free_hours': round(timeline.free_hours(*window), 1) if window else None,
+            'searched_until': end_date
+        })
+    
     @extend_schema(
         tags=['Resources'],
         summary="Get available resources",
@@ -164,6 +219,9 @@ class ResourceViewSet(viewsets.ModelViewSet):
             OpenApiParameter('start_date', OpenApiTypes.DATE, description='Start date for availability check'),
             OpenApiParameter('end_date', OpenApiTypes.DATE, description='End date for availability check'),
             OpenApiParameter('required_skills', OpenApiTypes.STR, description='Comma-separated list of required skill IDs'),
+            OpenApiParameter('skill_match', OpenApiTypes.STR, enum=['any', 'all'],
+                             description='Require any (default) or all of the required skills'),
+            OpenApiParameter('min_proficiency', OpenApiTypes.INT, description='Lowest proficiency (1-10) a required skill counts at'),
         ]
     )
     @action(detail=False, methods=['get'])
@@ -172,22 +230,33 @@ class ResourceViewSet(viewsets.ModelViewSet):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         required_skills = request.query_params.get('required_skills', '').split(',')
+        min_proficiency = request.query_params.get('min_proficiency', '1')
+        if not min_proficiency.isdigit():
+            return Response({'error': 'min_proficiency must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        queryset = self.get_queryset()
+        queryset = self.get_queryset().prefetch_related('skills', 'resource_skills__skill')
         
-        # Filter by skills if provided
+        # Filter by skills if provided, from the in-memory skill index
         if required_skills and required_skills[0]:
             skill_ids = [int(skill_id) for skill_id in required_skills if skill_id.isdigit()]
-            queryset = queryset.filter(skills__in=skill_ids).distinct()
+            if request.query_params.get('skill_match') == 'all':
+                resource_ids = skill_index.resources_with_all(skill_ids, int(min_proficiency))
+            else:
+                resource_ids = skill_index.resources_with_any(skill_ids, int(min_proficiency))
+            queryset = queryset.filter(id__in=resource_ids)
         
         # Add availability filtering logic here
         # For now, return all resources with utilization data
+        resources = list(queryset)
+        period_utilization = utilization_engine.compute(resources, start_date, end_date)
+        serializer_context = {'utilization_map': utilization_engine.compute(resources)}
+        
         available_resources = []
-        for resource in queryset:
-            utilization = resource.current_utilization(start_date, end_date)
+        for resource in resources:
+            utilization = period_utilization[resource.id]
             if utilization < 100:  # Resource has some availability
                 available_resources.append({
-                    **ResourceSerializer(resource).data,
+                    **ResourceSerializer(resource, context=serializer_context).data,
                     'utilization_percentage': utilization,
                     'available_capacity': resource.capacity * (1 - utilization / 100)
                 })
@@ -196,6 +265,152 @@ class ResourceViewSet(viewsets.ModelViewSet):
             'count': len(available_resources),
             'results': available_resources
         })
+    
+    @extend_schema(
+        tags=['Resources'],
+        summary="Get utilization cache statistics",
+        description="Get hit/miss counters of the versioned utilization cache."
+    )
+    @action(detail=False, methods=['get'], url_path='utilization-cache')
+    def utilization_cache(self, request):
+        """Get utilization cache hit/miss counters"""
+        return Response(utilization_engine.cache.stats())
+
+
+class UtilizationViewSet(viewsets.ViewSet):
+    """Cross-resource utilization reports"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    MAX_WEEKS = 104
+    
+    @extend_schema(
+        tags=['Resources'],
+        summary="Utilization heatmap",
+        description=(
+            "Weekly utilization for every resource as a compact columnar payload. "
+            "Supports conditional requests with ETag / If-None-Match."
+        ),
+        parameters=[
+            OpenApiParameter('start', OpenApiTypes.DATE, description='First week (snapped to Monday; default: this week)'),
+            OpenApiParameter('weeks', OpenApiTypes.INT, description='Number of weeks (default: 12, max: 104)'),
+            OpenApiParameter('department', OpenApiTypes.STR, description='Only include resources of this department'),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def heatmap(self, request):
+        """Get a resources x weeks utilization matrix"""
+        try:
+            start = request.query_params.get('start')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else timezone.now().date()
+            weeks = int(request.query_params.get('weeks', 12))
+        except ValueError:
+            return Response(
+                {'error': 'start must be YYYY-MM-DD and weeks an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= weeks <= self.MAX_WEEKS:
+            return Response(
+                {'error': f'weeks must be between 1 and {self.MAX_WEEKS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start -= timedelta(days=start.weekday())
+        department = request.query_params.get('department')
+        
+        resources = Resource.objects.only('id', 'name', 'department', 'capacity', 'location')
+        if department:
+            resources = resources.filter(department=department)
+        resources = list(resources)
+        
+        if_none_match = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+        etag = None
+        if utilization_engine.cache.enabled:
+            # The ETag covers the parameters, the resource rows and every resource's data version
+            versions = utilization_engine.cache.versions([r.id for r in resources])
+            fingerprint = json.dumps([
+                start.isoformat(), weeks, department,
+                [(r.id, r.name, r.department, r.capacity, r.location, versions[r.id]) for r in resources]
+            ])
+            etag = '"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+            if etag in if_none_match:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+        
+        matrix = utilization_engine.heatmap(resources, start, weeks)
+        payload = {
+            'start': start,
+            'weeks': weeks,
+            'department': department,
+            'week_starts': [str(week) for week in matrix['week_starts']],
+            'resources': {
+                'id': [r.id for r in resources],
+                'name': [r.name for r in resources],
+                'department': [r.department for r in resources],
+                'capacity': [r.capacity for r in resources],
+            },
+            # One row per resource, one column per week
+            'utilization': matrix['utilization'].tolist(),
+        }
+        if etag is None:
+            # Data versions of a per-process cache miss other processes' changes,
+            # so the ETag is taken from the computed payload instead
+            etag = '"%s"' % hashlib.sha1(json.dumps(payload, default=str).encode()).hexdigest()
+            if etag in if_none_match:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+        response = Response(payload)
+        response['ETag'] = etag
+        return response
+
+
+class AIServiceViewSet(viewsets.ViewSet):
+    """Health and usage of the LLM backend behind the AI features"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    MAX_METRICS_HOURS = 24 * 365
+    
+    @extend_schema(
+        tags=['AI Services'],
+        summary="AI service status",
+        description=(
+            "Configured LLM backend and its circuit breaker: closed (calls allowed), "
+            "open (AI features use their non-AI fallbacks until retry_at) or half_open "
+            "(a trial call is allowed)."
+        )
+    )
+    @action(detail=False, methods=['get'])
+    def status(self, request):
+        """Get the LLM backend and circuit breaker state"""
+        return Response(gemini_service.status())
+    
+    @extend_schema(
+        tags=['AI Services'],
+        summary="AI call metrics",
+        description=(
+            "LLM calls made in the last `hours` (default 24) per feature: call count, "
+            "outcomes, cache hit and failure rates, and p50/p95/p99 latency, prompt "
+            "tokens and response size. Features are ordered by prompt tokens sent."
+        ),
+        parameters=[
+            OpenApiParameter('hours', OpenApiTypes.FLOAT, description='Report window in hours (max: 8760)'),
+            OpenApiParameter('feature', OpenApiTypes.STR, description='Only report on this feature'),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """Get per-feature LLM call telemetry"""
+        try:
+            hours = float(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({'error': 'hours must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        # float() also accepts nan and inf, which timedelta rejects
+        if not (math.isfinite(hours) and 0 < hours <= self.MAX_METRICS_HOURS):
+            return Response(
+                {'error': f'hours must be greater than 0 and at most {self.MAX_METRICS_HOURS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(llm_telemetry.report(hours=hours, feature=request.query_params.get('feature')))
 
 
 @extend_schema_view(
@@ -217,7 +432,7 @@ class ResourceViewSet(viewsets.ModelViewSet):
 )
 class ProjectViewSet(viewsets.ModelViewSet):
     """ViewSet for managing projects"""
-    queryset = Project.objects.all()
+    queryset = Project.objects.with_metrics().select_related('manager')
     permission_classes = [permissions.IsAuthenticated, IsProjectManagerOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProjectFilter
@@ -248,8 +463,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
             'completed_tasks': tasks.filter(status='completed').count(),
             'in_progress_tasks': tasks.filter(status='in_progress').count(),
             'not_started_tasks': tasks.filter(status='not_started').count(),
-            'total_estimated_hours': sum(task.estimated_hours for task in tasks),
-            'total_actual_hours': sum(task.get_actual_hours() for task in tasks),
+            'total_estimated_hours': project.total_estimated_hours,
+            'total_actual_hours': project.actual_hours,
             'completion_percentage': project.get_completion_percentage(),
             'assigned_resources': Assignment.objects.filter(task__project=project).values_list('resource__name', flat=True).distinct().count()
         }
@@ -379,48 +594,59 @@ class AssignmentViewSet(viewsets.ModelViewSet):
         try:
             ai_service = AIResourceAllocationService()
             
+            tasks = []
             for task_id in task_ids:
                 try:
                     task = Task.objects.get(id=task_id)
-                    
-                    # Skip if already assigned (unless force_reassign is True)
-                    if Assignment.objects.filter(task=task).exists() and not force_reassign:
-                        continue
-                    
-                    if auto_assign:
-                        suggestions = ai_service.suggest_optimal_resource_allocation(
-                            task_id=task_id,
-                            force_refresh=False
-                        )
-                        
-                        if suggestions and 'suggestions' in suggestions and suggestions['suggestions']:
-                            best_suggestion = suggestions['suggestions'][0]
-                            resource_id = best_suggestion['resource']['id']
-                            resource = Resource.objects.get(id=resource_id)
-                            
-                            # Remove existing assignment if force_reassign
-                            if force_reassign:
-                                Assignment.objects.filter(task=task).delete()
-                            
-                            assignment = Assignment.objects.create(
-                                task=task,
-                                resource=resource,
-                                allocated_hours=task.estimated_hours
-                            )
-                            
-                            assignments_made.append({
-                                'task_id': task.id,
-                                'task_name': task.name,
-                                'resource_id': resource.id,
-                                'resource_name': resource.name,
-                                'assignment_id': assignment.id,
-                                'match_score': best_suggestion.get('match_score', 0)
-                            })
-                            
                 except Task.DoesNotExist:
                     errors.append(f"Task {task_id} not found")
-                except Exception as e:
-                    errors.append(f"Failed to assign task {task_id}: {str(e)}")
+                    continue
+                
+                # Skip if already assigned (unless force_reassign is True)
+                if Assignment.objects.filter(task=task).exists() and not force_reassign:
+                    continue
+                tasks.append(task)
+            
+            if auto_assign:
+                # Get AI suggestions for all tasks concurrently, outside any transaction
+                suggestions_by_task = ai_service.suggest_allocations([task.id for task in tasks])
+                
+                with transaction.atomic():
+                    for task in tasks:
+                        try:
+                            # Savepoint per task: a failed task must not break the others
+                            with transaction.atomic():
+                                suggestions = suggestions_by_task.get(task.id)
+                                
+                                if suggestions and 'suggestions' in suggestions and suggestions['suggestions']:
+                                    best_suggestion = suggestions['suggestions'][0]
+                                    resource_id = best_suggestion['resource']['id']
+                                    resource = Resource.objects.get(id=resource_id)
+                                    
+                                    # Remove existing assignment if force_reassign
+                                    if force_reassign:
+                                        Assignment.objects.filter(task=task).delete()
+                                    elif Assignment.objects.filter(task=task).exists():
+                                        # Assigned by another request while the model was answering
+                                        continue
+                                    
+                                    assignment = Assignment.objects.create(
+                                        task=task,
+                                        resource=resource,
+                                        allocated_hours=task.estimated_hours
+                                    )
+                                    
+                                    assignments_made.append({
+                                        'task_id': task.id,
+                                        'task_name': task.name,
+                                        'resource_id': resource.id,
+                                        'resource_name': resource.name,
+                                        'assignment_id': assignment.id,
+                                        'match_score': best_suggestion.get('match_score', 0)
+                                    })
+                                
+                        except Exception as e:
+                            errors.append(f"Failed to assign task {task.id}: {str(e)}")
             
             return Response({
                 'success': True,
@@ -0,0 +1,115 @@
+"""
+Business-day calendar for ResourcePro
+
+Work days are counted with NumPy's ``busday_count`` so the cost of a count
+does not depend on the length of the range. Holidays are configured per
+location through the ``BUSINESS_HOLIDAYS`` setting::
+
+    BUSINESS_HOLIDAYS = {
+        'default': ['2025-12-25'],           # applies to every location
+        'London, UK': ['2025-08-25'],        # matched against Resource.location
+    }
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+
+DEFAULT_WEEKMASK = '1111100'  # Monday-Friday
+DEFAULT_LOCATION = 'default'
+
+
+def _to_day(value) -> np.datetime64:
+    """Convert a date, datetime or ISO string to a day-resolution datetime64"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+def _to_days(values: Iterable) -> np.ndarray:
+    """Convert a sequence of dates to a datetime64[D] array"""
+    if isinstance(values, np.ndarray) and values.dtype == 'datetime64[D]':
+        return values
+    return np.array([_to_day(v) for v in values], dtype='datetime64[D]')
+
+
+class BusinessCalendar:
+    """Count business days, taking weekends and per-location holidays into account"""
+
+    def __init__(self, holidays: Optional[Dict[str, Iterable]] = None, weekmask: str = DEFAULT_WEEKMASK):
+        self.weekmask = weekmask
+        self._holidays = holidays
+        self._holidays_source = None
+        self._calendars: Dict[str, np.busdaycalendar] = {}
+
+    def _holiday_config(self) -> Dict[str, Iterable]:
+        """Holiday lists by location, read from settings unless given explicitly"""
+        if self._holidays is not None:
+            return self._holidays
+        config = getattr(settings, 'BUSINESS_HOLIDAYS', None)
+        # Compare the setting itself: a fallback {} would differ on every call
+        if config is not self._holidays_source:
+            # Settings were changed (e.g. override_settings in tests)
+            self._holidays_source = config
+            self._calendars = {}
+        return config or {}
+
+    def calendar_for(self, location: Optional[str] = None) -> np.busdaycalendar:
+        """Get the (cached) NumPy calendar for a location"""
+        config = self._holiday_config()
+        key = location or DEFAULT_LOCATION
+        calendar = self._calendars.get(key)
+        if calendar is None:
+            holidays = list(config.get(DEFAULT_LOCATION, []))
+            if key != DEFAULT_LOCATION:
+                holidays += list(config.get(key, []))
+            calendar = np.busdaycalendar(weekmask=self.weekmask, holidays=_to_days(holidays))
+            self._calendars[key] = calendar
+        return calendar
+
+    def count(self, start_date, end_date, location: Optional[str] = None) -> int:
+        """
+        Count business days between two dates (inclusive)
+
+        Returns 0 when end_date is before start_date.
+        """
+        start = _to_day(start_date)
+        end = _to_day(end_date)
+        if end < start:
+            return 0
+        return int(np.busday_count(start, end + 1, busdaycal=self.calendar_for(location)))
+
+    def count_many(self, start_dates, end_dates, locations=None) -> np.ndarray:
+        """
+        Count business days for many date ranges at once (inclusive)
+
+        Args:
+            start_dates: Sequence of range start dates
+            end_dates: Sequence of range end dates, same length as start_dates
+            locations: Optional location, or sequence of locations (one per range)
+
+        Returns:
+            Integer array of business-day counts; empty ranges count as 0
+        """
+        starts = _to_days(start_dates)
+        ends = _to_days(end_dates) + 1
+        ends = np.maximum(ends, starts)
+
+        if locations is None or isinstance(locations, str):
+            return np.busday_count(starts, ends, busdaycal=self.calendar_for(locations))
+
+        locations = np.array([loc or DEFAULT_LOCATION for loc in locations], dtype=object)
+        counts = np.zeros(len(starts), dtype=np.int64)
+        for location in set(locations):
+            mask = locations == location
+            counts[mask] = np.busday_count(starts[mask], ends[mask], busdaycal=self.calendar_for(location))
+        return counts
+
+    def is_business_day(self, day, location: Optional[str] = None) -> bool:
+        """Check whether a single date is a business day"""
+        return bool(np.is_busday(_to_day(day), busdaycal=self.calendar_for(location)))
+
+
+# Global instance
+business_calendar = BusinessCalendar()
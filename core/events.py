@@ -0,0 +1,148 @@
+"""
+Change events pushed to browsers over Server-Sent Events
+
+Events are kept in a short numbered log in the default cache, so every web
+process (and the background job threads) can publish and every open stream can
+read them. With the local-memory cache this only spans one process; use a
+shared cache backend when running several workers.
+
+Streams check the log once per EVENT_POLL_SECONDS on the server, so browsers
+hold one open connection instead of polling, and only receive data when
+something changed.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EVENT_SEQUENCE_KEY = 'events:sequence'
+EVENT_KEY = 'events:{}'
+EVENT_TTL = 300
+EVENT_POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15
+# Milliseconds browsers wait before reconnecting a closed stream
+RECONNECT_MILLISECONDS = 3000
+# Events read per check; a client further behind skips to the newest ones
+MAX_BATCH = 100
+
+
+def latest_event_id() -> int:
+    """Sequence number of the newest published event (0 if none)"""
+    return cache.get(EVENT_SEQUENCE_KEY) or 0
+
+
+def _publish_now(event_type: str, data: Dict[str, Any]):
+    cache.add(EVENT_SEQUENCE_KEY, 0, None)
+    event_id = cache.incr(EVENT_SEQUENCE_KEY)
+    cache.set(EVENT_KEY.format(event_id), {
+        'id': event_id,
+        'type': event_type,
+        'data': data,
+        'published_at': timezone.now().isoformat(),
+    }, EVENT_TTL)
+
+
+def publish(event_type: str, data: Optional[Dict[str, Any]] = None):
+    """
+    Publish an event once the current transaction commits
+
+    Args:
+        event_type: Event name, e.g. 'briefing', 'insight', 'assignment', 'utilization'
+        data: JSON-serializable payload
+    """
+    def send():
+        try:
+            _publish_now(event_type, data or {})
+        except Exception as e:
+            # Push updates are best-effort and must never break the write
+            logger.warning(f"Could not publish {event_type} event: {e}")
+
+    transaction.on_commit(send)
+
+
+def events_since(last_id: int) -> List[Dict[str, Any]]:
+    """
+    Events published after last_id, oldest first
+
+    Stops before an id that is not readable yet (published concurrently) so it
+    is picked up by the next check; ids that already expired are skipped.
+    """
+    newest = latest_event_id()
+    if newest <= last_id:
+        return []
+    first = max(last_id + 1, newest - MAX_BATCH + 1)
+    stored = cache.get_many([EVENT_KEY.format(event_id) for event_id in range(first, newest + 1)])
+
+    events = []
+    for event_id in range(first, newest + 1):
+        event = stored.get(EVENT_KEY.format(event_id))
+        if event is None:
+            if newest - event_id < 10:
+                break
+            continue
+        events.append(event)
+    return events
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """Encode an event in the text/event-stream format"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], cls=DjangoJSONEncoder)}\n\n"
+
+
+class EventStream:
+    """
+    One client's stream, resumable from the id in the Last-Event-ID header
+
+    Iterate asynchronously under ASGI; synchronous iteration holds the
+    calling thread for the whole duration. The stream ends after `duration`
+    seconds and the browser reconnects with the last id it saw.
+    """
+
+    def __init__(self, last_id: Optional[int] = None, duration: float = 300):
+        self.last_id = latest_event_id() if last_id is None else last_id
+        self.duration = duration
+
+    def _opening(self) -> str:
+        return f"retry: {RECONNECT_MILLISECONDS}\n: connected\n\n"
+
+    def _pending(self) -> List[str]:
+        chunks = []
+        for event in events_since(self.last_id):
+            self.last_id = event['id']
+            chunks.append(format_event(event))
+        return chunks
+
+    def __iter__(self) -> Iterator[str]:
+        yield self._opening()
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < self.duration:
+            for chunk in self._pending():
+                last_sent = time.monotonic()
+                yield chunk
+            if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keepalive\n\n"
+            time.sleep(EVENT_POLL_SECONDS)
+
+    async def __aiter__(self):
+        yield self._opening()
+        loop = asyncio.get_running_loop()
+        started = last_sent = loop.time()
+        while loop.time() - started < self.duration:
+            # The cache calls block, so run them off the event loop
+            for chunk in await sync_to_async(self._pending)():
+                last_sent = loop.time()
+                yield chunk
+            if loop.time() - last_sent >= HEARTBEAT_SECONDS:
+                last_sent = loop.time()
+                yield ": keepalive\n\n"
+            await asyncio.sleep(EVENT_POLL_SECONDS)
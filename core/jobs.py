@@ -0,0 +1,100 @@
+"""
+In-process background jobs for ResourcePro
+
+Work that should not run while a user waits (snapshot rebuilds, LLM calls) is
+handed to a small thread pool once the current transaction commits. Jobs are
+keyed: while a job is queued or running, enqueuing the same key again does not
+start a second copy; if the job is already running it is re-run once
+afterwards, so changes made while it was working are picked up.
+
+Set ``BACKGROUND_JOBS_EAGER = True`` to run jobs inline (useful for scripts and
+tests).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+
+
+class JobRunner:
+    """Run keyed jobs on a lazily created thread pool"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        # key -> True when the running job must be repeated after it finishes
+        self._active: Dict[str, bool] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            workers = self.max_workers or getattr(settings, 'BACKGROUND_JOB_WORKERS', DEFAULT_WORKERS)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resourcepro-job')
+        return self._executor
+
+    def enqueue(self, key: str, func: Callable, *args, **kwargs):
+        """
+        Schedule func(*args, **kwargs) unless a job with the same key is pending
+
+        The job is submitted once the current transaction commits, so it sees
+        the caller's writes (and is dropped if the transaction rolls back).
+        """
+        if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+            self._run(key, func, args, kwargs, track=False)
+            return
+        transaction.on_commit(lambda: self._submit(key, func, args, kwargs))
+
+    def enqueue_once(self, key: str, func: Callable, *args, **kwargs):
+        """
+        Like enqueue, but a request made while the job is running is dropped
+        instead of causing a re-run (for expensive jobs such as LLM calls,
+        where the running job's result is good enough)
+        """
+        if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+            self._run(key, func, args, kwargs, track=False)
+            return
+        transaction.on_commit(lambda: self._submit(key, func, args, kwargs, rerun=False))
+
+    def _submit(self, key, func, args, kwargs, rerun=True) -> bool:
+        """Start a job now, or mark an active one for a re-run; True if started"""
+        with self._lock:
+            if key in self._active:
+                self._active[key] = self._active[key] or rerun
+                return False
+            self._active[key] = False
+            self._get_executor().submit(self._run, key, func, args, kwargs)
+        return True
+
+    def is_active(self, key: str) -> bool:
+        """Check whether a job with this key is queued or running"""
+        with self._lock:
+            return key in self._active
+
+    def _run(self, key, func, args, kwargs, track=True):
+        while True:
+            close_old_connections()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception(f"Background job {key} failed")
+            finally:
+                close_old_connections()
+
+            if not track:
+                return
+            with self._lock:
+                if not self._active.get(key):
+                    self._active.pop(key, None)
+                    return
+                self._active[key] = False
+
+
+# Global instance
+jobs = JobRunner()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from utils.llm_cache import llm_cache
+
+
+class Command(BaseCommand):
+    help = 'Show LLM response cache hit/miss counts and saved latency, or clear the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete every cached response and reset the counters',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            llm_cache.clear()
+            self.stdout.write(self.style.SUCCESS('Cleared the LLM response cache'))
+            return
+
+        stats = llm_cache.stats()
+        self.stdout.write(
+            f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {stats['hit_rate']:.1%}\n"
+            f"Latency saved: {stats['saved_seconds']}s\n"
+            f"Stored responses: {stats['entries']} "
+            f"({stats['stored_hits']} hits, {stats['stored_saved_seconds']}s saved)"
+        )
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand
+from utils.llm_telemetry import llm_telemetry
+
+
+class Command(BaseCommand):
+    help = 'Report LLM call latency, prompt size, cache hits and failures per feature'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=24,
+            help='Report on calls made in the last N hours (default: 24)',
+        )
+        parser.add_argument(
+            '--feature',
+            help='Only report on this feature',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete every recorded call',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            llm_telemetry.clear()
+            self.stdout.write(self.style.SUCCESS('Deleted the LLM call records'))
+            return
+
+        report = llm_telemetry.report(hours=options['hours'], feature=options['feature'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if not report['features']:
+            self.stdout.write(f"No LLM calls in the last {options['hours']:g} hours")
+            return
+
+        self.stdout.write(
+            f"{'Feature':<28}{'Calls':>7}{'Cache':>7}{'Fail':>6}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'p95 tokens':>12}{'Tokens':>10}"
+        )
+        rows = list(report['features'].items()) + [('TOTAL', report['total'])]
+        for name, summary in rows:
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f"{name[:27]:<28}{summary['calls']:>7}{summary['cache_hit_rate']:>7.0%}"
+                f"{summary['failure_rate']:>6.0%}{self._ms(latency['p50'])}{self._ms(latency['p95'])}"
+                f"{self._ms(latency['p99'])}{summary['prompt_tokens']['p95'] or 0:>12.0f}"
+                f"{summary['prompt_tokens']['total']:>10}"
+            )
+
+    def _ms(self, value):
+        return f"{value:>9.0f}" if value is not None else f"{'-':>9}"
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from utils.gemini_ai import gemini_service
+
+
+class Command(BaseCommand):
+    help = 'Show the LLM backend and its circuit breaker state, or close the circuit'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Close the circuit and forget past failures',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            gemini_service.breaker.reset()
+            self.stdout.write(self.style.SUCCESS('Closed the LLM circuit'))
+            return
+
+        status = gemini_service.status()
+        circuit = status['circuit']
+        self.stdout.write(
+            f"Backend: {status['backend']}  Configured: {status['configured']}  Available: {status['available']}\n"
+            f"Circuit: {circuit['state']}  Consecutive failures: "
+            f"{circuit['consecutive_failures']}/{circuit['failure_threshold']}  Trips: {circuit['trips']}"
+        )
+        if circuit['retry_at']:
+            self.stdout.write(f"Open since {circuit['opened_at']}, trial call from {circuit['retry_at']}")
+        if circuit['last_error']:
+            self.stdout.write(f"Last error ({circuit['last_failure_at']}): {circuit['last_error']}")
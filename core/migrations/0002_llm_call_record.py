@@ -0,0 +1,34 @@
+# Generated by Django 4.2.6 on 2026-10-18 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_llm_response_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCallRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feature', models.CharField(help_text='Call site, e.g. daily_briefing', max_length=100)),
+                ('model_name', models.CharField(max_length=100)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('cache_hit', 'Answered from cache'), ('error', 'Error'), ('parse_error', 'Unparseable response'), ('circuit_open', 'Skipped: circuit open'), ('unavailable', 'Skipped: not configured'), ('cancelled', 'Stream closed early')], max_length=20)),
+                ('error_type', models.CharField(blank=True, max_length=100)),
+                ('prompt_chars', models.PositiveIntegerField(default=0)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0, help_text='Estimated')),
+                ('response_chars', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.FloatField(default=0)),
+                ('first_chunk_ms', models.FloatField(blank=True, help_text='Time to the first streamed chunk', null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Model calls made, retries included')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['feature', 'created_at'], name='core_llmcal_feature_758a8a_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,53 @@
 from django.db import models
 
-# Create your models here.
+
+class CachedLLMResponse(models.Model):
+    """LLM response stored by utils.llm_cache, keyed by a hash of model, prompt and temperature"""
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+    response_text = models.TextField()
+    latency_ms = models.FloatField(default=0, help_text="Time the original call took")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.model_name} response {self.key[:12]}"
+    
+    class Meta:
+        ordering = ['-last_used_at']
+
+
+class LLMCallRecord(models.Model):
+    """One LLM call recorded by utils.llm_telemetry, for per-feature latency and size reports"""
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('cache_hit', 'Answered from cache'),
+        ('error', 'Error'),
+        ('parse_error', 'Unparseable response'),
+        ('circuit_open', 'Skipped: circuit open'),
+        ('unavailable', 'Skipped: not configured'),
+        ('cancelled', 'Stream closed early'),
+    ]
+    
+    feature = models.CharField(max_length=100, help_text="Call site, e.g. daily_briefing")
+    model_name = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    error_type = models.CharField(max_length=100, blank=True)
+    prompt_chars = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(default=0, help_text="Estimated")
+    response_chars = models.PositiveIntegerField(default=0)
+    latency_ms = models.FloatField(default=0)
+    first_chunk_ms = models.FloatField(null=True, blank=True, help_text="Time to the first streamed chunk")
+    attempts = models.PositiveSmallIntegerField(default=0, help_text="Model calls made, retries included")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.feature} {self.outcome} {self.latency_ms:.0f}ms"
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['feature', 'created_at']),
+        ]
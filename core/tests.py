@@ -2,8 +2,27 @@ from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
+from django.core.cache import cache
+from django.test import override_settings
+from django.core.management import call_command
+from django.db import transaction
 from datetime import date, timedelta
-from unittest.mock import patch
+import threading
+import time
+from io import StringIO
+from itertools import islice
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+
+from . import events
+from .business_calendar import BusinessCalendar
+from .models import CachedLLMResponse, LLMCallRecord
+from utils.gemini_ai import GeminiAIService
+from utils.llm_backends import LocalBackend, get_backend
+from utils.llm_cache import llm_cache
+from utils.llm_telemetry import LLMCall, llm_telemetry
+from utils.single_flight import SingleFlight
 
 from .utils import (
     get_week_date_range, 
@@ -194,6 +213,546 @@ class CoreUtilsTest(TestCase):
             self.assertFalse(result)
 
 
+class BusinessCalendarTest(TestCase):
+    """Test cases for the business-day calendar"""
+    
+    def setUp(self):
+        self.calendar = BusinessCalendar(holidays={
+            'default': ['2023-12-25'],
+            'London, UK': ['2023-12-26'],
+        })
+    
+    def test_count_weekdays_inclusive(self):
+        """Test counting a Monday-Sunday week"""
+        self.assertEqual(self.calendar.count(date(2023, 6, 12), date(2023, 6, 18)), 5)
+        self.assertEqual(self.calendar.count(date(2023, 6, 12), date(2023, 6, 12)), 1)
+    
+    def test_count_reversed_range(self):
+        """Test that an empty range counts as zero"""
+        self.assertEqual(self.calendar.count(date(2023, 6, 18), date(2023, 6, 12)), 0)
+    
+    def test_count_with_location_holidays(self):
+        """Test default and per-location holidays"""
+        start, end = date(2023, 12, 25), date(2023, 12, 29)
+        self.assertEqual(self.calendar.count(start, end), 4)
+        self.assertEqual(self.calendar.count(start, end, 'London, UK'), 3)
+        self.assertEqual(self.calendar.count(start, end, 'Unknown'), 4)
+    
+    def test_count_many_matches_count(self):
+        """Test batch counting against single counts"""
+        starts = [date(2023, 1, 2), date(2023, 12, 20), date(2023, 6, 18)]
+        ends = [date(2023, 3, 31), date(2024, 1, 5), date(2023, 6, 12)]
+        locations = [None, 'London, UK', 'London, UK']
+        
+        counts = self.calendar.count_many(starts, ends, locations)
+        
+        expected = [self.calendar.count(s, e, loc) for s, e, loc in zip(starts, ends, locations)]
+        self.assertEqual(list(counts), expected)
+    
+    def test_is_business_day(self):
+        """Test single-day checks"""
+        self.assertTrue(self.calendar.is_business_day(date(2023, 6, 12)))
+        self.assertFalse(self.calendar.is_business_day(date(2023, 6, 17)))
+        self.assertFalse(self.calendar.is_business_day(date(2023, 12, 26), 'London, UK'))
+
+    @override_settings(BUSINESS_HOLIDAYS={})
+    def test_calendars_are_kept_without_configured_holidays(self):
+        """Test that the calendars read from empty settings are built only once"""
+        calendar = BusinessCalendar()
+        self.assertIs(calendar.calendar_for('London, UK'), calendar.calendar_for('London, UK'))
+        self.assertEqual(calendar.count(date(2023, 12, 25), date(2023, 12, 29)), 5)
+
+
+class EventsTest(TestCase):
+    """Test cases for the Server-Sent Events log"""
+    
+    def setUp(self):
+        cache.delete(events.EVENT_SEQUENCE_KEY)
+    
+    def _publish(self, event_type, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish(event_type, data)
+    
+    def test_publish_waits_for_commit(self):
+        """Test that events from a transaction are only visible once it commits"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            events.publish('briefing', {'state': 'done'})
+            self.assertEqual(events.events_since(0), [])
+        
+        for callback in callbacks:
+            callback()
+        published = events.events_since(0)
+        self.assertEqual([(e['id'], e['type'], e['data']) for e in published], [(1, 'briefing', {'state': 'done'})])
+    
+    def test_events_since(self):
+        """Test reading only the events after a given id"""
+        for index in range(3):
+            self._publish('assignment', {'id': index})
+        
+        self.assertEqual([e['data']['id'] for e in events.events_since(1)], [1, 2])
+        self.assertEqual(events.events_since(events.latest_event_id()), [])
+    
+    def test_format_event(self):
+        """Test the text/event-stream encoding"""
+        text = events.format_event({'id': 7, 'type': 'utilization', 'data': {'resource_ids': [1, 2]}})
+        self.assertEqual(text, 'id: 7\nevent: utilization\ndata: {"resource_ids": [1, 2]}\n\n')
+    
+    def test_stream_resumes_after_last_id(self):
+        """Test that a stream sends the events after its last id"""
+        self._publish('insight', {'id': 1})
+        self._publish('insight', {'id': 2})
+        
+        stream = events.EventStream(last_id=1, duration=5)
+        opening, chunk = islice(iter(stream), 2)
+        
+        self.assertIn('retry: ', opening)
+        self.assertTrue(chunk.startswith('id: 2\nevent: insight\n'))
+        self.assertEqual(stream.last_id, 2)
+
+    def test_async_stream_reads_the_log_off_the_event_loop(self):
+        """Test that the blocking cache reads do not run on the event loop thread"""
+        self._publish('insight', {'id': 1})
+        stream = events.EventStream(last_id=0, duration=5)
+        reader_threads = []
+        events_since = events.events_since
+
+        def recording_events_since(last_id):
+            reader_threads.append(threading.current_thread())
+            return events_since(last_id)
+
+        async def first_event():
+            chunks = stream.__aiter__()
+            await chunks.__anext__()
+            chunk = await chunks.__anext__()
+            await chunks.aclose()
+            return threading.current_thread(), chunk
+
+        with patch.object(events, 'events_since', side_effect=recording_events_since):
+            loop_thread, chunk = async_to_sync(first_event)()
+
+        self.assertTrue(chunk.startswith('id: 1\nevent: insight\n'))
+        self.assertTrue(reader_threads)
+        self.assertNotIn(loop_thread, reader_threads)
+
+    def test_new_stream_starts_at_latest_event(self):
+        """Test that a stream without Last-Event-ID skips older events"""
+        self._publish('insight', {'id': 1})
+        self.assertEqual(events.EventStream().last_id, 1)
+
+
+class LLMResponseCacheTest(TestCase):
+    """Test cases for the persistent LLM response cache"""
+    
+    def setUp(self):
+        llm_cache.clear()
+        self.backend = MagicMock(model_name='test-model')
+        self.backend.generate.return_value = '{"answer": "42"}'
+        self.service = GeminiAIService(backend=self.backend)
+        self.service.breaker.reset()
+    
+    def test_identical_prompt_is_served_from_cache(self):
+        """Test that a repeated prompt does not call the model again"""
+        first = self.service.generate_json_response("How many?", temperature=0.3)
+        second = self.service.generate_json_response("How many?", temperature=0.3)
+        
+        self.assertEqual(first, {"answer": "42"})
+        self.assertEqual(second, first)
+        self.assertEqual(self.backend.generate.call_count, 1)
+        stats = llm_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+    
+    def test_key_includes_prompt_and_temperature(self):
+        """Test that a different prompt or temperature misses"""
+        self.service.generate_content("How many?", temperature=0.3)
+        self.service.generate_content("How many?", temperature=0.7)
+        self.service.generate_content("How few?", temperature=0.3)
+        self.assertEqual(self.backend.generate.call_count, 3)
+    
+    def test_bypass_and_expiry(self):
+        """Test use_cache=False and expired entries both call the model"""
+        self.service.generate_content("How many?", cache_ttl=60)
+        self.service.generate_content("How many?", use_cache=False)
+        self.assertEqual(self.backend.generate.call_count, 2)
+        
+        CachedLLMResponse.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.service.generate_content("How many?")
+        self.assertEqual(self.backend.generate.call_count, 3)
+    
+    @override_settings(LLM_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """Test that nothing is stored when the cache is disabled"""
+        self.service.generate_content("How many?")
+        self.service.generate_content("How many?")
+        self.assertEqual(self.backend.generate.call_count, 2)
+        self.assertFalse(CachedLLMResponse.objects.exists())
+    
+    @override_settings(LLM_CACHE_MAX_ENTRIES=10)
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test the size cap keeps the most recently used responses"""
+        for index in range(10):
+            self.service.generate_content(f"Prompt {index}")
+        CachedLLMResponse.objects.update(last_used_at=timezone.now() - timedelta(hours=1))
+        self.service.generate_content("Prompt 0")  # hit, becomes most recent
+        
+        self.service.generate_content("Prompt 10")
+        
+        self.assertEqual(CachedLLMResponse.objects.count(), 9)
+        kept = llm_cache.make_key(self.service.model_name, "Prompt 0", 0.7)
+        self.assertTrue(CachedLLMResponse.objects.filter(key=kept).exists())
+    
+    def test_unparseable_json_is_not_cached(self):
+        """Test that an invalid JSON response is dropped from the cache"""
+        self.backend.generate.return_value = 'not json'
+        self.assertIsNone(self.service.generate_json_response("How many?"))
+        self.assertFalse(CachedLLMResponse.objects.exists())
+
+
+@override_settings(LLM_CACHE_ENABLED=False, LLM_TELEMETRY_ENABLED=False)
+class GeminiBatchTest(TestCase):
+    """Test cases for concurrent Gemini calls"""
+    
+    def setUp(self):
+        self.service = GeminiAIService(backend=MagicMock(model_name='test-model'))
+        self.service.backend.is_retryable.return_value = False
+        self.service.breaker.reset()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.service.backend.generate.side_effect = self._answer
+    
+    def _answer(self, prompt, temperature=None, max_output_tokens=None, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if 'broken' in prompt:
+            raise RuntimeError("quota exceeded")
+        return f'{{"prompt": "{prompt.split()[0]}"}}'
+    
+    def test_results_keep_prompt_order(self):
+        """Test that responses come back in prompt order and failures are None"""
+        prompts = ['p0', 'p1', 'broken', 'p3', 'p4']
+        results = self.service.batch_generate(prompts, max_concurrency=3)
+        
+        self.assertEqual(results, [{'prompt': 'p0'}, {'prompt': 'p1'}, None, {'prompt': 'p3'}, {'prompt': 'p4'}])
+    
+    def test_concurrency_is_bounded(self):
+        """Test that calls overlap but never exceed max_concurrency"""
+        self.service.batch_generate([f'p{i}' for i in range(8)], max_concurrency=3)
+        
+        self.assertEqual(self.service.backend.generate.call_count, 8)
+        self.assertGreater(self.peak, 1)
+        self.assertLessEqual(self.peak, 3)
+    
+    def test_async_response(self):
+        """Test the awaitable variant"""
+        result = async_to_sync(self.service.agenerate_json_response)('p0')
+        self.assertEqual(result, {'prompt': 'p0'})
+
+
+@override_settings(LLM_CACHE_ENABLED=False, LLM_RETRY_BACKOFF_SECONDS=0.001)
+class LocalLLMBackendTest(TestCase):
+    """Test cases for the offline LLM stand-in"""
+    
+    def setUp(self):
+        self.service = GeminiAIService(backend=LocalBackend(latency_ms=0))
+        self.service.breaker.reset()
+    
+    def test_selected_by_setting(self):
+        """Test that LLM_BACKEND picks the backend"""
+        with override_settings(LLM_BACKEND='local'):
+            self.assertIsInstance(get_backend(), LocalBackend)
+        with override_settings(LLM_BACKEND='utils.llm_backends.LocalBackend'):
+            self.assertIsInstance(get_backend(), LocalBackend)
+    
+    def test_allocation_response_uses_prompt_ids(self):
+        """Test that allocation answers only recommend resources listed in the prompt"""
+        from analytics.ai_services import AIResourceAllocationService
+        
+        prompt = AIResourceAllocationService()._create_allocation_prompt(
+            {"id": 1, "name": "Build API"},
+            [{"id": resource_id, "name": f"R{resource_id}"} for resource_id in (7, 8, 9, 10)]
+        )
+        response = self.service.generate_json_response(prompt)
+        
+        recommended = [rec['resource_id'] for rec in response['recommendations']]
+        self.assertEqual(len(recommended), 3)
+        self.assertTrue(set(recommended) <= {7, 8, 9, 10})
+        self.assertEqual(response, self.service.generate_json_response(prompt))
+    
+    def test_query_answer(self):
+        """Test the natural language answer format"""
+        response = self.service.generate_json_response('SYSTEM DATA: {}\nUSER QUESTION: "Who is free?"')
+        self.assertIn('Who is free?', response['answer'])
+        self.assertIn('found_conflicts', response)
+    
+    def test_error_rate_and_latency(self):
+        """Test injected failures and latency"""
+        failing = GeminiAIService(backend=LocalBackend(latency_ms=0, error_rate=1.0))
+        self.assertIsNone(failing.generate_json_response('USER QUESTION: "x"'))
+        
+        slow = LocalBackend(latency_ms=40)
+        started = time.monotonic()
+        slow.generate('USER QUESTION: "x"')
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+
+@override_settings(LLM_CACHE_ENABLED=False, LLM_MAX_RETRIES=2, LLM_RETRY_BACKOFF_SECONDS=0.001,
+                   LLM_BREAKER_FAILURE_THRESHOLD=2, LLM_BREAKER_RESET_SECONDS=60)
+class LLMResilienceTest(TestCase):
+    """Test cases for LLM call deadlines, retries and the circuit breaker"""
+    
+    def setUp(self):
+        self.backend = LocalBackend(latency_ms=0)
+        self.service = GeminiAIService(backend=self.backend)
+        self.service.breaker.reset()
+    
+    def tearDown(self):
+        self.service.breaker.reset()
+    
+    def test_transient_failure_is_retried(self):
+        """Test that a timeout is retried and the retry's answer is returned"""
+        with patch.object(self.backend, 'generate', side_effect=[TimeoutError('slow'), 'ok']) as generate:
+            self.assertEqual(self.service.generate_content('prompt'), 'ok')
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(self.service.breaker.status()['consecutive_failures'], 0)
+    
+    def test_permanent_failure_is_not_retried(self):
+        """Test that a non-transient error fails at once without counting against the circuit"""
+        with patch.object(self.backend, 'generate', side_effect=ValueError('bad prompt')) as generate:
+            self.assertIsNone(self.service.generate_content('prompt'))
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(self.service.breaker.state(), 'closed')
+    
+    def test_deadline_limits_attempts(self):
+        """Test that each attempt only gets the time left before the call deadline"""
+        with override_settings(LLM_TIMEOUT_SECONDS=0.2):
+            started = time.monotonic()
+            self.assertIsNone(GeminiAIService(backend=LocalBackend(latency_ms=1000)).generate_content('prompt'))
+        self.assertLess(time.monotonic() - started, 0.5)
+    
+    def test_circuit_opens_and_recovers(self):
+        """Test fail-fast after consecutive failures and recovery through a trial call"""
+        failing = GeminiAIService(backend=LocalBackend(latency_ms=0, error_rate=1.0))
+        self.assertIsNone(failing.generate_content('prompt'))
+        self.assertIsNone(failing.generate_content('prompt'))
+        self.assertEqual(failing.breaker.state(), 'open')
+        self.assertFalse(self.service.is_available())
+        
+        # Open: no backend calls at all
+        with patch.object(self.backend, 'generate') as generate:
+            self.assertIsNone(self.service.generate_content('prompt'))
+        generate.assert_not_called()
+        status = self.service.status()['circuit']
+        self.assertEqual((status['trips'], status['consecutive_failures']), (1, 2))
+        self.assertIn('Injected', status['last_error'])
+        
+        # Half open after the reset time: one trial call closes the circuit
+        with override_settings(LLM_BREAKER_RESET_SECONDS=0):
+            self.assertEqual(self.service.breaker.state(), 'half_open')
+            self.assertTrue(self.service.is_available())
+            self.assertIsNotNone(self.service.generate_content('USER QUESTION: "x"'))
+        self.assertEqual(self.service.breaker.state(), 'closed')
+    
+    def test_failed_trial_reopens(self):
+        """Test that a failed trial call re-opens the circuit"""
+        for _ in range(2):
+            self.service.breaker.record_failure('down')
+        with override_settings(LLM_BREAKER_RESET_SECONDS=0):
+            self.assertTrue(self.service.breaker.allow_request())
+            # Only one trial call at a time
+            self.assertFalse(self.service.breaker.allow_request())
+            self.service.breaker.record_failure('still down')
+        self.assertEqual(self.service.breaker.state(), 'open')
+        self.assertEqual(self.service.breaker.status()['trips'], 2)
+
+
+class LLMStreamingTest(TestCase):
+    """Test cases for streamed LLM responses"""
+    
+    def setUp(self):
+        self.backend = LocalBackend(latency_ms=0)
+        self.service = GeminiAIService(backend=self.backend)
+        self.service.breaker.reset()
+        llm_cache.clear()
+    
+    def tearDown(self):
+        self.service.breaker.reset()
+    
+    def test_chunks_are_cached_as_one_response(self):
+        """Test that a stream arrives in pieces and is then answered from the cache"""
+        prompt = 'USER QUESTION: "Who is free?"\nAnswer in plain text'
+        chunks = list(self.service.stream_content(prompt))
+        self.assertGreater(len(chunks), 1)
+        self.assertIn('Who is free?', ''.join(chunks))
+        
+        with patch.object(self.backend, 'generate_stream') as generate_stream:
+            self.assertEqual(list(self.service.stream_content(prompt)), [''.join(chunks)])
+        generate_stream.assert_not_called()
+    
+    @override_settings(LLM_CACHE_ENABLED=False, LLM_RETRY_BACKOFF_SECONDS=0.001)
+    def test_failure_before_first_chunk_is_retried(self):
+        """Test that only a stream that has not started yet is retried"""
+        with patch.object(self.backend, 'generate_stream',
+                          side_effect=[TimeoutError('slow'), iter(['a', 'b'])]) as generate_stream:
+            self.assertEqual(list(self.service.stream_content('prompt')), ['a', 'b'])
+        self.assertEqual(generate_stream.call_count, 2)
+        
+        def broken_stream(*args, **kwargs):
+            yield 'a'
+            raise ConnectionError('reset')
+        
+        with patch.object(self.backend, 'generate_stream', side_effect=broken_stream) as generate_stream:
+            self.assertEqual(list(self.service.stream_content('prompt')), ['a'])
+        self.assertEqual(generate_stream.call_count, 1)
+
+
+class SingleFlightTest(TestCase):
+    """Test cases for coalescing concurrent computations of the same result"""
+    
+    def setUp(self):
+        self.flight = SingleFlight(lock_seconds=5)
+    
+    def test_concurrent_callers_share_one_call(self):
+        """Test that callers arriving while a computation runs get its result"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': len(calls)}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.flight.do('briefing', compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 5)
+        # Finished flights are not reused by later callers
+        self.assertEqual(self.flight.do('briefing', compute), {'value': 2})
+    
+    def test_waiter_takes_over_from_failed_leader(self):
+        """Test that the lock is released when the leader fails"""
+        token = self.flight.acquire('task:1')
+        self.assertIsNone(self.flight.acquire('task:1'))
+        threading.Timer(0.1, self.flight.release, args=('task:1', token)).start()
+        
+        self.assertEqual(self.flight.do('task:1', lambda: 'computed'), 'computed')
+        with self.assertRaises(ValueError):
+            self.flight.do('task:1', self._fail)
+        token = self.flight.acquire('task:1')
+        self.assertIsNotNone(token)
+        self.flight.release('task:1', token)
+    
+    def test_wait_for_completed_flight(self):
+        """Test handing a result to a caller that is waiting"""
+        token = self.flight.acquire('task:2')
+        threading.Timer(0.1, self.flight.complete, args=('task:2', token, 'shared')).start()
+        self.assertEqual(self.flight.wait('task:2'), (True, 'shared'))
+        self.assertEqual(self.flight.wait('task:2'), (False, None))
+    
+    def _fail(self):
+        raise ValueError('failed')
+
+
+@override_settings(LLM_CACHE_ENABLED=True, LLM_TELEMETRY_ENABLED=True)
+class LLMTelemetryTest(TestCase):
+    """Test cases for per-feature LLM call telemetry"""
+    
+    def setUp(self):
+        self.backend = LocalBackend(latency_ms=0)
+        self.service = GeminiAIService(backend=self.backend)
+        self.service.breaker.reset()
+        llm_cache.clear()
+        llm_telemetry.clear()
+    
+    def tearDown(self):
+        self.service.breaker.reset()
+    
+    def test_outcomes_are_recorded_per_call(self):
+        """Test model calls, cache hits and parse failures"""
+        prompt = 'USER QUESTION: "Who is free?"'
+        self.service.generate_json_response(prompt, feature='nli_query')
+        self.service.generate_json_response(prompt, feature='nli_query')
+        with patch.object(self.backend, 'generate', return_value='not json'):
+            self.service.generate_json_response('Other prompt', feature='nli_query')
+        
+        records = list(LLMCallRecord.objects.order_by('id'))
+        self.assertEqual([record.outcome for record in records], ['success', 'cache_hit', 'parse_error'])
+        self.assertEqual([record.attempts for record in records], [1, 0, 1])
+        self.assertEqual(records[0].feature, 'nli_query')
+        self.assertGreater(records[0].prompt_tokens, 0)
+        self.assertEqual(records[0].response_chars, records[1].response_chars)
+        self.assertEqual(records[2].error_type, 'JSONDecodeError')
+    
+    def test_failed_write_keeps_the_callers_transaction(self):
+        """Test that a record that cannot be stored leaves the surrounding transaction usable"""
+        call = LLMCall(llm_telemetry, 'nli_query', 'model', 'prompt')
+        call.attempts = None  # NOT NULL column
+        with transaction.atomic():
+            llm_telemetry.record(call)
+            self.assertEqual(LLMCallRecord.objects.count(), 0)
+    
+    def test_skipped_and_streamed_calls(self):
+        """Test calls skipped by an open circuit and streams closed early"""
+        with override_settings(LLM_BREAKER_FAILURE_THRESHOLD=1):
+            self.service.breaker.record_failure('down')
+            self.assertIsNone(self.service.generate_content('prompt'))
+        self.service.breaker.reset()
+        
+        stream = self.service.stream_content('USER QUESTION: "x"\nAnswer in plain text', feature='nli_query_stream')
+        next(stream)
+        stream.close()
+        
+        circuit_open, cancelled = LLMCallRecord.objects.order_by('id')
+        self.assertEqual((circuit_open.outcome, circuit_open.feature), ('circuit_open', 'other'))
+        self.assertEqual(cancelled.outcome, 'cancelled')
+        self.assertIsNotNone(cancelled.first_chunk_ms)
+    
+    def test_report_percentiles(self):
+        """Test the per-feature summary"""
+        for latency in range(1, 101):
+            LLMCallRecord.objects.create(feature='daily_briefing', model_name='m', outcome='success',
+                                         latency_ms=latency, prompt_tokens=1000, attempts=1)
+        LLMCallRecord.objects.create(feature='daily_briefing', model_name='m', outcome='cache_hit', latency_ms=1)
+        LLMCallRecord.objects.create(feature='nli_query', model_name='m', outcome='error', latency_ms=500,
+                                     prompt_tokens=10, attempts=3)
+        
+        report = llm_telemetry.report(hours=1)
+        briefing = report['features']['daily_briefing']
+        self.assertEqual(list(report['features']), ['daily_briefing', 'nli_query'])
+        self.assertEqual(briefing['calls'], 101)
+        self.assertEqual(briefing['latency_ms'], {'p50': 50, 'p95': 95, 'p99': 99, 'max': 100})
+        self.assertEqual(briefing['prompt_tokens']['total'], 100000)
+        self.assertEqual(briefing['failure_rate'], 0.0)
+        self.assertEqual(report['features']['nli_query']['failure_rate'], 1.0)
+        self.assertEqual(report['total']['model_attempts'], 103)
+        self.assertEqual(list(llm_telemetry.report(feature='nli_query')['features']), ['nli_query'])
+        
+        out = StringIO()
+        call_command('llm_metrics', stdout=out)
+        self.assertIn('daily_briefing', out.getvalue())
+    
+    @override_settings(LLM_TELEMETRY_MAX_RECORDS=10, LLM_TELEMETRY_RETENTION_DAYS=7)
+    def test_store_is_pruned(self):
+        """Test that records past the retention period and beyond the cap are dropped"""
+        records = [LLMCallRecord.objects.create(feature='f', model_name='m', outcome='success') for _ in range(25)]
+        LLMCallRecord.objects.filter(id=records[-1].id).update(created_at=timezone.now() - timedelta(days=8))
+        
+        llm_telemetry._prune()
+        
+        remaining = list(LLMCallRecord.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(remaining, [record.id for record in records[14:24]])
+
+
 class CoreURLsTest(TestCase):
     """Test cases for core URL routing"""
     
@@ -1,3 +1,6 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.utils import timezone
 from datetime import timedelta
 
@@ -37,4 +40,8 @@ def calculate_date_difference(start_date, end_date):
 def is_past_due(date):
     """Check if a date is in the past."""
     today = timezone.now().date()
-    return date < today
\ No newline at end of file
+    return date < today
+
+def cache_is_shared(alias='default'):
+    """Check whether a cache is seen by every process (not local-memory or dummy)."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -3,23 +3,45 @@ AI services for dashboard features
 """
 import json
 import logging
+import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from decimal import Decimal
 import time
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.db.models import Count, Avg, Sum, Q
 from django.contrib.auth.models import User
 
 from resources.models import Resource
+from resources.skill_index import skill_index
 from projects.models import Task, Project
 from allocation.models import Assignment
+from allocation.utilization import utilization_engine
 from dashboard.models import DashboardAIAnalysis, NLIQuery, AIInsight, RiskCategory, DynamicRisk, AIRecommendation
+from core import events
+from core.jobs import jobs
 from utils.gemini_ai import gemini_service
+from utils.prompt_context import PromptContextBuilder, compact_json, deadline_score, priority_score
+from utils.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
+BRIEFING_JOB_NAME = 'dashboard-briefing'
+BRIEFING_JOB_KEY = 'dashboard:briefing:job'
+BRIEFING_FLIGHT_KEY = 'dashboard:briefing'
+# Seconds page views wait before retrying a failed background briefing
+BRIEFING_RETRY_SECONDS = 300
+# Seconds an identical prompt is answered from the LLM response cache
+BRIEFING_CACHE_TTL = 2 * 3600
+NLI_CACHE_TTL = 15 * 60
+RECOMMENDATION_CACHE_TTL = 24 * 3600
+
+NO_QUERY_DATA_ANSWER = ("I don't have access to any project data in the system yet. "
+                        "Please ensure resources, projects, and tasks are created in the system.")
+AI_UNAVAILABLE_ANSWER = "The AI service is currently unavailable. Please try again later."
+
 class DashboardAIService:
     """AI-powered dashboard analysis service"""
     
@@ -32,13 +54,12 @@ class DashboardAIService:
             
         Returns:
             Dictionary containing briefing data
+        
+        Concurrent callers share one generation (utils.single_flight) instead
+        of each calling the AI service.
         """        # Check if we have recent analysis (within last 2 hours)
         if not force_refresh:
-            recent_analysis = DashboardAIAnalysis.objects.filter(
-                analysis_type='daily_briefing',
-                created_at__gte=timezone.now() - timedelta(hours=2),
-                is_active=True            ).first()
-            
+            recent_analysis = self._get_recent_briefing()
             if recent_analysis:
                 return self._format_enhanced_analysis_response(recent_analysis)
         
@@ -46,19 +67,40 @@ class DashboardAIService:
             logger.warning("Gemini AI not available for dashboard analysis")
             return {"error": "AI service not available"}
         
+        return single_flight.do(BRIEFING_FLIGHT_KEY, self._generate_daily_briefing, force_refresh)
+    
+    def _get_recent_briefing(self) -> Optional[DashboardAIAnalysis]:
+        return DashboardAIAnalysis.objects.filter(
+            analysis_type='daily_briefing',
+            created_at__gte=timezone.now() - timedelta(hours=2),
+            is_active=True
+        ).first()
+    
+    def _generate_daily_briefing(self, force_refresh: bool) -> Dict[str, Any]:
+        """Generate and store a briefing; the caller holds the single-flight lock"""
+        # A briefing may have been stored while this caller waited for the lock
+        if not force_refresh:
+            recent_analysis = self._get_recent_briefing()
+            if recent_analysis:
+                return self._format_enhanced_analysis_response(recent_analysis)
+        
         try:
             # Gather dashboard data
             dashboard_data = self._gather_dashboard_data()
+            context_text, context_report = self._build_prompt_context(dashboard_data)
             
             # Perform comprehensive risk analysis
             risk_service = EnhancedRiskAnalysisService()
-            comprehensive_risks = risk_service.analyze_comprehensive_risks(dashboard_data)
+            comprehensive_risks = risk_service.analyze_comprehensive_risks(dashboard_data, context_text,
+                                                                     force_refresh=force_refresh)
             
             # Create prompt for AI analysis (enhanced with comprehensive risks)
-            prompt = self._create_enhanced_dashboard_analysis_prompt(dashboard_data, comprehensive_risks)
+            prompt = self._create_enhanced_dashboard_analysis_prompt(context_text, comprehensive_risks)
             
             # Get AI analysis
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3, cache_ttl=BRIEFING_CACHE_TTL,
+                                                                use_cache=not force_refresh,
+                                                                feature='daily_briefing')
             
             if not ai_response:
                 logger.warning("AI service returned no response")
@@ -67,6 +109,7 @@ class DashboardAIService:
             # Enhance response with comprehensive risk data
             ai_response['comprehensive_risks'] = comprehensive_risks
             ai_response['risk_categories'] = self._categorize_risks(comprehensive_risks)
+            ai_response['prompt_context'] = context_report
             
             # Store and return analysis
             analysis = self._store_enhanced_analysis(ai_response, dashboard_data, comprehensive_risks)
@@ -76,6 +119,83 @@ class DashboardAIService:
             logger.error(f"Error generating dashboard briefing: {e}")
             return {"error": f"Failed to generate briefing: {str(e)}"}
     
+    def get_latest_briefing(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent stored briefing without calling the AI service"""
+        analysis = DashboardAIAnalysis.objects.filter(
+            analysis_type='daily_briefing',
+            is_active=True
+        ).order_by('-created_at').first()
+        return self._format_enhanced_analysis_response(analysis) if analysis else None
+    
+    def get_briefing_job_status(self) -> Dict[str, Any]:
+        """State of the last background briefing job (idle, pending, running, done or failed)"""
+        return cache.get(BRIEFING_JOB_KEY) or {'state': 'idle'}
+    
+    def _set_briefing_job_status(self, state: str, **extra):
+        status = self.get_briefing_job_status()
+        status.update(extra, state=state, updated_at=timezone.now().isoformat())
+        cache.set(BRIEFING_JOB_KEY, status, 24 * 3600)
+    
+    def request_daily_briefing(self):
+        """
+        Generate a new briefing in the background
+        
+        Requests made while a briefing is being generated are merged into it.
+        """
+        if self.get_briefing_job_status()['state'] not in ('pending', 'running'):
+            self._set_briefing_job_status('pending', requested_at=timezone.now().isoformat(), error=None)
+        jobs.enqueue_once(BRIEFING_JOB_NAME, self._run_briefing_job)
+    
+    def _run_briefing_job(self):
+        """Background job body: regenerate the briefing and record the outcome"""
+        self._set_briefing_job_status('running')
+        result = self.generate_daily_briefing(force_refresh=True)
+        if result.get('error'):
+            self._set_briefing_job_status('failed', error=result['error'], failed_at=timezone.now().isoformat())
+            events.publish('briefing', {'state': 'failed', 'error': result['error']})
+        else:
+            self._set_briefing_job_status('done', analysis_id=result.get('id'), error=None)
+            events.publish('briefing', {'state': 'done', 'analysis_id': result.get('id')})
+    
+    def briefing_for_dashboard(self) -> Dict[str, Any]:
+        """
+        Briefing to render on the dashboard without waiting for the AI service
+        
+        Returns the last stored briefing (or a placeholder marked ``pending``)
+        and queues a background refresh when it is older than two hours. After
+        a failed refresh, page views wait BRIEFING_RETRY_SECONDS before
+        trying again so an unavailable AI service is not called on every view.
+        """
+        briefing = self.get_latest_briefing()
+        is_current = briefing and timezone.now() - briefing['created_at'] < timedelta(hours=2)
+        if is_current:
+            return briefing
+        
+        if not gemini_service.is_available():
+            return briefing or {"error": "AI service not available"}
+        
+        status = self.get_briefing_job_status()
+        recently_failed = (
+            status['state'] == 'failed'
+            and timezone.now() - datetime.fromisoformat(status['failed_at']) < timedelta(seconds=BRIEFING_RETRY_SECONDS)
+        )
+        if not recently_failed:
+            self.request_daily_briefing()
+        
+        if briefing:
+            briefing['pending'] = not recently_failed
+            return briefing
+        if recently_failed:
+            return {"error": f"Failed to generate briefing: {status.get('error')}"}
+        return {
+            "summary": "Preparing today's briefing. It will appear here shortly.",
+            "risks": [],
+            "recommendations": [],
+            "confidence_score": 0.0,
+            "is_fresh": False,
+            "pending": True,
+        }
+    
     def _gather_dashboard_data(self) -> Dict[str, Any]:
         """Gather all dashboard data for AI analysis"""
         today = timezone.now().date()
@@ -85,9 +205,10 @@ class DashboardAIService:
         resource_data = []
         total_utilization = 0
         overallocated_count = 0
+        current_utilization = utilization_engine.compute(resources)
         
         for resource in resources:
-            utilization = resource.current_utilization()
+            utilization = current_utilization[resource.id]
             total_utilization += utilization
             if utilization > 100:
                 overallocated_count += 1
@@ -104,7 +225,7 @@ class DashboardAIService:
         avg_utilization = total_utilization / len(resources) if resources else 0
         
         # Get active projects
-        projects = Project.objects.filter(status__in=['planning', 'active', 'on_hold'])
+        projects = Project.objects.filter(status__in=['planning', 'active', 'on_hold']).with_metrics()
         project_data = []
         
         for project in projects:
@@ -153,6 +274,7 @@ class DashboardAIService:
                 "priority": task.priority,
                 "status": task.status,
                 "due_date": task.end_date.isoformat() if task.end_date else None,
+                "days_until": (task.end_date - today).days if task.end_date else None,
                 "required_skills": [skill.name for skill in task.skills_required.all()]
             })
         
@@ -180,13 +302,50 @@ class DashboardAIService:
             }
         }
     
-    def _create_dashboard_analysis_prompt(self, data: Dict[str, Any]) -> str:
+    def _build_prompt_context(self, data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fit the dashboard data into the prompt token budget
+        
+        Overallocated resources, close deadlines and high-priority work are
+        listed first; whatever does not fit is summarised per section.
+        
+        Returns:
+            (compact JSON text, size report)
+        """
+        def header(section):
+            return {key: value for key, value in data[section].items() if key != 'details'}
+        
+        builder = PromptContextBuilder('daily_briefing')
+        builder.add_fixed('analysis_date', data['analysis_date'])
+        builder.add_section(
+            'resources', data['resources']['details'], header=header('resources'),
+            score=lambda r: r['utilization'],
+            stats_fields=['utilization'], count_fields=['department', 'role']
+        )
+        builder.add_section(
+            'deadlines', data['deadlines']['details'], header=header('deadlines'),
+            score=lambda d: deadline_score(d['days_until']) + priority_score(d['priority']) + (0 if d['assigned_resources'] else 0.5),
+            stats_fields=['days_until'], count_fields=['project', 'status']
+        )
+        builder.add_section(
+            'projects', data['projects']['details'], header=header('projects'),
+            score=lambda p: deadline_score(p['days_until_deadline']) + (100 - p['completion']) / 100,
+            stats_fields=['completion', 'days_until_deadline'], count_fields=['status']
+        )
+        builder.add_section(
+            'unassigned_tasks', data['unassigned_tasks']['details'], header=header('unassigned_tasks'),
+            score=lambda t: deadline_score(t['days_until']) + priority_score(t['priority']),
+            stats_fields=['priority', 'days_until'], count_fields=['project']
+        )
+        return builder.build()
+    
+    def _create_dashboard_analysis_prompt(self, context_text: str) -> str:
         """Create prompt for dashboard analysis"""
         return f"""
 You are an expert resource management analyst providing daily briefings for a project management dashboard.
 
-Current Dashboard Data:
-{json.dumps(data, indent=2)}
+Current Dashboard Data (lists are ordered by urgency; "omitted" summarises entries left out):
+{context_text}
 
 Analyze this data and provide insights in the following format:
 
@@ -232,16 +391,16 @@ Respond with valid JSON in this exact format:
     ]
 }}
 """
-    def _create_enhanced_dashboard_analysis_prompt(self, data: Dict[str, Any], comprehensive_risks: List[Dict[str, Any]]) -> str:
+    def _create_enhanced_dashboard_analysis_prompt(self, context_text: str, comprehensive_risks: List[Dict[str, Any]]) -> str:
         """Create enhanced prompt including comprehensive risk analysis"""
         return f"""
 You are an expert resource management analyst providing daily briefings for a project management dashboard.
 
-Current Dashboard Data:
-{json.dumps(data, indent=2)}
+Current Dashboard Data (lists are ordered by urgency; "omitted" summarises entries left out):
+{context_text}
 
 Comprehensive Risk Analysis:
-{json.dumps(comprehensive_risks, indent=2)}
+{compact_json(comprehensive_risks)}
 
 Based on both the dashboard data and the comprehensive risk analysis, provide insights in the following format:
 
@@ -459,8 +618,9 @@ class NaturalLanguageInterfaceService:
             # Analyze query intent
             intent_data = self._analyze_query_intent(query_text)
             
-            # Check if this is a simple query or needs AI processing
-            if self._is_complex_query(query_text, intent_data):
+            # Check if this is a simple query or needs AI processing; while the
+            # AI service is unavailable every query gets the rule-based answer
+            if gemini_service.is_available() and self._is_complex_query(query_text, intent_data):
                 response = self._process_ai_query(query_text, user)
             else:
                 response = self._generate_query_response(query_text, intent_data)
@@ -490,6 +650,85 @@ class NaturalLanguageInterfaceService:
             logger.error(f"Error processing NLI query: {e}")
             return {"error": f"Failed to process query: {str(e)}"}
     
+    def stream_query(self, query_text: str, user: Optional[User] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process a natural language query, yielding the answer as it is generated
+        
+        Yields (event, data) pairs:
+            ('query', {'id'}) once the NLIQuery record exists,
+            ('token', {'text'}) for each piece of the answer,
+            ('done', {'id', 'response', 'execution_time'}) with the same
+            response process_query would return.
+        
+        The record is finalised by a background job after the last token, so
+        the stream ends without waiting for the write.
+        """
+        start_time = time.time()
+        intent_data = self._analyze_query_intent(query_text)
+        query_record = NLIQuery.objects.create(
+            query_text=query_text,
+            intent=intent_data.get('intent', ''),
+            entities=intent_data.get('entities', {}),
+            success=False,
+            user=user
+        )
+        yield 'query', {'id': query_record.id}
+        
+        response = {"error": "The response stream was closed before the answer was complete"}
+        try:
+            if gemini_service.is_available() and self._is_complex_query(query_text, intent_data):
+                response = yield from self._stream_ai_query(query_text)
+            else:
+                response = self._generate_query_response(query_text, intent_data)
+                yield 'token', {'text': response.get('text', '')}
+        except Exception as e:
+            logger.error(f"Error streaming NLI query: {e}")
+            response = {"error": f"Failed to process query: {str(e)}"}
+        finally:
+            execution_time = time.time() - start_time
+            jobs.enqueue(f'nli-query:{query_record.id}', self._finalize_query,
+                         query_record.id, response, execution_time)
+        
+        yield 'done', {'id': query_record.id, 'response': response, 'execution_time': execution_time}
+    
+    def _stream_ai_query(self, query_text: str):
+        """Yield ('token', ...) events from the model's streamed answer; returns the response"""
+        prepared = self._gather_query_context(query_text)
+        if prepared is None:
+            yield 'token', {'text': NO_QUERY_DATA_ANSWER}
+            return {"answer": NO_QUERY_DATA_ANSWER}
+        context_text, context_report = prepared
+        prompt = self._create_query_prompt(context_text, query_text, plain_text=True)
+        
+        chunks = []
+        for chunk in gemini_service.stream_content(prompt, temperature=0.3, cache_ttl=NLI_CACHE_TTL,
+                                                   feature='nli_query_stream'):
+            chunks.append(chunk)
+            yield 'token', {'text': chunk}
+        
+        text = ''.join(chunks).strip()
+        if not text:
+            logger.warning("Gemini returned no response")
+            yield 'token', {'text': AI_UNAVAILABLE_ANSWER}
+            return {"answer": AI_UNAVAILABLE_ANSWER}
+        return {
+            "text": text,
+            "data": [text],
+            "type": "ai_response",
+            "prompt_context": context_report,
+            "streamed": True
+        }
+    
+    def _finalize_query(self, query_id: int, response: Dict[str, Any], execution_time: float):
+        """Store the complete response of a streamed query"""
+        NLIQuery.objects.filter(id=query_id).update(
+            response_data=response,
+            response_text=response.get('text', ''),
+            execution_time=execution_time,
+            success=not response.get('error'),
+            error_message=response.get('error', '')
+        )
+    
     def _analyze_query_intent(self, query_text: str) -> Dict[str, Any]:
         """Analyze query to determine intent and entities"""
         # Simple keyword-based intent analysis (can be enhanced with ML)
@@ -544,8 +783,9 @@ class NaturalLanguageInterfaceService:
         query_lower = query_text.lower()
         looking_for_least = any(word in query_lower for word in ["least", "lowest", "underutilized", "not busy"])
         
+        current_utilization = utilization_engine.compute(resources)
         for resource in resources:
-            utilization = resource.current_utilization()
+            utilization = current_utilization[resource.id]
             available_resources.append({
                 "name": resource.name,
                 "role": resource.role,
@@ -583,8 +823,9 @@ class NaturalLanguageInterfaceService:
         resources = Resource.objects.all()
         overallocated_resources = []
         
+        current_utilization = utilization_engine.compute(resources)
         for resource in resources:
-            utilization = resource.current_utilization()
+            utilization = current_utilization[resource.id]
             if utilization > 100:
                 overallocated_resources.append({
                     "name": resource.name,
@@ -653,6 +894,7 @@ class NaturalLanguageInterfaceService:
         # Get all resources and calculate their activity level
         resources = Resource.objects.all()
         resource_activity = []
+        current_utilization = utilization_engine.compute(resources)
         
         for resource in resources:
             # Calculate activity based on current assignments and utilization
@@ -660,7 +902,7 @@ class NaturalLanguageInterfaceService:
                 resource=resource
             ).count()
             
-            utilization = resource.current_utilization()
+            utilization = current_utilization[resource.id]
             
             # Activity score combines number of assignments and utilization
             activity_score = (active_assignments * 20) + utilization
@@ -699,7 +941,7 @@ class NaturalLanguageInterfaceService:
     
     def _handle_project_query(self, query_text: str) -> Dict[str, Any]:
         """Handle project-related queries"""
-        projects = Project.objects.all()
+        projects = Project.objects.with_metrics()
         project_data = []
         
         for project in projects:
@@ -752,23 +994,41 @@ class NaturalLanguageInterfaceService:
         # Fallback: treat as simple only if intent is general
         return intent_data.get('intent', 'general') == 'general'
 
-    def _process_ai_query(self, query_text: str, user: Optional[User] = None) -> Dict[str, Any]:
-        """Send the user's query and full DB context to Gemini, restricting answer to context only."""
-        try:
-            # Gather all relevant context
-            context_data = self._gather_comprehensive_context()
-            context_data['current_date'] = str(timezone.now().date())
-            
-            # Check if we have any data
-            if not context_data.get('resources') and not context_data.get('projects') and not context_data.get('tasks'):
-                return {"answer": "I don't have access to any project data in the system yet. Please ensure resources, projects, and tasks are created in the system."}
-            
-            # Create a more focused prompt for conflict detection
-            prompt = f"""
+    def _gather_query_context(self, query_text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Prompt context for a query and its report, or None when there is no data yet"""
+        context_data = self._gather_comprehensive_context()
+        context_data['current_date'] = str(timezone.now().date())
+        
+        # Check if we have any data
+        if not context_data.get('resources') and not context_data.get('projects') and not context_data.get('tasks'):
+            return None
+        return self._build_prompt_context(context_data, query_text)
+    
+    def _create_query_prompt(self, context_text: str, query_text: str, plain_text: bool = False) -> str:
+        """
+        Prompt answering a query from the context only
+        
+        The answer is requested as JSON, or as plain text when it is streamed
+        to the user as it is generated.
+        """
+        if plain_text:
+            response_format = (
+                '8. Answer in plain text for the user to read: short paragraphs, "•" at the start of '
+                'list items, no JSON, markdown headings or code blocks.'
+            )
+        else:
+            response_format = (
+                '8. IMPORTANT: Respond with ONLY a valid JSON object. Do not wrap your response in ```json '
+                'blocks or any other formatting. Your entire response should be valid JSON that starts with '
+                '{ and ends with }.\n\n'
+                'Respond in JSON format: {"answer": "detailed response", "found_conflicts": true/false, '
+                '"data_summary": "what data was analyzed"}'
+            )
+        return f"""
 You are an intelligent project management assistant. Answer the user's question using ONLY the provided data below.
 
-SYSTEM DATA:
-{json.dumps(context_data, indent=2)}
+SYSTEM DATA (lists are ordered by relevance; "omitted" summarises entries left out):
+{context_text}
 
 USER QUESTION: "{query_text}"
 
@@ -802,18 +1062,26 @@ ANALYSIS INSTRUCTIONS:
 
 7. Always be specific with names, percentages, and dates from the actual data.
 
-8. IMPORTANT: Respond with ONLY a valid JSON object. Do not wrap your response in ```json blocks or any other formatting. Your entire response should be valid JSON that starts with {{ and ends with }}.
-
-Respond in JSON format: {{"answer": "detailed response", "found_conflicts": true/false, "data_summary": "what data was analyzed"}}
+{response_format}
 """
+    
+    def _process_ai_query(self, query_text: str, user: Optional[User] = None) -> Dict[str, Any]:
+        """Send the user's query and full DB context to Gemini, restricting answer to context only."""
+        try:
+            prepared = self._gather_query_context(query_text)
+            if prepared is None:
+                return {"answer": NO_QUERY_DATA_ANSWER}
+            context_text, context_report = prepared
+            prompt = self._create_query_prompt(context_text, query_text)
             
             # Call Gemini API with error handling
             logger.info(f"Sending query to Gemini: {query_text}")
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3, cache_ttl=NLI_CACHE_TTL,
+                                                                feature='nli_query')
             
             if not ai_response:
                 logger.warning("Gemini returned no response")
-                return {"answer": "The AI service is currently unavailable. Please try again later."}
+                return {"answer": AI_UNAVAILABLE_ANSWER}
               # Log the response for debugging
             logger.info(f"Gemini response type: {type(ai_response)}")
             logger.info(f"Gemini response: {ai_response}")
@@ -854,7 +1122,8 @@ Respond in JSON format: {{"answer": "detailed response", "found_conflicts": true
                         "data": answer if isinstance(answer, list) else [answer],
                         "type": "ai_response",
                         "data_summary": ai_response.get('data_summary', ''),
-                        "found_conflicts": ai_response.get('found_conflicts', False)
+                        "found_conflicts": ai_response.get('found_conflicts', False),
+                        "prompt_context": context_report
                     }
                 else:
                     # If it's a dict but no 'answer' field, convert the whole thing to answer
@@ -930,19 +1199,74 @@ Respond in JSON format: {{"answer": "detailed response", "found_conflicts": true
                 "type": "error"
             }
 
+    def _build_prompt_context(self, context_data: Dict[str, Any], query_text: str = '') -> Tuple[str, Dict[str, Any]]:
+        """
+        Fit the comprehensive context into the prompt token budget
+        
+        Entities named in the question come first, then overallocated
+        resources, close deadlines and high-priority or unassigned work. The
+        conflict lists are left out: the summary counts them and the entities
+        themselves rank first in their sections.
+        
+        Returns:
+            (compact JSON text, size report)
+        """
+        query = query_text.lower()
+        
+        def mentioned(*names):
+            for name in names:
+                if name and re.search(rf'\b{re.escape(str(name).lower())}\b', query):
+                    return 10.0
+            return 0.0
+        
+        utilization = {r['id']: r.get('utilization', 0) for r in context_data.get('resources', [])}
+        task_urgency = {
+            t['id']: deadline_score(t.get('days_until_deadline')) + priority_score(t.get('priority'))
+            for t in context_data.get('tasks', [])
+        }
+        
+        builder = PromptContextBuilder('nli_query')
+        builder.add_fixed('current_date', context_data.get('current_date'))
+        builder.add_fixed('summary', context_data.get('summary', {}))
+        builder.add_section(
+            'resources', context_data.get('resources', []),
+            score=lambda r: mentioned(r.get('name'), r.get('role'), r.get('department')) + r.get('utilization', 0) / 100,
+            stats_fields=['utilization', 'billable_hours', 'total_hours'], count_fields=['department', 'role']
+        )
+        builder.add_section(
+            'tasks', context_data.get('tasks', []),
+            score=lambda t: (mentioned(t.get('name'), t.get('project')) + task_urgency.get(t['id'], 0)
+                             + (0 if t.get('assigned_resources') else 0.5)),
+            stats_fields=['days_until_deadline'], count_fields=['status', 'project']
+        )
+        builder.add_section(
+            'projects', context_data.get('projects', []),
+            score=lambda p: (mentioned(p.get('name')) + deadline_score(p.get('days_until_deadline'))
+                             + (1 if p.get('is_over_budget') else 0) + (100 - (p.get('completion') or 0)) / 100),
+            stats_fields=['completion', 'days_until_deadline', 'actual_cost'], count_fields=['status']
+        )
+        builder.add_section(
+            'assignments', context_data.get('assignments', []),
+            score=lambda a: (mentioned(a.get('resource'), a.get('task'), a.get('project'))
+                             + utilization.get(a.get('resource_id'), 0) / 100 + task_urgency.get(a.get('task_id'), 0)),
+            stats_fields=['hours'], count_fields=['resource', 'project']
+        )
+        return builder.build()
+    
     def _gather_comprehensive_context(self) -> Dict[str, Any]:
         """Gather all relevant DB data for LLM context (resources, projects, tasks, assignments, deadlines, skills, risks)."""
         try:
             today = timezone.now().date()
             resources = Resource.objects.all()
-            projects = Project.objects.all()
+            projects = Project.objects.with_metrics()
             tasks = Task.objects.all()
             assignments = Assignment.objects.all()
               # Build context with error handling
             resource_data = []
+            current_utilization = utilization_engine.compute(resources)
             for r in resources:
                 try:
-                    utilization = r.current_utilization()
+                    utilization = current_utilization[r.id]
                     
                     # Try to get billable hours data
                     billable_hours = 0
@@ -1039,7 +1363,7 @@ Respond in JSON format: {{"answer": "detailed response", "found_conflicts": true
                         "start_date": p.start_date.isoformat() if p.start_date else None,
                         "end_date": p.end_date.isoformat() if p.end_date else None,
                         "days_until_deadline": (p.end_date - today).days if p.end_date else None,
-                        "task_count": tasks.filter(project=p).count(),
+                        "task_count": p.task_count,
                         "budget": float(budget) if budget else None,
                         "estimated_cost": estimated_cost,
                         "actual_cost": actual_cost,
@@ -1171,18 +1495,29 @@ Respond in JSON format: {{"answer": "detailed response", "found_conflicts": true
 class EnhancedRiskAnalysisService:
     """Advanced AI-powered risk analysis for diverse project scenarios"""
     
-    def analyze_comprehensive_risks(self, project_context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Identify all types of risks, not just resource-related ones"""
+    def analyze_comprehensive_risks(self, project_context: Dict[str, Any], context_text: Optional[str] = None,
+                                    force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Identify all types of risks, not just resource-related ones
+        
+        Args:
+            project_context: Context data used to tailor interventions
+            context_text: Prompt-ready (token-budgeted) rendering of the context;
+                the whole project_context is used when omitted
+            force_refresh: Ask the model again instead of using a cached answer
+        """
         
         if not gemini_service.is_available():
             return []
         
         try:
             # Create comprehensive risk analysis prompt
-            prompt = self._create_comprehensive_risk_prompt(project_context)
+            prompt = self._create_comprehensive_risk_prompt(context_text or compact_json(project_context))
             
             # Get AI analysis
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.4)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.4, cache_ttl=BRIEFING_CACHE_TTL,
+                                                                use_cache=not force_refresh,
+                                                                feature='risk_analysis')
             
             if not ai_response or 'risks' not in ai_response:
                 return []
@@ -1199,13 +1534,13 @@ class EnhancedRiskAnalysisService:
             logger.error(f"Error in comprehensive risk analysis: {e}")
             return []
     
-    def _create_comprehensive_risk_prompt(self, context: Dict[str, Any]) -> str:
+    def _create_comprehensive_risk_prompt(self, context_text: str) -> str:
         """Create prompt for comprehensive risk analysis"""
         return f"""
 You are an expert project management risk analyst. Analyze the following project context and identify ALL types of risks that could impact project success.
 
 Project Context:
-{json.dumps(context, indent=2)}
+{context_text}
 
 Analyze for these risk categories:
 1. RESOURCE & ALLOCATION: Team capacity, skill gaps, utilization issues
@@ -1664,7 +1999,8 @@ Respond with valid JSON in this exact format:
 """
             
             # Get AI recommendations
-            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+            ai_response = gemini_service.generate_json_response(prompt, temperature=0.3, cache_ttl=RECOMMENDATION_CACHE_TTL,
+                                                                feature='risk_recommendations')
             
             if not ai_response or 'recommendation' not in ai_response:
                 return {"error": "Failed to generate recommendation"}
@@ -1799,7 +2135,8 @@ Respond with valid JSON in this exact format:
             if gemini_service.is_available():
                 context_data = self._gather_comprehensive_context()
                 prompt = self._create_conflict_analysis_prompt(conflicts, context_data)
-                ai_response = gemini_service.generate_json_response(prompt, temperature=0.3)
+                ai_response = gemini_service.generate_json_response(prompt, temperature=0.3, cache_ttl=NLI_CACHE_TTL,
+                                                                    feature='conflict_analysis')
                 
                 if ai_response:
                     return {
@@ -1828,9 +2165,10 @@ Respond with valid JSON in this exact format:
         """Detect resource allocation conflicts"""
         conflicts = []
         resources = Resource.objects.all()
+        current_utilization = utilization_engine.compute(resources)
         
         for resource in resources:
-            utilization = resource.current_utilization()
+            utilization = current_utilization[resource.id]
             if utilization > 100:
                 # Get assignments for this overallocated resource
                 assignments = Assignment.objects.filter(resource=resource)
@@ -1898,18 +2236,18 @@ Respond with valid JSON in this exact format:
         conflicts = []
         
         # Find tasks with unmet skill requirements
-        tasks = Task.objects.filter(status__in=['not_started', 'in_progress'])
+        tasks = Task.objects.filter(status__in=['not_started', 'in_progress']).select_related(
+            'project'
+        ).prefetch_related('skills_required', 'assignments__resource')
+        # Skills held by the assigned resources come from the in-memory skill index
+        skills = skill_index.snapshot()
         
         for task in tasks:
-            required_skills = set(skill.name for skill in task.skills_required.all())
+            required = {skill.id: skill.name for skill in task.skills_required.all()}
+            required_skills = set(required.values())
             if required_skills:
-                # Get skills of assigned resources
-                assigned_skills = set()
-                for assignment in task.assignments.all():
-                    resource_skills = set(skill.name for skill in assignment.resource.skills.all())
-                    assigned_skills.update(resource_skills)
-                
-                missing_skills = required_skills - assigned_skills
+                team = skills.of(assignment.resource_id for assignment in task.assignments.all())
+                missing_skills = set(name for skill_id, name in required.items() if not skills.mask(skill_id) & team)
                 if missing_skills:
                     conflicts.append({
                         "type": "skill_gap",
@@ -1966,10 +2304,10 @@ Respond with valid JSON in this exact format:
 You are an expert project management consultant analyzing conflicts in a resource management system.
 
 DETECTED CONFLICTS:
-{json.dumps(conflicts, indent=2, default=str)}
+{compact_json(conflicts)}
 
 FULL PROJECT CONTEXT:
-{json.dumps(context_data, indent=2, default=str)}
+{compact_json(context_data)}
 
 ANALYSIS REQUIREMENTS:
 1. Analyze the severity and impact of each conflict
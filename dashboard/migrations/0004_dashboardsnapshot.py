@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-18 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_remove_intervention_add_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='default', max_length=50, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('data_version', models.CharField(blank=True, help_text='Data version the snapshot was built from', max_length=64)),
+                ('generated_at', models.DateTimeField()),
+                ('build_seconds', models.FloatField(default=0.0)),
+            ],
+        ),
+    ]
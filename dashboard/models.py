@@ -204,3 +204,21 @@ class AIInsight(models.Model):
         self.save()
 
 
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed dashboard metrics and chart data, rebuilt in the background
+    """
+    key = models.CharField(max_length=50, unique=True, default='default')
+    data = models.JSONField(default=dict)
+    data_version = models.CharField(max_length=64, blank=True, help_text='Data version the snapshot was built from')
+    generated_at = models.DateTimeField()
+    build_seconds = models.FloatField(default=0.0)
+    
+    def __str__(self):
+        return f"Dashboard snapshot {self.key} - {self.generated_at.strftime('%Y-%m-%d %H:%M')}"
+    
+    @property
+    def age(self):
+        """Time since the snapshot was generated"""
+        return timezone.now() - self.generated_at
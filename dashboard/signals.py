@@ -0,0 +1,58 @@
+"""
+Signal handlers that mark the dashboard snapshot out of date when the data
+it is built from changes, and publish change events to open dashboards
+"""
+from django.db.models.signals import post_delete, post_save
+
+from allocation.models import Assignment
+from core import events
+from projects.models import Project, Task
+from resources.models import Resource, ResourceAvailability
+from .models import AIInsight
+from .snapshot import dashboard_snapshots
+
+SNAPSHOT_SOURCES = (Resource, ResourceAvailability, Project, Task, Assignment)
+
+
+def invalidate_dashboard_snapshot(sender, raw=False, **kwargs):
+    """Bump the data version so the next dashboard view queues a rebuild"""
+    if not raw:
+        dashboard_snapshots.bump()
+
+
+for model in SNAPSHOT_SOURCES:
+    post_save.connect(invalidate_dashboard_snapshot, sender=model,
+                      dispatch_uid=f'dashboard_snapshot_save_{model.__name__}')
+    post_delete.connect(invalidate_dashboard_snapshot, sender=model,
+                        dispatch_uid=f'dashboard_snapshot_delete_{model.__name__}')
+
+
+def publish_assignment_event(sender, instance, raw=False, created=False, **kwargs):
+    """Tell open dashboards that an assignment was created, changed or removed"""
+    if raw:
+        return
+    action = 'deleted' if kwargs.get('signal') is post_delete else ('created' if created else 'updated')
+    events.publish('assignment', {
+        'id': instance.pk,
+        'resource_id': instance.resource_id,
+        'task_id': instance.task_id,
+        'action': action,
+    })
+
+
+def publish_insight_event(sender, instance, raw=False, created=False, **kwargs):
+    """Tell open dashboards about new or resolved AI insights"""
+    if raw:
+        return
+    events.publish('insight', {
+        'id': instance.pk,
+        'title': instance.title,
+        'severity': instance.severity,
+        'is_resolved': instance.is_resolved,
+        'created': created,
+    })
+
+
+post_save.connect(publish_assignment_event, sender=Assignment, dispatch_uid='events_assignment_save')
+post_delete.connect(publish_assignment_event, sender=Assignment, dispatch_uid='events_assignment_delete')
+post_save.connect(publish_insight_event, sender=AIInsight, dispatch_uid='events_insight_save')
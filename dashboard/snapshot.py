@@ -0,0 +1,184 @@
+"""
+Precomputed dashboard snapshot
+
+The dashboard's metrics and chart data are built in the background and stored
+as a DashboardSnapshot row, so a page view is a single lookup. A snapshot is
+served even when stale (stale-while-revalidate): if it is older than
+DASHBOARD_SNAPSHOT_TTL seconds, or the data version changed since it was built,
+a rebuild is queued and the next view gets the fresh one.
+
+The data version is a token in the cache that signal handlers replace whenever
+resources, projects, tasks, assignments or availability change.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from allocation.utilization import utilization_engine
+from core import events
+from core.jobs import jobs
+from projects.models import Project, Task
+from resources.models import Resource
+from .models import DashboardSnapshot
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = 'dashboard:data_version'
+DEFAULT_TTL = 300
+OPEN_TASK_STATUSES = ['not_started', 'in_progress', 'blocked']
+
+
+def _utilization_color(utilization: float) -> str:
+    if utilization > 100:
+        return "#e53e3e"
+    if utilization > 85:
+        return "#ed8936"
+    return "#48bb78"
+
+
+class DashboardSnapshotService:
+    """Build, store and serve the dashboard snapshot"""
+
+    job_key = 'dashboard-snapshot'
+
+    def __init__(self, key: str = 'default'):
+        self.key = key
+
+    def data_version(self) -> str:
+        """Current data version token"""
+        version = cache.get(DATA_VERSION_KEY)
+        if version is None:
+            cache.add(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(DATA_VERSION_KEY)
+        return version
+
+    def bump(self):
+        """Mark every existing snapshot as out of date"""
+        def _bump():
+            cache.set(DATA_VERSION_KEY, uuid.uuid4().hex, None)
+
+        _bump()
+        # Again on commit, so a snapshot built from the pre-commit state is not kept as fresh
+        transaction.on_commit(_bump)
+
+    def compute(self) -> Dict:
+        """Compute the dashboard data (JSON-serializable)"""
+        today = timezone.now().date()
+        last_week = timezone.now() - timedelta(days=7)
+
+        resources = list(Resource.objects.all())
+        utilization = utilization_engine.compute(resources)
+        utilizations = [utilization[r.id] for r in resources]
+
+        projects = list(
+            Project.objects.filter(status__in=['planning', 'active', 'on_hold']).with_metrics()
+        )
+
+        upcoming_deadlines = Task.objects.filter(
+            end_date__gte=today,
+            end_date__lte=today + timedelta(days=14),
+            status__in=OPEN_TASK_STATUSES
+        ).order_by('end_date').select_related('project')
+
+        return {
+            'total_resources': len(resources),
+            'total_projects': len(projects),
+            'overallocated_count': sum(1 for value in utilizations if value > 100),
+            'unassigned_tasks': Task.objects.filter(assignments=None, status__in=OPEN_TASK_STATUSES).count(),
+            'recent_projects': Project.objects.filter(created_at__gte=last_week).count(),
+            'completed_tasks_recent': Task.objects.filter(status='completed', updated_at__gte=last_week).count(),
+            'avg_utilization': round(sum(utilizations) / len(utilizations), 1) if utilizations else 0,
+            'resource_names': [r.name for r in resources],
+            'resource_utilizations': utilizations,
+            'resource_colors': [_utilization_color(value) for value in utilizations],
+            'project_names': [p.name for p in projects],
+            'project_completions': [p.completion for p in projects],
+            'upcoming_deadlines': [
+                {
+                    'id': task.id,
+                    'name': task.name,
+                    'project_name': task.project.name,
+                    'end_date': task.end_date.isoformat(),
+                }
+                for task in upcoming_deadlines
+            ],
+        }
+
+    def build(self) -> DashboardSnapshot:
+        """Compute and store a new snapshot"""
+        # Read the version first, so changes made during the build leave it stale
+        version = self.data_version()
+        started = time.monotonic()
+        data = self.compute()
+        snapshot, _ = DashboardSnapshot.objects.update_or_create(
+            key=self.key,
+            defaults={
+                'data': data,
+                'data_version': version,
+                'generated_at': timezone.now(),
+                'build_seconds': round(time.monotonic() - started, 3),
+            }
+        )
+        logger.info(f"Built dashboard snapshot in {snapshot.build_seconds}s")
+        events.publish('dashboard', {'generated_at': snapshot.generated_at.isoformat()})
+        return snapshot
+
+    def is_stale(self, snapshot: DashboardSnapshot) -> bool:
+        """Check whether a snapshot is past its TTL or built from older data"""
+        ttl = getattr(settings, 'DASHBOARD_SNAPSHOT_TTL', DEFAULT_TTL)
+        return snapshot.age > timedelta(seconds=ttl) or snapshot.data_version != self.data_version()
+
+    def schedule_rebuild(self):
+        """Rebuild the snapshot in the background"""
+        jobs.enqueue(f'{self.job_key}:{self.key}', self.build)
+
+    def get(self) -> DashboardSnapshot:
+        """
+        Get the snapshot to render, queueing a rebuild if it is stale
+
+        Only the very first request (no snapshot stored yet) builds inline.
+        """
+        snapshot = DashboardSnapshot.objects.filter(key=self.key).first()
+        if snapshot is None:
+            return self.build()
+        if self.is_stale(snapshot):
+            self.schedule_rebuild()
+        return snapshot
+
+    def context(self, snapshot: DashboardSnapshot) -> Dict:
+        """Template context for a snapshot"""
+        data = snapshot.data
+        today = timezone.now().date()
+        deadlines = []
+        for task in data.get('upcoming_deadlines', []):
+            end_date = date.fromisoformat(task['end_date'])
+            deadlines.append(dict(task, end_date=end_date, is_overdue=end_date < today))
+
+        return {
+            'total_resources': data.get('total_resources', 0),
+            'total_projects': data.get('total_projects', 0),
+            'overallocated_count': data.get('overallocated_count', 0),
+            'unassigned_tasks': data.get('unassigned_tasks', 0),
+            'recent_projects': data.get('recent_projects', 0),
+            'completed_tasks_recent': data.get('completed_tasks_recent', 0),
+            'avg_utilization': data.get('avg_utilization', 0),
+            'upcoming_deadlines': deadlines,
+            'resource_names_json': json.dumps(data.get('resource_names', [])),
+            'resource_utilizations_json': json.dumps(data.get('resource_utilizations', [])),
+            'resource_colors_json': json.dumps(data.get('resource_colors', [])),
+            'project_names_json': json.dumps(data.get('project_names', [])),
+            'project_completions_json': json.dumps(data.get('project_completions', [])),
+            'snapshot_generated_at': snapshot.generated_at,
+        }
+
+
+# Global instance
+dashboard_snapshots = DashboardSnapshotService()
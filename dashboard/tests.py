@@ -1,17 +1,30 @@
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import date, timedelta
 import json
 from decimal import Decimal
+from unittest.mock import patch
+import threading
+
+from asgiref.sync import sync_to_async
 
 from .models import (
     DashboardAIAnalysis, RiskCategory, DynamicRisk, 
-    AIRecommendation, AISearchQuery, AISearchResult
+    AIRecommendation, AISearchQuery, AISearchResult, DashboardSnapshot, NLIQuery
+)
+from .ai_services import (
+    BRIEFING_FLIGHT_KEY, BRIEFING_JOB_KEY, DashboardAIService, EnhancedRiskAnalysisService, nli_service
 )
+from .snapshot import dashboard_snapshots
+from utils.gemini_ai import GeminiAIService
+from utils.llm_backends import LocalBackend
+from utils.prompt_context import PromptContextBuilder, estimate_tokens
+from utils.single_flight import single_flight
 from projects.models import Project, Task
-from resources.models import Resource, Skill
+from resources.models import Resource, ResourceSkill, Skill
 from allocation.models import Assignment
 
 
@@ -601,3 +614,347 @@ class DashboardIntegrationTest(TestCase):
         estimated_capacity = resource_capacity * 4.3  # ~172 hours
         utilization_percentage = (120 / estimated_capacity) * 100
         self.assertLess(utilization_percentage, 100)  # Should be under 100%
+
+
+class DashboardSnapshotTest(TestCase):
+    """Test cases for the precomputed dashboard snapshot"""
+    
+    def setUp(self):
+        self.project = Project.objects.create(
+            name="Snapshot Project",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+            status='active'
+        )
+        self.task = Task.objects.create(
+            project=self.project,
+            name="Snapshot Task",
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=5),
+            estimated_hours=10,
+            status='not_started'
+        )
+        Resource.objects.create(name="Snapshot Resource", role="Developer", capacity=40)
+    
+    def test_first_request_builds_snapshot(self):
+        """Test that a missing snapshot is built and holds the dashboard data"""
+        snapshot = dashboard_snapshots.get()
+        
+        self.assertEqual(DashboardSnapshot.objects.count(), 1)
+        self.assertEqual(snapshot.data['total_projects'], 1)
+        self.assertEqual(snapshot.data['unassigned_tasks'], 1)
+        self.assertEqual(snapshot.data['upcoming_deadlines'][0]['name'], "Snapshot Task")
+        self.assertFalse(dashboard_snapshots.is_stale(snapshot))
+    
+    def test_stale_snapshot_is_served_while_rebuilding(self):
+        """Test that data changes mark the snapshot stale without blocking the read"""
+        snapshot = dashboard_snapshots.build()
+        Task.objects.create(
+            project=self.project, name="Another Task", start_date=date.today(),
+            end_date=date.today() + timedelta(days=2), estimated_hours=4, status='not_started'
+        )
+        
+        served = dashboard_snapshots.get()
+        self.assertEqual(served.pk, snapshot.pk)
+        self.assertEqual(served.data['unassigned_tasks'], 1)
+        self.assertTrue(dashboard_snapshots.is_stale(served))
+        
+        with self.settings(BACKGROUND_JOBS_EAGER=True):
+            dashboard_snapshots.get()
+        self.assertEqual(DashboardSnapshot.objects.get().data['unassigned_tasks'], 2)
+    
+    def test_snapshot_built_before_commit_is_stale(self):
+        """Test that a snapshot built while the writing transaction is open is stale once it commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(
+                project=self.project, name="Uncommitted Task", start_date=date.today(),
+                end_date=date.today() + timedelta(days=2), estimated_hours=4, status='not_started'
+            )
+            # A background build that reads the new version before the commit
+            snapshot = dashboard_snapshots.build()
+            self.assertFalse(dashboard_snapshots.is_stale(snapshot))
+        
+        self.assertTrue(dashboard_snapshots.is_stale(snapshot))
+    
+    def test_ttl_expiry_marks_stale(self):
+        """Test that snapshots older than the TTL are stale"""
+        snapshot = dashboard_snapshots.build()
+        snapshot.generated_at = timezone.now() - timedelta(seconds=301)
+        with self.settings(DASHBOARD_SNAPSHOT_TTL=300):
+            self.assertTrue(dashboard_snapshots.is_stale(snapshot))
+        with self.settings(DASHBOARD_SNAPSHOT_TTL=600):
+            self.assertFalse(dashboard_snapshots.is_stale(snapshot))
+
+
+class DashboardBriefingJobTest(TestCase):
+    """Test cases for generating the daily briefing off the request path"""
+    
+    def setUp(self):
+        cache.delete(BRIEFING_JOB_KEY)
+        self.service = DashboardAIService()
+    
+    def _store_briefing(self, age_hours=0):
+        analysis = DashboardAIAnalysis.objects.create(
+            analysis_type='daily_briefing',
+            summary="Stored briefing",
+            analysis_data={}
+        )
+        DashboardAIAnalysis.objects.filter(pk=analysis.pk).update(
+            created_at=timezone.now() - timedelta(hours=age_hours)
+        )
+        return analysis
+    
+    @patch('dashboard.ai_services.gemini_service.is_available', return_value=True)
+    def test_current_briefing_is_served_without_generation(self, _):
+        """Test that a recent briefing is rendered as is"""
+        analysis = self._store_briefing(age_hours=1)
+        with patch.object(DashboardAIService, 'generate_daily_briefing') as generate:
+            briefing = self.service.briefing_for_dashboard()
+        
+        generate.assert_not_called()
+        self.assertEqual(briefing['id'], analysis.id)
+        self.assertFalse(briefing.get('pending'))
+    
+    @patch('dashboard.ai_services.gemini_service.is_available', return_value=True)
+    def test_stale_briefing_is_served_while_regenerating(self, _):
+        """Test that an old briefing is returned at once and a new one is queued"""
+        analysis = self._store_briefing(age_hours=3)
+        with patch.object(DashboardAIService, 'generate_daily_briefing') as generate:
+            with self.captureOnCommitCallbacks() as callbacks:
+                briefing = self.service.briefing_for_dashboard()
+        
+        generate.assert_not_called()
+        self.assertEqual(briefing['id'], analysis.id)
+        self.assertTrue(briefing['pending'])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.service.get_briefing_job_status()['state'], 'pending')
+    
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    @patch('dashboard.ai_services.gemini_service.is_available', return_value=True)
+    def test_failed_generation_is_not_retried_on_every_view(self, _):
+        """Test that page views back off after a failed background briefing"""
+        failure = {"error": "AI service timed out"}
+        with patch.object(DashboardAIService, 'generate_daily_briefing', return_value=failure) as generate:
+            first = self.service.briefing_for_dashboard()
+            second = self.service.briefing_for_dashboard()
+        
+        self.assertEqual(generate.call_count, 1)
+        self.assertTrue(first['pending'])
+        self.assertIn("AI service timed out", second['error'])
+        self.assertEqual(self.service.get_briefing_job_status()['state'], 'failed')
+    @patch('dashboard.ai_services.gemini_service.is_available', return_value=True)
+    def test_concurrent_generation_is_shared(self, _):
+        """Test that a briefing another caller is generating is not generated again"""
+        token = single_flight.acquire(BRIEFING_FLIGHT_KEY)
+        other_result = {"id": 1, "summary": "Generated elsewhere"}
+        threading.Timer(0.1, single_flight.complete, args=(BRIEFING_FLIGHT_KEY, token, other_result)).start()
+        
+        with patch('dashboard.ai_services.gemini_service.generate_json_response') as generate:
+            briefing = self.service.generate_daily_briefing()
+        
+        generate.assert_not_called()
+        self.assertEqual(briefing, other_result)
+
+    @patch('dashboard.ai_services.gemini_service.is_available', return_value=True)
+    def test_forced_refresh_skips_the_response_cache(self, _):
+        """Test that a forced briefing asks the model again for the risks and the briefing"""
+        with patch('dashboard.ai_services.gemini_service.generate_json_response', return_value=None) as generate:
+            self.service.generate_daily_briefing(force_refresh=True)
+
+        features = [call.kwargs['feature'] for call in generate.call_args_list]
+        self.assertEqual(features, ['risk_analysis', 'daily_briefing'])
+        for call in generate.call_args_list:
+            self.assertFalse(call.kwargs['use_cache'])
+
+
+class DashboardEventStreamTest(TestCase):
+    """Test cases for the Server-Sent Events endpoint"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='streamer', password='testpass123')
+    
+    def test_requires_login(self):
+        """Test that anonymous requests are refused"""
+        response = self.client.get(reverse('event_stream'))
+        self.assertEqual(response.status_code, 401)
+    
+    def test_wsgi_requests_are_not_streamed(self):
+        """Test that WSGI requests get no stream, so they do not hold a worker"""
+        self.client.login(username='streamer', password='testpass123')
+        response = self.client.get(reverse('event_stream'))
+        self.assertEqual(response.status_code, 204)
+    
+    @override_settings(EVENT_STREAM_SECONDS=0)
+    async def test_stream_response(self):
+        """Test the stream headers and the reconnect hint"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('event_stream'), HTTP_LAST_EVENT_ID='3')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn('retry: ', body)
+
+
+@override_settings(LLM_CACHE_ENABLED=False, BACKGROUND_JOBS_EAGER=True)
+class NLIQueryStreamTest(TestCase):
+    """Test cases for streamed natural language answers"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='asker', password='testpass123')
+        Resource.objects.create(name="Busy", role="Developer")
+        self.service = GeminiAIService(backend=LocalBackend(latency_ms=0))
+        self.service.breaker.reset()
+    
+    def _events(self, response):
+        events = []
+        for block in b''.join(response.streaming_content).decode().strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((fields['event'], json.loads(fields['data'])))
+        return events
+    
+    def test_answer_is_streamed_then_stored(self):
+        """Test token events ahead of the full response, and the record finalised afterwards"""
+        self.client.login(username='asker', password='testpass123')
+        with patch('dashboard.ai_services.gemini_service', self.service):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('stream_nli_query'),
+                                            data=json.dumps({'query': 'Which resource is free?'}),
+                                            content_type='application/json')
+                events = self._events(response)
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], 'query')
+        self.assertEqual(names[-1], 'done')
+        self.assertGreater(names.count('token'), 1)
+        
+        answer = ''.join(data['text'] for name, data in events if name == 'token')
+        done = events[-1][1]
+        self.assertEqual(done['response']['text'], answer.strip())
+        self.assertTrue(done['response']['streamed'])
+        
+        query = NLIQuery.objects.get(id=done['id'])
+        self.assertTrue(query.success)
+        self.assertEqual(query.response_text, answer.strip())
+    
+    def test_rule_based_answer_when_ai_unavailable(self):
+        """Test that the stream still answers when the AI service cannot be used"""
+        self.service.breaker.reset()
+        with patch('dashboard.ai_services.gemini_service.is_available', return_value=False):
+            events = list(nli_service.stream_query('Which resource is free?', user=self.user))
+        
+        self.assertEqual([name for name, _ in events], ['query', 'token', 'done'])
+        self.assertNotIn('streamed', events[-1][1]['response'])
+    
+    def test_requires_query(self):
+        self.client.login(username='asker', password='testpass123')
+        response = self.client.post(reverse('stream_nli_query'), data=json.dumps({}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SkillConflictTest(TestCase):
+    """Test cases for skill gap detection"""
+    
+    def test_skill_gaps_of_assigned_resources(self):
+        """Test that only skills no assigned resource holds are reported missing"""
+        python = Skill.objects.create(name="Python")
+        aws = Skill.objects.create(name="AWS")
+        go = Skill.objects.create(name="Go")
+        developer = Resource.objects.create(name="Developer", role="Developer")
+        ops = Resource.objects.create(name="Ops", role="DevOps")
+        ResourceSkill.objects.create(resource=developer, skill=python, proficiency=8)
+        ResourceSkill.objects.create(resource=ops, skill=aws, proficiency=6)
+        project = Project.objects.create(name="Platform", start_date=date.today(), end_date=date.today() + timedelta(days=30))
+        covered = Task.objects.create(
+            project=project, name="Covered", start_date=date.today(),
+            end_date=date.today() + timedelta(days=5), estimated_hours=10
+        )
+        covered.skills_required.set([python, aws])
+        gap = Task.objects.create(
+            project=project, name="Gap", start_date=date.today(),
+            end_date=date.today() + timedelta(days=5), estimated_hours=10
+        )
+        gap.skills_required.set([python, aws, go])
+        for task in (covered, gap):
+            Assignment.objects.create(resource=developer, task=task, allocated_hours=5)
+            Assignment.objects.create(resource=ops, task=task, allocated_hours=5)
+        
+        conflicts = EnhancedRiskAnalysisService()._detect_skill_conflicts()
+        
+        self.assertEqual([conflict['task'] for conflict in conflicts], ["Gap"])
+        self.assertEqual(conflicts[0]['missing_skills'], ["Go"])
+        self.assertEqual(conflicts[0]['severity'], "medium")
+        self.assertEqual(sorted(conflicts[0]['assigned_resources']), ["Developer", "Ops"])
+
+
+class PromptContextBuilderTest(TestCase):
+    """Test cases for token-budgeted prompt context"""
+    
+    def _resources(self, count):
+        return [
+            {"id": i, "name": f"Resource {i}", "department": "Engineering" if i % 2 else "Design", "utilization": float(i)}
+            for i in range(count)
+        ]
+    
+    def test_small_context_is_complete_and_compact(self):
+        """Test that a context within budget is included in full without indentation"""
+        builder = PromptContextBuilder('test', token_budget=1000)
+        builder.add_fixed('analysis_date', '2024-01-01')
+        builder.add_section('resources', self._resources(3), score=lambda r: r['utilization'])
+        text, report = builder.build()
+        
+        data = json.loads(text)
+        self.assertNotIn('\n', text)
+        self.assertNotIn(': ', text)
+        self.assertEqual([r['id'] for r in data['resources']['details']], [2, 1, 0])
+        self.assertNotIn('omitted', data['resources'])
+        self.assertFalse(report['truncated'])
+        self.assertEqual(report['sections']['resources'], {'included': 3, 'total': 3})
+    
+    def test_large_context_is_ranked_and_summarised(self):
+        """Test that the most relevant entries are kept and the rest summarised"""
+        builder = PromptContextBuilder('test', token_budget=400)
+        builder.add_section('resources', self._resources(200), score=lambda r: r['utilization'],
+                            header={'total': 200}, stats_fields=['utilization'], count_fields=['department'])
+        text, report = builder.build()
+        
+        data = json.loads(text)
+        included = data['resources']['details']
+        omitted = data['resources']['omitted']
+        self.assertTrue(report['truncated'])
+        self.assertLessEqual(estimate_tokens(text), 400)
+        self.assertEqual(report['tokens'], estimate_tokens(text))
+        self.assertEqual(included[0]['utilization'], 199.0)
+        self.assertEqual(len(included) + omitted['count'], 200)
+        self.assertEqual(omitted['utilization']['max'], included[-1]['utilization'] - 1)
+        self.assertEqual(sum(omitted['by_department'].values()), omitted['count'])
+        self.assertEqual(data['resources']['total'], 200)
+    
+    def test_unused_budget_passes_to_later_sections(self):
+        """Test that a short section leaves its share to the next one"""
+        builder = PromptContextBuilder('test', token_budget=600)
+        builder.add_section('resources', self._resources(1))
+        builder.add_section('tasks', [{"id": i, "name": f"Task {i}"} for i in range(100)])
+        _, report = builder.build()
+        
+        self.assertEqual(report['sections']['resources']['included'], 1)
+        self.assertGreater(report['sections']['tasks']['included'], 40)
+    
+    def test_dashboard_context(self):
+        """Test building the briefing context from gathered dashboard data"""
+        Resource.objects.create(name="Busy", role="Developer")
+        Project.objects.create(name="Portal", start_date=date.today(), end_date=date.today() + timedelta(days=10))
+        service = DashboardAIService()
+        
+        text, report = service._build_prompt_context(service._gather_dashboard_data())
+        
+        data = json.loads(text)
+        self.assertEqual(data['resources']['details'][0]['name'], "Busy")
+        self.assertEqual(data['projects']['details'][0]['name'], "Portal")
+        self.assertEqual(report['name'], 'daily_briefing')
+
@@ -1,106 +1,42 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from asgiref.sync import sync_to_async
 import json
 from datetime import timedelta
 from resources.models import Resource
 from projects.models import Project, Task
 from allocation.models import Assignment
+from allocation.utilization import utilization_engine
 from dashboard.models import DashboardAIAnalysis, AIInsight
 from dashboard.ai_services import dashboard_ai_service, nli_service, enhanced_risk_service
+from dashboard.snapshot import dashboard_snapshots
+from core.events import EventStream, format_event
 
 @login_required
 def dashboard(request):
     """
     Dashboard view with overall resource utilization, project status, and AI insights.
     """
-    # Get all active resources
-    resources = Resource.objects.all()
+    # Metrics and chart data come from the precomputed snapshot; a stale one
+    # is still rendered while a rebuild runs in the background
+    snapshot = dashboard_snapshots.get()
     
-    # Calculate current utilization for all resources
-    for resource in resources:
-        resource.utilization = resource.current_utilization()
-      # Get active projects
-    projects = Project.objects.filter(status__in=['planning', 'active', 'on_hold'])
-    
-    # Get upcoming deadlines (tasks due in the next 14 days)
-    today = timezone.now().date()
-    upcoming_deadlines = Task.objects.filter(
-        end_date__gte=today,
-        end_date__lte=today + timedelta(days=14),
-        status__in=['not_started', 'in_progress', 'blocked']
-    ).order_by('end_date').select_related('project')
-    
-    # Get overallocated resources
-    overallocated_resources = [r for r in resources if r.utilization > 100]
-    
-    # Get unassigned tasks
-    unassigned_tasks = Task.objects.filter(
-        assignments=None,
-        status__in=['not_started', 'in_progress', 'blocked']
-    ).count()
-    
-    # Calculate some trending data for enhanced metrics
-    last_week = today - timedelta(days=7)
-    
-    # Count projects created in the last week
-    recent_projects = Project.objects.filter(
-        created_at__gte=last_week
-    ).count() if hasattr(Project, 'created_at') else 0
-    
-    # Count tasks completed in the last week
-    completed_tasks_recent = Task.objects.filter(
-        status='completed',
-        updated_at__gte=last_week
-    ).count() if hasattr(Task, 'updated_at') else 0
-    
-    # Calculate average utilization
-    avg_utilization = sum(r.utilization for r in resources) / len(resources) if resources else 0
-    
-    # Prepare data for charts
-    resource_names = [r.name for r in resources]
-    resource_utilizations = [r.utilization for r in resources]
-    
-    project_names = [p.name for p in projects]
-    project_completions = [p.completion for p in projects]
-    
-    # Create chart colors based on utilization
-    resource_colors = []
-    for r in resources:
-        if r.utilization > 100:
-            resource_colors.append("#e53e3e")
-        elif r.utilization > 85:
-            resource_colors.append("#ed8936")
-        else:
-            resource_colors.append("#48bb78")
-    
-    # Get AI analysis for dashboard
-    ai_analysis = dashboard_ai_service.generate_daily_briefing()
+    # Last stored AI briefing; a new one is generated in the background and
+    # picked up by the page through polling
+    ai_analysis = dashboard_ai_service.briefing_for_dashboard()
     
     # Add AI data to context
-    context = {
-        'resources': resources,
-        'projects': projects,
-        'upcoming_deadlines': upcoming_deadlines,
-        'overallocated_resources': overallocated_resources,
-        'unassigned_tasks': unassigned_tasks,
-        'total_resources': resources.count(),
-        'total_projects': projects.count(),
-        'recent_projects': recent_projects,
-        'completed_tasks_recent': completed_tasks_recent,
-        'avg_utilization': round(avg_utilization, 1),
-        # Add these for the charts as JSON strings
-        'resource_names_json': json.dumps(resource_names),
-        'resource_utilizations_json': json.dumps(resource_utilizations),
-        'resource_colors_json': json.dumps(resource_colors),
-        'project_names_json': json.dumps(project_names),
-        'project_completions_json': json.dumps(project_completions),
+    context = dashboard_snapshots.context(snapshot)
+    context.update({
         'ai_analysis': ai_analysis,
         'has_ai_service': True,
-    }
+    })
     
     return render(request, 'dashboard/dashboard.html', context)
 
@@ -146,18 +82,95 @@ def process_nli_query(request):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+async def _iterate_in_thread(iterator):
+    """Serve a blocking iterator asynchronously, one item per worker thread call"""
+    done = object()
+    while True:
+        item = await sync_to_async(next)(iterator, done)
+        if item is done:
+            return
+        yield item
+
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+def stream_nli_query(request):
+    """
+    Streaming variant of process_nli_query
+    
+    Returns text/event-stream: a 'query' event with the record id, 'token'
+    events with pieces of the answer as the model generates them, and a 'done'
+    event with the complete response (as process_nli_query returns it).
+    Read it with fetch(); EventSource cannot send the POST body.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    query_text = data.get('query', '')
+    if not query_text:
+        return JsonResponse({"error": "Query text is required"}, status=400)
+    
+    events = (
+        format_event({'id': number, 'type': event, 'data': payload})
+        for number, (event, payload) in enumerate(nli_service.stream_query(query_text, user=request.user), 1)
+    )
+    if isinstance(request, ASGIRequest):
+        events = _iterate_in_thread(events)
+    
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 @require_http_methods(["POST"])
 def refresh_ai_analysis(request):
     """
     API endpoint to refresh AI analysis
+    
+    Queues a new briefing and returns immediately; poll get_ai_analysis for
+    the result.
     """
     try:
-        ai_analysis = dashboard_ai_service.generate_daily_briefing(force_refresh=True)
-        return JsonResponse(ai_analysis)
+        dashboard_ai_service.request_daily_briefing()
+        return JsonResponse({
+            "status": "pending",
+            "job": dashboard_ai_service.get_briefing_job_status(),
+        }, status=202)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def event_stream(request):
+    """
+    Server-Sent Events stream of briefing, insight, assignment, utilization
+    and dashboard snapshot changes
+    
+    Only served under ASGI, where the stream is asynchronous and stays open
+    for EVENT_STREAM_SECONDS before the browser reconnects and resumes from
+    the Last-Event-ID header. Under WSGI an open stream would hold a worker
+    for as long as the page is open, so the answer is 204 No Content, which
+    stops the browser reconnecting; the page polls instead.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    stream = EventStream(last_event_id, getattr(settings, 'EVENT_STREAM_SECONDS', 300))
+    # StreamingHttpResponse would pick the blocking __iter__ of the stream
+    response = StreamingHttpResponse(stream.__aiter__(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 @require_http_methods(["POST"])
 def resolve_insight(request, insight_id):
@@ -197,13 +210,14 @@ def get_project_resources(request):
         except Project.DoesNotExist:
             return JsonResponse({"error": "Project not found"}, status=404)
     
+    utilization = utilization_engine.compute(resources)
     resources_data = []
     for resource in resources:
         resources_data.append({
             'id': resource.id,
             'name': resource.name,
             'role': resource.role,
-            'current_utilization': resource.current_utilization(),
+            'current_utilization': utilization[resource.id],
             'hourly_rate': float(resource.hourly_rate) if hasattr(resource, 'hourly_rate') and resource.hourly_rate else 50.0,
             'skills': [skill.name for skill in resource.skills.all()] if hasattr(resource, 'skills') else []
         })
@@ -272,7 +286,8 @@ def get_ai_analysis(request):
                 "recommendations": latest_analysis.recommendations,
                 "confidence_score": latest_analysis.confidence_score,
                 "created_at": latest_analysis.created_at.isoformat(),
-                "is_fresh": is_fresh
+                "is_fresh": is_fresh,
+                "job": dashboard_ai_service.get_briefing_job_status(),
             })
         else:
             # If no analysis exists, return basic structure
@@ -282,7 +297,8 @@ def get_ai_analysis(request):
                 "recommendations": [],
                 "confidence_score": 0.0,
                 "created_at": timezone.now().isoformat(),
-                "is_fresh": False
+                "is_fresh": False,
+                "job": dashboard_ai_service.get_briefing_job_status(),
             })
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
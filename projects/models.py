@@ -1,7 +1,86 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.contrib.auth.models import User
 from django.utils import timezone
-from resources.models import Skill
+from resources.models import Skill, TimeEntry
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _project_total(queryset, project_field, expression, output_field):
+    """Correlated subquery totalling expression over rows of one project"""
+    totals = (
+        queryset.filter(**{project_field: OuterRef('pk')})
+        .order_by()
+        .values(project_field)
+        .annotate(total=expression)
+        .values('total')
+    )
+    return Subquery(totals, output_field=output_field)
+
+
+class ProjectQuerySet(models.QuerySet):
+    def with_metrics(self):
+        """
+        Annotate task and cost metrics computed in SQL
+        
+        Adds task_count, total_estimated_hours, completion_percentage,
+        estimated_cost, actual_hours, actual_cost and budget_variance, so a
+        list of projects needs one query however many tasks, assignments and
+        time entries they have. The get_* methods return these values when
+        present.
+        """
+        from allocation.models import Assignment
+        
+        tasks = Task.objects.all()
+        weighted_completion = Cast(Sum(F('estimated_hours') * F('completion_percentage')), FloatField())
+        
+        return self.annotate(
+            task_count=Coalesce(
+                _project_total(tasks, 'project', Count('pk'), models.IntegerField()), 0
+            ),
+            total_estimated_hours=Coalesce(
+                _project_total(tasks, 'project', Sum('estimated_hours'), models.IntegerField()), 0
+            ),
+            completion_percentage=Coalesce(
+                _project_total(
+                    tasks, 'project',
+                    weighted_completion / NullIf(Sum('estimated_hours'), 0),
+                    FloatField()
+                ),
+                Value(0.0)
+            ),
+            estimated_cost=Coalesce(
+                _project_total(
+                    Assignment.objects.all(), 'task__project',
+                    Sum(F('allocated_hours') * F('resource__cost_per_hour'), output_field=MONEY),
+                    MONEY
+                ),
+                Value(Decimal('0')), output_field=MONEY
+            ),
+            actual_hours=Coalesce(
+                _project_total(TimeEntry.objects.all(), 'task__project', Sum('hours'), MONEY),
+                Value(Decimal('0')), output_field=MONEY
+            ),
+            actual_cost=Coalesce(
+                _project_total(
+                    TimeEntry.objects.all(), 'task__project',
+                    Sum(F('hours') * F('resource__cost_per_hour'), output_field=MONEY),
+                    MONEY
+                ),
+                Value(Decimal('0')), output_field=MONEY
+            ),
+        ).annotate(
+            budget_variance=models.Case(
+                models.When(Q(budget__isnull=True) | Q(budget=0), then=Value(None)),
+                default=F('budget') - F('actual_cost'),
+                output_field=MONEY
+            )
+        )
+
 
 class Project(models.Model):
     name = models.CharField(max_length=100)
@@ -22,11 +101,15 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProjectQuerySet.as_manager()
+    
     def __str__(self):
         return self.name
     
     def get_completion_percentage(self):
         """Calculate the project completion percentage based on weighted tasks and partial completion."""
+        if hasattr(self, 'completion_percentage'):  # annotated by with_metrics()
+            return round(self.completion_percentage, 1)
         tasks = self.tasks.all()
         if not tasks:
             return 0
@@ -48,6 +131,8 @@ class Project(models.Model):
     
     def get_estimated_cost(self):
         """Calculate estimated cost based on allocated resources"""
+        if hasattr(self, 'estimated_cost'):
+            return self.estimated_cost
         total_cost = 0
         for assignment in self.get_all_assignments():
             if assignment.resource.cost_per_hour:
@@ -56,6 +141,8 @@ class Project(models.Model):
     
     def get_actual_cost(self):
         """Calculate actual cost based on time entries"""
+        if hasattr(self, 'actual_cost'):
+            return self.actual_cost
         total_cost = 0
         for task in self.tasks.all():
             for time_entry in task.time_entries.all():
@@ -70,6 +157,8 @@ class Project(models.Model):
     
     def get_budget_variance(self):
         """Calculate budget variance (positive = under budget, negative = over budget)"""
+        if hasattr(self, 'budget_variance'):
+            return self.budget_variance
         if not self.budget:
             return None
         return self.budget - self.get_actual_cost()
@@ -1,8 +1,11 @@
 from django.test import TestCase
 from projects.models import Project, Task
+from resources.models import Resource, TimeEntry
+from allocation.models import Assignment
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 
 class ProjectModelTests(TestCase):
     def setUp(self):
@@ -44,4 +47,74 @@ class ProjectModelTests(TestCase):
         )
         
         # 1 of 2 tasks completed = 50%
-        self.assertEqual(self.project.get_completion_percentage(), 50)
\ No newline at end of file
+        self.assertEqual(self.project.get_completion_percentage(), 50)
+
+
+class ProjectMetricsTests(TestCase):
+    """Project.objects.with_metrics() must match the per-object methods"""
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.resource = Resource.objects.create(name='Dev', role='Developer', cost_per_hour=Decimal('50.00'))
+        self.project = Project.objects.create(
+            name='Costed Project',
+            start_date=self.today,
+            end_date=self.today + timedelta(days=30),
+            budget=Decimal('1000.00')
+        )
+        self.empty = Project.objects.create(
+            name='Empty Project',
+            start_date=self.today,
+            end_date=self.today + timedelta(days=30)
+        )
+        first = Task.objects.create(
+            project=self.project, name='First', start_date=self.today,
+            end_date=self.today + timedelta(days=5), estimated_hours=10, completion_percentage=50
+        )
+        second = Task.objects.create(
+            project=self.project, name='Second', start_date=self.today,
+            end_date=self.today + timedelta(days=5), estimated_hours=30, completion_percentage=20
+        )
+        Assignment.objects.create(resource=self.resource, task=first, allocated_hours=8)
+        TimeEntry.objects.create(resource=self.resource, task=second, date=self.today, hours=Decimal('2.50'))
+        TimeEntry.objects.create(resource=self.resource, task=second, date=self.today - timedelta(days=1), hours=Decimal('1.50'))
+
+    def test_annotations_match_methods(self):
+        """Test annotated values against the unannotated calculations"""
+        for plain in Project.objects.all():
+            annotated = Project.objects.with_metrics().get(pk=plain.pk)
+            self.assertEqual(annotated.get_completion_percentage(), plain.get_completion_percentage())
+            self.assertEqual(annotated.get_estimated_cost(), plain.get_estimated_cost())
+            self.assertEqual(annotated.get_actual_cost(), plain.get_actual_cost())
+            self.assertEqual(annotated.get_budget_variance(), plain.get_budget_variance())
+
+    def test_annotated_values(self):
+        """Test the totals for a project with tasks, assignments and time entries"""
+        project = Project.objects.with_metrics().get(pk=self.project.pk)
+        self.assertEqual(project.task_count, 2)
+        self.assertEqual(project.total_estimated_hours, 40)
+        self.assertEqual(project.completion, 27.5)
+        self.assertEqual(project.estimated_cost, Decimal('400'))
+        self.assertEqual(project.actual_hours, Decimal('4'))
+        self.assertEqual(project.actual_cost, Decimal('200'))
+        self.assertEqual(project.budget_variance, Decimal('800'))
+
+        empty = Project.objects.with_metrics().get(pk=self.empty.pk)
+        self.assertEqual((empty.task_count, empty.completion), (0, 0))
+        self.assertIsNone(empty.budget_variance)
+
+    def test_single_query(self):
+        """Test that the metrics for many projects take one query"""
+        for index in range(5):
+            project = Project.objects.create(
+                name=f'Project {index}', start_date=self.today, end_date=self.today + timedelta(days=10)
+            )
+            Task.objects.create(
+                project=project, name='Task', start_date=self.today,
+                end_date=self.today + timedelta(days=5), estimated_hours=5
+            )
+
+        with self.assertNumQueries(1):
+            projects = list(Project.objects.with_metrics())
+            [(p.completion, p.get_estimated_cost(), p.get_actual_cost(), p.get_budget_variance()) for p in projects]
+
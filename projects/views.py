@@ -7,14 +7,14 @@ from .forms import ProjectForm, TaskForm
 @login_required
 def project_list(request):
     """List all projects"""
-    projects = Project.objects.all()
+    projects = Project.objects.with_metrics()
     
     return render(request, 'projects/project_list.html', {'projects': projects})
 
 @login_required
 def project_detail(request, pk):
     """Detail view for a project"""
-    project = get_object_or_404(Project, pk=pk)
+    project = get_object_or_404(Project.objects.with_metrics(), pk=pk)
     tasks = project.tasks.all()
     
     return render(request, 'projects/project_detail.html', {
@@ -3,6 +3,10 @@ ASGI config for resourcepro project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module (e.g. ``uvicorn resourcepro.asgi:application``)
+to keep the dashboard's Server-Sent Events stream open without tying up a worker
+thread per browser.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -37,6 +37,84 @@ ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1,0.0.0.0,tes
 # Gemini AI Configuration
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
 
+# LLM backend (utils.llm_backends): 'gemini', 'local' - a deterministic offline
+# stand-in returning canned JSON after LLM_LOCAL_LATENCY_MS, failing at
+# LLM_LOCAL_ERROR_RATE, for benchmarks - or a dotted path to a backend class
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+LLM_LOCAL_LATENCY_MS = int(os.environ.get('LLM_LOCAL_LATENCY_MS', 800))
+LLM_LOCAL_ERROR_RATE = float(os.environ.get('LLM_LOCAL_ERROR_RATE', 0.0))
+
+# Approximate token budget for the data embedded in each LLM prompt
+# (utils.prompt_context); the least relevant entries are summarised beyond it
+LLM_CONTEXT_TOKEN_BUDGET = int(os.environ.get('LLM_CONTEXT_TOKEN_BUDGET', 6000))
+
+# Persistent LLM response cache (utils.llm_cache): identical prompts are
+# answered from the database for the call site's TTL (default below); the
+# least recently used responses are evicted beyond LLM_CACHE_MAX_ENTRIES
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+LLM_CACHE_DEFAULT_TTL = 6 * 3600
+LLM_CACHE_MAX_ENTRIES = 1000
+
+# Every LLM call must finish within LLM_TIMEOUT_SECONDS, retries included;
+# transient failures are retried up to LLM_MAX_RETRIES times with jittered
+# exponential backoff. After LLM_BREAKER_FAILURE_THRESHOLD consecutive failed
+# calls the circuit opens and AI features use their non-AI fallbacks for
+# LLM_BREAKER_RESET_SECONDS before a trial call (utils.circuit_breaker)
+LLM_TIMEOUT_SECONDS = int(os.environ.get('LLM_TIMEOUT_SECONDS', 30))
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF_SECONDS = 0.5
+LLM_BREAKER_FAILURE_THRESHOLD = 5
+LLM_BREAKER_RESET_SECONDS = 60
+
+# Every LLM call is recorded per feature - prompt and response size, latency,
+# cache outcome, failures (utils.llm_telemetry); `manage.py llm_metrics` and
+# /api/v1/ai/metrics/ report percentiles. Records are kept for
+# LLM_TELEMETRY_RETENTION_DAYS, at most LLM_TELEMETRY_MAX_RECORDS of them.
+LLM_TELEMETRY_ENABLED = os.environ.get('LLM_TELEMETRY_ENABLED', 'True').lower() == 'true'
+LLM_TELEMETRY_RETENTION_DAYS = 7
+LLM_TELEMETRY_MAX_RECORDS = 50000
+
+# Gemini calls a batch operation (e.g. bulk auto-assign) makes at once
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+
+# Concurrent requests for the same expensive AI result (daily briefing, task
+# allocation suggestions) share one computation (utils.single_flight); the
+# computing caller's lock expires after this many seconds if it dies. Needs a
+# shared cache backend to coalesce across processes.
+SINGLE_FLIGHT_LOCK_SECONDS = 180
+
+# Seconds a process keeps its skill index (resources.skill_index) when the
+# default cache is not shared, so changes saved by other processes are seen
+SKILL_INDEX_MAX_AGE = 60
+
+# Bulk auto-assign with "mode": "solver" (allocation.solver) only assigns a
+# resource holding at least this share of a task's required skills
+AUTO_ASSIGN_MIN_SKILL_MATCH = 0.5
+
+# Business calendar: holiday dates (YYYY-MM-DD) by Resource.location.
+# Dates under 'default' apply to every location.
+BUSINESS_HOLIDAYS = {
+    'default': [],
+}
+
+# Background jobs (core.jobs): worker threads, or run inline when eager
+BACKGROUND_JOB_WORKERS = int(os.environ.get('BACKGROUND_JOB_WORKERS', 2))
+BACKGROUND_JOBS_EAGER = False
+
+# Seconds before today's utilization snapshot is refreshed on the next dashboard
+# view. Assignment changes refresh it immediately; schedule
+# `manage.py update_utilization --today-only` to keep it current without traffic.
+UTILIZATION_SNAPSHOT_MAX_AGE = 3600
+
+# Seconds a precomputed dashboard snapshot is served before a background
+# rebuild is queued; data changes queue one immediately
+DASHBOARD_SNAPSHOT_TTL = int(os.environ.get('DASHBOARD_SNAPSHOT_TTL', 300))
+
+# Server-Sent Events (/dashboard/api/events/): seconds a stream stays open
+# before the browser reconnects. Only served through resourcepro.asgi; under
+# WSGI an open stream would hold a worker, so pages poll instead.
+EVENT_STREAM_SECONDS = 300
+
 
 # Application definition
 
@@ -218,14 +296,25 @@ CORS_ALLOWED_HEADERS = [
     'x-requested-with',
 ]
 
-# API Rate Limiting (if needed)
-# Uncomment and configure as needed
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-#         'LOCATION': 'unique-snowflake',
-#     }
-# }
+# Default cache. The utilization cache (allocation.utilization) and the skill
+# index (resources.skill_index) keep data versions in it, bumped by whichever
+# process changes the data: web workers, background jobs, management commands.
+# Set REDIS_URL (needs the redis package) so every process shares them; the
+# local-memory fallback is per process, so utilization is then always computed
+# instead of cached and skill indexes are rebuilt after SKILL_INDEX_MAX_AGE.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Security settings for API
 SECURE_CROSS_ORIGIN_OPENER_POLICY = 'same-origin-allow-popups'
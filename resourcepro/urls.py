@@ -32,6 +32,7 @@ urlpatterns = [
     path('demo/', include('demo_data.urls', namespace='demo_data')),
     # Global AI Search endpoint (page-agnostic)
     path('api/ai-search/', dashboard_views.process_nli_query, name='global_ai_search'),
+    path('api/ai-search/stream/', dashboard_views.stream_nli_query, name='global_ai_search_stream'),
 ]
 
 if settings.DEBUG:
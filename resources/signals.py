@@ -0,0 +1,35 @@
+"""
+Signal handlers that keep the skill index (resources.skill_index) in sync with
+resources and their skills
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Resource, ResourceSkill
+from .skill_index import skill_index
+
+
+@receiver(post_save, sender=ResourceSkill)
+@receiver(post_delete, sender=ResourceSkill)
+def invalidate_skill_index_for_skill(sender, instance, raw=False, **kwargs):
+    """A resource gained, lost or changed proficiency in a skill"""
+    skill_index.invalidate()
+
+
+@receiver(post_save, sender=Resource)
+def invalidate_skill_index_for_new_resource(sender, instance, created, raw=False, **kwargs):
+    """New resources need a position in the index"""
+    if created:
+        skill_index.invalidate()
+
+
+@receiver(post_delete, sender=Resource)
+def invalidate_skill_index_for_deleted_resource(sender, instance, **kwargs):
+    skill_index.invalidate()
+
+
+@receiver(m2m_changed, sender=Resource.skills.through)
+def invalidate_skill_index_for_skill_set(sender, instance, action, **kwargs):
+    """resource.skills.add/remove/set/clear bulk-write ResourceSkill rows without post_save"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        skill_index.invalidate()
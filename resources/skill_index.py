@@ -0,0 +1,188 @@
+"""
+In-memory skill → resource index
+
+Holds, for every skill and proficiency level, the set of resources having the
+skill at that level or above as a bitset (a Python int with one bit per
+resource). "Resources with all / any of these skills at proficiency ≥ p" is
+then an AND / OR of a few integers instead of a join over ResourceSkill.
+
+The index is built per process from one ResourceSkill query and rebuilt on
+first use after a change. Changes are detected through a version kept in the
+default cache, replaced by the signal handlers in resources.signals. Only a
+cache shared by every process (see CACHES in settings) carries another
+process's changes; with the per-process local-memory cache an index is also
+rebuilt once it is SKILL_INDEX_MAX_AGE seconds old. Bulk writes that bypass
+signals (QuerySet.update, bulk_create) must call skill_index.invalidate().
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.utils import cache_is_shared
+
+MIN_PROFICIENCY = 1
+MAX_PROFICIENCY = 10
+VERSION_KEY = 'skill_index:version'
+DEFAULT_MAX_AGE = 60
+
+
+class _Snapshot:
+    """Bitsets for one version of the resource skills"""
+
+    def __init__(self, version: str, resource_ids: List[int], rows: Iterable[tuple]):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.resource_ids = resource_ids
+        self.positions = {resource_id: position for position, resource_id in enumerate(resource_ids)}
+        self.universe = (1 << len(resource_ids)) - 1
+        # masks[skill_id][p - 1]: resources with the skill at proficiency ≥ p
+        self.masks: Dict[int, List[int]] = {}
+        self.proficiencies: Dict[int, Dict[int, int]] = defaultdict(dict)
+
+        levels = defaultdict(lambda: [0] * MAX_PROFICIENCY)
+        for resource_id, skill_id, proficiency in rows:
+            position = self.positions.get(resource_id)
+            if position is None:
+                continue
+            proficiency = min(max(proficiency or MIN_PROFICIENCY, MIN_PROFICIENCY), MAX_PROFICIENCY)
+            levels[skill_id][proficiency - 1] |= 1 << position
+            self.proficiencies[resource_id][skill_id] = proficiency
+        for skill_id, exact in levels.items():
+            # Cumulate from the top so level p includes everyone above it
+            masks, running = [0] * MAX_PROFICIENCY, 0
+            for level in range(MAX_PROFICIENCY - 1, -1, -1):
+                running |= exact[level]
+                masks[level] = running
+            self.masks[skill_id] = masks
+
+    def mask(self, skill_id: int, min_proficiency: int = MIN_PROFICIENCY) -> int:
+        """Bitset of resources having the skill at min_proficiency or above"""
+        masks = self.masks.get(skill_id)
+        if masks is None or min_proficiency > MAX_PROFICIENCY:
+            return 0
+        return masks[max(min_proficiency, MIN_PROFICIENCY) - 1]
+
+    def all_of(self, skill_ids: Iterable[int], min_proficiency: int = MIN_PROFICIENCY) -> int:
+        """Bitset of resources having every one of the skills (all resources for none)"""
+        mask = self.universe
+        for skill_id in set(skill_ids):
+            mask &= self.mask(skill_id, min_proficiency)
+            if not mask:
+                break
+        return mask
+
+    def any_of(self, skill_ids: Iterable[int], min_proficiency: int = MIN_PROFICIENCY) -> int:
+        """Bitset of resources having at least one of the skills"""
+        mask = 0
+        for skill_id in set(skill_ids):
+            mask |= self.mask(skill_id, min_proficiency)
+        return mask
+
+    def of(self, resource_ids: Iterable[int]) -> int:
+        """Bitset of the given resources"""
+        mask = 0
+        for resource_id in resource_ids:
+            position = self.positions.get(resource_id)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def ids(self, mask: int) -> List[int]:
+        """Resource IDs of the bits set in a bitset, in ID order"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.resource_ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+class SkillIndex:
+    """Process-wide skill → resource bitsets, rebuilt when resource skills change"""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def _version(self) -> str:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # add() keeps a version another process created in the meantime
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _is_current(self, snapshot: Optional[_Snapshot], version: str) -> bool:
+        if snapshot is None or snapshot.version != version:
+            return False
+        if cache_is_shared():
+            return True
+        # Other processes' changes never reach a per-process cache
+        return time.monotonic() - snapshot.built_at < getattr(settings, 'SKILL_INDEX_MAX_AGE', DEFAULT_MAX_AGE)
+
+    def _current(self) -> _Snapshot:
+        version = self._version()
+        snapshot = self._snapshot
+        if self._is_current(snapshot, version):
+            return snapshot
+        with self._lock:
+            if not self._is_current(self._snapshot, version):
+                self._snapshot = self._build(version)
+            return self._snapshot
+
+    def _build(self, version: str) -> _Snapshot:
+        from .models import Resource, ResourceSkill
+
+        resource_ids = list(Resource.objects.order_by('id').values_list('id', flat=True))
+        rows = ResourceSkill.objects.values_list('resource_id', 'skill_id', 'proficiency')
+        return _Snapshot(version, resource_ids, rows)
+
+    def invalidate(self):
+        """Rebuild the index on next use, in every process sharing the cache"""
+        def _bump():
+            cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+        self._snapshot = None
+        _bump()
+        # Again on commit, so an index built from the pre-commit state is not kept
+        transaction.on_commit(_bump)
+
+    def snapshot(self) -> _Snapshot:
+        """
+        The current bitsets, for combining several queries
+
+        Bits of one snapshot must not be mixed with another's: positions
+        change when the index is rebuilt.
+        """
+        return self._current()
+
+    def resources_with_all(self, skill_ids: Iterable[int], min_proficiency: int = MIN_PROFICIENCY) -> List[int]:
+        """IDs of resources having all of the skills at min_proficiency or above"""
+        snapshot = self._current()
+        return snapshot.ids(snapshot.all_of(skill_ids, min_proficiency))
+
+    def resources_with_any(self, skill_ids: Iterable[int], min_proficiency: int = MIN_PROFICIENCY) -> List[int]:
+        """IDs of resources having any of the skills at min_proficiency or above"""
+        snapshot = self._current()
+        return snapshot.ids(snapshot.any_of(skill_ids, min_proficiency))
+
+    def skills_of(self, resource_id: int) -> Dict[int, int]:
+        """Proficiency by skill ID for a resource"""
+        return dict(self._current().proficiencies.get(resource_id, {}))
+
+    def missing_skills(self, skill_ids: Iterable[int], resource_ids: Iterable[int],
+                       min_proficiency: int = MIN_PROFICIENCY) -> Set[int]:
+        """Skills that none of the resources has at min_proficiency or above"""
+        snapshot = self._current()
+        team = snapshot.of(resource_ids)
+        return {skill_id for skill_id in set(skill_ids) if not snapshot.mask(skill_id, min_proficiency) & team}
+
+
+# Global instance
+skill_index = SkillIndex()
@@ -0,0 +1,91 @@
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from resources.models import Resource, ResourceSkill, Skill
+from resources.skill_index import skill_index
+
+
+class SkillIndexTest(TestCase):
+    """Test cases for the in-memory skill → resource index"""
+    
+    def setUp(self):
+        self.python = Skill.objects.create(name="Python")
+        self.aws = Skill.objects.create(name="AWS")
+        self.go = Skill.objects.create(name="Go")
+        self.expert = Resource.objects.create(name="Expert", role="Developer")
+        self.generalist = Resource.objects.create(name="Generalist", role="Developer")
+        self.newcomer = Resource.objects.create(name="Newcomer", role="Developer")
+        ResourceSkill.objects.create(resource=self.expert, skill=self.python, proficiency=9)
+        ResourceSkill.objects.create(resource=self.expert, skill=self.aws, proficiency=8)
+        ResourceSkill.objects.create(resource=self.generalist, skill=self.python, proficiency=5)
+        ResourceSkill.objects.create(resource=self.generalist, skill=self.aws, proficiency=3)
+    
+    def test_all_and_any(self):
+        """Test all/any queries at proficiency thresholds"""
+        skills = [self.python.id, self.aws.id]
+        self.assertEqual(skill_index.resources_with_all(skills), [self.expert.id, self.generalist.id])
+        self.assertEqual(skill_index.resources_with_all(skills, min_proficiency=4), [self.expert.id])
+        self.assertEqual(skill_index.resources_with_any(skills, min_proficiency=4),
+                         [self.expert.id, self.generalist.id])
+        self.assertEqual(skill_index.resources_with_any(skills, min_proficiency=10), [])
+        self.assertEqual(skill_index.resources_with_all([self.python.id, self.go.id]), [])
+        self.assertEqual(skill_index.resources_with_any([self.go.id, 999999]), [])
+        self.assertEqual(len(skill_index.resources_with_all([])), Resource.objects.count())
+    
+    def test_team_gaps(self):
+        """Test finding skills no one in a group has"""
+        skills = [self.python.id, self.aws.id, self.go.id]
+        self.assertEqual(skill_index.missing_skills(skills, [self.generalist.id, self.newcomer.id]), {self.go.id})
+        self.assertEqual(skill_index.missing_skills(skills, [self.generalist.id], min_proficiency=4),
+                         {self.aws.id, self.go.id})
+        self.assertEqual(skill_index.missing_skills(skills, []), set(skills))
+        self.assertEqual(skill_index.skills_of(self.expert.id), {self.python.id: 9, self.aws.id: 8})
+    
+    def test_answers_from_memory(self):
+        """Test that repeated queries do not touch the database"""
+        skill_index.resources_with_all([self.python.id])
+        with self.assertNumQueries(0):
+            for level in range(1, 11):
+                skill_index.resources_with_all([self.python.id, self.aws.id], min_proficiency=level)
+                skill_index.resources_with_any([self.python.id, self.go.id], min_proficiency=level)
+    
+    def test_invalidated_by_skill_changes(self):
+        """Test that skill and resource changes are seen on the next query"""
+        self.assertEqual(skill_index.resources_with_any([self.go.id]), [])
+        
+        resource_skill = ResourceSkill.objects.create(resource=self.newcomer, skill=self.go, proficiency=2)
+        self.assertEqual(skill_index.resources_with_any([self.go.id]), [self.newcomer.id])
+        
+        resource_skill.proficiency = 7
+        resource_skill.save()
+        self.assertEqual(skill_index.resources_with_any([self.go.id], min_proficiency=6), [self.newcomer.id])
+        
+        resource_skill.delete()
+        self.assertEqual(skill_index.resources_with_any([self.go.id]), [])
+        
+        self.newcomer.skills.add(self.go, through_defaults={'proficiency': 4})
+        self.assertEqual(skill_index.resources_with_any([self.go.id]), [self.newcomer.id])
+        
+        self.newcomer.delete()
+        self.assertEqual(skill_index.resources_with_any([self.go.id]), [])
+        
+        self.python.delete()
+        self.assertEqual(skill_index.resources_with_any([self.python.id]), [])
+        
+        newcomer = Resource.objects.create(name="Second Newcomer", role="Developer")
+        self.assertIn(newcomer.id, skill_index.resources_with_all([]))
+
+    @override_settings(SKILL_INDEX_MAX_AGE=60)
+    def test_per_process_index_expires(self):
+        """Test that changes no signal reported are seen once the index is too old"""
+        self.assertEqual(skill_index.resources_with_any([self.python.id], min_proficiency=6), [self.expert.id])
+        
+        # As if saved by another process, whose version bump this cache never sees
+        ResourceSkill.objects.filter(resource=self.generalist, skill=self.python).update(proficiency=7)
+        self.assertEqual(skill_index.resources_with_any([self.python.id], min_proficiency=6), [self.expert.id])
+        
+        with patch('resources.skill_index.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(skill_index.resources_with_any([self.python.id], min_proficiency=6),
+                             [self.expert.id, self.generalist.id])
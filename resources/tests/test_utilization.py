@@ -1,9 +1,26 @@
-from django.test import TestCase
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Sum
+from django.test import TestCase, override_settings
 from resources.models import Resource
 from projects.models import Project, Task
-from allocation.models import Assignment
+from allocation.models import Assignment, ResourceDailyLoad
+from allocation.utilization import utilization_engine
+from analytics.models import GroupWeeklyUtilization, HistoricalUtilization, MonthlyUtilization, WeeklyUtilization
+from analytics.rollups import utilization_rollups
+from analytics.services import UtilizationTrackingService
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+
+# A cache every process sees, so utilization values are cached
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'resourcepro-test-cache'),
+    }
+}
 
 class ResourceUtilizationTests(TestCase):
     def setUp(self):
@@ -93,4 +110,257 @@ class ResourceUtilizationTests(TestCase):
         self.assertEqual(
             self.resource.current_utilization(start_date=next_week_start, end_date=next_week_end), 
             75
-        )
\ No newline at end of file
+        )
+
+    def test_batch_utilization_matches_per_resource(self):
+        """Test that the batch engine agrees with current_utilization"""
+        other = Resource.objects.create(name='Other Resource', role='Designer', capacity=20)
+        idle = Resource.objects.create(name='Idle Resource', role='Tester', capacity=0)
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=20)
+        Assignment.objects.create(resource=other, task=self.task, allocated_hours=10)
+        
+        utilization = utilization_engine.compute(Resource.objects.all())
+        
+        self.assertEqual(utilization[self.resource.id], 50)
+        self.assertEqual(utilization[other.id], 50)
+        self.assertEqual(utilization[idle.id], 0)
+        for resource in (self.resource, other, idle):
+            self.assertEqual(utilization[resource.id], resource.current_utilization())
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class UtilizationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.week_start = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
+        self.resource = Resource.objects.create(name='Cached Resource', role='Developer', capacity=40)
+        self.project = Project.objects.create(
+            name='Cache Project',
+            start_date=self.week_start,
+            end_date=self.week_start + timedelta(days=30),
+            status='active'
+        )
+        self.task = Task.objects.create(
+            project=self.project,
+            name='Cache Task',
+            start_date=self.week_start,
+            end_date=self.week_start + timedelta(days=6),
+            estimated_hours=20,
+            status='in_progress'
+        )
+        self.assignment = Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=20)
+
+    def test_repeated_reads_hit_cache(self):
+        """Test that a second read is served from the cache"""
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 50)
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 50)
+        
+        stats = utilization_engine.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_assignment_change_invalidates(self):
+        """Test that assignment edits are never served stale"""
+        self.assertEqual(self.resource.current_utilization(), 50)
+        
+        self.assignment.allocated_hours = 30
+        self.assignment.save()
+        self.assertEqual(self.resource.current_utilization(), 75)
+        
+        self.assignment.delete()
+        self.assertEqual(self.resource.current_utilization(), 0)
+
+    def test_task_and_capacity_changes_invalidate(self):
+        """Test that task date and capacity edits are never served stale"""
+        self.assertEqual(self.resource.current_utilization(), 50)
+        
+        self.task.start_date = self.week_start + timedelta(days=7)
+        self.task.end_date = self.week_start + timedelta(days=13)
+        self.task.save()
+        self.assertEqual(self.resource.current_utilization(), 0)
+        
+        self.resource.capacity = 20
+        self.resource.save()
+        next_week = self.week_start + timedelta(days=7)
+        self.assertEqual(self.resource.current_utilization(next_week), 100)
+
+    def _double_hours_without_signals(self):
+        ResourceDailyLoad.objects.filter(resource=self.resource).update(allocated_hours=F('allocated_hours') * 2)
+
+    def test_version_bumped_by_another_process_is_seen(self):
+        """Test that a data version replaced outside this process invalidates cached values"""
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 50)
+        self._double_hours_without_signals()
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 50)
+        
+        cache.set(f'utilization:version:{self.resource.id}', 'bumped-elsewhere', None)
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 100)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_bypassed(self):
+        """Test that values are not cached where other processes' bumps cannot be seen"""
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 50)
+        self._double_hours_without_signals()
+        self.assertEqual(utilization_engine.compute([self.resource])[self.resource.id], 100)
+        self.assertEqual(utilization_engine.cache.stats()['misses'], 0)
+
+
+class DailyUtilizationSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.resource = Resource.objects.create(name='Snapshot Resource', role='Developer', capacity=40)
+        self.idle = Resource.objects.create(name='Idle Resource', role='Developer', capacity=40)
+        self.project = Project.objects.create(
+            name='Snapshot Project',
+            start_date=self.today,
+            end_date=self.today + timedelta(days=30),
+            status='active'
+        )
+        self.task = Task.objects.create(
+            project=self.project,
+            name='Snapshot Task',
+            start_date=self.today,
+            end_date=self.today + timedelta(days=9),
+            estimated_hours=20,
+            status='in_progress'
+        )
+        self.service = UtilizationTrackingService()
+
+    def test_record_writes_every_resource_and_marks_fresh(self):
+        """Test that one call records all resources and updates the freshness marker"""
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=20)
+        self.assertTrue(self.service.get_snapshot_status()['stale'])
+        
+        self.assertEqual(self.service.record_daily_utilization(), 2)
+        
+        row = HistoricalUtilization.objects.get(resource=self.resource, date=self.today)
+        self.assertEqual(row.allocated_hours, 2)
+        self.assertEqual(row.available_hours, 8)
+        self.assertEqual(row.utilization_percentage, self.resource.current_utilization(self.today, self.today))
+        self.assertTrue(HistoricalUtilization.objects.filter(resource=self.idle, date=self.today).exists())
+        
+        status = self.service.get_snapshot_status()
+        self.assertFalse(status['stale'])
+        self.assertEqual(status['rows'], 2)
+
+    def test_record_upserts(self):
+        """Test that recording twice updates rows instead of duplicating them"""
+        self.service.record_daily_utilization()
+        Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=40)
+        self.service.record_daily_utilization()
+        
+        self.assertEqual(HistoricalUtilization.objects.filter(date=self.today).count(), 2)
+        row = HistoricalUtilization.objects.get(resource=self.resource, date=self.today)
+        self.assertEqual(row.allocated_hours, 4)
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_assignment_change_refreshes_snapshot(self):
+        """Test that a committed assignment change re-records today's snapshot"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(resource=self.resource, task=self.task, allocated_hours=20)
+        
+        row = HistoricalUtilization.objects.get(resource=self.resource, date=self.today)
+        self.assertEqual(row.allocated_hours, 2)
+        self.assertFalse(self.service.get_snapshot_status()['stale'])
+
+
+class UtilizationRollupTests(TestCase):
+    def setUp(self):
+        # Friday 2025-03-28 to Wednesday 2025-04-02 spans two weeks and two months
+        self.start = date(2025, 3, 28)
+        self.end = date(2025, 4, 2)
+        self.resource = Resource.objects.create(name='Rollup Resource', role='Developer', department='Engineering', capacity=40)
+        self.other = Resource.objects.create(name='Rollup Designer', role='Designer', department='Engineering', capacity=40)
+        project = Project.objects.create(name='Rollup Project', start_date=self.start, end_date=self.end, status='active')
+        task = Task.objects.create(
+            project=project, name='Rollup Task', start_date=self.start, end_date=self.end,
+            estimated_hours=24, status='in_progress'
+        )
+        Assignment.objects.create(resource=self.resource, task=task, allocated_hours=24)
+        UtilizationTrackingService().backfill_daily_utilization(self.start, self.end)
+
+    def test_rollups_match_daily_rows(self):
+        """Test that weekly, monthly and group rollups sum the daily rows"""
+        for model, key, periods in (
+            (WeeklyUtilization, 'period_start', [date(2025, 3, 24), date(2025, 3, 31)]),
+            (MonthlyUtilization, 'period_start', [date(2025, 3, 1), date(2025, 4, 1)]),
+        ):
+            self.assertEqual(sorted(set(model.objects.values_list(key, flat=True))), periods)
+        
+        week = WeeklyUtilization.objects.get(resource=self.resource, period_start=date(2025, 3, 31))
+        daily = HistoricalUtilization.objects.filter(resource=self.resource, date__gte=date(2025, 3, 31))
+        self.assertEqual(week.days, 3)
+        self.assertEqual(week.allocated_hours, sum(row.allocated_hours for row in daily))
+        self.assertEqual(week.utilization_total, sum(row.utilization_percentage for row in daily))
+        
+        group = GroupWeeklyUtilization.objects.get(department='Engineering', role='Developer', period_start=date(2025, 3, 24))
+        self.assertEqual(group.days, 3)
+        self.assertEqual(group.resource_count, 1)
+
+    def test_rewriting_a_day_refreshes_rollups(self):
+        """Test that re-recording a day replaces its contribution instead of adding to it"""
+        UtilizationTrackingService().record_daily_utilization(date(2025, 4, 1))
+        month = MonthlyUtilization.objects.get(resource=self.resource, period_start=date(2025, 4, 1))
+        self.assertEqual(month.days, 2)
+        
+        # 2 resources x (2 weeks + 2 months) + 2 roles x 2 weeks
+        self.assertEqual(utilization_rollups.rebuild(), 12)
+        self.assertEqual(MonthlyUtilization.objects.get(resource=self.resource, period_start=date(2025, 4, 1)).days, 2)
+
+    def test_summaries_read_rollups(self):
+        """Test that per-resource and group averages equal averages over the daily rows"""
+        daily = HistoricalUtilization.objects.filter(resource=self.resource)
+        expected = float(sum(row.utilization_percentage for row in daily)) / daily.count()
+        
+        with self.assertNumQueries(1):
+            summary = utilization_rollups.resource_summary(self.start, self.end)
+        self.assertAlmostEqual(summary[self.resource.id]['avg_utilization'], expected, places=2)
+        self.assertEqual(summary[self.other.id]['avg_utilization'], 0)
+        
+        # Month-aligned ranges read the monthly table
+        april = utilization_rollups.resource_summary(date(2025, 4, 1), date(2025, 4, 30))
+        self.assertEqual(april[self.resource.id]['days'], 2)
+        
+        # One query for the whole week, one for the days of the partial week
+        with self.assertNumQueries(2):
+            current, previous = utilization_rollups.group_averages(
+                [(date(2025, 3, 31), self.end), (date(2025, 3, 24), date(2025, 3, 30))], role='Developer'
+            )
+        previous_week = daily.filter(date__lt=date(2025, 3, 31))
+        self.assertAlmostEqual(previous, float(sum(row.utilization_percentage for row in previous_week)) / 3, places=2)
+        self.assertGreater(current, 0)
+
+    def test_mid_week_range_matches_daily_aggregation(self):
+        """Test that ranges starting and ending mid-week count only their own days"""
+        project = Project.objects.create(
+            name='Long Project', start_date=date(2025, 3, 3), end_date=date(2025, 4, 20), status='active'
+        )
+        task = Task.objects.create(
+            project=project, name='Long Task', start_date=date(2025, 3, 3), end_date=date(2025, 4, 20),
+            estimated_hours=140, status='in_progress'
+        )
+        Assignment.objects.create(resource=self.other, task=task, allocated_hours=140)
+        UtilizationTrackingService().backfill_daily_utilization(date(2025, 3, 3), date(2025, 4, 20))
+        # Thursday to Tuesday, with whole weeks and rows on either side
+        start, end = date(2025, 3, 13), date(2025, 4, 8)
+        
+        summary = utilization_rollups.resource_summary(start, end)
+        for resource in (self.resource, self.other):
+            daily = HistoricalUtilization.objects.filter(resource=resource, date__gte=start, date__lte=end)
+            expected = daily.aggregate(
+                avg=Avg('utilization_percentage'), allocated=Sum('allocated_hours'), days=Count('id')
+            )
+            self.assertEqual(summary[resource.id]['days'], expected['days'])
+            self.assertEqual(summary[resource.id]['allocated_hours'], expected['allocated'])
+            self.assertAlmostEqual(summary[resource.id]['avg_utilization'], float(expected['avg']), places=2)
+        
+        current, previous = utilization_rollups.group_averages(
+            [(start, end), (date(2025, 3, 5), start - timedelta(days=1))], role='Designer'
+        )
+        for (period_start, period_end), average in (((start, end), current),
+                                                    ((date(2025, 3, 5), start - timedelta(days=1)), previous)):
+            expected = HistoricalUtilization.objects.filter(
+                resource__role='Designer', date__gte=period_start, date__lte=period_end
+            ).aggregate(avg=Avg('utilization_percentage'))['avg']
+            self.assertAlmostEqual(average, float(expected), places=2)
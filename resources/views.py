@@ -15,14 +15,16 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.units import inch
 import io
 from .models import Resource, Skill, ResourceSkill, TimeEntry, ResourceAvailability
+from allocation.utilization import utilization_engine
 from .forms import ResourceForm, ResourceSkillFormSet, TimeEntryForm, ResourceAvailabilityForm, BulkTimeEntryForm
 
 @login_required
 def resource_list(request):
     """List all resources"""
     resources = Resource.objects.all()
+    utilization = utilization_engine.compute(resources)
     for resource in resources:
-        resource.utilization = resource.current_utilization()
+        resource.utilization = utilization[resource.id]
     
     return render(request, 'resources/resource_list.html', {'resources': resources})
 
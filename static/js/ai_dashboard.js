@@ -41,6 +41,7 @@ function initializeAIFeatures() {
     restorePageScroll();
     
     initializeAIAnalyst();
+    initializeDashboardEvents();
     initializeNLISearch();
     
     // For allocation page, also try to initialize after a short delay
@@ -107,6 +108,20 @@ function initializeAIAnalyst() {
     
     // Check if we already have content rendered from the server
     const widget = document.querySelector('.ai-analyst-widget');
+    if (widget && widget.dataset.pending === 'true') {
+        // The server rendered the last briefing and is generating a new one
+        waitForBriefing(widget.dataset.analysisId)
+            .then(data => {
+                if (widget.querySelector('.ai-content')) {
+                    updateAIContentOnly(data);
+                    markBriefingFresh(widget, data);
+                } else {
+                    updateAIAnalysisWidget(data);
+                }
+            })
+            .catch(error => console.warn('Background briefing not available:', error.message));
+        return;
+    }
     if (widget && widget.querySelector('.ai-content')) {
         console.log('AI widget already rendered from server, skipping auto-refresh');
         return; // Don't replace server-rendered content
@@ -131,12 +146,11 @@ function refreshAIAnalysis(force = true) {
         widget.innerHTML = '<div class="loading-spinner"><i class="fas fa-spinner fa-spin"></i> Analyzing dashboard data...</div>';
     }
     
-    const apiCall = force ? 
-        fetch('/dashboard/api/refresh-ai-analysis/', { method: 'POST', headers: { 'X-CSRFToken': getCookie('csrftoken') } }) :
-        fetch('/dashboard/api/refresh-ai-analysis/', { method: 'POST', headers: { 'X-CSRFToken': getCookie('csrftoken') } });
+    const previousId = widget.dataset.analysisId;
     
-    apiCall
-        .then(response => response.json())
+    // The refresh endpoint only queues generation; wait for the new briefing
+    requestBriefingRefresh()
+        .then(() => waitForBriefing(previousId))
         .then(data => {
             updateAIAnalysisWidget(data);
         })
@@ -146,10 +160,165 @@ function refreshAIAnalysis(force = true) {
         });
 }
 
+/**
+ * Queue generation of a new briefing on the server
+ */
+function requestBriefingRefresh() {
+    return fetch('/dashboard/api/refresh-ai-analysis/', {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCookie('csrftoken') }
+    }).then(response => response.json());
+}
+
+/**
+ * Server-Sent Events from /dashboard/api/events/
+ *
+ * One EventSource is shared by the page and opened on first use. The browser
+ * reconnects on its own and resumes from the last event id it received.
+ * Servers running under WSGI answer 204 instead of streaming; the browser
+ * then closes the EventSource and each onUnavailable callback is run so
+ * callers can poll instead.
+ */
+let dashboardEventSource = null;
+let dashboardEventsClosed = false;
+const dashboardEventFallbacks = [];
+
+function onDashboardEvent(type, handler, onUnavailable) {
+    if (!window.EventSource || dashboardEventsClosed) return false;
+    if (!dashboardEventSource) {
+        dashboardEventSource = new EventSource('/dashboard/api/events/');
+        dashboardEventSource.addEventListener('error', () => {
+            // CLOSED means the browser gave up instead of reconnecting
+            if (dashboardEventSource.readyState !== EventSource.CLOSED) return;
+            dashboardEventsClosed = true;
+            dashboardEventFallbacks.splice(0).forEach(fallback => fallback());
+        });
+    }
+    if (onUnavailable) {
+        dashboardEventFallbacks.push(onUnavailable);
+    }
+    dashboardEventSource.addEventListener(type, event => {
+        let data = {};
+        try {
+            data = JSON.parse(event.data);
+        } catch (error) {
+            console.warn('Ignoring malformed dashboard event:', error);
+        }
+        handler(data);
+    });
+    return true;
+}
+
+/**
+ * Tell the user when the data behind the dashboard changed
+ */
+function initializeDashboardEvents() {
+    if (!document.querySelector('.ai-analyst-widget')) return;
+    
+    let notified = false;
+    const announce = () => {
+        if (notified) return;
+        notified = true;
+        showNotification('info', 'New data available - refresh to update the dashboard');
+    };
+    onDashboardEvent('dashboard', announce);
+    onDashboardEvent('insight', announce);
+}
+
+/**
+ * Wait for a briefing newer than previousId
+ *
+ * Listens for 'briefing' events and fetches the briefing once one arrives;
+ * falls back to polling when the browser has no EventSource or the server
+ * does not stream events. Resolves with
+ * the new briefing, rejects when the background job failed or nothing
+ * arrived within the time limit.
+ */
+function waitForBriefing(previousId, intervalMs = 5000, maxAttempts = 60) {
+    return new Promise((resolve, reject) => {
+        let attempts = 0;
+        let finished = false;
+        
+        function finish(callback, value) {
+            if (finished) return;
+            finished = true;
+            callback(value);
+        }
+        
+        function check() {
+            return fetch('/dashboard/api/ai-analysis/')
+                .then(response => response.json())
+                .then(data => {
+                    if (data.id && String(data.id) !== String(previousId || '')) {
+                        finish(resolve, data);
+                    } else if (data.job && data.job.state === 'failed') {
+                        finish(reject, new Error(data.job.error || 'Briefing generation failed'));
+                    }
+                    return finished;
+                });
+        }
+        
+        function poll() {
+            attempts++;
+            check()
+                .then(done => {
+                    if (done) return;
+                    if (attempts >= maxAttempts) {
+                        finish(reject, new Error('Timed out waiting for briefing'));
+                    } else {
+                        setTimeout(poll, intervalMs);
+                    }
+                })
+                .catch(error => {
+                    if (attempts >= maxAttempts) {
+                        finish(reject, error);
+                    } else {
+                        setTimeout(poll, intervalMs);
+                    }
+                });
+        }
+        
+        const subscribed = onDashboardEvent('briefing', data => {
+            if (finished) return;
+            if (data.state === 'failed') {
+                finish(reject, new Error(data.error || 'Briefing generation failed'));
+            } else {
+                check().catch(error => console.warn('Could not load briefing:', error));
+            }
+        }, () => {
+            if (!finished) setTimeout(poll, intervalMs);
+        });
+        
+        if (!subscribed) {
+            setTimeout(poll, intervalMs);
+            return;
+        }
+        
+        // The briefing may have finished before the stream connected
+        check().catch(error => console.warn('Could not load briefing:', error));
+        setTimeout(() => finish(reject, new Error('Timed out waiting for briefing')), intervalMs * maxAttempts);
+    });
+}
+
+/**
+ * Mark a server-rendered briefing widget as up to date
+ */
+function markBriefingFresh(widget, data) {
+    widget.dataset.analysisId = data.id;
+    delete widget.dataset.pending;
+    const indicator = widget.querySelector('.freshness-indicator');
+    if (indicator) {
+        indicator.textContent = 'Fresh';
+        indicator.classList.remove('stale');
+        indicator.classList.add('fresh');
+    }
+}
+
 function updateAIAnalysisWidget(data) {
     const widget = document.querySelector('.ai-analyst-widget');
     if (!widget) return;
     
+    widget.dataset.analysisId = data.id || '';
     widget.innerHTML = `
         <div class="ai-analysis-content">
             <div class="analysis-summary">
@@ -633,6 +802,18 @@ function processNLIQuery(query) {
     
     showNLILoading();
     
+    // Stream the answer as it is generated where the browser can read response bodies
+    if (window.ReadableStream && window.TextDecoder) {
+        streamNLIQuery(query).catch(error => {
+            console.error('Error streaming NLI query:', error);
+            fetchNLIQuery(query);
+        });
+    } else {
+        fetchNLIQuery(query);
+    }
+}
+
+function fetchNLIQuery(query) {
     fetch('/api/ai-search/', {
         method: 'POST',
         headers: {
@@ -651,6 +832,94 @@ function processNLIQuery(query) {
     });
 }
 
+/**
+ * Read the text/event-stream response of the streaming endpoint: the answer
+ * text is shown as 'token' events arrive and replaced by the full result on 'done'
+ */
+async function streamNLIQuery(query) {
+    const response = await fetch('/api/ai-search/stream/', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: JSON.stringify({ query: query })
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Streaming request failed with status ${response.status}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+    let finished = false;
+    
+    while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (!data) continue;
+            const payload = JSON.parse(data);
+            
+            if (event === 'token') {
+                if (query !== currentQuery) continue;
+                answer += payload.text;
+                showNLIPartialAnswer(answer);
+            } else if (event === 'done') {
+                finished = true;
+                if (query === currentQuery) displayNLIResults(payload);
+            }
+        }
+    }
+    if (!finished) {
+        throw new Error('Stream ended before the answer was complete');
+    }
+}
+
+function showNLIPartialAnswer(text) {
+    const resultsContainer = document.getElementById('nliResults');
+    if (!resultsContainer) return;
+    
+    let answerText = resultsContainer.querySelector('.answer-text.streaming');
+    if (!answerText) {
+        resultsContainer.style.display = 'block';
+        resultsContainer.innerHTML = `
+            <div class="results-header">
+                <h4><i class="fas fa-robot"></i> AI Assistant Response</h4>
+                <button class="btn-close-results" onclick="closeNLIResults()">
+                    <i class="fas fa-times"></i>
+                </button>
+            </div>
+            <div class="nli-response">
+                <div class="nli-answer">
+                    <div class="answer-text streaming"></div>
+                </div>
+            </div>
+        `;
+        answerText = resultsContainer.querySelector('.answer-text.streaming');
+    }
+    answerText.innerHTML = formatResponseText(escapeNLIText(text));
+}
+
+function escapeNLIText(text) {
+    const element = document.createElement('div');
+    element.textContent = text;
+    return element.innerHTML;
+}
+
 function showNLILoading() {
     const resultsContainer = document.getElementById('nliResults');
     if (resultsContainer) {
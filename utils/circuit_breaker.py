@@ -0,0 +1,137 @@
+"""
+Circuit breaker for calls to an external service
+
+After `failure_threshold` consecutive failed calls the circuit opens and calls
+fail fast (callers fall back to their non-AI paths) instead of each request
+waiting for a timeout. Once `reset_seconds` have passed the circuit is half
+open: a single trial call is let through, and closes the circuit if it
+succeeds or re-opens it if it fails.
+
+State is kept in the default cache so every thread, and with a shared cache
+backend every process, sees the same circuit.
+"""
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 60
+# A trial call that never reports back blocks further trials for this long
+PROBE_SECONDS = 60
+STATE_KEY = 'circuit:{}'
+PROBE_KEY = 'circuit:{}:probe'
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc).isoformat()
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit around one external dependency"""
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None,
+                 reset_seconds: Optional[float] = None):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+
+    @property
+    def failure_threshold(self) -> int:
+        return self._failure_threshold or getattr(
+            settings, 'LLM_BREAKER_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)
+
+    @property
+    def reset_seconds(self) -> float:
+        return self._reset_seconds or getattr(settings, 'LLM_BREAKER_RESET_SECONDS', DEFAULT_RESET_SECONDS)
+
+    def _load(self) -> Dict[str, Any]:
+        return cache.get(STATE_KEY.format(self.name)) or {
+            'state': CLOSED,
+            'failures': 0,
+            'opened_at': None,
+            'last_failure_at': None,
+            'last_error': None,
+            'trips': 0,
+        }
+
+    def _save(self, data: Dict[str, Any]):
+        cache.set(STATE_KEY.format(self.name), data, None)
+
+    def state(self) -> str:
+        """closed, open, or half_open once an open circuit's reset time has passed"""
+        data = self._load()
+        if data['state'] == OPEN and time.time() - data['opened_at'] >= self.reset_seconds:
+            return HALF_OPEN
+        return data['state']
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be made now
+
+        While half open only one caller at a time gets True (the trial call);
+        it must report back with record_success or record_failure.
+        """
+        state = self.state()
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            return cache.add(PROBE_KEY.format(self.name), True, PROBE_SECONDS)
+        return False
+
+    def record_success(self):
+        """Report a successful call; closes the circuit"""
+        data = self._load()
+        if data['state'] != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        if data['state'] != CLOSED or data['failures']:
+            data.update(state=CLOSED, failures=0, opened_at=None)
+            self._save(data)
+        cache.delete(PROBE_KEY.format(self.name))
+
+    def record_failure(self, error: Any = None):
+        """Report a failed call; opens the circuit at the threshold or after a failed trial"""
+        state = self.state()
+        data = self._load()
+        data['failures'] += 1
+        data['last_failure_at'] = time.time()
+        data['last_error'] = str(error)[:500] if error is not None else None
+        if state == HALF_OPEN or (state == CLOSED and data['failures'] >= self.failure_threshold):
+            data.update(state=OPEN, opened_at=time.time(), trips=data['trips'] + 1)
+            logger.warning(f"Circuit {self.name} opened after {data['failures']} consecutive failures: {error}")
+        self._save(data)
+        cache.delete(PROBE_KEY.format(self.name))
+
+    def reset(self):
+        """Close the circuit and forget past failures"""
+        cache.delete_many([STATE_KEY.format(self.name), PROBE_KEY.format(self.name)])
+
+    def status(self) -> Dict[str, Any]:
+        """Circuit state for monitoring"""
+        data = self._load()
+        retry_at = None
+        if data['state'] == OPEN:
+            retry_at = _isoformat(data['opened_at'] + self.reset_seconds)
+        return {
+            'name': self.name,
+            'state': self.state(),
+            'consecutive_failures': data['failures'],
+            'failure_threshold': self.failure_threshold,
+            'reset_seconds': self.reset_seconds,
+            'opened_at': _isoformat(data['opened_at']),
+            'retry_at': retry_at,
+            'last_failure_at': _isoformat(data['last_failure_at']),
+            'last_error': data['last_error'],
+            'trips': data['trips'],
+        }
@@ -1,74 +1,245 @@
 """
 Gemini AI utility functions for ResourcePro
+
+Prompts are sent through the backend selected by LLM_BACKEND (see
+utils.llm_backends): Gemini in production, or a local stand-in for offline
+benchmarks.
+
+Every call has a deadline (LLM_TIMEOUT_SECONDS, retries included). Transient
+failures are retried up to LLM_MAX_RETRIES times with jittered exponential
+backoff, and a circuit breaker stops calling the backend after repeated
+failed calls: is_available() then reports False, so callers take their
+non-AI fallbacks at once until the backend recovers.
+
+Each call is recorded under its call site (the ``feature`` argument) by
+utils.llm_telemetry.
 """
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Any, Sequence
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import close_old_connections
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+from .circuit_breaker import OPEN, CircuitBreaker
+from .llm_backends import LLMBackend, get_backend
+from .llm_cache import llm_cache
+from .llm_telemetry import LLMCall, llm_telemetry
 
 logger = logging.getLogger(__name__)
 
+# Model calls batch_generate runs at once (LLM_MAX_CONCURRENCY)
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.5
+
 class GeminiAIService:
-    """Service class for interacting with Google Gemini AI"""
+    """Service class for interacting with Google Gemini AI (or the configured LLM backend)"""
     
-    def __init__(self):
-        self.initialized = False
-        if GEMINI_AVAILABLE and settings.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                self.initialized = True
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini AI: {e}")
-                self.initialized = False
-        else:
-            logger.warning("Gemini AI not available: Missing API key or library not installed")
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend or get_backend()
+        self.model_name = self.backend.model_name
+        self.initialized = self.backend.is_available()
+        self.breaker = CircuitBreaker('llm')
     
     def is_available(self) -> bool:
-        """Check if Gemini AI is properly configured and available"""
-        return self.initialized
+        """Check if Gemini AI is properly configured and available (its circuit is not open)"""
+        return self.initialized and self.breaker.state() != OPEN
     
-    def generate_content(self, prompt: str, temperature: float = 0.7) -> Optional[str]:
+    def status(self) -> Dict[str, Any]:
+        """Backend and circuit breaker state for monitoring"""
+        return {
+            'backend': self.model_name,
+            'configured': self.initialized,
+            'available': self.is_available(),
+            'circuit': self.breaker.status(),
+        }
+    
+    def generate_content(self, prompt: str, temperature: float = 0.7, cache_ttl: Optional[int] = None,
+                         use_cache: bool = True, feature: Optional[str] = None) -> Optional[str]:
         """
         Generate content using Gemini AI
         
         Args:
             prompt: The input prompt
             temperature: Controls randomness (0.0 to 1.0)
+            cache_ttl: Seconds an identical prompt is answered from the response
+                cache (LLM_CACHE_DEFAULT_TTL if not given)
+            use_cache: Set to False to always call the model (the new response
+                still replaces the cached one)
+            feature: Call site the call is reported under (llm_telemetry)
             
         Returns:
             Generated text or None if failed
         """
-        if not self.is_available():
+        with llm_telemetry.track(feature, self.model_name, prompt) as call:
+            text = self._generate(prompt, temperature, cache_ttl, use_cache, call)
+            call.set_response(text)
+            return text
+    
+    def _generate(self, prompt: str, temperature: float, cache_ttl: Optional[int], use_cache: bool,
+                  call: LLMCall) -> Optional[str]:
+        """generate_content, recording the outcome on call"""
+        if not self.initialized:
             logger.warning("Gemini AI not available")
+            call.set_outcome('unavailable')
             return None
         
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=2048,
-                )
-            )
-            return response.text
-        except Exception as e:
-            logger.error(f"Gemini AI generation failed: {e}")
+        # Cached responses are served even while the circuit is open
+        cache_key = None
+        if llm_cache.enabled():
+            cache_key = llm_cache.make_key(self.model_name, prompt, temperature)
+            if use_cache:
+                cached = llm_cache.get(cache_key)
+                if cached is not None:
+                    call.set_outcome('cache_hit')
+                    return cached
+        
+        if not self.breaker.allow_request():
+            logger.warning("Gemini AI circuit is open; skipping the call")
+            call.set_outcome('circuit_open')
             return None
+        
+        started = time.monotonic()
+        text = self._call_with_retries(prompt, temperature, call)
+        
+        if cache_key and text:
+            llm_cache.set(cache_key, self.model_name, text, ttl=cache_ttl,
+                          latency_ms=(time.monotonic() - started) * 1000)
+        return text
+    
+    def _call_with_retries(self, prompt: str, temperature: float, call: LLMCall) -> Optional[str]:
+        """
+        Call the backend within the call deadline, retrying transient failures
+        
+        Reports the outcome of the whole call (not of each attempt) to the
+        circuit breaker.
+        """
+        timeout = getattr(settings, 'LLM_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)
+        max_retries = getattr(settings, 'LLM_MAX_RETRIES', DEFAULT_MAX_RETRIES)
+        backoff = getattr(settings, 'LLM_RETRY_BACKOFF_SECONDS', DEFAULT_RETRY_BACKOFF_SECONDS)
+        deadline = time.monotonic() + timeout
+        
+        attempt = 0
+        while True:
+            call.attempts += 1
+            try:
+                text = self.backend.generate(prompt, temperature=temperature, max_output_tokens=2048,
+                                             timeout=deadline - time.monotonic())
+                self.breaker.record_success()
+                return text
+            except Exception as e:
+                if not self.backend.is_retryable(e):
+                    # The backend answered, so the circuit stays closed
+                    logger.error(f"Gemini AI generation failed: {e}")
+                    self.breaker.record_success()
+                    call.set_outcome('error', e)
+                    return None
+                
+                # Jittered exponential backoff: between half and all of base * 2^attempt
+                delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt >= max_retries or time.monotonic() + delay >= deadline:
+                    logger.error(f"Gemini AI generation failed after {attempt + 1} attempts: {e}")
+                    self.breaker.record_failure(e)
+                    call.set_outcome('error', e)
+                    return None
+                logger.warning(f"Gemini AI attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+    
+    def stream_content(self, prompt: str, temperature: float = 0.7, cache_ttl: Optional[int] = None,
+                       use_cache: bool = True, feature: Optional[str] = None) -> Iterator[str]:
+        """
+        Generate content using Gemini AI, yielding text chunks as they arrive
+        
+        A cached response is yielded as one chunk. Failures before the first
+        chunk are retried like generate_content; after it the stream just ends,
+        since the caller has already used what it received. Yields nothing if
+        no response could be generated.
+        """
+        with llm_telemetry.track(feature, self.model_name, prompt) as call:
+            yield from self._stream(prompt, temperature, cache_ttl, use_cache, call)
+    
+    def _stream(self, prompt: str, temperature: float, cache_ttl: Optional[int], use_cache: bool,
+                call: LLMCall) -> Iterator[str]:
+        """stream_content, recording the outcome on call"""
+        if not self.initialized:
+            logger.warning("Gemini AI not available")
+            call.set_outcome('unavailable')
+            return
+        
+        cache_key = None
+        if llm_cache.enabled():
+            cache_key = llm_cache.make_key(self.model_name, prompt, temperature)
+            if use_cache:
+                cached = llm_cache.get(cache_key)
+                if cached is not None:
+                    call.set_outcome('cache_hit')
+                    call.add_chunk(cached)
+                    yield cached
+                    return
+        
+        if not self.breaker.allow_request():
+            logger.warning("Gemini AI circuit is open; skipping the call")
+            call.set_outcome('circuit_open')
+            return
+        
+        timeout = getattr(settings, 'LLM_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)
+        max_retries = getattr(settings, 'LLM_MAX_RETRIES', DEFAULT_MAX_RETRIES)
+        backoff = getattr(settings, 'LLM_RETRY_BACKOFF_SECONDS', DEFAULT_RETRY_BACKOFF_SECONDS)
+        started = time.monotonic()
+        deadline = started + timeout
+        chunks = []
+        
+        attempt = 0
+        while True:
+            call.attempts += 1
+            try:
+                for chunk in self.backend.generate_stream(prompt, temperature=temperature, max_output_tokens=2048,
+                                                          timeout=deadline - time.monotonic()):
+                    chunks.append(chunk)
+                    call.add_chunk(chunk)
+                    yield chunk
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Stream exceeded the {timeout}s deadline")
+                break
+            except Exception as e:
+                retryable = self.backend.is_retryable(e)
+                delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.0)
+                if chunks or not retryable or attempt >= max_retries or time.monotonic() + delay >= deadline:
+                    logger.error(f"Gemini AI streaming failed after {attempt + 1} attempts: {e}")
+                    if retryable:
+                        self.breaker.record_failure(e)
+                    else:
+                        self.breaker.record_success()
+                    call.set_outcome('error', e)
+                    return
+                logger.warning(f"Gemini AI stream attempt {attempt + 1} failed ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+        
+        self.breaker.record_success()
+        text = ''.join(chunks)
+        if cache_key and text:
+            llm_cache.set(cache_key, self.model_name, text, ttl=cache_ttl,
+                          latency_ms=(time.monotonic() - started) * 1000)
     
-    def generate_json_response(self, prompt: str, temperature: float = 0.3) -> Optional[Dict]:
+    def generate_json_response(self, prompt: str, temperature: float = 0.3, cache_ttl: Optional[int] = None,
+                               use_cache: bool = True, feature: Optional[str] = None) -> Optional[Dict]:
         """
         Generate JSON response using Gemini AI
         
         Args:
             prompt: The input prompt (should request JSON format)
             temperature: Controls randomness (lower for more consistent JSON)
+            cache_ttl: Seconds an identical prompt is answered from the response cache
+            use_cache: Set to False to bypass the response cache
+            feature: Call site the call is reported under (llm_telemetry)
             
         Returns:
             Parsed JSON dict or None if failed
@@ -78,8 +249,13 @@ class GeminiAIService:
 
 IMPORTANT: Please respond with valid JSON only. Do not include any markdown formatting, explanations, or additional text outside the JSON structure."""
         
-        response_text = self.generate_content(json_prompt, temperature)
-        
+        with llm_telemetry.track(feature, self.model_name, json_prompt) as call:
+            response_text = self._generate(json_prompt, temperature, cache_ttl, use_cache, call)
+            call.set_response(response_text)
+            return self._parse_json_response(response_text, json_prompt, temperature, call)
+    
+    def _parse_json_response(self, response_text: Optional[str], json_prompt: str, temperature: float,
+                             call: LLMCall) -> Optional[Dict]:
         if not response_text:
             return None
         
@@ -95,9 +271,72 @@ IMPORTANT: Please respond with valid JSON only. Do not include any markdown form
             
             return json.loads(cleaned_response.strip())
         except json.JSONDecodeError as e:
+            call.set_outcome('parse_error', e)
             logger.error(f"Failed to parse JSON response from Gemini: {e}")
             logger.error(f"Raw response: {response_text}")
+            # Don't keep serving an unusable response from the cache
+            llm_cache.delete(llm_cache.make_key(self.model_name, json_prompt, temperature))
+            return None
+    
+    async def agenerate_json_response(self, prompt: str, temperature: float = 0.3,
+                                      cache_ttl: Optional[int] = None, use_cache: bool = True,
+                                      feature: Optional[str] = None) -> Optional[Dict]:
+        """
+        Async variant of generate_json_response
+        
+        The blocking client call runs in a worker thread, so the event loop
+        (and other awaiting requests) keep running while the model answers.
+        """
+        return await sync_to_async(self._generate_json_in_thread, thread_sensitive=False)(
+            prompt, temperature, cache_ttl, use_cache, feature
+        )
+    
+    def batch_generate(self, prompts: Sequence[str], max_concurrency: Optional[int] = None,
+                       temperature: float = 0.3, cache_ttl: Optional[int] = None,
+                       use_cache: bool = True, feature: Optional[str] = None) -> List[Optional[Dict]]:
+        """
+        Generate JSON responses for several prompts concurrently
+        
+        Args:
+            prompts: Input prompts (should request JSON format)
+            max_concurrency: Model calls in flight at once (LLM_MAX_CONCURRENCY if not given)
+            temperature: Controls randomness, as for generate_json_response
+            cache_ttl: Seconds an identical prompt is answered from the response cache
+            use_cache: Set to False to bypass the response cache
+            feature: Call site the calls are reported under (llm_telemetry)
+            
+        Returns:
+            One parsed JSON dict (or None if that call failed) per prompt, in order
+        """
+        max_concurrency = max_concurrency or getattr(settings, 'LLM_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)
+        workers = max(1, min(max_concurrency, len(prompts)))
+        if workers == 1:
+            return [
+                self.generate_json_response(prompt, temperature, cache_ttl=cache_ttl, use_cache=use_cache,
+                                            feature=feature)
+                for prompt in prompts
+            ]
+        
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resourcepro-llm') as executor:
+            results = list(executor.map(
+                lambda prompt: self._generate_json_in_thread(prompt, temperature, cache_ttl, use_cache, feature),
+                prompts
+            ))
+        logger.info(f"Generated {len(prompts)} responses with {workers} concurrent calls "
+                    f"in {time.monotonic() - started:.1f}s")
+        return results
+    
+    def _generate_json_in_thread(self, prompt, temperature, cache_ttl, use_cache, feature=None) -> Optional[Dict]:
+        """generate_json_response for a worker thread, releasing its database connection"""
+        try:
+            return self.generate_json_response(prompt, temperature, cache_ttl=cache_ttl, use_cache=use_cache,
+                                               feature=feature)
+        except Exception as e:
+            logger.error(f"Gemini AI generation failed: {e}")
             return None
+        finally:
+            close_old_connections()
 
 # Global instance
 gemini_service = GeminiAIService()
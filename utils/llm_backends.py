@@ -0,0 +1,396 @@
+"""
+LLM backends for ResourcePro
+
+GeminiAIService sends prompts through a backend chosen by the LLM_BACKEND
+setting:
+
+- 'gemini': Google Gemini via google.generativeai (needs GEMINI_API_KEY)
+- 'local': a deterministic offline stand-in that answers every AI prompt in
+  the application with schema-valid canned JSON, after LLM_LOCAL_LATENCY_MS
+  and failing at LLM_LOCAL_ERROR_RATE (as a transient error), so the AI paths can be benchmarked and
+  load-tested end to end without network access
+- a dotted path to an LLMBackend subclass
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_LATENCY_MS = 800
+
+
+class LLMBackendError(Exception):
+    """A backend could not produce a response"""
+
+
+class LLMBackend:
+    """Interface of a text generation backend"""
+
+    # Identifies the model in response cache keys
+    model_name = ''
+
+    def is_available(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                 timeout: Optional[float] = None) -> str:
+        """
+        Generate text for a prompt
+
+        Args:
+            timeout: Seconds to wait for the response before giving up
+
+        Raises:
+            Exception: if no response could be produced
+        """
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Generate text for a prompt as it is produced, in chunks
+
+        Backends without a streaming API yield the whole response as one chunk.
+        """
+        yield self.generate(prompt, temperature=temperature, max_output_tokens=max_output_tokens,
+                            timeout=timeout)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failure is transient (timeouts, overload), so worth retrying"""
+        return isinstance(error, (TimeoutError, ConnectionError, LLMBackendError))
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini"""
+
+    model_name = 'gemini-1.5-flash'
+
+    def __init__(self):
+        self.model = None
+        if GEMINI_AVAILABLE and settings.GEMINI_API_KEY:
+            try:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                self.model = genai.GenerativeModel(self.model_name)
+            except Exception as e:
+                logger.error(f"Failed to initialize Gemini AI: {e}")
+        else:
+            logger.warning("Gemini AI not available: Missing API key or library not installed")
+
+    def is_available(self) -> bool:
+        return self.model is not None
+
+    def generate(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                 timeout: Optional[float] = None) -> str:
+        response = self.model.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+            ),
+            request_options={'timeout': timeout} if timeout else None,
+        )
+        return response.text
+
+    def generate_stream(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        response = self.model.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+            ),
+            request_options={'timeout': timeout} if timeout else None,
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    def is_retryable(self, error: Exception) -> bool:
+        return super().is_retryable(error) or isinstance(error, (
+            google_exceptions.DeadlineExceeded,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.ResourceExhausted,
+            google_exceptions.InternalServerError,
+            google_exceptions.TooManyRequests,
+        ))
+
+
+def _ids_between(prompt: str, start: str, end: str) -> List[int]:
+    """Values of "id" fields in the part of a prompt between two markers"""
+    begin = prompt.find(start)
+    if begin < 0:
+        return []
+    finish = prompt.find(end, begin)
+    section = prompt[begin:finish if finish > 0 else None]
+    return [int(value) for value in re.findall(r'"id":\s*(\d+)', section)]
+
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for benchmarks and load tests
+
+    The kind of answer is recognised from a phrase in each prompt's instructions;
+    IDs (resources, forecasts) are taken from the data embedded in the prompt,
+    so the responses are accepted by the same code that handles Gemini's.
+    Content depends only on the prompt, so identical prompts get identical
+    answers; latency jitter and injected failures come from a seeded generator.
+    """
+
+    model_name = 'local-stand-in'
+
+    def __init__(self, latency_ms: Optional[float] = None, error_rate: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms if latency_ms is not None else getattr(
+            settings, 'LLM_LOCAL_LATENCY_MS', DEFAULT_LOCAL_LATENCY_MS)
+        self.error_rate = error_rate if error_rate is not None else getattr(settings, 'LLM_LOCAL_ERROR_RATE', 0.0)
+        self._random = random.Random(seed if seed is not None else getattr(settings, 'LLM_LOCAL_SEED', 0))
+        # (phrase from the prompt's instructions, builder); checked in order
+        self._responders: List[Tuple[str, Callable[[str, random.Random], Union[str, Dict[str, Any]]]]] = [
+            ('Answer in plain text', self._plain_answer),
+            ('USER QUESTION:', self._query_answer),
+            ('providing daily briefings', self._briefing),
+            ('Statistical Forecasts (Generated by ML)', self._forecast_adjustments),
+            ('"immediate_hiring"', self._strategic_recommendations),
+            ('"skills_to_develop"', self._skill_recommendations),
+            ('recommendations for this task', self._allocation_recommendations),
+            ('"overall_risk_assessment"', self._risk_analysis),
+            ('DETECTED CONFLICTS:', self._conflict_analysis),
+            ('Generate ONE simple, actionable recommendation', self._single_recommendation),
+        ]
+
+    def _latency(self) -> float:
+        """Seconds the next response takes: the configured mean +/-25%"""
+        return max(0.0, self.latency_ms * self._random.uniform(0.75, 1.25)) / 1000
+
+    def _respond(self, prompt: str) -> str:
+        if self._random.random() < self.error_rate:
+            raise LLMBackendError("Injected local backend failure")
+
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        for marker, responder in self._responders:
+            if marker in prompt:
+                response = responder(prompt, rng)
+                return response if isinstance(response, str) else json.dumps(response)
+        return json.dumps({'text': 'Local stand-in response'})
+
+    def generate(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                 timeout: Optional[float] = None) -> str:
+        latency = self._latency()
+        if timeout is not None and latency > timeout:
+            time.sleep(max(0.0, timeout))
+            raise TimeoutError(f"Local backend did not answer within {timeout:.1f}s")
+        time.sleep(latency)
+        return self._respond(prompt)
+
+    def generate_stream(self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 2048,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        # The first chunk arrives after a fifth of the latency, the rest is spread over the words
+        latency = self._latency()
+        first = latency * 0.2
+        if timeout is not None and first > timeout:
+            time.sleep(max(0.0, timeout))
+            raise TimeoutError(f"Local backend did not answer within {timeout:.1f}s")
+        time.sleep(first)
+        words = re.findall(r'\S+\s*', self._respond(prompt)) or ['']
+        for index, word in enumerate(words):
+            if index:
+                time.sleep((latency - first) / len(words))
+            yield word
+
+    def _forecast_adjustments(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        begin = prompt.find('Statistical Forecasts')
+        end = prompt.find('Current Business Context', begin)
+        data = prompt[begin:end if end > 0 else None]
+        rows = re.findall(r'"id":\s*(\d+).*?"predicted_demand_hours":\s*([\d.]+)', data, re.S)
+        adjusted = []
+        for forecast_id, hours in rows:
+            change = round(rng.uniform(-15, 15), 1)
+            adjusted.append({
+                'original_forecast_id': int(forecast_id),
+                'adjusted_demand_hours': round(float(hours) * (1 + change / 100), 1),
+                'adjustment_percentage': change,
+                'reasoning': 'Adjusted for current project pipeline and seasonal demand.',
+                'confidence_score': round(rng.uniform(0.6, 0.9), 2),
+                'context_factors': ['project pipeline', 'seasonality'],
+            })
+        return {
+            'adjusted_forecasts': adjusted,
+            'overall_insights': {
+                'market_trends_impact': 'Demand is expected to stay close to the statistical forecast.',
+                'strategic_recommendations': 'Keep hiring plans flexible and revisit monthly.',
+                'risk_factors': ['Project start dates slipping'],
+                'opportunities': ['Cross-training to cover peak demand'],
+            },
+        }
+
+    def _strategic_recommendations(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        def category(actions: List[str]) -> Dict[str, Any]:
+            return {
+                'priority_level': rng.choice(['high', 'medium', 'low']),
+                'timeline': rng.choice(['1-3 months', '3-6 months', '6-12 months']),
+                'specific_actions': actions,
+                'expected_roi': 'Reduced overtime and fewer missed deadlines.',
+                'implementation_complexity': rng.choice(['low', 'medium', 'high']),
+            }
+
+        return {
+            'immediate_hiring': category(['Open requisitions for roles forecast above capacity']),
+            'training_development': category(['Cross-train developers on the most demanded skills']),
+            'resource_optimization': category(['Rebalance assignments from overallocated resources']),
+            'long_term_planning': category(['Review the forecast quarterly against actual demand']),
+        }
+
+    def _skill_recommendations(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        begin = prompt.find('Current Team Skills Data')
+        end = prompt.find('Project Requirements Data', begin)
+        team_skills = prompt[begin:end if end > 0 else None] if begin >= 0 else ''
+        names = list(dict.fromkeys(re.findall(r'"name":\s*"([^"]+)"', team_skills))) or ['Python', 'Django', 'SQL']
+
+        def items(count: int) -> List[Dict[str, Any]]:
+            return [
+                {
+                    'skill_name': name,
+                    'priority_score': rng.randint(1, 10),
+                    'reasoning': f'{name} appears in current project requirements.',
+                    'confidence_score': round(rng.uniform(0.5, 0.9), 2),
+                    'estimated_impact': 'Fewer skill gaps on upcoming tasks.',
+                }
+                for name in rng.sample(names, min(count, len(names)))
+            ]
+
+        return {'skills_to_develop': items(5), 'training_areas': items(5), 'obsolete_skills': items(3)}
+
+    def _allocation_recommendations(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        resource_ids = _ids_between(prompt, 'Available Resources:', 'Analyze each resource')
+        recommendations = [
+            {
+                'resource_id': resource_id,
+                'match_score': round(rng.uniform(0.4, 0.95), 2),
+                'reasoning': 'Skills and availability fit the task requirements.',
+                'estimated_completion_time': round(rng.uniform(4, 40), 1),
+                'cost_efficiency_score': round(rng.uniform(0.4, 0.9), 2),
+                'risk_factors': ['Competing assignments'],
+                'benefits': ['Relevant experience'],
+            }
+            for resource_id in rng.sample(resource_ids, min(3, len(resource_ids)))
+        ]
+        recommendations.sort(key=lambda rec: rec['match_score'], reverse=True)
+        return {'recommendations': recommendations, 'analysis_summary': 'Local stand-in allocation analysis'}
+
+    def _risk_analysis(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        return {
+            'risks': [
+                {
+                    'category': 'RESOURCE & ALLOCATION',
+                    'title': 'Overallocated team members',
+                    'description': 'Some resources are assigned above their weekly capacity.',
+                    'severity': rng.choice(['medium', 'high']),
+                    'probability': round(rng.uniform(0.3, 0.8), 2),
+                    'impact_score': round(rng.uniform(3, 8), 1),
+                    'affected_items': [],
+                    'root_causes': ['Parallel project deadlines'],
+                    'potential_triggers': ['New urgent tasks'],
+                    'impact_areas': ['timeline', 'team_morale'],
+                    'suggested_interventions': [{
+                        'intervention_type': 'reassignment',
+                        'description': 'Move tasks to resources with spare capacity.',
+                        'effort_required': 'low',
+                        'success_probability': 0.7,
+                        'estimated_cost': 0,
+                        'time_to_implement': '1 week',
+                    }],
+                    'monitoring_indicators': ['Weekly utilization above 100%'],
+                    'escalation_conditions': ['Deadline at risk'],
+                },
+            ],
+            'overall_risk_assessment': {
+                'project_risk_level': 'medium',
+                'primary_concerns': ['Resource capacity'],
+                'immediate_actions_needed': ['Rebalance assignments'],
+                'long_term_strategies': ['Plan capacity per quarter'],
+            },
+        }
+
+    def _conflict_analysis(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        return {
+            'summary': 'Local stand-in conflict analysis.',
+            'insights': ['Conflicts are concentrated on a few resources.'],
+            'recommendations': ['Reassign overlapping tasks.'],
+            'priority_actions': ['Resolve overallocations due this week.'],
+            'confidence': rng.randint(60, 90),
+        }
+
+    def _single_recommendation(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        return {
+            'recommendation': {
+                'title': 'Rebalance workload',
+                'description': 'Move lower-priority tasks to resources with spare capacity.',
+            },
+        }
+
+    def _plain_answer(self, prompt: str, rng: random.Random) -> str:
+        match = re.search(r'USER QUESTION: "(.*)"', prompt)
+        question = match.group(1) if match else 'your question'
+        return (f'Local stand-in answer to: {question}\n'
+                f'• {rng.randint(1, 5)} resources have spare capacity this week\n'
+                f'• {rng.randint(0, 3)} tasks are due within seven days')
+
+    def _query_answer(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        match = re.search(r'USER QUESTION: "(.*)"', prompt)
+        question = match.group(1) if match else 'your question'
+        return {
+            'answer': f'Local stand-in answer to: {question}',
+            'found_conflicts': rng.random() < 0.5,
+            'data_summary': 'Resources, projects and tasks in the prompt context',
+        }
+
+    def _briefing(self, prompt: str, rng: random.Random) -> Dict[str, Any]:
+        return {
+            'summary': 'Local stand-in briefing: utilization is stable and no deadline is at immediate risk.',
+            'risks': [{
+                'title': 'Upcoming deadline pressure',
+                'description': 'Several tasks are due within two weeks.',
+                'priority': rng.choice(['high', 'medium', 'low']),
+                'affected_items': [],
+                'confidence': round(rng.uniform(0.6, 0.9), 2),
+                'risk_category': 'timeline',
+            }],
+            'recommendations': [{
+                'title': 'Review task priorities',
+                'description': 'Confirm owners for tasks due in the next two weeks.',
+                'priority': 'medium',
+                'affected_items': [],
+                'confidence': round(rng.uniform(0.6, 0.9), 2),
+                'intervention_type': 'reassignment',
+            }],
+            'confidence_score': round(rng.uniform(0.6, 0.9), 2),
+        }
+
+
+BACKENDS = {
+    'gemini': GeminiBackend,
+    'local': LocalBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> LLMBackend:
+    """Instantiate the backend named by LLM_BACKEND ('gemini', 'local' or a dotted class path)"""
+    name = name or getattr(settings, 'LLM_BACKEND', 'gemini')
+    backend_class = BACKENDS.get(name) or import_string(name)
+    return backend_class()
@@ -0,0 +1,160 @@
+"""
+Persistent response cache for LLM calls
+
+Responses are stored in the database (core.CachedLLMResponse) under a hash of
+model, prompt and temperature, so an identical prompt - same task, same data -
+is answered without a network call until its TTL expires, across restarts and
+processes. The table is capped at LLM_CACHE_MAX_ENTRIES rows; the least
+recently used rows are evicted first.
+
+Hit and miss counts are kept in the default cache; together with the latency
+recorded for each stored response they show how much waiting the cache saved.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+STATS_KEY = 'llm_cache:stats:{}'
+# Evict down to this fraction of the cap, so eviction does not run on every store
+EVICTION_TARGET = 0.9
+
+
+class LLMResponseCache:
+    """Content-addressed, persistent cache of LLM responses"""
+
+    def enabled(self) -> bool:
+        return getattr(settings, 'LLM_CACHE_ENABLED', True)
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, temperature: float) -> str:
+        """Hash identifying a model, prompt and temperature combination"""
+        digest = hashlib.sha256()
+        for part in (model_name, f'{temperature:.3f}', prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored response text for a key, or None if missing or expired"""
+        from core.models import CachedLLMResponse
+
+        now = timezone.now()
+        try:
+            entry = CachedLLMResponse.objects.filter(key=key, expires_at__gt=now).only(
+                'id', 'response_text', 'latency_ms'
+            ).first()
+            if entry is None:
+                self._count('misses')
+                return None
+            CachedLLMResponse.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+        except DatabaseError as e:
+            # The cache must never make an AI call fail
+            logger.warning(f"LLM response cache unavailable: {e}")
+            return None
+
+        self._count('hits')
+        self._count('saved_ms', int(entry.latency_ms))
+        return entry.response_text
+
+    def set(self, key: str, model_name: str, response_text: str, ttl: Optional[int] = None,
+            latency_ms: float = 0):
+        """Store a response for ttl seconds (LLM_CACHE_DEFAULT_TTL if not given)"""
+        from core.models import CachedLLMResponse
+
+        ttl = ttl or getattr(settings, 'LLM_CACHE_DEFAULT_TTL', DEFAULT_TTL)
+        now = timezone.now()
+        try:
+            CachedLLMResponse.objects.update_or_create(
+                key=key,
+                defaults={
+                    'model_name': model_name,
+                    'response_text': response_text,
+                    'latency_ms': latency_ms,
+                    'hits': 0,
+                    'last_used_at': now,
+                    'expires_at': now + timedelta(seconds=ttl),
+                }
+            )
+            self._evict()
+        except DatabaseError as e:
+            logger.warning(f"Could not store LLM response: {e}")
+
+    def delete(self, key: str):
+        """Forget a stored response"""
+        from core.models import CachedLLMResponse
+
+        try:
+            CachedLLMResponse.objects.filter(key=key).delete()
+        except DatabaseError as e:
+            logger.warning(f"Could not delete LLM response: {e}")
+
+    def _evict(self):
+        """Drop expired rows and, above the size cap, the least recently used ones"""
+        from core.models import CachedLLMResponse
+
+        max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        if CachedLLMResponse.objects.count() <= max_entries:
+            return
+
+        CachedLLMResponse.objects.filter(expires_at__lte=timezone.now()).delete()
+        keep = int(max_entries * EVICTION_TARGET)
+        stale_ids = list(
+            CachedLLMResponse.objects.order_by('-last_used_at').values_list('id', flat=True)[keep:]
+        )
+        if stale_ids:
+            CachedLLMResponse.objects.filter(id__in=stale_ids).delete()
+            logger.info(f"Evicted {len(stale_ids)} least recently used LLM responses")
+
+    def clear(self):
+        """Remove every stored response and reset the counters"""
+        from core.models import CachedLLMResponse
+
+        CachedLLMResponse.objects.all().delete()
+        cache.delete_many([STATS_KEY.format(name) for name in ('hits', 'misses', 'saved_ms')])
+
+    def _count(self, name: str, amount: int = 1):
+        key = STATS_KEY.format(name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counts since the counters were reset, and stored-entry totals
+
+        saved_seconds is the latency of the original calls that hits avoided.
+        """
+        from core.models import CachedLLMResponse
+
+        hits = cache.get(STATS_KEY.format('hits')) or 0
+        misses = cache.get(STATS_KEY.format('misses')) or 0
+        totals = CachedLLMResponse.objects.aggregate(
+            total_hits=Sum('hits'),
+            saved_ms=Sum(F('hits') * F('latency_ms')),
+        )
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'saved_seconds': round((cache.get(STATS_KEY.format('saved_ms')) or 0) / 1000, 2),
+            'entries': CachedLLMResponse.objects.count(),
+            'stored_hits': totals['total_hits'] or 0,
+            'stored_saved_seconds': round((totals['saved_ms'] or 0) / 1000, 2),
+        }
+
+
+# Global instance
+llm_cache = LLMResponseCache()
@@ -0,0 +1,214 @@
+"""
+Telemetry for LLM calls
+
+Every gemini_service call is recorded (core.LLMCallRecord) with its call site
+("feature"), prompt and response size, latency, cache outcome, attempts and
+failures. report() summarises them per feature - call counts, cache hit and
+failure rates, p50/p95/p99 latency and prompt size - to show what each AI
+feature costs and which prompts are worth slimming down.
+
+The store is rolling: records older than LLM_TELEMETRY_RETENTION_DAYS, and
+the oldest beyond LLM_TELEMETRY_MAX_RECORDS, are pruned as new ones arrive.
+"""
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .prompt_context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURE = 'other'
+DEFAULT_MAX_RECORDS = 50000
+DEFAULT_RETENTION_DAYS = 7
+# Prune once every this many records rather than on every call
+PRUNE_EVERY = 100
+PERCENTILES = (50, 95, 99)
+# Outcomes of calls that reached the model, whose latency is reported
+MODEL_OUTCOMES = ('success', 'error', 'parse_error', 'cancelled')
+FAILURE_OUTCOMES = ('error', 'parse_error')
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = PERCENTILES) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles and maximum of a list of values (None when empty)"""
+    ordered = sorted(values)
+    summary = {}
+    for point in points:
+        if ordered:
+            rank = max(0, math.ceil(point / 100 * len(ordered)) - 1)
+            summary[f'p{point}'] = round(ordered[rank], 1)
+        else:
+            summary[f'p{point}'] = None
+    summary['max'] = round(ordered[-1], 1) if ordered else None
+    return summary
+
+
+class LLMCall:
+    """
+    Measurements of one call, filled in while it runs
+
+    Used as a context manager: the record is stored on exit. An exception
+    leaving the block marks the call as failed; a generator closed before it
+    finished (a stream the client stopped reading) as cancelled.
+    """
+
+    def __init__(self, telemetry: 'LLMTelemetry', feature: Optional[str], model_name: str, prompt: str):
+        self.telemetry = telemetry
+        self.feature = feature or DEFAULT_FEATURE
+        self.model_name = model_name
+        self.prompt_chars = len(prompt)
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.response_chars = 0
+        self.outcome = 'success'
+        self.error_type = ''
+        self.attempts = 0
+        self.first_chunk_ms = None
+        self.latency_ms = 0.0
+        self._started = time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self._started) * 1000
+
+    def set_outcome(self, outcome: str, error: Optional[BaseException] = None):
+        self.outcome = outcome
+        self.error_type = type(error).__name__ if error is not None else ''
+
+    def set_response(self, text: Optional[str]):
+        self.response_chars = len(text or '')
+
+    def add_chunk(self, chunk: str):
+        """Count a streamed chunk, noting the time to the first one"""
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = self.elapsed_ms()
+        self.response_chars += len(chunk)
+
+    def __enter__(self) -> 'LLMCall':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is GeneratorExit:
+            self.set_outcome('cancelled')
+        elif exc_type is not None:
+            self.set_outcome('error', exc)
+        self.latency_ms = self.elapsed_ms()
+        self.telemetry.record(self)
+        return False
+
+
+class LLMTelemetry:
+    """Rolling store of LLM call measurements"""
+
+    def enabled(self) -> bool:
+        return getattr(settings, 'LLM_TELEMETRY_ENABLED', True)
+
+    def track(self, feature: Optional[str], model_name: str, prompt: str) -> LLMCall:
+        """Start measuring a call; use the result as a context manager"""
+        return LLMCall(self, feature, model_name, prompt)
+
+    def record(self, call: LLMCall):
+        """Store a finished call's measurements"""
+        if not self.enabled():
+            return
+        from core.models import LLMCallRecord
+
+        try:
+            # Savepoint, so a failed write does not break the caller's transaction
+            with transaction.atomic():
+                record = LLMCallRecord.objects.create(
+                    feature=call.feature[:100],
+                    model_name=call.model_name[:100],
+                    outcome=call.outcome,
+                    error_type=call.error_type[:100],
+                    prompt_chars=call.prompt_chars,
+                    prompt_tokens=call.prompt_tokens,
+                    response_chars=call.response_chars,
+                    latency_ms=call.latency_ms,
+                    first_chunk_ms=call.first_chunk_ms,
+                    attempts=call.attempts,
+                )
+                if record.id % PRUNE_EVERY == 0:
+                    self._prune()
+        except DatabaseError as e:
+            # Telemetry must never make an AI call fail
+            logger.warning(f"Could not record LLM call: {e}")
+
+    def _prune(self):
+        """Drop records past the retention period and the oldest beyond the size cap"""
+        from core.models import LLMCallRecord
+
+        retention_days = getattr(settings, 'LLM_TELEMETRY_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+        LLMCallRecord.objects.filter(created_at__lt=timezone.now() - timedelta(days=retention_days)).delete()
+
+        max_records = getattr(settings, 'LLM_TELEMETRY_MAX_RECORDS', DEFAULT_MAX_RECORDS)
+        cutoff = LLMCallRecord.objects.order_by('-id').values_list('id', flat=True)[max_records:max_records + 1]
+        if cutoff:
+            deleted, _ = LLMCallRecord.objects.filter(id__lte=cutoff[0]).delete()
+            logger.info(f"Pruned {deleted} old LLM call records")
+
+    def clear(self):
+        """Remove every record"""
+        from core.models import LLMCallRecord
+
+        LLMCallRecord.objects.all().delete()
+
+    def report(self, hours: float = 24, feature: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-feature summary of the calls made in the last `hours`
+
+        Features are ordered by the prompt tokens they sent, largest first.
+        Latency percentiles cover calls that reached the model; cache hits
+        and skipped calls are only counted.
+        """
+        from core.models import LLMCallRecord
+
+        since = timezone.now() - timedelta(hours=hours)
+        records = LLMCallRecord.objects.filter(created_at__gte=since)
+        if feature:
+            records = records.filter(feature=feature)
+
+        rows_by_feature = defaultdict(list)
+        for row in records.values('feature', 'outcome', 'prompt_tokens', 'response_chars',
+                                  'latency_ms', 'first_chunk_ms', 'attempts'):
+            rows_by_feature[row['feature']].append(row)
+
+        features = {name: self._summarize(rows) for name, rows in rows_by_feature.items()}
+        all_rows = [row for rows in rows_by_feature.values() for row in rows]
+        return {
+            'since': since.isoformat(),
+            'hours': hours,
+            'total': self._summarize(all_rows),
+            'features': dict(sorted(features.items(), key=lambda item: -item[1]['prompt_tokens']['total'])),
+        }
+
+    def _summarize(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        outcomes = Counter(row['outcome'] for row in rows)
+        model_rows = [row for row in rows if row['outcome'] in MODEL_OUTCOMES]
+        failures = sum(outcomes[outcome] for outcome in FAILURE_OUTCOMES)
+        prompt_tokens = [row['prompt_tokens'] for row in rows]
+        first_chunks = [row['first_chunk_ms'] for row in model_rows if row['first_chunk_ms'] is not None]
+
+        summary = {
+            'calls': len(rows),
+            'outcomes': dict(outcomes),
+            'cache_hit_rate': round(outcomes['cache_hit'] / len(rows), 3) if rows else 0.0,
+            'failure_rate': round(failures / len(model_rows), 3) if model_rows else 0.0,
+            'parse_failures': outcomes['parse_error'],
+            'model_attempts': sum(row['attempts'] for row in rows),
+            'latency_ms': percentiles([row['latency_ms'] for row in model_rows]),
+            'prompt_tokens': dict(percentiles(prompt_tokens), total=sum(prompt_tokens)),
+            'response_chars': percentiles([row['response_chars'] for row in model_rows]),
+        }
+        if first_chunks:
+            summary['first_chunk_ms'] = percentiles(first_chunks)
+        return summary
+
+
+# Global instance
+llm_telemetry = LLMTelemetry()
@@ -0,0 +1,185 @@
+"""
+Token-budgeted prompt context for LLM calls
+
+Prompts used to embed every resource, project, task and assignment as indented
+JSON, so their size (and Gemini latency and cost) grew with the organisation.
+PromptContextBuilder fits the context into a token budget instead: fixed parts
+(headline numbers) are always included, entity lists are ranked by relevance
+and included until their share of the budget is used, and the rest of each
+list is replaced by a statistical summary.
+"""
+import json
+import logging
+import math
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 6000
+# Rough size of a token in characters of JSON, used to estimate prompt size
+CHARS_PER_TOKEN = 4
+# Days ahead over which deadline_score falls from 1 to 0
+DEADLINE_HORIZON_DAYS = 30
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of prompt text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact_json(data: Any) -> str:
+    """Serialize prompt data without indentation or padding"""
+    return json.dumps(data, separators=(',', ':'), default=str)
+
+
+def deadline_score(days_until: Optional[int], horizon: int = DEADLINE_HORIZON_DAYS) -> float:
+    """Relevance of a deadline: 1.0 when due or overdue, falling to 0 at the horizon"""
+    if days_until is None:
+        return 0.0
+    if days_until <= 0:
+        return 1.0
+    return max(0.0, 1.0 - days_until / horizon)
+
+
+def priority_score(priority: Any) -> float:
+    """Relevance of a 1-5 priority (5 = high) as 0.0-1.0"""
+    try:
+        return max(0.0, min(float(priority), 5.0)) / 5.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _summarize(items: Sequence[Dict[str, Any]], stats_fields: Sequence[str],
+               count_fields: Sequence[str]) -> Dict[str, Any]:
+    """Describe omitted items by count, numeric ranges and category counts"""
+    summary = {'count': len(items)}
+    for field in stats_fields:
+        values = [item[field] for item in items if isinstance(item.get(field), (int, float))]
+        if values:
+            summary[field] = {
+                'min': round(min(values), 1),
+                'max': round(max(values), 1),
+                'avg': round(sum(values) / len(values), 1),
+            }
+    for field in count_fields:
+        counts = Counter(str(item.get(field)) for item in items)
+        summary[f'by_{field}'] = dict(counts.most_common(10))
+    return summary
+
+
+class _Section:
+    def __init__(self, name, items, score, header, stats_fields, count_fields):
+        self.name = name
+        self.header = header or {}
+        self.stats_fields = stats_fields
+        self.count_fields = count_fields
+        self.ranked = sorted(items, key=score, reverse=True) if score else list(items)
+        self.costs = [estimate_tokens(compact_json(item)) + 1 for item in self.ranked]
+        self.included = 0
+
+    def render(self) -> Dict[str, Any]:
+        rendered = dict(self.header)
+        rendered['details'] = self.ranked[:self.included]
+        omitted = self.ranked[self.included:]
+        if omitted:
+            rendered['omitted'] = _summarize(omitted, self.stats_fields, self.count_fields)
+        return rendered
+
+
+class PromptContextBuilder:
+    """
+    Build compact prompt context that fits a token budget
+
+    Example:
+        builder = PromptContextBuilder('daily_briefing')
+        builder.add_fixed('analysis_date', today.isoformat())
+        builder.add_section('resources', resource_rows, score=lambda r: r['utilization'],
+                            stats_fields=['utilization'], count_fields=['department'])
+        text, report = builder.build()
+    """
+
+    def __init__(self, name: str, token_budget: Optional[int] = None):
+        self.name = name
+        self.token_budget = token_budget or getattr(settings, 'LLM_CONTEXT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)
+        self._fixed: Dict[str, Any] = {}
+        self._sections: List[_Section] = []
+
+    def add_fixed(self, key: str, value: Any) -> 'PromptContextBuilder':
+        """Include a value as is (headline numbers, dates)"""
+        self._fixed[key] = value
+        return self
+
+    def add_section(self, name: str, items: Sequence[Dict[str, Any]],
+                    score: Optional[Callable[[Dict[str, Any]], float]] = None,
+                    header: Optional[Dict[str, Any]] = None,
+                    stats_fields: Sequence[str] = (),
+                    count_fields: Sequence[str] = ()) -> 'PromptContextBuilder':
+        """
+        Include a list of entities, most relevant first, as far as the budget allows
+
+        Sections share the budget left after fixed parts in the order they are
+        added; budget a section does not need passes to the following ones.
+
+        Args:
+            name: Key of the section in the context
+            items: Entity dictionaries
+            score: Relevance of an item (higher is included first); keeps the given order if omitted
+            header: Values always included with the section (totals, averages)
+            stats_fields: Numeric fields summarised (min/max/avg) for omitted items
+            count_fields: Categorical fields counted for omitted items
+        """
+        self._sections.append(_Section(name, items, score, header, stats_fields, count_fields))
+        return self
+
+    def _render(self) -> Dict[str, Any]:
+        context = dict(self._fixed)
+        for section in self._sections:
+            context[section.name] = section.render()
+        return context
+
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Render the context
+
+        Returns:
+            (compact JSON text, report) where the report gives the estimated
+            tokens, the budget, whether anything was left out, and per section
+            how many items were included out of how many
+        """
+        # Fixed parts, section headers and worst-case omitted summaries come first
+        for section in self._sections:
+            section.included = 0
+        remaining = self.token_budget - estimate_tokens(compact_json(self._render()))
+
+        # First pass: an equal share per section, unused share rolls forward
+        for index, section in enumerate(self._sections):
+            share = remaining // (len(self._sections) - index) if remaining > 0 else 0
+            used = 0
+            while section.included < len(section.ranked) and used + section.costs[section.included] <= share:
+                used += section.costs[section.included]
+                section.included += 1
+            remaining -= used
+
+        # Second pass: hand what is left to sections that still have items, in order
+        for section in self._sections:
+            while section.included < len(section.ranked) and section.costs[section.included] <= remaining:
+                remaining -= section.costs[section.included]
+                section.included += 1
+
+        text = compact_json(self._render())
+        sections = {s.name: {'included': s.included, 'total': len(s.ranked)} for s in self._sections}
+        cut = [f"{name} {counts['included']}/{counts['total']}"
+               for name, counts in sections.items() if counts['included'] < counts['total']]
+        report = {
+            'name': self.name,
+            'budget': self.token_budget,
+            'tokens': estimate_tokens(text),
+            'truncated': bool(cut),
+            'sections': sections,
+        }
+        logger.info(f"Prompt context {self.name}: ~{report['tokens']} of {self.token_budget} tokens"
+                    + (f", truncated {', '.join(cut)}" if cut else ""))
+        return text, report
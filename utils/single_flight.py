@@ -0,0 +1,128 @@
+"""
+Single-flight coalescing of expensive operations
+
+When many callers need the same expensive result at once - every dashboard
+viewer finding the daily briefing expired, several requests asking for
+suggestions for the same task - only the first caller computes it; the others
+wait for that computation and share its result instead of each making the same
+LLM call and storing a duplicate row.
+
+The leader holds a lock in the default cache (added atomically with
+cache.add), so with a shared cache backend such as Redis or Memcached callers
+in every process are coalesced; the local-memory default coalesces threads of
+one process. The lock expires after SINGLE_FLIGHT_LOCK_SECONDS, so a leader
+that dies does not block others for longer than that. Results are handed to
+waiters under the leader's token, and never reused by later callers: callers
+check their own store (recent briefing, recent suggestions) once they lead.
+"""
+import logging
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_SECONDS = 180
+# How long a finished flight's result stays available to its waiters
+RESULT_SECONDS = 60
+POLL_INITIAL_SECONDS = 0.05
+POLL_MAX_SECONDS = 0.5
+LOCK_KEY = 'single_flight:{}'
+RESULT_KEY = 'single_flight:{}:{}'
+
+
+class SingleFlight:
+    """Let one caller per key compute a result while the others wait for it"""
+
+    def __init__(self, lock_seconds: Optional[float] = None):
+        self._lock_seconds = lock_seconds
+
+    @property
+    def lock_seconds(self) -> float:
+        return self._lock_seconds or getattr(settings, 'SINGLE_FLIGHT_LOCK_SECONDS', DEFAULT_LOCK_SECONDS)
+
+    def do(self, key: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Return func(*args, **kwargs), or the result of the call already in flight for key
+
+        Exceptions raised by func propagate to the leader only; waiters then
+        take over and call func themselves.
+        """
+        deadline = time.monotonic() + self.lock_seconds
+        while True:
+            token = self.acquire(key)
+            if token:
+                break
+            found, result = self.wait(key, timeout=deadline - time.monotonic())
+            if found:
+                return result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Gave up waiting for single-flight {key}; computing it here")
+                return func(*args, **kwargs)
+
+        completed = False
+        try:
+            result = func(*args, **kwargs)
+            self.complete(key, token, result)
+            completed = True
+            return result
+        finally:
+            if not completed:
+                self.release(key, token)
+
+    def acquire(self, key: str) -> Optional[str]:
+        """
+        Become the leader for key without waiting
+
+        Returns:
+            A token to pass to complete or release, or None if another caller leads
+        """
+        token = uuid.uuid4().hex
+        if cache.add(LOCK_KEY.format(key), token, self.lock_seconds):
+            return token
+        return None
+
+    def complete(self, key: str, token: str, result: Any):
+        """Hand the leader's result to the waiters and release the lock"""
+        cache.set(RESULT_KEY.format(key, token), {'result': result}, RESULT_SECONDS)
+        self.release(key, token)
+
+    def release(self, key: str, token: str):
+        """Release the lock without a result; a waiter becomes the next leader"""
+        lock_key = LOCK_KEY.format(key)
+        # Leave a lock that has expired and been taken by another caller alone
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> Tuple[bool, Any]:
+        """
+        Wait for the flight in progress for key
+
+        Returns:
+            (True, result) when the leader completed, or (False, None) when no
+            flight is in progress, the leader gave up, or the timeout passed
+        """
+        deadline = time.monotonic() + (self.lock_seconds if timeout is None else timeout)
+        lock_key = LOCK_KEY.format(key)
+        token = cache.get(lock_key)
+        delay = POLL_INITIAL_SECONDS
+        while token:
+            entry = cache.get(RESULT_KEY.format(key, token))
+            if entry is not None:
+                return True, entry['result']
+            if cache.get(lock_key) != token:
+                # Released between the two reads: completed, or abandoned
+                entry = cache.get(RESULT_KEY.format(key, token))
+                return (True, entry['result']) if entry is not None else (False, None)
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+        return False, None
+
+
+# Global instance
+single_flight = SingleFlight()